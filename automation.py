@@ -12,6 +12,7 @@ import time
 import logging
 import textwrap
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
 
 # 添加crawler目录到系统路径
@@ -23,10 +24,26 @@ except ImportError:
     # 如果路径有问题，尝试直接导入
     from enhanced_crawler import EnhancedFreeStuffCrawler
 
+try:
+    from enhanced_config import ARCHIVE_INDEX, COMPACTION, DEAL_STORE, LIVENESS
+except ImportError:
+    ARCHIVE_INDEX = {}
+    COMPACTION = {}
+    DEAL_STORE = {}
+    LIVENESS = {}
+from archive_index import ArchiveIndex
+from compaction import BACKUP_NAME, RUN_NAME, SnapshotArchive
+from deal_store import DealStore
+from deal_stream import iter_deals
+from liveness import LivenessChecker, apply_liveness, deal_link
+
 from bs4 import BeautifulSoup
 
 class AutomationManager:
     """自动化管理器"""
+
+    MAX_DISPLAY_DEALS = 20      # 网站上最多显示的优惠数量
+    CANDIDATE_FACTOR = 3        # 读取的候选优惠数量倍数（链接检查可能移除一部分）
     
     def __init__(self):
         self.setup_logging()
@@ -36,6 +53,8 @@ class AutomationManager:
         self.sample_data_dir = self.crawler_dir / 'sample_data'
         self.sample_data_file = self.sample_data_dir / 'enhanced_deals_sample.json'
         self.last_update_used_fallback = False
+        self.last_deadline_stats = {}
+        self.last_liveness_stats = {}
         
     def setup_logging(self):
         """设置日志"""
@@ -49,8 +68,14 @@ class AutomationManager:
         )
         self.logger = logging.getLogger(__name__)
     
-    def run_crawler(self):
-        """运行爬虫"""
+    def run_crawler(self, engine=None, cache_only=False, incremental=False, max_deals=None):
+        """运行爬虫
+
+        engine: 'sync' 或 'async'，为空时使用 enhanced_config.CRAWL_ENGINE
+        cache_only: 只从HTTP缓存读取页面，离线重放上一次运行
+        incremental: 只解析新优惠，遇到已处理过的优惠即停止
+        max_deals: 最多解析的优惠数量，为空时使用 enhanced_config.MAX_DEALS
+        """
         self.logger.info("🤖 启动爬虫系统...")
         
         try:
@@ -59,8 +84,14 @@ class AutomationManager:
             os.chdir(self.crawler_dir)
             
             # 运行爬虫
-            crawler = EnhancedFreeStuffCrawler()
+            crawler = EnhancedFreeStuffCrawler(
+                engine=engine,
+                cache_only=cache_only or None,
+                incremental=incremental or None,
+                max_deals=max_deals,
+            )
             deals = crawler.run_crawler()
+            self.last_deadline_stats = crawler.deadline_stats.stats()
             
             os.chdir(original_cwd)
             
@@ -79,8 +110,7 @@ class AutomationManager:
         """加载示例优惠数据作为兜底"""
         if self.sample_data_file.exists():
             try:
-                with open(self.sample_data_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                data = list(islice(iter_deals(str(self.sample_data_file)), self.candidate_limit()))
                 if data:
                     self.logger.warning("⚠️ 未获取到实时优惠，使用示例数据进行展示")
                     return data
@@ -94,8 +124,11 @@ class AutomationManager:
         """更新网站内容"""
         self.last_update_used_fallback = False
         if not deals_data:
-            # 获取最新的数据文件
-            deals_data = self.get_latest_deals()
+            # 获取最新的数据（只读取可能显示的前若干个）
+            deals_data = self.get_latest_deals(limit=self.candidate_limit())
+        else:
+            # 爬虫返回的 DealRun 从输出文件逐条读取，同样只取可能显示的前若干个
+            deals_data = list(islice(deals_data, self.candidate_limit()))
 
         if not deals_data:
             deals_data = self.load_fallback_deals()
@@ -104,6 +137,10 @@ class AutomationManager:
                 return False
             self.last_update_used_fallback = True
 
+        # 示例数据不需要检查；实时数据在渲染前移除或降级失效的商家链接
+        if not self.last_update_used_fallback:
+            deals_data = self.check_deal_links(deals_data)
+
         try:
             self.logger.info("🌐 更新网站内容...")
 
@@ -120,19 +157,111 @@ class AutomationManager:
             self.logger.error(f"❌ 网站更新失败: {e}")
             return False
     
-    def get_latest_deals(self):
-        """获取最新的优惠数据"""
+    def check_deal_links(self, deals):
+        """并发检查商家链接是否仍然可用，移除或降级失效的优惠"""
+        self.last_liveness_stats = {}
+        if not LIVENESS.get('enabled', True):
+            return deals
+        checker = LivenessChecker.from_config(LIVENESS, base_dir=str(self.crawler_dir))
         try:
-            # 查找最新的enhanced_deals文件
-            json_files = list(self.data_dir.glob('enhanced_deals_*.json'))
-            if not json_files:
-                return []
-
-            latest_file = max(json_files, key=lambda x: x.stat().st_mtime)
-
-            with open(latest_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-
+            urls = [url for url in map(deal_link, deals) if url]
+            self.logger.info(f"🔍 检查 {len(urls)} 个商家链接...")
+            results = checker.check_many(urls)
+        except Exception as e:
+            self.logger.error(f"链接检查失败，跳过: {e}")
+            return deals
+        finally:
+            checker.close()
+
+        checked = apply_liveness(deals, results, drop_dead=LIVENESS.get('drop_dead', False))
+        self.last_liveness_stats = checker.stats()
+        self.logger.info(f"链接检查统计: {self.last_liveness_stats}，"
+                         f"保留 {len(checked)}/{len(deals)} 个优惠")
+        return checked
+
+    def open_deal_store(self):
+        """打开优惠数据库；未启用或尚未创建时返回None"""
+        if not DEAL_STORE.get('enabled', True):
+            return None
+        store_path = self.crawler_dir / DEAL_STORE.get('path', 'data/deals.db')
+        if not store_path.exists():
+            return None
+        return DealStore(str(store_path))
+
+    def import_snapshots(self):
+        """把 crawler/data 中已有的快照文件一次性导入优惠数据库，返回导入的运行数"""
+        if not self.data_dir.exists():
+            return 0
+        with DealStore.from_config(DEAL_STORE, base_dir=str(self.crawler_dir)) as store:
+            imported = store.import_snapshots(str(self.data_dir))
+            self.logger.info(f"已导入 {imported} 个快照文件，数据库统计: {store.stats()}")
+        return imported
+
+    def first_seen(self, detail_url):
+        """某个详情页最早出现在哪次 JSONL 运行中：(归档文件名, 优惠)，从未出现时返回None"""
+        if not self.data_dir.exists():
+            return None
+        archive_dir = self.crawler_dir / COMPACTION.get('path', 'data/archive')
+        with ArchiveIndex.from_config(ARCHIVE_INDEX, data_dir=str(self.data_dir),
+                                      archive_dir=str(archive_dir) if COMPACTION.get('enabled', True) else None) as index:
+            index.refresh()
+            return index.first_seen(detail_url)
+
+    def compact_archives(self, keep_runs=None, keep_backups=None):
+        """按保留策略归档较早的运行结果和网站备份，返回 {'runs': 统计, 'backups': 统计}"""
+        results = {}
+        targets = (
+            ('runs', self.data_dir, COMPACTION.get('path', 'data/archive'), self.crawler_dir,
+             keep_runs if keep_runs is not None else COMPACTION.get('keep_runs', 30), RUN_NAME),
+            ('backups', self.project_root / 'backups', COMPACTION.get('backup_path', 'backups/archive'),
+             self.project_root, keep_backups if keep_backups is not None else COMPACTION.get('keep_backups', 10),
+             BACKUP_NAME),
+        )
+        for kind, directory, path, base_dir, keep, pattern in targets:
+            if not directory.exists():
+                continue
+            with SnapshotArchive.from_config(COMPACTION, path=path, base_dir=str(base_dir)) as archive:
+                results[kind] = archive.compact(str(directory), keep=keep, pattern=pattern)
+                self.logger.info(f"归档{kind}: {results[kind]}，归档统计: {archive.stats()}")
+        return results
+
+    def restore_snapshot(self, name):
+        """从归档还原一个文件（或一个时间戳对应的整次运行），返回还原的文件路径列表"""
+        if BACKUP_NAME.match(name):
+            path, base_dir, directory = COMPACTION.get('backup_path', 'backups/archive'), self.project_root, \
+                self.project_root / 'backups'
+        else:
+            path, base_dir, directory = COMPACTION.get('path', 'data/archive'), self.crawler_dir, self.data_dir
+        if not (base_dir / path / 'manifest.db').exists():
+            return []
+        with SnapshotArchive.from_config(COMPACTION, path=path, base_dir=str(base_dir)) as archive:
+            return archive.restore(name, str(directory))
+
+    def candidate_limit(self):
+        return self.MAX_DISPLAY_DEALS * self.CANDIDATE_FACTOR
+
+    def iter_latest_deals(self):
+        """逐条返回最新一次运行的优惠（优先读取优惠数据库，其次是最新的数据文件）"""
+        store = self.open_deal_store()
+        if store is not None:
+            with store:
+                run = store.latest_run()
+                if run is not None and run['deal_count']:
+                    yield from store.iter_run_deals(run['run_id'])
+                    return
+
+        # 查找最新的enhanced_deals文件（JSON 或 JSONL）
+        data_files = [*self.data_dir.glob('enhanced_deals_*.json'), *self.data_dir.glob('enhanced_deals_*.jsonl')]
+        if not data_files:
+            return
+
+        latest_file = max(data_files, key=lambda x: x.stat().st_mtime)
+        yield from iter_deals(str(latest_file))
+
+    def get_latest_deals(self, limit=None):
+        """获取最新的优惠数据（limit 限制读取的数量，JSONL 文件和数据库不会被整体读入）"""
+        try:
+            return list(islice(self.iter_latest_deals(), limit))
         except Exception as e:
             self.logger.error(f"获取最新数据失败: {e}")
             return []
@@ -151,22 +280,27 @@ class AutomationManager:
             update_text += " | ✅ 提取真实优惠链接"
 
         deal_items = []
-        for deal in deals[:20]:  # 最多显示20个优惠
+        for deal in islice(deals, self.MAX_DISPLAY_DEALS):  # 最多显示20个优惠
             title = deal.get('title_zh', deal.get('title', '')).strip()
             description = deal.get('description_zh', deal.get('description', '')).strip()
             if len(description) > 150:
                 description = description[:150].rstrip() + "..."
 
             url = deal.get('url', '#')
+            # 联盟/短链接按最终落地URL显示域名，链接本身仍指向原链接
+            final_url = deal.get('final_url') or url
             source_url = deal.get('source_url', deal.get('detail_url', '#'))
             date = deal.get('date', '')
             image = deal.get('image', '')
 
-            is_real_link = bool(url and 'latestfreestuff.co.uk' not in url)
+            is_real_link = bool(url and 'latestfreestuff.co.uk' not in url and 'latestfreestuff.co.uk' not in final_url)
+            # 检查未通过的链接（已失效、无法连接）不显示"真实链接"标记，改为链接到详情页
+            if deal.get('link_status') in ('dead', 'expired', 'unreachable'):
+                is_real_link = False
 
             try:
                 from urllib.parse import urlparse
-                domain = urlparse(url).netloc if url.startswith('http') else '未知域名'
+                domain = urlparse(final_url).netloc if final_url.startswith('http') else '未知域名'
             except Exception:
                 domain = '未知域名'
 
@@ -290,6 +424,23 @@ class AutomationManager:
             if used_fallback
             else '✅ 系统运行正常，继续定时执行'
         )
+        timeouts = self.last_deadline_stats
+        timeout_status = (
+            f"⚠️ {timeouts.get('deals_timed_out', 0)} 个优惠解析超时，"
+            f"{timeouts.get('deals_skipped', 0)} 个因截止时间跳过，"
+            f"{timeouts.get('listing_pages_skipped', 0)} 个列表页未抓取"
+            if any(timeouts.values())
+            else '✅ 无'
+        )
+
+        states = self.last_liveness_stats.get('states', {})
+        liveness_status = (
+            f"{self.last_liveness_stats.get('checked', 0)} 个链接，"
+            f"失效 {states.get('dead', 0) + states.get('expired', 0)} 个，"
+            f"无法连接 {states.get('unreachable', 0)} 个"
+            if self.last_liveness_stats
+            else '⚠️ 未执行'
+        )
 
         report = f"""# 🤖 自动化运行报告
 
@@ -301,6 +452,8 @@ class AutomationManager:
 - **获取优惠数量**: {deals_count} 个
 - **网站更新**: {website_status}
 - **真实链接提取**: ✅ 已启用
+- **时间预算超时**: {timeout_status}
+- **链接可用性检查**: {liveness_status}
 
 ### 📊 系统状态
 
@@ -330,14 +483,15 @@ class AutomationManager:
         self.logger.info(f"📄 报告已保存: {report_file}")
         return report
     
-    def run_full_automation(self):
+    def run_full_automation(self, engine=None, cache_only=False, incremental=False, max_deals=None):
         """运行完整的自动化流程"""
         self.logger.info("🚀 启动全自动化流程...")
         
         start_time = time.time()
         
         # 1. 运行爬虫
-        deals = self.run_crawler()
+        deals = self.run_crawler(engine=engine, cache_only=cache_only,
+                                 incremental=incremental, max_deals=max_deals)
         deals_count = len(deals)
         
         # 2. 更新网站
@@ -370,12 +524,37 @@ def main():
     """主函数"""
     automation = AutomationManager()
     
+    # --async 切换到在线程池中并发解析的并发引擎
+    engine = None
+    if '--async' in sys.argv:
+        sys.argv.remove('--async')
+        engine = 'async'
+    # --cache-only 离线重放上一次运行的HTTP缓存
+    cache_only = '--cache-only' in sys.argv
+    if cache_only:
+        sys.argv.remove('--cache-only')
+    # --incremental 只解析新优惠
+    incremental = '--incremental' in sys.argv
+    if incremental:
+        sys.argv.remove('--incremental')
+    # --max-deals N 最多解析的优惠数量
+    max_deals = None
+    if '--max-deals' in sys.argv:
+        index = sys.argv.index('--max-deals')
+        try:
+            max_deals = int(sys.argv[index + 1])
+        except (IndexError, ValueError):
+            print("--max-deals 需要一个整数参数")
+            return
+        del sys.argv[index:index + 2]
+    
     if len(sys.argv) > 1:
         command = sys.argv[1].lower()
         
         if command == 'crawler':
             # 只运行爬虫
-            deals = automation.run_crawler()
+            deals = automation.run_crawler(engine=engine, cache_only=cache_only,
+                                           incremental=incremental, max_deals=max_deals)
             print(f"爬虫完成，获取 {len(deals)} 个优惠")
             
         elif command == 'update':
@@ -389,11 +568,12 @@ def main():
             print("报告生成完成")
             
         else:
-            print("未知命令。使用: python automation.py [crawler|update|report]")
+            print("未知命令。使用: python automation.py [crawler|update|report] [--async] [--cache-only] [--incremental] [--max-deals N]")
             
     else:
         # 运行完整流程
-        automation.run_full_automation()
+        automation.run_full_automation(engine=engine, cache_only=cache_only,
+                                       incremental=incremental, max_deals=max_deals)
 
 if __name__ == "__main__":
     main()
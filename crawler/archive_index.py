@@ -0,0 +1,310 @@
+"""
+归档索引 - 历史 JSONL 运行结果的偏移索引，mmap 随机读取单条记录
+
+crawler/data 中的历史运行越积越多，"某个 detail_url 最早是哪次运行出现的"这类查询
+原先只能把每个文件完整解析一遍。这里为 enhanced_deals_<时间戳>.jsonl 建立一个旁路索引文件：
+- 每条优惠登记两个键：规范化 detail_url 的指纹，以及优惠内容的哈希（deal_hash）
+- 记录为定长的 (键, 文件编号, 偏移, 长度)，按键排序；查询时 mmap 索引文件二分查找，
+  再 mmap 对应的归档文件只解码命中的那一行
+- 文件编号按文件名（即运行时间）排序，同一个键的多条记录天然按时间先后排列
+- refresh() 只扫描新增或大小变化的归档，已删除的归档从索引中移除
+- 被 compaction 压缩归档（从 data 目录删除）的运行保留在索引中：还原出的 JSONL 与原文件逐字节相同，
+  偏移仍然有效，读取时从归档解压该文件；建立索引之前就已归档的运行也会从归档中读取并登记
+只索引 JSONL 归档；JSON 数组快照没有逐条的字节边界。
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+from collections import OrderedDict, namedtuple
+
+from url_classifier import canonicalize_url
+
+INDEX_NAME = 'enhanced_deals.idx'
+ARCHIVE_PREFIX = 'enhanced_deals_'
+ARCHIVE_SUFFIX = '.jsonl'
+
+MAGIC = b'DIDX'
+VERSION = 1
+HEADER = struct.Struct('<4sHII')       # 魔数, 版本, 文件表长度, 记录数
+RECORD = struct.Struct('<8sIQI')       # 键, 文件编号, 偏移, 长度
+KEY_SIZE = 8
+
+# file: 归档文件名；offset/length: 该条记录在文件中的字节范围
+ArchiveRecord = namedtuple('ArchiveRecord', ('file', 'offset', 'length'))
+
+
+def detail_key(url):
+    """detail_url 的索引键（规范化后的 8 字节 BLAKE2b 指纹）"""
+    canonical = canonicalize_url(url or '')
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=KEY_SIZE, person=b'detail').digest()
+
+
+def deal_hash(deal):
+    """优惠内容的哈希（与字段顺序和空白无关），十六进制字符串"""
+    canonical = json.dumps(deal, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=KEY_SIZE, person=b'deal').hexdigest()
+
+
+def _deal_url(deal):
+    return deal.get('source_url') or deal.get('detail_url')
+
+
+def scan_lines(lines):
+    """扫描 JSONL 的各行（保留换行符），逐条返回 (键, 偏移, 长度)；无法解析的行被跳过"""
+    offset = 0
+    for line in lines:
+        length = len(line.rstrip(b'\r\n'))
+        if length:
+            try:
+                deal = json.loads(line[:length])
+            except ValueError:
+                deal = None
+            if isinstance(deal, dict):
+                yield bytes.fromhex(deal_hash(deal)), offset, length
+                url = _deal_url(deal)
+                if url:
+                    yield detail_key(url), offset, length
+        offset += len(line)
+
+
+def scan_archive(path):
+    """扫描一个 JSONL 归档文件，逐条返回 (键, 偏移, 长度)"""
+    with open(path, 'rb') as f:
+        yield from scan_lines(f)
+
+
+class ArchiveIndex:
+    """data 目录下所有 JSONL 归档的合并偏移索引"""
+
+    def __init__(self, data_dir, max_open=64, archive_dir=None):
+        self.data_dir = data_dir
+        self.archive_dir = archive_dir   # compaction 归档目录；为None时只索引 data 目录中的文件
+        self._archive = None
+        self.path = os.path.join(data_dir, INDEX_NAME)
+        self.max_open = max(1, max_open)
+        self._files = []          # 文件编号 → (文件名, 大小)
+        self._count = 0
+        self._records_start = 0
+        self._index_map = None
+        self._archives = OrderedDict()  # 文件名 → mmap 或已解压的内容（LRU，避免同时打开过多文件）
+
+    @classmethod
+    def from_config(cls, config, data_dir='data', archive_dir=None):
+        """根据 ARCHIVE_INDEX 配置打开索引"""
+        return cls(data_dir, max_open=config.get('max_open', 64), archive_dir=archive_dir)
+
+    def close(self):
+        for archive in self._archives.values():
+            if isinstance(archive, mmap.mmap):
+                archive.close()
+        self._archives.clear()
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+        if self._index_map is not None:
+            self._index_map.close()
+            self._index_map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def archives(self):
+        """data 目录中的 JSONL 归档，按文件名（运行时间）排序"""
+        if not os.path.isdir(self.data_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.data_dir)
+            if name.startswith(ARCHIVE_PREFIX) and name.endswith(ARCHIVE_SUFFIX)
+        )
+
+    def snapshot_archive(self):
+        """compaction 归档（清单不存在时返回None，不创建归档目录）"""
+        if self._archive is None and self.archive_dir is not None and \
+                os.path.exists(os.path.join(self.archive_dir, 'manifest.db')):
+            from compaction import SnapshotArchive
+
+            # 读取时按对象扩展名选择解压方式，与配置的压缩格式无关
+            self._archive = SnapshotArchive(self.archive_dir, codec='gzip')
+        return self._archive
+
+    def _read_index(self):
+        """读取现有索引：返回 (文件表, 记录列表)，索引不存在或已损坏时返回空"""
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            magic, version, table_len, count = HEADER.unpack_from(data)
+            if magic != MAGIC or version != VERSION:
+                return [], []
+            files = [tuple(entry) for entry in json.loads(data[HEADER.size:HEADER.size + table_len])]
+            start = HEADER.size + table_len
+            records = list(RECORD.iter_unpack(data[start:start + count * RECORD.size]))
+            return files, records
+        except (OSError, ValueError, struct.error):
+            return [], []
+
+    def refresh(self):
+        """增量更新索引：扫描新增或变化的归档，移除已删除的归档；返回新扫描的归档数"""
+        old_files, old_records = self._read_index()
+        live = set()
+        files = {}
+        for name in self.archives():
+            size = os.path.getsize(os.path.join(self.data_dir, name))
+            if size:
+                live.add(name)
+                files[name] = size
+        archive = self.snapshot_archive()
+        if archive is not None:
+            indexed = dict(old_files)
+            for name in archive.names(ARCHIVE_SUFFIX):
+                if name.startswith(ARCHIVE_PREFIX) and name not in files:
+                    # 已归档的运行沿用原有记录；建立索引之前就已归档的（大小未知）需要还原后扫描
+                    files[name] = indexed.get(name)
+        if None not in files.values() and sorted(files.items()) == old_files and os.path.exists(self.path):
+            self._open_index()
+            return 0
+
+        for name, size in files.items():
+            if size is None:
+                files[name] = len(self._archived_bytes(name))
+        current = sorted(files.items())
+        old_ids = {entry: file_id for file_id, entry in enumerate(old_files)}
+        by_file = {}
+        for key, file_id, offset, length in old_records:
+            by_file.setdefault(file_id, []).append((key, offset, length))
+        records = []
+        scanned = 0
+        for file_id, entry in enumerate(current):
+            old_id = old_ids.get(entry)
+            if old_id is None:
+                if entry[0] in live:
+                    entries = scan_archive(os.path.join(self.data_dir, entry[0]))
+                else:
+                    entries = scan_lines(self._archived_bytes(entry[0]).splitlines(keepends=True))
+                scanned += 1
+            else:
+                # 未变化的归档沿用原有记录，只需更新文件编号
+                entries = by_file.get(old_id, ())
+            records.extend((key, file_id, offset, length) for key, offset, length in entries)
+        records.sort()
+        self._write(current, records)
+        self._open_index()
+        return scanned
+
+    def _write(self, files, records):
+        table = json.dumps([list(entry) for entry in files], ensure_ascii=False).encode('utf-8')
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(table), len(records)))
+            f.write(table)
+            buffer = bytearray(RECORD.size * len(records))
+            for i, record in enumerate(records):
+                RECORD.pack_into(buffer, i * RECORD.size, *record)
+            f.write(buffer)
+        if self._index_map is not None:
+            self._index_map.close()
+            self._index_map = None
+        os.replace(tmp_path, self.path)
+
+    def _open_index(self):
+        if self._index_map is not None:
+            self._index_map.close()
+            self._index_map = None
+        with open(self.path, 'rb') as f:
+            self._index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, table_len, count = HEADER.unpack_from(self._index_map)
+        self._files = [tuple(entry) for entry in
+                       json.loads(self._index_map[HEADER.size:HEADER.size + table_len])]
+        self._records_start = HEADER.size + table_len
+        self._count = count
+
+    def _ensure_open(self):
+        if self._index_map is None:
+            if os.path.exists(self.path):
+                self._open_index()
+            else:
+                self.refresh()
+
+    def locate(self, key):
+        """查找某个键的全部记录（按运行时间先后），返回 [ArchiveRecord]"""
+        self._ensure_open()
+        index, start, size = self._index_map, self._records_start, RECORD.size
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            pos = start + mid * size
+            if index[pos:pos + KEY_SIZE] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        matches = []
+        while lo < self._count:
+            found, file_id, offset, length = RECORD.unpack_from(index, start + lo * size)
+            if found != key:
+                break
+            matches.append(ArchiveRecord(self._files[file_id][0], offset, length))
+            lo += 1
+        return matches
+
+    def _archived_bytes(self, name):
+        """已从 data 目录归档的运行：从 compaction 归档还原整个文件（按 LRU 缓存）"""
+        data = self._archives.get(name)
+        if data is None:
+            archive = self.snapshot_archive()
+            data = archive.read(name) if archive is not None else None
+            if data is None:
+                raise FileNotFoundError(name)
+            self._cache(name, data)
+        return data
+
+    def _cache(self, name, archive):
+        self._archives[name] = archive
+        while len(self._archives) > self.max_open:
+            evicted = self._archives.popitem(last=False)[1]
+            if isinstance(evicted, mmap.mmap):
+                evicted.close()
+
+    def read(self, record):
+        """mmap 归档文件并只解码这一条记录（已归档的运行从 compaction 归档解压）"""
+        archive = self._archives.get(record.file)
+        if archive is None:
+            path = os.path.join(self.data_dir, record.file)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    archive = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._cache(record.file, archive)
+            else:
+                archive = self._archived_bytes(record.file)
+        else:
+            self._archives.move_to_end(record.file)
+        return json.loads(archive[record.offset:record.offset + record.length])
+
+    def find(self, detail_url):
+        """某个详情页在各次运行中的记录：[(归档文件名, 优惠)]，按时间先后排列"""
+        return list(self._readable(self.locate(detail_key(detail_url))))
+
+    def first_seen(self, detail_url):
+        """某个详情页最早出现的 (归档文件名, 优惠)，从未出现时返回None"""
+        return next(self._readable(self.locate(detail_key(detail_url))), None)
+
+    def get(self, hash_hex):
+        """按 deal_hash 读取优惠（内容相同的优惠只返回最早的一条），不存在时返回None"""
+        found = next(self._readable(self.locate(bytes.fromhex(hash_hex))), None)
+        return found[1] if found else None
+
+    def _readable(self, records):
+        """依次读取记录，跳过文件已不可用的（例如未指定 archive_dir 时指向归档的记录）"""
+        for record in records:
+            try:
+                yield record.file, self.read(record)
+            except FileNotFoundError:
+                continue
+
+    def stats(self):
+        self._ensure_open()
+        return {'archives': len(self._files), 'records': self._count}
@@ -0,0 +1,921 @@
+#!/usr/bin/env python3
+"""
+爬虫性能基准测试
+
+用法（在 crawler 目录下运行）:
+    python benchmarks.py link-index [--kb 1500] [--repeat 5]
+    python benchmarks.py url-classifier [--urls 20000] [--domains 5000]
+    python benchmarks.py translator [--texts 2000] [--entries 50000]
+    python benchmarks.py streaming [--kb 1500] [--kbps 4000]
+    python benchmarks.py charset [--kb 1500] [--repeat 5]
+    python benchmarks.py listing-parser [--cards 5000] [--repeat 3]
+    python benchmarks.py extraction-pool [--pages 64] [--kb 300] [--threads 32]
+    python benchmarks.py transport [--requests 256] [--threads 32]
+    python benchmarks.py archive-index [--runs 1095] [--deals 200] [--lookups 200]
+    python benchmarks.py compaction [--runs 365] [--deals 200] [--keep 30]
+    python benchmarks.py dedupe [--entries 20000] [--lookups 2000]
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sample_data')
+
+
+def build_detail_page(target_kb, seed=42):
+    """生成接近真实结构的大型详情页（导航、正文、脚本、分享按钮，真实链接在末尾）"""
+    rng = random.Random(seed)
+    header = (
+        '<html><head><meta charset="utf-8"><link rel="stylesheet" href="/wp-content/style.css">'
+        '<script>var cfg = {"home": "https://www.latestfreestuff.co.uk/"};</script></head><body>'
+        '<nav>' + ''.join(
+            f'<a class="menu-item" href="/category/{i}/">Category {i}</a>' for i in range(40)
+        ) + '</nav>'
+    )
+    blocks = []
+    size = len(header)
+    i = 0
+    while size < target_kb * 1024:
+        kind = rng.randrange(6)
+        if kind == 0:
+            block = f'<p>Lorem ipsum dolor sit amet {i}, consectetur adipiscing elit. ' * 3 + '</p>'
+        elif kind == 1:
+            block = f'<div class="related"><a href="/free-stuff/related-{i}/" title="Related {i}">Related freebie {i}</a></div>'
+        elif kind == 2:
+            block = f'<img src="/wp-content/uploads/{i}.jpg" alt="image {i}" loading="lazy">'
+        elif kind == 3:
+            block = (
+                f'<div class="share"><a href="https://www.facebook.com/sharer/sharer.php?u={i}" target="_blank">Share</a>'
+                f'<a href="https://twitter.com/intent/tweet?url={i}" target="_blank">Tweet</a></div>'
+            )
+        elif kind == 4:
+            block = f'<script>window.dataLayer = window.dataLayer || []; dataLayer.push({{"id": {i}}});</script>'
+        else:
+            block = f'<span class="meta">Posted {i} days ago</span>'
+        blocks.append(block)
+        size += len(block)
+        i += 1
+    footer = (
+        '<a class="btn btn-primary" href="https://merchant.example.co.uk/free-sample" '
+        'target="_blank" rel="nofollow">Get Deal</a>'
+        '<iframe src="https://www.youtube.com/embed/x"></iframe></body></html>'
+    )
+    return header + ''.join(blocks) + footer
+
+
+def legacy_patterns(rules):
+    """原实现中逐条在整页上执行的正则"""
+    patterns = [rules.get_freebie.pattern, rules.claim_link.pattern]
+    patterns += [r.pattern for r in rules.primary + rules.secondary + rules.js]
+    patterns += [rules.meta_refresh.pattern, rules.iframe.pattern]
+    return patterns
+
+
+def bench_link_index(args):
+    from enhanced_config import REAL_LINK_EXTRACTION
+    from link_index import LinkRuleSet
+
+    rules = LinkRuleSet.from_config(REAL_LINK_EXTRACTION)
+    all_rules = [rules.get_freebie, rules.claim_link] + rules.primary + rules.secondary + rules.js
+    all_rules += [rules.meta_refresh, rules.iframe]
+
+    pages = []
+    for name in sorted(os.listdir(SAMPLE_DIR)):
+        if name.endswith('.html'):
+            with open(os.path.join(SAMPLE_DIR, name), 'r', encoding='utf-8') as f:
+                pages.append((name, f.read()))
+    for kb in (50, 300, args.kb):
+        pages.append((f'synthetic_{kb}kb', build_detail_page(kb)))
+
+    print(f"{'页面':<32}{'大小(KB)':>10}{'逐条正则(ms)':>16}{'单次索引(ms)':>16}{'加速':>8}")
+    for name, html in pages:
+        # 结果一致性校验
+        index = rules.index(html)
+        for rule in all_rules:
+            expected = re.findall(rule.pattern, html, re.IGNORECASE)
+            if rule.findall(index) != expected:
+                print(f"❌ 结果不一致: {name} 规则 {rule.pattern[:60]}")
+                return 1
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for pattern in legacy_patterns(rules):
+                re.findall(pattern, html, re.IGNORECASE)
+        legacy = (time.perf_counter() - start) / args.repeat * 1000
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            index = rules.index(html)
+            for rule in all_rules:
+                rule.findall(index)
+        indexed = (time.perf_counter() - start) / args.repeat * 1000
+
+        speedup = legacy / indexed if indexed else float('inf')
+        print(f"{name:<32}{len(html) / 1024:>10.1f}{legacy:>16.2f}{indexed:>16.2f}{speedup:>7.1f}x")
+    print("✅ 所有规则在索引上的结果与整页正则一致")
+    return 0
+
+
+def legacy_is_valid_deal_url(url, rules):
+    """原实现：逐个遍历列表"""
+    if not url or len(url) < 10:
+        return False
+    url_lower = url.lower()
+    for pattern in rules['invalid_patterns']:
+        if pattern in url_lower:
+            return False
+    for pattern in rules['social_share_patterns']:
+        if pattern in url_lower:
+            return False
+    for ext in rules['invalid_extensions']:
+        if url_lower.endswith(ext):
+            return False
+    try:
+        from urllib.parse import urlparse
+        domain = urlparse(url).netloc.lower()
+        if domain.startswith('www.'):
+            domain = domain[4:]
+        for valid_domain in rules['trusted_domains']:
+            if domain == valid_domain or domain.endswith('.' + valid_domain):
+                return True
+        for keyword in rules['deal_keywords']:
+            if keyword in url_lower:
+                return True
+    except Exception:
+        pass
+    return len(url) > 15 and 'latestfreestuff.co.uk' not in url_lower
+
+
+def build_candidate_urls(count, domains, seed=7):
+    """生成一页中常见的候选链接：站内链接、分享链接、静态资源、商家链接"""
+    rng = random.Random(seed)
+    templates = [
+        'https://www.latestfreestuff.co.uk/free-stuff/item-{i}/',
+        'https://www.facebook.com/sharer/sharer.php?u=item-{i}',
+        'https://twitter.com/intent/tweet?url=item-{i}',
+        '/wp-content/uploads/{i}.jpg',
+        'https://cdn.example.net/assets/app-{i}.js',
+        'https://www.{d}/product/{i}',
+        'https://offers.{d}/landing?id={i}',
+        'https://merchant{i}.example.org/signup',
+        'https://brand{i}.co.uk/free-sample-request',
+        'mailto:hello{i}@example.com',
+        'https://downloads.example.com/guide-{i}.pdf',
+    ]
+    return [rng.choice(templates).format(i=i, d=rng.choice(domains)) for i in range(count)]
+
+
+def bench_url_classifier(args):
+    from enhanced_config import URL_VALIDATION
+    from url_classifier import URLClassifier
+
+    base = dict(URL_VALIDATION)
+    extra = [f'merchant-{i}.co.uk' for i in range(max(0, args.domains - len(base['trusted_domains'])))]
+
+    print(f"{'可信域名数':>10}{'原实现(ms)':>14}{'编译分类器(ms)':>18}{'加速':>8}")
+    for domains in (base['trusted_domains'], base['trusted_domains'] + extra):
+        rules = dict(base, trusted_domains=domains)
+        classifier = URLClassifier(**rules)
+        urls = build_candidate_urls(args.urls, domains)
+
+        legacy_results = [legacy_is_valid_deal_url(url, rules) for url in urls]
+        if [classifier.is_valid_deal_url(url) for url in urls] != legacy_results:
+            print("❌ 分类结果与原实现不一致")
+            return 1
+
+        start = time.perf_counter()
+        for url in urls:
+            legacy_is_valid_deal_url(url, rules)
+        legacy = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for url in urls:
+            classifier.is_valid_deal_url(url)
+        compiled = (time.perf_counter() - start) * 1000
+
+        print(f"{len(domains):>10}{legacy:>14.2f}{compiled:>18.2f}{legacy / compiled:>7.1f}x")
+    print(f"✅ {args.urls} 个候选链接的分类结果与原实现一致")
+    return 0
+
+
+def legacy_translate(text, translations):
+    """原实现：按词典逐条 str.replace"""
+    translated = text.lower()
+    for en, zh in translations.items():
+        translated = translated.replace(en, zh)
+    return translated
+
+
+def build_phrase_dictionary(count, seed=11):
+    """生成合成短语词典（随机英文短语 → 占位中文）"""
+    rng = random.Random(seed)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    entries = {}
+    while len(entries) < count:
+        words = [''.join(rng.choice(letters) for _ in range(rng.randint(4, 9)))
+                 for _ in range(rng.randint(1, 3))]
+        entries[' '.join(words)] = f'短语{len(entries)}'
+    return entries
+
+
+def bench_translator(args):
+    from translator import BASE_TRANSLATIONS, PhraseMatcher
+
+    with open(os.path.join(SAMPLE_DIR, 'enhanced_deals_sample.json'), 'r', encoding='utf-8') as f:
+        samples = json.load(f)
+    texts = [d.get(key, '') for d in samples for key in ('title', 'description') if d.get(key)]
+    texts = (texts * (args.texts // max(1, len(texts)) + 1))[:args.texts]
+
+    # 内置词典下与原实现的一致性校验
+    matcher = PhraseMatcher(BASE_TRANSLATIONS)
+    mismatches = sum(matcher.replace(t.lower()) != legacy_translate(t, BASE_TRANSLATIONS) for t in texts)
+    if mismatches:
+        print(f"⚠️  {mismatches}/{len(texts)} 条文本与逐条替换结果不同（重叠词按最长匹配处理）")
+    else:
+        print(f"✅ 内置词典下 {len(texts)} 条文本与逐条替换结果一致")
+
+    print(f"{'词典条目':>10}{'逐条替换(ms)':>16}{'单次扫描(ms)':>16}{'加速':>8}")
+    for size in (len(BASE_TRANSLATIONS), 5000, args.entries):
+        translations = dict(BASE_TRANSLATIONS)
+        translations.update(build_phrase_dictionary(size - len(BASE_TRANSLATIONS)))
+        matcher = PhraseMatcher(translations)
+
+        start = time.perf_counter()
+        for text in texts:
+            legacy_translate(text, translations)
+        legacy = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for text in texts:
+            matcher.replace(text.lower())
+        compiled = (time.perf_counter() - start) * 1000
+
+        print(f"{len(translations):>10}{legacy:>16.2f}{compiled:>16.2f}{legacy / compiled:>7.1f}x")
+    return 0
+
+
+def serve_pages(pages, kbps):
+    """在本地线程中启动限速的HTTP服务器，返回 (server, base_url)"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    import threading
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = pages.get(self.path)
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            # 按带宽分块发送，模拟真实网络下载
+            chunk = 16384
+            try:
+                for i in range(0, len(body), chunk):
+                    self.wfile.write(body[i:i + chunk])
+                    time.sleep(chunk / (kbps * 1024))
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # 客户端提前断开
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def bench_streaming(args):
+    import requests
+    from enhanced_config import REAL_LINK_EXTRACTION
+    from link_index import LinkRuleSet
+    from streaming import LinkWatcher, read_stream
+
+    rules = LinkRuleSet.from_config(REAL_LINK_EXTRACTION)
+    watcher = LinkWatcher(rules.get_freebie.regex)
+    button = '<a class="btn" href="https://www.latestfreestuff.co.uk/claim/sample/">GET FREEBIE</a>'
+    pages = {}
+    for kb in (50, 300, args.kb):
+        html = build_detail_page(kb)
+        # GET FREEBIE 按钮位于正文开头（导航之后），与真实详情页一致
+        cut = html.index('</nav>') + len('</nav>')
+        pages[f'/detail-{kb}kb'] = (html[:cut] + button + html[cut:]).encode('utf-8')
+
+    server, base = serve_pages(pages, args.kbps)
+    session = requests.Session()
+    print(f"{'页面':<20}{'大小(KB)':>10}{'完整下载(ms)':>16}{'流式(ms)':>12}{'读取(KB)':>12}{'加速':>8}")
+    try:
+        for path, body in pages.items():
+            start = time.perf_counter()
+            html = session.get(base + path, timeout=60).text
+            expected = rules.get_freebie.findall(rules.index(html))[0]
+            full = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            page, _ = read_stream(session.get(base + path, timeout=60, stream=True), watcher)
+            found = rules.get_freebie.findall(rules.index(page))[0]
+            streamed = (time.perf_counter() - start) * 1000
+            if found != expected:
+                print(f"❌ 结果不一致: {path}")
+                return 1
+            print(f"{path:<20}{len(body) / 1024:>10.1f}{full:>16.1f}{streamed:>12.1f}"
+                  f"{page.bytes_read / 1024:>12.1f}{full / streamed:>7.1f}x")
+    finally:
+        server.shutdown()
+    print("✅ 流式读取找到的 GET FREEBIE 链接与完整页面一致")
+    return 0
+
+
+def bench_charset(args):
+    from requests.models import Response
+    from requests.structures import CaseInsensitiveDict
+    from requests.utils import get_encoding_from_headers
+    from charset import decode_html
+
+    pages = []
+    for name in sorted(os.listdir(SAMPLE_DIR)):
+        if name.endswith('.html'):
+            with open(os.path.join(SAMPLE_DIR, name), 'rb') as f:
+                pages.append((name, f.read()))
+    for kb in (50, 300, args.kb):
+        # 正文中加入非ASCII字符（£、é、—），编码判断错误时会产生乱码
+        html = build_detail_page(kb).replace('Lorem ipsum', 'Lorem £5 café — ipsum')
+        pages.append((f'synthetic_{kb}kb', html.encode('utf-8')))
+        pages.append((f'synthetic_{kb}kb_no_meta', html.replace('<meta charset="utf-8">', '').encode('utf-8')))
+
+    def response_text(body, content_type):
+        # 与 requests 适配器相同：编码只来自响应头，为空时 .text 会运行字符集检测
+        response = Response()
+        response._content = body
+        response.headers = CaseInsensitiveDict({'Content-Type': content_type} if content_type else {})
+        response.encoding = get_encoding_from_headers(response.headers)
+        return response.text
+
+    print(f"{'页面':<30}{'Content-Type':<26}{'response.text(ms)':>20}{'decode_html(ms)':>18}{'加速':>9}  结果")
+    for name, body in pages:
+        expected = body.decode('utf-8')
+        for content_type in (None, 'text/html', 'text/html; charset=utf-8'):
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                legacy_text = response_text(body, content_type)
+            legacy = (time.perf_counter() - start) / args.repeat * 1000
+
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                text, _ = decode_html(body, content_type)
+            fast = (time.perf_counter() - start) / args.repeat * 1000
+
+            if text != expected:
+                print(f"❌ 解码结果错误: {name} ({content_type})")
+                return 1
+            legacy_status = '一致' if legacy_text == expected else '原实现乱码'
+            speedup = legacy / fast if fast else float('inf')
+            print(f"{name:<30}{content_type or '(无)':<26}{legacy:>20.2f}{fast:>18.2f}{speedup:>8.1f}x  {legacy_status}")
+    print("✅ decode_html 在所有页面和响应头组合下均正确解码")
+    return 0
+
+
+def build_listing_page(cards, nested=False, seed=5):
+    """生成列表页；nested 时卡片内部包含缩略图和元信息的嵌套 div（标题在其之后）"""
+    rng = random.Random(seed)
+    items = []
+    for i in range(cards):
+        extra = ' '.join(f'data-k{k}="value {k} of {i}"' for k in range(rng.randrange(1, 6)))
+        if nested:
+            items.append(
+                f'<article class="post-card" {extra}>'
+                f'<div class="thumb"><a href="/free-stuff/item-{i}/"><img src="/img/{i}.jpg" alt="item {i}"></a></div>'
+                f'<div class="meta"><span class="date">{i} hours ago</span></div>'
+                f'<h3><a href="/free-stuff/item-{i}/">Free Sample Number {i}</a></h3>'
+                f'<p>Claim a free sample {i} &amp; more today</p></article>'
+            )
+        else:
+            items.append(
+                f'<div class="post-card" {extra}><div class="inner"><h3>Free Sample Number {i}</h3>'
+                f'<a href="/free-stuff/item-{i}/">link</a><p>Claim a free sample {i} &amp; more today</p>'
+                f'<img data-src="/img/{i}.jpg" alt="item {i}"></div></div>'
+            )
+    nav = ''.join(f'<li class="menu-item"><a href="/category/{k}/" title="Category {k}">Category {k}</a></li>'
+                  for k in range(60))
+    return f'<html><head><title>Listing</title></head><body><ul class="menu">{nav}</ul><main>{"".join(items)}</main></body></html>'
+
+
+def legacy_parse_listing(html):
+    """原 DealParser：遇到第一个 </div> 即结束当前优惠"""
+    from html.parser import HTMLParser
+
+    class LegacyDealParser(HTMLParser):
+        def __init__(self):
+            super().__init__()
+            self.deals = []
+            self.current_deal = {}
+            self.in_deal_container = False
+            self.in_title = False
+            self.in_description = False
+
+        def handle_starttag(self, tag, attrs):
+            attrs_dict = dict(attrs)
+            if tag in ['article', 'div'] and any('deal' in str(v).lower() or 'post' in str(v).lower()
+                                               for v in attrs_dict.values()):
+                self.in_deal_container = True
+                self.current_deal = {}
+            if tag in ['h1', 'h2', 'h3', 'h4'] and self.in_deal_container:
+                self.in_title = True
+            if tag == 'p' and self.in_deal_container:
+                self.in_description = True
+            if tag == 'a' and self.in_deal_container and 'href' in attrs_dict:
+                if 'detail_url' not in self.current_deal:
+                    self.current_deal['detail_url'] = attrs_dict['href']
+            if tag == 'img' and self.in_deal_container:
+                if 'src' in attrs_dict:
+                    self.current_deal['image'] = attrs_dict['src']
+                elif 'data-src' in attrs_dict:
+                    self.current_deal['image'] = attrs_dict['data-src']
+
+        def handle_endtag(self, tag):
+            if tag in ['article', 'div'] and self.in_deal_container:
+                if self.current_deal and 'title' in self.current_deal:
+                    self.deals.append(self.current_deal.copy())
+                self.in_deal_container = False
+                self.current_deal = {}
+            if tag in ['h1', 'h2', 'h3', 'h4']:
+                self.in_title = False
+            if tag == 'p':
+                self.in_description = False
+
+        def handle_data(self, data):
+            data = data.strip()
+            if not data:
+                return
+            if self.in_title and self.in_deal_container:
+                self.current_deal['title'] = data
+            if self.in_description and self.in_deal_container:
+                if 'description' not in self.current_deal:
+                    self.current_deal['description'] = data
+                else:
+                    self.current_deal['description'] += ' ' + data
+
+    parser = LegacyDealParser()
+    parser.feed(html)
+    return parser.deals
+
+
+def bench_listing_parser(args):
+    from listing_parser import create_deal_parser, lxml_available, parse_listing
+
+    backends = ['html.parser'] + (['lxml'] if lxml_available() else [])
+    if len(backends) == 1:
+        print("⚠️  未安装 lxml，只测试 html.parser 后端")
+
+    print(f"{'页面':<22}{'大小(KB)':>10}{'实现':>14}{'耗时(ms)':>12}{'优惠数':>8}{'完整':>6}")
+    for nested in (False, True):
+        for cards in (100, 1000, args.cards):
+            html = build_listing_page(cards, nested=nested)
+            name = f"{'nested' if nested else 'flat'}_{cards}"
+            complete = lambda deals: sum(1 for d in deals if {'title', 'detail_url', 'image'} <= d.keys())
+
+            results = {}
+            for label in ['legacy'] + backends:
+                func = legacy_parse_listing if label == 'legacy' else (lambda h, b=label: parse_listing(h, b))
+                start = time.perf_counter()
+                for _ in range(args.repeat):
+                    deals = func(html)
+                elapsed = (time.perf_counter() - start) / args.repeat * 1000
+                results[label] = deals
+                print(f"{name:<22}{len(html) / 1024:>10.1f}{label:>14}{elapsed:>12.2f}{len(deals):>8}{complete(deals):>6}")
+
+            expected = results['html.parser']
+            if any(results[b] != expected for b in backends):
+                print(f"❌ 后端结果不一致: {name}")
+                return 1
+            if not nested and results['legacy'] != expected:
+                print(f"❌ 扁平卡片上与原实现结果不一致: {name}")
+                return 1
+            # 分块 feed 的结果与整页解析一致
+            for backend in backends:
+                parser = create_deal_parser(backend)
+                streamed = []
+                for i in range(0, len(html), 16384):
+                    streamed += parser.feed(html[i:i + 16384])
+                streamed += parser.close()
+                if streamed != expected:
+                    print(f"❌ 分块解析结果不一致: {name} ({backend})")
+                    return 1
+    print("✅ 各后端结果一致，分块 feed 与整页解析一致；扁平卡片上与原实现一致")
+    return 0
+
+
+def bench_extraction_pool(args):
+    from concurrent.futures import ThreadPoolExecutor
+    from enhanced_config import REAL_LINK_EXTRACTION, URL_VALIDATION
+    from extraction import ExtractionPool, LinkExtractor
+
+    # 每页内容略有不同，避免结果被任何一层缓存
+    pages = [build_detail_page(args.kb, seed=i) for i in range(args.pages)]
+    inline = LinkExtractor.from_config(REAL_LINK_EXTRACTION, URL_VALIDATION)
+    expected = [inline.detail_links(html) for html in pages[:4]]
+
+    def run(extractor):
+        # 与并发引擎相同：多个I/O线程各自提交页面并等待结果
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            results = list(executor.map(extractor.detail_links, pages))
+        return time.perf_counter() - start, results
+
+    cores = os.cpu_count() or 1
+    print(f"CPU核心数: {cores}，{args.pages} 个 {args.kb}KB 详情页，{args.threads} 个I/O线程")
+    print(f"{'实现':<20}{'耗时(s)':>10}{'页/秒':>10}{'加速':>8}")
+    baseline, _ = run(inline)
+    print(f"{'当前进程':<20}{baseline:>10.2f}{args.pages / baseline:>10.1f}{1.0:>7.1f}x")
+
+    for workers in sorted({1, 2, 4, cores}):
+        pool = ExtractionPool(inline, REAL_LINK_EXTRACTION, URL_VALIDATION, workers=workers,
+                              chunk_size=args.chunk_size, min_bytes=0)
+        try:
+            pool.detail_links(pages[0])  # 预热：启动工作进程
+            elapsed, results = run(pool)
+        finally:
+            pool.close()
+        if results[:4] != expected:
+            print(f"❌ 进程池结果与当前进程不一致 (workers={workers})")
+            return 1
+        label = f"进程池 x{workers}"
+        print(f"{label:<20}{elapsed:>10.2f}{args.pages / elapsed:>10.1f}{baseline / elapsed:>7.1f}x")
+    print("✅ 进程池提取结果与当前进程一致")
+    return 0
+
+
+def serve_pages_h2(pages):
+    """本地 HTTP/2 测试服务器（h2c 先验知识，无TLS），返回 (停止函数, base_url)
+
+    每个连接一个线程，同一连接上的多个流交替发送，遵守流量控制窗口。
+    """
+    import socket
+    import threading
+
+    import h2.config
+    import h2.connection
+    import h2.events
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(64)
+    stopped = threading.Event()
+
+    def handle(sock):
+        conn = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False))
+        conn.initiate_connection()
+        sock.sendall(conn.data_to_send())
+        pending = {}  # stream_id → 待发送的响应体
+        with sock:
+            while not stopped.is_set():
+                try:
+                    data = sock.recv(65535)
+                except OSError:
+                    return
+                if not data:
+                    return
+                for event in conn.receive_data(data):
+                    if isinstance(event, h2.events.RequestReceived):
+                        path = dict(event.headers).get(b':path', b'/').decode()
+                        body = pages.get(path)
+                        status = b'200' if body is not None else b'404'
+                        body = body if body is not None else b'not found'
+                        conn.send_headers(event.stream_id, [
+                            (b':status', status),
+                            (b'content-type', b'text/html; charset=utf-8'),
+                            (b'content-length', str(len(body)).encode()),
+                        ])
+                        pending[event.stream_id] = body
+                    elif isinstance(event, h2.events.StreamReset):
+                        pending.pop(event.stream_id, None)
+                    elif isinstance(event, h2.events.ConnectionTerminated):
+                        return
+                for stream_id, body in list(pending.items()):
+                    while body:
+                        size = min(conn.local_flow_control_window(stream_id), conn.max_outbound_frame_size, len(body))
+                        if size <= 0:
+                            break
+                        conn.send_data(stream_id, body[:size])
+                        body = body[size:]
+                    if body:
+                        pending[stream_id] = body
+                    else:
+                        conn.end_stream(stream_id)
+                        del pending[stream_id]
+                sock.sendall(conn.data_to_send())
+
+    def accept():
+        while not stopped.is_set():
+            try:
+                sock, _ = listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=handle, args=(sock,), daemon=True).start()
+
+    threading.Thread(target=accept, daemon=True).start()
+
+    def stop():
+        stopped.set()
+        listener.close()
+
+    return stop, f'http://127.0.0.1:{listener.getsockname()[1]}'
+
+
+def bench_transport(args):
+    import logging
+    from concurrent.futures import ThreadPoolExecutor
+
+    import requests
+    from transport import HTTPXTransport, RequestsTransport
+
+    logging.getLogger('urllib3').setLevel(logging.ERROR)  # 连接池已满的警告正是要对比的内容
+    pages = {f'/free-stuff/item-{i}/': build_detail_page(20, seed=i).encode('utf-8') for i in range(args.requests)}
+    paths = list(pages)
+
+    def run(transport, base):
+        def fetch(path):
+            response = transport.get(base + path, timeout=30)
+            response.raise_for_status()
+            return len(response.content)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            total = sum(executor.map(fetch, paths))
+        elapsed = time.perf_counter() - start
+        if total != sum(len(body) for body in pages.values()):
+            raise RuntimeError("响应体长度不一致")
+        host = next(iter(transport.stats().values()))
+        return elapsed, host
+
+    print(f"{args.requests} 个同主机请求，{args.threads} 个并发线程")
+    print(f"{'传输':<34}{'耗时(s)':>10}{'新建连接':>10}{'复用':>8}  协议")
+
+    server, base = serve_pages(pages, kbps=1024 * 1024)
+    try:
+        for label, maxsize in (('requests 默认连接池(10)', 10), (f'requests 主机连接池({args.threads})', args.threads)):
+            transport = RequestsTransport(requests.Session(), pool_maxsize=maxsize)
+            elapsed, host = run(transport, base)
+            transport.close()
+            print(f"{label:<34}{elapsed:>10.2f}{host['connections']:>10}{host['reused']:>8}  HTTP/1.1")
+    finally:
+        server.shutdown()
+
+    try:
+        stop, base = serve_pages_h2(pages)
+    except ImportError:
+        print("⚠️  未安装 h2/httpx（pip install 'httpx[http2]'），跳过 HTTP/2 测试")
+        return 0
+    try:
+        transport = HTTPXTransport(http2=True, http1=False)
+        elapsed, host = run(transport, base)
+        transport.close()
+        versions = ', '.join(f'{v}×{n}' for v, n in host['versions'].items())
+        print(f"{'httpx HTTP/2（h2c）':<34}{elapsed:>10.2f}{host['connections']:>10}{host['reused']:>8}  {versions}")
+    finally:
+        stop()
+    return 0
+
+
+def bench_archive_index(args):
+    import tempfile
+
+    from archive_index import ArchiveIndex
+    from deal_stream import iter_deals, write_deals
+    from url_classifier import canonicalize_url
+
+    with open(os.path.join(SAMPLE_DIR, 'enhanced_deals_sample.json'), 'r', encoding='utf-8') as f:
+        template = json.load(f)[0]
+    rng = random.Random(3)
+    pool = args.runs * args.deals // 4  # 每个优惠平均出现在约4次运行中
+    data_dir = tempfile.mkdtemp(prefix='archive-bench-')
+    print(f"生成 {args.runs} 个归档，每个 {args.deals} 个优惠...")
+    for run in range(args.runs):
+        base = run * args.deals // 4
+        deals = [
+            dict(template, source_url=f'https://www.latestfreestuff.co.uk/free-stuff/deal-{(base + k) % pool}/',
+                 title=f'Free Sample {(base + k) % pool}', run=run)
+            for k in range(args.deals)
+        ]
+        day, slot = divmod(run, 3)
+        write_deals(os.path.join(data_dir, f'enhanced_deals_2025{day // 28 + 1:02d}{day % 28 + 1:02d}_{slot:02d}0000.jsonl'),
+                    deals)
+
+    index = ArchiveIndex(data_dir)
+    start = time.perf_counter()
+    index.refresh()
+    build = time.perf_counter() - start
+    print(f"建立索引: {build:.2f}s，{index.stats()}，索引大小 "
+          f"{os.path.getsize(index.path) / 1024 / 1024:.1f}MB")
+
+    write_deals(os.path.join(data_dir, 'enhanced_deals_20991231_000000.jsonl'), [template])
+    start = time.perf_counter()
+    index.refresh()
+    print(f"新增一个归档后增量更新: {time.perf_counter() - start:.2f}s")
+    index.close()
+
+    targets = [f'https://www.latestfreestuff.co.uk/free-stuff/deal-{rng.randrange(pool)}/' for _ in range(args.lookups)]
+
+    start = time.perf_counter()
+    index = ArchiveIndex(data_dir)
+    found = [index.first_seen(url) for url in targets]
+    lookup = (time.perf_counter() - start) * 1000 / len(targets)
+
+    # 原方式：按时间顺序完整解析每个归档，直到找到为止（只测前几个查询）
+    sample = targets[:max(1, min(5, len(targets)))]
+    archives = index.archives()
+    start = time.perf_counter()
+    for url in sample:
+        key = canonicalize_url(url)
+        for name in archives:
+            if any(canonicalize_url(d.get('source_url', '')) == key for d in iter_deals(os.path.join(data_dir, name))):
+                break
+    scan = (time.perf_counter() - start) * 1000 / len(sample)
+
+    if any(result is None for result in found):
+        raise RuntimeError("索引查询缺少结果")
+    print(f"first_seen 点查询: 索引 {lookup:.3f}ms/次，完整解析 {scan:.1f}ms/次（{scan / lookup:.0f}x）")
+    index.close()
+    return 0
+
+
+def bench_compaction(args):
+    import shutil
+    import tempfile
+
+    from compaction import SnapshotArchive
+    from deal_stream import write_deals
+
+    with open(os.path.join(SAMPLE_DIR, 'enhanced_deals_sample.json'), 'r', encoding='utf-8') as f:
+        template = json.load(f)[0]
+    page = '<html><body>' + '<div class="deal-item">优惠</div>' * 800 + '</body></html>'
+    data_dir = tempfile.mkdtemp(prefix='compaction-bench-')
+    print(f"生成 {args.runs} 次运行，每次 {args.deals} 个优惠（相邻运行约 90% 的优惠相同）...")
+    for run in range(args.runs):
+        stamp = f'2025{run // 28 % 12 + 1:02d}{run % 28 + 1:02d}_{run // 336:02d}0000'
+        deals = [dict(template, source_url=f'https://www.latestfreestuff.co.uk/free-stuff/deal-{run * args.deals // 10 + k}/',
+                      title=f'Free Sample {run * args.deals // 10 + k}') for k in range(args.deals)]
+        write_deals(os.path.join(data_dir, f'enhanced_deals_{stamp}.jsonl'), deals)
+        with open(os.path.join(data_dir, f'enhanced_deals_{stamp}.html'), 'w', encoding='utf-8') as f:
+            f.write(page.replace('优惠', f'优惠 {run % 7}', 1))
+
+    def usage():
+        total = files = 0
+        for root, _, names in os.walk(data_dir):
+            files += len(names)
+            total += sum(os.path.getsize(os.path.join(root, name)) for name in names)
+        return total, files
+
+    def scan():
+        # 与 update_website.get_latest_data_files 相同：列出目录并按修改时间找最新的文件
+        start = time.perf_counter()
+        for _ in range(20):
+            names = [n for n in os.listdir(data_dir) if n.endswith(('.json', '.jsonl'))]
+            max(names, key=lambda n: os.path.getmtime(os.path.join(data_dir, n)))
+        return (time.perf_counter() - start) * 1000 / 20
+
+    before, files_before = usage()
+    scan_before = scan()
+    archive = SnapshotArchive(os.path.join(data_dir, 'archive'))
+    start = time.perf_counter()
+    result = archive.compact(data_dir, keep=args.keep)
+    elapsed = time.perf_counter() - start
+    after, files_after = usage()
+    scan_after = scan()
+
+    oldest = archive.entries()[0]['name']
+    start = time.perf_counter()
+    restored = archive.read(oldest)
+    restore_ms = (time.perf_counter() - start) * 1000
+
+    print(f"归档 {result['files']} 个文件（{result['records']} 条记录，去重后 {result['new_records']} 条，"
+          f"HTML 对象 {result['new_objects']} 个），用时 {elapsed:.2f}s，压缩格式 {archive.stats()['codec']}")
+    print(f"磁盘占用: {before / 1024 / 1024:.1f}MB / {files_before} 个文件 → "
+          f"{after / 1024 / 1024:.1f}MB / {files_after} 个文件（{before / after:.1f}x）")
+    print(f"扫描 data 目录找最新文件: {scan_before:.2f}ms → {scan_after:.2f}ms")
+    print(f"还原最早的一次运行 {oldest}（{len(restored)} 字节）: {restore_ms:.1f}ms")
+    archive.close()
+    shutil.rmtree(data_dir)
+    return 0
+
+
+def bench_dedupe(args):
+    from dedupe import DedupeIndex, jaccard, title_tokens
+
+    rng = random.Random(5)
+    brands = [f'brand{i}' for i in range(2000)]
+    products = ['chocolate', 'bar', 'sample', 'shampoo', 'coffee', 'pods', 'tea', 'bags', 'serum', 'cream',
+                'nappies', 'dog', 'food', 'cat', 'treats', 'magazine', 'book', 'seeds', 'crisps', 'razor']
+    titles = [f"Free {rng.choice(brands)} {' '.join(rng.sample(products, 3))} {rng.choice(['', 'pack', 'kit'])}"
+              for _ in range(args.entries)]
+    index = DedupeIndex(max_entries=args.entries)
+    start = time.perf_counter()
+    for i, title in enumerate(titles):
+        index.add(f'https://latestfreestuff.co.uk/free-stuff/deal-{i}', {'title': title, 'url': f'https://m.co.uk/{i}'})
+    build = time.perf_counter() - start
+
+    # 改写过的标题：加一个营销用词和一个商品词，链接带跟踪参数（不会按链接命中）
+    queries = []
+    for _ in range(args.lookups):
+        i = rng.randrange(args.entries)
+        queries.append((f'https://latestfreestuff.co.uk/free-stuff/deal-{i}-v2',
+                        title_tokens(f'Claim your {titles[i]} sample!')))
+
+    start = time.perf_counter()
+    hits = sum(index.lookup(key, tokens, host='m.co.uk') is not None for key, tokens in queries)
+    lsh = (time.perf_counter() - start) * 1000 / len(queries)
+
+    # 原方式：与所有已知优惠逐个计算 Jaccard（只测一部分查询）
+    known = [title_tokens(title) for title in titles]
+    sample = queries[:max(1, min(50, len(queries)))]
+    start = time.perf_counter()
+    for _, tokens in sample:
+        max(jaccard(tokens, other) for other in known)
+    scan = (time.perf_counter() - start) * 1000 / len(sample)
+
+    print(f"建立 {args.entries} 条索引: {build:.2f}s")
+    print(f"改写标题查询: 命中 {hits}/{len(queries)}，LSH {lsh:.3f}ms/次，逐个比较 {scan:.2f}ms/次（{scan / lsh:.0f}x）")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="爬虫性能基准测试")
+    subparsers = parser.add_subparsers(dest="command")
+
+    link_parser = subparsers.add_parser("link-index", help="单次扫描链接索引 vs 逐条正则")
+    link_parser.add_argument("--kb", type=int, default=1500, help="最大合成详情页大小 (KB)")
+    link_parser.add_argument("--repeat", type=int, default=5, help="重复次数")
+    link_parser.set_defaults(func=bench_link_index)
+
+    url_parser = subparsers.add_parser("url-classifier", help="编译URL分类器 vs 逐个遍历列表")
+    url_parser.add_argument("--urls", type=int, default=20000, help="候选链接数量")
+    url_parser.add_argument("--domains", type=int, default=5000, help="扩展后的可信域名数量")
+    url_parser.set_defaults(func=bench_url_classifier)
+
+    translator_parser = subparsers.add_parser("translator", help="单次扫描短语翻译 vs 逐条替换")
+    translator_parser.add_argument("--texts", type=int, default=2000, help="翻译文本数量")
+    translator_parser.add_argument("--entries", type=int, default=50000, help="最大词典条目数")
+    translator_parser.set_defaults(func=bench_translator)
+
+    streaming_parser = subparsers.add_parser("streaming", help="流式提前断开 vs 完整下载")
+    streaming_parser.add_argument("--kb", type=int, default=1500, help="最大合成详情页大小 (KB)")
+    streaming_parser.add_argument("--kbps", type=int, default=4000, help="模拟下载带宽 (KB/s)")
+    streaming_parser.set_defaults(func=bench_streaming)
+
+    charset_parser = subparsers.add_parser("charset", help="响应头/BOM/meta 解码 vs response.text")
+    charset_parser.add_argument("--kb", type=int, default=1500, help="最大合成详情页大小 (KB)")
+    charset_parser.add_argument("--repeat", type=int, default=5, help="重复次数")
+    charset_parser.set_defaults(func=bench_charset)
+
+    listing_parser = subparsers.add_parser("listing-parser", help="列表页解析：原实现 vs html.parser vs lxml")
+    listing_parser.add_argument("--cards", type=int, default=5000, help="最大列表页卡片数量")
+    listing_parser.add_argument("--repeat", type=int, default=3, help="重复次数")
+    listing_parser.set_defaults(func=bench_listing_parser)
+
+    pool_parser = subparsers.add_parser("extraction-pool", help="链接提取：当前进程 vs 进程池")
+    pool_parser.add_argument("--pages", type=int, default=64, help="详情页数量")
+    pool_parser.add_argument("--kb", type=int, default=300, help="每个详情页大小 (KB)")
+    pool_parser.add_argument("--threads", type=int, default=32, help="并发I/O线程数")
+    pool_parser.add_argument("--chunk-size", type=int, default=4, help="每个任务合并的页面数")
+    pool_parser.set_defaults(func=bench_extraction_pool)
+
+    transport_parser = subparsers.add_parser("transport", help="连接池复用与 HTTP/2 多路复用")
+    transport_parser.add_argument("--requests", type=int, default=256, help="请求数量")
+    transport_parser.add_argument("--threads", type=int, default=32, help="并发线程数")
+    transport_parser.set_defaults(func=bench_transport)
+
+    archive_parser = subparsers.add_parser("archive-index", help="归档偏移索引点查询 vs 完整解析")
+    archive_parser.add_argument("--runs", type=int, default=1095, help="归档数量（默认约一年，每天3次）")
+    archive_parser.add_argument("--deals", type=int, default=200, help="每个归档的优惠数量")
+    archive_parser.add_argument("--lookups", type=int, default=200, help="查询次数")
+    archive_parser.set_defaults(func=bench_archive_index)
+
+    compaction_parser = subparsers.add_parser("compaction", help="历史运行结果压缩归档：磁盘占用与目录扫描")
+    compaction_parser.add_argument("--runs", type=int, default=365, help="运行次数")
+    compaction_parser.add_argument("--deals", type=int, default=200, help="每次运行的优惠数量")
+    compaction_parser.add_argument("--keep", type=int, default=30, help="保留原始文件的最近运行次数")
+    compaction_parser.set_defaults(func=bench_compaction)
+
+    dedupe_parser = subparsers.add_parser("dedupe", help="标题 MinHash LSH 去重查询 vs 逐个比较")
+    dedupe_parser.add_argument("--entries", type=int, default=20000, help="索引中的已知优惠数量")
+    dedupe_parser.add_argument("--lookups", type=int, default=2000, help="查询次数")
+    dedupe_parser.set_defaults(func=bench_dedupe)
+
+    args = parser.parse_args(argv)
+    if not getattr(args, "func", None):
+        parser.print_help()
+        return 1
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
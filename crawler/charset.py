@@ -0,0 +1,107 @@
+"""
+字符集解码 - 按 响应头 → BOM → <meta charset> → 字符集检测 的顺序确定编码
+
+response.text 在响应头没有 charset 时的行为并不理想：
+- 完全没有 Content-Type 时，requests 会对整个响应体运行字符集检测（大页面上很慢）
+- Content-Type 为 text/html 但没有 charset 时，按 ISO-8859-1 解码，UTF-8 页面会出现乱码
+这里直接处理 response.content 字节：先看响应头中的 charset，再看 BOM，
+再在前几KB中查找 <meta charset>，都没有时先尝试严格的 UTF-8 解码，
+最后才退回字符集检测。sniff_encoding 只确定编码不解码，可供直接处理字节的解析器使用。
+"""
+
+import codecs
+import re
+
+META_SCAN_BYTES = 4096
+
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+)
+_HEADER_CHARSET = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+_META_CHARSET = re.compile(
+    rb'<meta[^>]+?charset\s*=\s*["\']?\s*([\w.:-]+)',
+    re.IGNORECASE,
+)
+
+
+def normalize_encoding(name):
+    """返回 Python 能识别的编码名，无法识别时返回None"""
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name.strip()).name
+    except LookupError:
+        return None
+
+
+def header_encoding(content_type):
+    """Content-Type 中显式声明的 charset（不使用 text/* 的 ISO-8859-1 默认值）"""
+    if not content_type:
+        return None
+    match = _HEADER_CHARSET.search(content_type)
+    return normalize_encoding(match.group(1)) if match else None
+
+
+def bom_encoding(body):
+    """根据BOM判断编码，返回 (编码, BOM长度)"""
+    for bom, name in _BOMS:
+        if body.startswith(bom):
+            return name, len(bom)
+    return None, 0
+
+
+def meta_encoding(body, scan_bytes=META_SCAN_BYTES):
+    """在文档开头查找 <meta charset> 或 http-equiv 中声明的编码"""
+    match = _META_CHARSET.search(body, 0, scan_bytes)
+    if not match:
+        return None
+    name = normalize_encoding(match.group(1).decode('ascii', 'ignore'))
+    # 字节中的 meta 声明不可能是 UTF-16/32（否则无法按ASCII匹配到），按HTML规范视为UTF-8
+    if name and name.startswith(('utf-16', 'utf-32')):
+        return 'utf-8'
+    return name
+
+
+def sniff_encoding(body, content_type=None, scan_bytes=META_SCAN_BYTES):
+    """不做字符集检测的快速判断：响应头 → BOM → meta，均未声明时返回None"""
+    return (header_encoding(content_type)
+            or bom_encoding(body)[0]
+            or meta_encoding(body, scan_bytes))
+
+
+def detect_encoding(body):
+    """最后手段：运行字符集检测"""
+    try:
+        from charset_normalizer import from_bytes
+    except ImportError:
+        try:
+            import chardet
+        except ImportError:
+            return 'utf-8'
+        return normalize_encoding(chardet.detect(body).get('encoding')) or 'utf-8'
+    best = from_bytes(body).best()
+    return normalize_encoding(best.encoding) if best else 'utf-8'
+
+
+def decode_html(body, content_type=None, scan_bytes=META_SCAN_BYTES):
+    """将响应体解码为文本，返回 (文本, 编码)"""
+    encoding = sniff_encoding(body, content_type, scan_bytes)
+    if encoding is None:
+        # 未声明编码时绝大多数页面是UTF-8；严格解码成功就不需要检测
+        try:
+            return body.decode('utf-8'), 'utf-8'
+        except UnicodeDecodeError:
+            encoding = detect_encoding(body)
+    bom_name, bom_length = bom_encoding(body)
+    if bom_length and bom_name == encoding:
+        body = body[bom_length:]
+    return body.decode(encoding, errors='replace'), encoding
+
+
+def decode_response(response):
+    """按上述顺序解码 requests 响应，返回 (文本, 编码)"""
+    return decode_html(response.content, response.headers.get('Content-Type'))
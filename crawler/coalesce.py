@@ -0,0 +1,106 @@
+"""
+请求合并 - 单次运行内每个规范化URL只请求一次
+
+GET FREEBIE 按钮和申请页链接常常指向同一个申请页，不同优惠也可能共用页面；
+并发解析时同一个URL还可能被多个线程同时请求。
+这里为每个规范化URL保留一个 Future：第一个调用者负责请求，
+同时到达的调用者等待同一个结果，之后的调用者直接使用本次运行内缓存的页面。
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from url_classifier import canonicalize_url
+
+
+class RequestCoalescer:
+    """按规范化URL合并请求并缓存本次运行的响应体"""
+
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._futures = OrderedDict()  # 规范化URL → Future，按最近使用顺序排列
+        self._sizes = {}
+        self._bytes = 0
+
+        self.requests = 0      # 调用次数
+        self.fetches = 0       # 实际请求次数
+        self.coalesced = 0     # 等待进行中请求的次数
+        self.memo_hits = 0     # 直接使用已缓存页面的次数
+        self.evictions = 0     # 超出内存上限被丢弃的页面
+        self.refetches = 0     # 被丢弃后再次请求的次数
+        self._evicted = set()
+
+    @classmethod
+    def from_config(cls, config):
+        """根据 REQUEST_COALESCING 配置创建"""
+        return cls(max_bytes=config.get('max_bytes', 512 * 1024 * 1024))
+
+    def fetch(self, url, loader, variant=None):
+        """返回 url 的内容；同一个规范化URL在本次运行中只调用一次 loader
+
+        variant 区分同一URL的不同读取方式（如只读取页面开头的流式抓取），各自缓存。
+        """
+        key = canonicalize_url(url) if variant is None else (canonicalize_url(url), variant)
+        with self._lock:
+            self.requests += 1
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = self._futures[key] = Future()
+                self.fetches += 1
+                if key in self._evicted:
+                    self.refetches += 1
+            else:
+                self._futures.move_to_end(key)
+                if future.done():
+                    self.memo_hits += 1
+                else:
+                    self.coalesced += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            result = loader()
+        except BaseException as e:
+            # 异常不缓存，等待中的调用者收到同样的异常
+            with self._lock:
+                self._futures.pop(key, None)
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        self._account(key, result)
+        return result
+
+    def _account(self, key, result):
+        size = len(result) if isinstance(result, (str, bytes)) else 0
+        with self._lock:
+            if key not in self._futures:
+                return
+            self._sizes[key] = size
+            self._bytes += size
+            # 超出上限时丢弃最久未使用的已完成页面
+            while self._bytes > self.max_bytes and len(self._futures) > 1:
+                oldest, future = next(iter(self._futures.items()))
+                if not future.done() or oldest == key:
+                    break
+                del self._futures[oldest]
+                self._bytes -= self._sizes.pop(oldest, 0)
+                self._evicted.add(oldest)
+                self.evictions += 1
+
+    def stats(self):
+        """返回合并统计"""
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'unique_urls': self.fetches - self.refetches,
+                'fetches': self.fetches,
+                'coalesced': self.coalesced,
+                'memo_hits': self.memo_hits,
+                'evictions': self.evictions,
+                'refetches': self.refetches,
+                'cached_bytes': self._bytes,
+            }
@@ -0,0 +1,352 @@
+"""
+归档压缩 - 按内容寻址保存历史运行结果和网站备份，重复内容只存一份
+
+crawler/data 每次运行新增 enhanced_deals_<时间戳>.json(l) 和 .html 两个文件，
+WebsiteUpdater.backup_website 每次更新网站都把整个 index.html 复制到 backups/，
+两者无限增长，而内容大多与上一次相同。这里提供一个压缩归档：
+- 优惠记录逐条按内容哈希（BLAKE2b）去重，一次压缩中新出现的记录合并写入一个压缩包（packs/），
+  整包压缩比逐条压缩的效果好得多
+- HTML 快照和网站备份整个文件按内容哈希保存为一个压缩对象（objects/ab/<哈希>），相同内容只存一份
+- 清单（manifest.db，SQLite）记录每个归档文件由哪些记录/对象组成，任何一次运行都可以还原
+- 保留策略：目录中只保留最近 N 次运行（或 N 个备份）的原始文件，更早的归档后删除，
+  目录中的文件数和扫描时间不再随运行次数增长；用 restore 还原出来的文件不会被再次删除
+- 归档后的 JSONL 运行仍可通过 archive_index 按详情页查询（索引记录指向归档，读取时从压缩包还原）
+压缩格式优先使用 zstd（需要 zstandard 包），未安装时使用 gzip；读取时按对象的扩展名选择解压方式。
+.json 快照还原为与 save_deals 相同的格式（indent=2），.jsonl 和 .html 按字节还原。
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+RUN_NAME = re.compile(r'^enhanced_deals_(\d{8}_\d{6})\.(?:jsonl?|html)$')
+BACKUP_NAME = re.compile(r'^index_backup_(\d{8}_\d{6})\.html$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    hash    TEXT PRIMARY KEY,
+    path    TEXT NOT NULL,
+    size    INTEGER NOT NULL,
+    stored  INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS packs (
+    name    TEXT PRIMARY KEY,
+    records INTEGER NOT NULL,
+    size    INTEGER NOT NULL,
+    stored  INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    hash    TEXT PRIMARY KEY,
+    pack    TEXT NOT NULL REFERENCES packs(name),
+    line    INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    name     TEXT PRIMARY KEY,
+    stamp    TEXT NOT NULL,
+    size     INTEGER NOT NULL,
+    object   TEXT REFERENCES objects(hash),
+    records  TEXT,
+    archived TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_stamp ON entries(stamp);
+"""
+
+
+def zstd_available():
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class GzipCodec:
+    name = 'gzip'
+    suffix = '.gz'
+
+    def __init__(self, level=None):
+        self.level = 6 if level is None else level
+
+    def compress(self, data):
+        return gzip.compress(data, compresslevel=self.level, mtime=0)
+
+    def decompress(self, data):
+        return gzip.decompress(data)
+
+
+class ZstdCodec:
+    name = 'zstd'
+    suffix = '.zst'
+
+    def __init__(self, level=None):
+        import zstandard
+
+        self._compressor = zstandard.ZstdCompressor(level=10 if level is None else level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def decompress(self, data):
+        # 压缩时写入了内容长度，这里不需要流式解压
+        return self._decompressor.decompress(data)
+
+
+def create_codec(name='zstd', level=None):
+    """创建压缩器；zstd 不可用时使用 gzip"""
+    if name == 'zstd' and zstd_available():
+        return ZstdCodec(level)
+    if name not in ('zstd', 'gzip'):
+        raise ValueError(f"未知的压缩格式: {name}")
+    return GzipCodec(level)
+
+
+def content_hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _read_records(path):
+    """把优惠文件拆成逐条记录（每条为 ensure_ascii=False 的紧凑JSON，与 JSONL 输出的行相同）"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if path.endswith('.jsonl'):
+        records = []
+        for line in data.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                json.loads(line)
+            except ValueError:
+                continue  # 崩溃时写了一半的最后一行
+            records.append(line)
+        return records, len(data)
+    deals = json.loads(data)
+    return [json.dumps(deal, ensure_ascii=False).encode('utf-8') for deal in deals], len(data)
+
+
+def _write_atomic(path, data):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class SnapshotArchive:
+    """内容寻址的压缩归档（记录压缩包 + 文件对象 + SQLite 清单）"""
+
+    def __init__(self, root, codec='zstd', level=None):
+        self.root = root
+        self.codec = create_codec(codec, level)
+        self.logger = logging.getLogger(__name__)
+        os.makedirs(root, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(root, 'manifest.db'))
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA foreign_keys=ON')
+        self._conn.executescript(SCHEMA)
+        if codec == 'zstd' and self.codec.name != 'zstd':
+            self.logger.info("未安装 zstandard，归档使用 gzip 压缩")
+
+    @classmethod
+    def from_config(cls, config, path=None, base_dir=None):
+        """根据 COMPACTION 配置打开归档（path 默认为 config['path']）"""
+        path = path or config.get('path', 'data/archive')
+        if base_dir is not None:
+            path = os.path.join(base_dir, path)
+        return cls(path, codec=config.get('codec', 'zstd'), level=config.get('level'))
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _decompress(self, relative_path):
+        with open(os.path.join(self.root, relative_path), 'rb') as f:
+            data = f.read()
+        codec = self.codec if relative_path.endswith(self.codec.suffix) else create_codec(
+            'zstd' if relative_path.endswith(ZstdCodec.suffix) else 'gzip')
+        return codec.decompress(data)
+
+    def _put_object(self, data):
+        """保存一个文件对象，返回 (哈希, 新写入的压缩字节数)；内容已存在时不再写入"""
+        digest = content_hash(data)
+        if self._conn.execute('SELECT 1 FROM objects WHERE hash = ?', (digest,)).fetchone():
+            return digest, 0
+        path = os.path.join('objects', digest[:2], digest + self.codec.suffix)
+        compressed = self.codec.compress(data)
+        _write_atomic(os.path.join(self.root, path), compressed)
+        self._conn.execute('INSERT INTO objects (hash, path, size, stored) VALUES (?, ?, ?, ?)',
+                           (digest, path, len(data), len(compressed)))
+        return digest, len(compressed)
+
+    def _write_pack(self, lines, index):
+        """把本次新出现的记录写成一个压缩包，返回压缩后的字节数"""
+        data = b'\n'.join(lines) + b'\n'
+        compressed = self.codec.compress(data)
+        pack = os.path.join('packs', f"pack_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.jsonl{self.codec.suffix}")
+        _write_atomic(os.path.join(self.root, pack), compressed)
+        self._conn.execute('INSERT INTO packs (name, records, size, stored) VALUES (?, ?, ?, ?)',
+                           (pack, len(lines), len(data), len(compressed)))
+        self._conn.executemany('INSERT INTO records (hash, pack, line) VALUES (?, ?, ?)',
+                               ((digest, pack, line) for digest, line in index.items()))
+        return len(compressed)
+
+    def compact(self, directory, keep=10, pattern=RUN_NAME):
+        """归档 directory 中除最近 keep 次以外的文件并删除原文件，返回本次统计
+
+        文件名由 pattern 匹配，第一个分组为时间戳；同一时间戳的文件（.jsonl 和 .html）属于同一次运行。
+        清单中已有的文件（用 restore 还原出来的）保留不动，内容与归档不一致时只记录警告。
+        """
+        runs = {}
+        for name in os.listdir(directory):
+            match = pattern.match(name)
+            if match:
+                runs.setdefault(match.group(1), []).append(name)
+        stamps = sorted(runs)
+        expired = stamps[:-keep] if keep > 0 else stamps
+        result = {'runs': len(expired), 'files': 0, 'skipped': 0, 'bytes': 0, 'records': 0, 'new_records': 0,
+                  'new_objects': 0, 'stored': 0}
+        if not expired:
+            return result
+
+        known = {row['name'] for row in self._conn.execute('SELECT name FROM entries')}
+        archived = []     # 本次写入清单的文件（提交后删除原文件）
+        entries = []
+        pack_lines = []
+        pack_index = {}   # 本次新出现的记录哈希 → 压缩包中的行号
+        with self._conn:
+            for stamp in expired:
+                for name in sorted(runs[stamp]):
+                    path = os.path.join(directory, name)
+                    if name in known:
+                        result['skipped'] += 1
+                        if not self._matches(name, path):
+                            self.logger.warning(f"{name} 与归档中的内容不一致，保留原文件")
+                        continue
+                    try:
+                        if name.endswith('.html'):
+                            with open(path, 'rb') as f:
+                                data = f.read()
+                            digest, stored = self._put_object(data)
+                            result['new_objects'] += stored > 0
+                            result['stored'] += stored
+                            entries.append((name, stamp, len(data), digest, None))
+                            size = len(data)
+                        else:
+                            records, size = _read_records(path)
+                            hashes = [content_hash(record) for record in records]
+                            for digest, record in zip(hashes, records):
+                                if digest in pack_index or self._conn.execute(
+                                        'SELECT 1 FROM records WHERE hash = ?', (digest,)).fetchone():
+                                    continue
+                                pack_index[digest] = len(pack_lines)
+                                pack_lines.append(record)
+                            entries.append((name, stamp, size, None, json.dumps(hashes)))
+                            result['records'] += len(records)
+                    except (OSError, ValueError) as e:
+                        self.logger.warning(f"归档 {name} 失败，保留原文件: {e}")
+                        continue
+                    archived.append(name)
+                    result['files'] += 1
+                    result['bytes'] += size
+
+            if pack_lines:
+                result['stored'] += self._write_pack(pack_lines, pack_index)
+                result['new_records'] = len(pack_lines)
+            now = datetime.now().isoformat(timespec='seconds')
+            self._conn.executemany(
+                'INSERT INTO entries (name, stamp, size, object, records, archived) VALUES (?, ?, ?, ?, ?, ?)',
+                (entry + (now,) for entry in entries),
+            )
+
+        # 清单提交后再删除原文件
+        for name in archived:
+            os.remove(os.path.join(directory, name))
+        return result
+
+    def _matches(self, name, path):
+        try:
+            with open(path, 'rb') as f:
+                return f.read() == self.read(name)
+        except (OSError, ValueError):
+            return False
+
+    def __contains__(self, name):
+        return self._conn.execute('SELECT 1 FROM entries WHERE name = ?', (name,)).fetchone() is not None
+
+    def names(self, suffix=''):
+        """已归档的文件名（按文件名排序），可按扩展名过滤"""
+        rows = self._conn.execute("SELECT name FROM entries WHERE name LIKE ? ORDER BY name", (f'%{suffix}',))
+        return [row['name'] for row in rows]
+
+    def entries(self, stamp=None):
+        """已归档的文件（按时间先后）：[{'name', 'stamp', 'size', 'archived'}]"""
+        sql = 'SELECT name, stamp, size, archived FROM entries'
+        params = ()
+        if stamp is not None:
+            sql += ' WHERE stamp = ?'
+            params = (stamp,)
+        return [dict(row) for row in self._conn.execute(sql + ' ORDER BY stamp, name', params)]
+
+    def read(self, name):
+        """还原一个归档文件的内容（bytes），不存在时返回None"""
+        row = self._conn.execute('SELECT object, records FROM entries WHERE name = ?', (name,)).fetchone()
+        if row is None:
+            return None
+        if row['object'] is not None:
+            path = self._conn.execute('SELECT path FROM objects WHERE hash = ?', (row['object'],)).fetchone()[0]
+            return self._decompress(path)
+
+        hashes = json.loads(row['records'])
+        locations = {}
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            locations.update(
+                (r['hash'], (r['pack'], r['line'])) for r in self._conn.execute(
+                    f"SELECT hash, pack, line FROM records WHERE hash IN ({', '.join('?' * len(chunk))})", chunk)
+            )
+        packs = {}
+        records = []
+        for digest in hashes:
+            pack, line = locations[digest]
+            if pack not in packs:
+                packs[pack] = self._decompress(pack).split(b'\n')
+            records.append(packs[pack][line])
+        if name.endswith('.jsonl'):
+            return b''.join(record + b'\n' for record in records)
+        deals = [json.loads(record) for record in records]
+        return json.dumps(deals, ensure_ascii=False, indent=2).encode('utf-8')
+
+    def restore(self, name, directory):
+        """把归档文件还原到 directory（传入时间戳时还原该次运行的全部文件），返回还原的文件路径列表"""
+        names = [name] if name in self else [entry['name'] for entry in self.entries(stamp=name)]
+        restored = []
+        for entry in names:
+            path = os.path.join(directory, entry)
+            _write_atomic(path, self.read(entry))
+            restored.append(path)
+        return restored
+
+    def stats(self):
+        """返回归档统计：原始大小为所有归档文件之和，存储大小为压缩后的对象和压缩包之和"""
+        row = self._conn.execute(
+            'SELECT (SELECT COUNT(*) FROM entries) AS files,'
+            ' (SELECT COUNT(DISTINCT stamp) FROM entries) AS runs,'
+            ' (SELECT COALESCE(SUM(size), 0) FROM entries) AS size,'
+            ' (SELECT COUNT(*) FROM objects) AS objects,'
+            ' (SELECT COUNT(*) FROM records) AS records,'
+            ' (SELECT COALESCE(SUM(stored), 0) FROM objects) + (SELECT COALESCE(SUM(stored), 0) FROM packs) AS stored'
+        ).fetchone()
+        return dict(row, codec=self.codec.name)
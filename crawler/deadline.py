@@ -0,0 +1,104 @@
+"""
+时间预算 - 整次运行的截止时间与单个优惠的解析预算
+
+一个很慢的详情页可以让同步引擎等满请求超时，申请页还会再叠加一次，
+整次运行的耗时没有上限。这里引入两级预算：
+- 运行截止时间：到期后不再抓取新的列表页、不再开始解析新的优惠
+- 单个优惠的预算：详情页 → 申请页 → 商家链接整条链路共享，
+  通过 contextvars 传到 get_page_content，每次请求的超时和重试等待都不会超过剩余预算
+
+预算用完时返回目前找到的最佳链接（详情页上已能提取到的链接，否则为 source_url）。
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+
+class BudgetExceeded(Exception):
+    """当前优惠或整次运行的时间预算已用完，请求未发出"""
+
+
+class Deadline:
+    """基于 monotonic 时钟的截止时间，seconds 为 None 表示不限时"""
+
+    def __init__(self, seconds=None):
+        self.seconds = seconds
+        self.expires = None if seconds is None else time.monotonic() + seconds
+
+    def remaining(self):
+        if self.expires is None:
+            return float('inf')
+        return max(0.0, self.expires - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+
+class DealBudget:
+    """单个优惠的解析预算（不超过运行截止时间）"""
+
+    __slots__ = ('deadline', 'exhausted')
+
+    def __init__(self, seconds):
+        self.deadline = Deadline(seconds)
+        self.exhausted = False  # 解析过程中是否因预算不足放弃过请求
+
+    def remaining(self):
+        return self.deadline.remaining()
+
+
+_current_budget = contextvars.ContextVar('deal_budget', default=None)
+
+
+def current_budget():
+    """当前线程/任务正在使用的优惠预算，没有时返回None"""
+    return _current_budget.get()
+
+
+@contextmanager
+def deal_budget(seconds):
+    """在 with 块内为当前优惠设置解析预算"""
+    budget = DealBudget(seconds)
+    token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(token)
+
+
+def clamp_timeout(timeout):
+    """按当前优惠的剩余预算缩短请求超时；预算已用完时抛出 BudgetExceeded"""
+    budget = current_budget()
+    if budget is None:
+        return timeout
+    remaining = budget.remaining()
+    if remaining <= 0:
+        budget.exhausted = True
+        raise BudgetExceeded()
+    return min(timeout, remaining)
+
+
+class DeadlineStats:
+    """运行摘要中的超时统计（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.deals_timed_out = 0    # 解析中途预算用完，使用了目前最佳的链接
+        self.deals_skipped = 0      # 运行截止时间已到，未开始解析，直接使用 source_url
+        self.requests_cut = 0       # 因预算不足未发出的请求
+        self.listing_pages_skipped = 0
+
+    def add(self, name, count=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + count)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'deals_timed_out': self.deals_timed_out,
+                'deals_skipped': self.deals_skipped,
+                'requests_cut': self.requests_cut,
+                'listing_pages_skipped': self.listing_pages_skipped,
+            }
@@ -0,0 +1,219 @@
+"""
+优惠数据库 - 用带索引的 SQLite 保存每次运行的结果
+
+原先每次运行都写一个 data/enhanced_deals_<时间戳>.json（外加一个 .html 快照），
+读取"最新结果"时要列出整个 data 目录并逐个 stat 文件，启动开销随运行次数无限增长。
+这里把每次运行写入同一个数据库：
+- runs 表记录每次运行，(created, run_id) 上的索引可以直接取到最新一次（导入的旧快照按原时间排序）
+- deals 表按 (run_id, position) 保存优惠，detail_url / url / final_url / date 上建索引，
+  "最新一次运行"、"前N个有效优惠"、"某个详情页的历史记录"都只需一次索引查找
+- 完整的优惠字典以JSON保存在 data 列中，新增字段不需要修改表结构
+JSON导出保持原有格式，供仍读取快照文件的工具使用；import_snapshots 一次性导入已有的快照文件。
+"""
+
+import json
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+from deal_stream import iter_deals
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id     INTEGER PRIMARY KEY AUTOINCREMENT,
+    created    TEXT NOT NULL,
+    deal_count INTEGER NOT NULL,
+    json_file  TEXT,
+    html_file  TEXT,
+    source     TEXT NOT NULL DEFAULT 'crawler'
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_runs_json_file ON runs(json_file);
+CREATE INDEX IF NOT EXISTS idx_runs_created ON runs(created, run_id);
+
+CREATE TABLE IF NOT EXISTS deals (
+    id          INTEGER PRIMARY KEY,
+    run_id      INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    position    INTEGER NOT NULL,
+    detail_url  TEXT,
+    url         TEXT,
+    final_url   TEXT,
+    date        TEXT,
+    link_status TEXT,
+    data        TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_deals_run ON deals(run_id, position);
+CREATE INDEX IF NOT EXISTS idx_deals_detail_url ON deals(detail_url);
+CREATE INDEX IF NOT EXISTS idx_deals_url ON deals(url);
+CREATE INDEX IF NOT EXISTS idx_deals_final_url ON deals(final_url);
+CREATE INDEX IF NOT EXISTS idx_deals_date ON deals(date);
+"""
+
+# 不再展示的链接状态（见 liveness.py）
+INACTIVE_STATUS = ('dead', 'expired')
+
+_SNAPSHOT_NAME = re.compile(r'^enhanced_deals_(\d{8}_\d{6})\.jsonl?$')
+
+
+class DealStore:
+    """SQLite 优惠数据库"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA foreign_keys=ON')
+        self._conn.executescript(SCHEMA)
+
+    @classmethod
+    def from_config(cls, config, base_dir=None):
+        """根据 DEAL_STORE 配置打开数据库"""
+        path = config.get('path', 'data/deals.db')
+        if base_dir is not None:
+            path = os.path.join(base_dir, path)
+        return cls(path)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def save_run(self, deals, json_file=None, html_file=None, created=None, source='crawler'):
+        """在一个事务中写入一次运行的全部优惠，返回 run_id
+
+        deals 可以是任意可迭代对象（逐条写入，不需要整个列表在内存中）。
+        json_file / html_file 只记录文件名（快照都位于 data 目录下），同一快照只会导入一次。
+        """
+        json_file = os.path.basename(json_file) if json_file else None
+        html_file = os.path.basename(html_file) if html_file else None
+        created = created or datetime.now().isoformat(timespec='seconds')
+        count = 0
+
+        def rows(run_id):
+            nonlocal count
+            for position, deal in enumerate(deals):
+                count = position + 1
+                yield (
+                    run_id, position,
+                    deal.get('source_url') or deal.get('detail_url'),
+                    deal.get('url'), deal.get('final_url'), deal.get('date'), deal.get('link_status'),
+                    json.dumps(deal, ensure_ascii=False),
+                )
+
+        with self._conn:
+            cursor = self._conn.execute(
+                'INSERT INTO runs (created, deal_count, json_file, html_file, source) VALUES (?, 0, ?, ?, ?)',
+                (created, json_file, html_file, source),
+            )
+            run_id = cursor.lastrowid
+            self._conn.executemany(
+                'INSERT INTO deals (run_id, position, detail_url, url, final_url, date, link_status, data) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                rows(run_id),
+            )
+            self._conn.execute('UPDATE runs SET deal_count = ? WHERE run_id = ?', (count, run_id))
+        return run_id
+
+    def latest_run(self):
+        """最新一次运行的记录（字典），没有时返回None"""
+        row = self._conn.execute('SELECT * FROM runs ORDER BY created DESC, run_id DESC LIMIT 1').fetchone()
+        return dict(row) if row else None
+
+    def iter_run_deals(self, run_id, limit=None, active_only=False):
+        """按原有顺序逐条返回某次运行的优惠（生成器，不一次性读入内存）"""
+        sql = 'SELECT data FROM deals WHERE run_id = ?'
+        params = [run_id]
+        if active_only:
+            sql += f" AND (link_status IS NULL OR link_status NOT IN ({', '.join('?' * len(INACTIVE_STATUS))}))"
+            params.extend(INACTIVE_STATUS)
+        sql += ' ORDER BY position'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        for row in self._conn.execute(sql, params):
+            yield json.loads(row['data'])
+
+    def run_deals(self, run_id, limit=None, active_only=False):
+        """某次运行的优惠（按原有顺序）"""
+        return list(self.iter_run_deals(run_id, limit=limit, active_only=active_only))
+
+    def latest_deals(self, limit=None):
+        """最新一次运行的优惠，没有时返回空列表"""
+        run = self.latest_run()
+        return self.run_deals(run['run_id'], limit=limit) if run else []
+
+    def top_deals(self, n, active_only=True):
+        """最新一次运行中排在前面的 n 个优惠（默认跳过已失效的链接）"""
+        run = self.latest_run()
+        return self.run_deals(run['run_id'], limit=n, active_only=active_only) if run else []
+
+    def history(self, detail_url):
+        """某个详情页在各次运行中的记录，按时间先后排列：[(run_id, 运行时间, 优惠)]"""
+        rows = self._conn.execute(
+            'SELECT deals.run_id, runs.created, deals.data FROM deals JOIN runs USING (run_id) '
+            'WHERE deals.detail_url = ? ORDER BY runs.created, deals.run_id',
+            (detail_url,),
+        )
+        return [(row['run_id'], row['created'], json.loads(row['data'])) for row in rows]
+
+    def find_by_url(self, url):
+        """按商家链接（原链接或最终落地URL）查找最近一次的记录，没有时返回None"""
+        row = self._conn.execute(
+            'SELECT data FROM deals WHERE url = ? OR final_url = ? ORDER BY id DESC LIMIT 1', (url, url),
+        ).fetchone()
+        return json.loads(row['data']) if row else None
+
+    def export_json(self, path, run_id=None):
+        """按原有快照格式导出某次运行（默认最新一次），返回导出的优惠数量"""
+        if run_id is None:
+            run = self.latest_run()
+            if run is None:
+                return 0
+            run_id = run['run_id']
+        deals = self.run_deals(run_id)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(deals, f, ensure_ascii=False, indent=2)
+        return len(deals)
+
+    def import_snapshots(self, data_dir):
+        """一次性导入 data 目录中已有的 enhanced_deals_<时间戳>.json / .jsonl，返回导入的运行数
+
+        按文件名中的时间戳排序，已导入过的文件会被跳过，可以重复执行。
+        """
+        snapshots = []
+        for name in os.listdir(data_dir):
+            match = _SNAPSHOT_NAME.match(name)
+            if match:
+                snapshots.append((match.group(1), name))
+        known = {row['json_file'] for row in self._conn.execute('SELECT json_file FROM runs')}
+
+        imported = 0
+        for stamp, name in sorted(snapshots):
+            if name in known:
+                continue
+            json_file = os.path.join(data_dir, name)
+            try:
+                deals = list(iter_deals(json_file))
+            except (OSError, ValueError):
+                continue
+            html_file = os.path.splitext(json_file)[0] + '.html'
+            created = datetime.strptime(stamp, '%Y%m%d_%H%M%S').isoformat()
+            self.save_run(deals, json_file=json_file, html_file=html_file if os.path.exists(html_file) else None,
+                          created=created, source='import')
+            imported += 1
+        return imported
+
+    def stats(self):
+        """返回数据库统计"""
+        runs, deals = self._conn.execute(
+            'SELECT (SELECT COUNT(*) FROM runs), (SELECT COUNT(*) FROM deals)'
+        ).fetchone()
+        return {'runs': runs, 'deals': deals}
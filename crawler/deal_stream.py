@@ -0,0 +1,126 @@
+"""
+JSON Lines 输出 - 逐条追加写入优惠，读取时按生成器逐条返回
+
+原先 save_deals 在运行结束时对整个列表 json.dump(..., indent=2)，
+所有读取方都要 json.load 整个文件，内存占用随单次运行的优惠数量线性增长；
+运行中途崩溃时，已经解析出的优惠全部丢失。
+这里提供 JSONL 格式（每行一个优惠）：
+- JSONLWriter 在每批优惠解析和翻译完成时逐条追加并立即 flush（可选 fsync），
+  运行期间内存中只保留当前这一批
+- iter_deals 按生成器逐条读取 .jsonl（崩溃时写了一半的最后一行会被跳过）；
+  .json 快照仍可读取，但只能整体解析
+- write_deals / write_json_array 把优惠迭代器逐条写入 JSONL / JSON 数组文件（先写临时文件再原子替换）
+- DealRun 代表一次运行的输出：只记录数量，迭代时从输出文件重新逐条读取
+"""
+
+import json
+import os
+import threading
+
+
+class JSONLWriter:
+    """追加写入的 JSONL 文件（线程安全，每条记录写完即 flush）
+
+    文件在写入第一条记录时才创建，运行在写出任何优惠之前中断时不会留下空文件。
+    """
+
+    def __init__(self, path, fsync=False):
+        self.path = path
+        self.fsync = fsync
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = None
+        self._lock = threading.Lock()
+        self.written = 0
+
+    def write(self, deal):
+        line = json.dumps(deal, ensure_ascii=False) + '\n'
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self.written += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None and not self._file.closed:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_jsonl(path):
+    """逐行读取 JSONL 文件；无法解析的行（崩溃时写了一半的最后一行）被跳过"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def iter_deals(path):
+    """按文件格式逐条返回优惠（.jsonl 流式读取，其他按 JSON 数组读取）"""
+    if path.endswith('.jsonl'):
+        yield from iter_jsonl(path)
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        deals = json.load(f)
+    yield from deals
+
+
+def write_deals(path, deals, fsync=False):
+    """把优惠逐条写入 JSONL 文件（先写临时文件再原子替换），返回写入的数量"""
+    tmp_path = path + '.tmp'
+    count = 0
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for deal in deals:
+            f.write(json.dumps(deal, ensure_ascii=False))
+            f.write('\n')
+            count += 1
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return count
+
+
+def write_json_array(path, deals):
+    """把优惠逐条写入 JSON 数组文件，格式与 json.dump(deals, indent=2) 相同，返回写入的数量"""
+    tmp_path = path + '.tmp'
+    count = 0
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for deal in deals:
+            # json.dumps 会转义字符串中的换行，这里的换行只可能是缩进产生的
+            f.write(',\n  ' if count else '\n  ')
+            f.write(json.dumps(deal, ensure_ascii=False, indent=2).replace('\n', '\n  '))
+            count += 1
+        f.write('\n]' if count else ']')
+    os.replace(tmp_path, path)
+    return count
+
+
+class DealRun:
+    """一次运行输出的优惠：len() 为数量，每次迭代都调用 reader 重新逐条读取（不在内存中保留整个列表）"""
+
+    def __init__(self, count, reader):
+        self.count = count
+        self._reader = reader
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return iter(self._reader())
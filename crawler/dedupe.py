@@ -0,0 +1,299 @@
+"""
+跨运行去重 - 按规范化详情页链接和标题 MinHash 指纹合并重复的优惠
+
+同一个免费活动经常连续多次出现：详情页链接带着不同的跟踪参数，或者标题被稍微改写，
+之前每次都被当作新优惠重新解析真实链接、重新翻译、重新渲染。
+这里在 clean_deal_data 之后、解析真实链接之前加一个去重阶段：
+- 链接：canonicalize_url（小写主机、去掉 www.、跟踪参数和末尾的 /，查询参数排序）后完全相同
+- 标题：去掉常见的营销用词后取词集合，MinHash 签名分成若干段做 LSH，
+  同一段相同的已知优惠再计算精确的 Jaccard 相似度，达到阈值且标题中的数字完全相同才算重复
+  （"£5 off" 和 "£10 off" 不会被合并）；此外商家主机必须相同（不同商家的"Free sample"不是同一个活动），
+  商家主机未知（还没有解析过真实链接）时不按标题合并
+- 持久化索引保存每个优惠上一次的翻译；与已知优惠重复且原文相同时直接沿用，不再翻译；
+  同一次运行中的重复优惠只保留第一个。真实链接不在这里沿用，仍由带有效期的真实链接缓存负责
+索引按最近出现时间淘汰（max_entries / ttl_days）。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import struct
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urljoin, urlparse
+
+from url_classifier import INTERNAL_DOMAIN, canonicalize_url
+
+NUM_PERM = 48
+BANDS = 12          # 每段 4 个值：Jaccard 0.7 时约 96% 的概率至少一段相同，0.3 时约 10%
+ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 61) - 1
+# 固定种子：签名在不同运行之间必须一致
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+_TOKEN = re.compile(r'[a-z0-9]+(?:\.[0-9]+)?')
+STOPWORDS = frozenset((
+    'a', 'an', 'the', 'and', 'or', 'of', 'for', 'to', 'with', 'from', 'on', 'in', 'at', 'by',
+    'your', 'you', 'get', 'free', 'now', 'uk', 'claim', 'grab', 'new', 'today',
+))
+
+# 沿用翻译的字段：原文与记录中的相同时沿用 <字段>_zh
+TRANSLATED_FIELDS = ('title', 'description')
+
+
+def title_tokens(title):
+    """标题的词集合（小写，去掉营销常用词）"""
+    return frozenset(token for token in _TOKEN.findall((title or '').lower()) if token not in STOPWORDS)
+
+
+def minhash(tokens):
+    """词集合的 MinHash 签名（NUM_PERM 个值）"""
+    hashes = [int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+              for token in tokens]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def band_keys(tokens):
+    """LSH 分段键：签名每 ROWS 个值一段，每段压缩为 8 位十六进制"""
+    signature = minhash(tokens)
+    return [
+        hashlib.blake2b(struct.pack(f'<{ROWS}Q', *signature[i:i + ROWS]), digest_size=4).hexdigest()
+        for i in range(0, NUM_PERM, ROWS)
+    ]
+
+
+def merchant_host(url):
+    """商家链接的主机（小写，去掉 www.）；不是外部链接时返回None"""
+    if not url or not url.startswith(('http://', 'https://')) or INTERNAL_DOMAIN in url:
+        return None
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith('www.') else host or None
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def _numbers(tokens):
+    return frozenset(token for token in tokens if token[0].isdigit())
+
+
+class DedupeIndex:
+    """已知优惠的索引：规范化链接 → 记录，另有标题 LSH 分段 → 链接 的倒排表
+
+    path 为 None 时只保存在内存中（单次运行内的去重）。
+    """
+
+    def __init__(self, path=None, similarity=0.7, min_tokens=2, max_entries=20000, ttl_days=30):
+        self.path = path
+        self.similarity = similarity
+        self.min_tokens = max(1, min_tokens)
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl_days * 86400
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # 规范化链接 → 记录，按最近出现时间排列
+        self._bands = [{} for _ in range(BANDS)]
+        self._tokens = {}               # 规范化链接 → 标题词集合（用于精确计算相似度）
+        self._dirty = False
+        if path:
+            self.load()
+
+    @classmethod
+    def from_config(cls, config):
+        """根据 DEDUPE 配置创建索引"""
+        return cls(
+            config.get('path', 'data/cache/dedupe_index.json'),
+            similarity=config.get('similarity', 0.7),
+            min_tokens=config.get('min_tokens', 2),
+            max_entries=config.get('max_entries', 20000),
+            ttl_days=config.get('ttl_days', 30),
+        )
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self):
+        """从磁盘加载索引，丢弃已过期的记录"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            self.logger.warning(f"读取去重索引失败，将重新建立: {e}")
+            return
+        cutoff = time.time() - self.ttl
+        entries = sorted(data.get('entries', {}).items(), key=lambda item: item[1].get('last_seen', 0))
+        for key, entry in entries:
+            if entry.get('last_seen', 0) > cutoff:
+                self._put(key, entry)
+
+    def _put(self, key, entry):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._unlink(key, old)
+        self._entries[key] = entry
+        self._tokens[key] = frozenset(entry.get('tokens') or ())
+        for band, value in zip(self._bands, entry.get('bands') or ()):
+            band.setdefault(value, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            evicted, old = self._entries.popitem(last=False)
+            self._unlink(evicted, old)
+
+    def _unlink(self, key, entry):
+        self._tokens.pop(key, None)
+        for band, value in zip(self._bands, entry.get('bands') or ()):
+            keys = band.get(value)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del band[value]
+
+    def lookup(self, key, tokens, host=None):
+        """查找重复的已知优惠，返回 (规范化链接, 记录, 原因) 或 None；原因为 'url' 或 'title'
+
+        按标题匹配时要求记录的商家主机与 host 相同，host 为 None 时只按链接匹配。
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return key, entry, 'url'
+            if host is None or len(tokens) < self.min_tokens:
+                return None
+            candidates = set()
+            for band, value in zip(self._bands, band_keys(tokens)):
+                candidates.update(band.get(value, ()))
+            numbers = _numbers(tokens)
+            best = None
+            for candidate in candidates:
+                other = self._tokens[candidate]
+                if self._entries[candidate].get('host') != host or _numbers(other) != numbers:
+                    continue
+                score = jaccard(tokens, other)
+                if score >= self.similarity and (best is None or score > best[0]):
+                    best = (score, candidate)
+            if best is None:
+                return None
+            return best[1], self._entries[best[1]], 'title'
+
+    def add(self, key, deal, tokens=None, first_seen=None, host=None):
+        """登记（或更新）一个优惠；已存在的记录保留最早出现的日期
+
+        host 为空时取优惠最终落地链接（没有时为 url）的商家主机。
+        """
+        tokens = title_tokens(deal.get('title')) if tokens is None else tokens
+        entry = {}
+        for field in TRANSLATED_FIELDS:
+            if deal.get(field) and deal.get(f'{field}_zh'):
+                entry[field] = deal[field]
+                entry[f'{field}_zh'] = deal[f'{field}_zh']
+        entry['host'] = host or merchant_host(deal.get('final_url') or deal.get('url'))
+        entry['tokens'] = sorted(tokens)
+        entry['bands'] = band_keys(tokens) if len(tokens) >= self.min_tokens else []
+        entry['last_seen'] = time.time()
+        with self._lock:
+            old = self._entries.get(key)
+            entry['first_seen'] = (old or {}).get('first_seen') or first_seen or deal.get('date')
+            self._put(key, entry)
+            self._dirty = True
+
+    def save(self):
+        """原子写入磁盘（仅在有变化时）"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {'version': 1, 'entries': dict(self._entries)}
+            self._dirty = False
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+class DealDeduplicator:
+    """解析真实链接之前的去重阶段
+
+    link_cache 为真实链接缓存（可选）：用来查出还没有解析的候选优惠的商家主机，按标题匹配时需要。
+    """
+
+    def __init__(self, index, base_url='', link_cache=None):
+        self.index = index
+        self.base_url = base_url
+        self.link_cache = link_cache
+        self.candidates = 0
+        self.url_duplicates = 0
+        self.title_duplicates = 0
+        self.in_run_duplicates = 0
+
+    @classmethod
+    def from_config(cls, config, base_url='', link_cache=None):
+        return cls(DedupeIndex.from_config(config), base_url=base_url, link_cache=link_cache)
+
+    def key(self, deal):
+        return canonicalize_url(urljoin(self.base_url, deal.get('source_url') or deal.get('detail_url') or ''))
+
+    def host(self, deal):
+        """优惠的商家主机：已解析的链接优先，其次查真实链接缓存；未知时返回None"""
+        host = merchant_host(deal.get('final_url') or deal.get('url'))
+        if host is None and self.link_cache is not None and deal.get('detail_url'):
+            host = merchant_host(self.link_cache.peek(urljoin(self.base_url, deal['detail_url'])))
+        return host
+
+    def dedupe(self, deals):
+        """合并重复的优惠：同一次运行中的重复只保留第一个；与已知优惠重复的沿用已有的翻译"""
+        run_index = DedupeIndex(similarity=self.index.similarity, min_tokens=self.index.min_tokens)
+        kept = []
+        for deal in deals:
+            self.candidates += 1
+            key = self.key(deal)
+            tokens = title_tokens(deal.get('title'))
+            host = self.host(deal)
+            if run_index.lookup(key, tokens, host) is not None:
+                self.in_run_duplicates += 1
+                continue
+            run_index.add(key, deal, tokens, host=host)
+
+            match = self.index.lookup(key, tokens, host)
+            if match is not None:
+                _, entry, reason = match
+                if reason == 'url':
+                    self.url_duplicates += 1
+                else:
+                    self.title_duplicates += 1
+                for field in TRANSLATED_FIELDS:
+                    # 只有原文没变时翻译才能沿用
+                    if deal.get(field) and entry.get(field) == deal[field] and entry.get(f'{field}_zh'):
+                        deal[f'{field}_zh'] = entry[f'{field}_zh']
+                if entry.get('first_seen'):
+                    deal['first_seen'] = entry['first_seen']
+            kept.append(deal)
+        return kept
+
+    def record(self, deals):
+        """运行结束时登记本次输出的优惠（含翻译结果）"""
+        for deal in deals:
+            self.index.add(self.key(deal), deal, first_seen=deal.get('first_seen'))
+
+    def save(self):
+        self.index.save()
+
+    def stats(self):
+        """返回去重统计"""
+        return {
+            'candidates': self.candidates,
+            'url_duplicates': self.url_duplicates,
+            'title_duplicates': self.title_duplicates,
+            'in_run_duplicates': self.in_run_duplicates,
+            'index_size': len(self.index),
+        }
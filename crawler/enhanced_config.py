@@ -24,6 +24,132 @@ HTML_OUTPUT = "../index.html"
 
 # 翻译配置
 ENABLE_TRANSLATION = True
+TRANSLATION = {
+    'dictionary_file': 'dictionaries/en_zh.tsv',  # 短语词典（相对 crawler 目录），覆盖内置词汇
+    'cache_size': 10000,                          # 翻译缓存条目上限（LRU淘汰）
+    'backend': 'dictionary',   # 'dictionary' 本地词典 / 'remote' 远程API / 'local-http' 本机测试替身
+    'memory_enabled': True,    # 持久化翻译记忆，重复文本不再翻译
+    'memory_path': 'data/cache/translation_memory.json',
+    'memory_max_entries': 50000,
+    'remote': {
+        'endpoint': None,      # Google Translate v2 风格接口地址
+        'api_key': None,       # 也可通过环境变量 TRANSLATION_API_KEY 提供
+        'target': 'zh-CN',
+        'batch_size': 50,      # 每次请求的文本段数量
+        'min_interval': 0.5,   # 两次请求的最小间隔（秒），只对远程后端生效
+        'timeout': 15,
+    },
+}
+
+# 爬取引擎配置: 'sync' 为逐个解析的同步引擎, 'async' 为在线程池中并发解析的并发引擎（沿用原名称）
+CRAWL_ENGINE = 'sync'
+
+# 列表页遍历配置：从首页出发，按优先级抓取分页和分类列表（所有列表的第1页优先）
+LISTING_CRAWL = {
+    'enabled': True,
+    'max_pages': 20,                # 单次运行最多抓取的列表页数
+    'max_depth': 1,                 # 最多跟随几层分类链接（0 表示只翻首页的分页）
+    'max_pages_per_listing': 10,    # 单个列表最多翻几页
+    'pagination_patterns': [        # 分页链接（第一个分组为页码）
+        r'/page/(\d+)/?$',
+        r'[?&](?:page|paged)=(\d+)',
+    ],
+    'category_patterns': [          # 分类列表链接（匹配路径）
+        r'/category/[^/?#]+(?:/[^/?#]+)*/?$',
+    ],
+}
+
+# 重试配置：超时、连接错误、429 和 5xx 按指数退避重试（重试次数见 REAL_LINK_EXTRACTION['max_retries']）
+RETRY = {
+    'backoff_base': 0.5,        # 第 n 次重试前随机等待 0 ~ backoff_base * 2^n 秒
+    'backoff_max': 30.0,        # 单次等待上限（秒）
+    'max_retry_after': 60.0,    # Retry-After 超过该值（秒）时不再重试
+    'retry_statuses': [429, 500, 502, 503, 504],
+}
+
+# 熔断配置：同一主机连续失败达到阈值后，冷却期内的请求立即失败
+CIRCUIT_BREAKER = {
+    'failure_threshold': 5,     # 连续失败次数
+    'reset_timeout': 30.0,      # 冷却时间（秒），之后放行一个探测请求
+}
+
+# 列表页解析配置
+LISTING_PARSER = {
+    'backend': 'auto',   # 'lxml'、'html.parser' 或 'auto'（已安装 lxml 时使用 lxml）
+}
+
+# 传输层配置
+TRANSPORT = {
+    'client': 'requests',         # 'requests'，或 'httpx'（需要 pip install 'httpx[http2]'）
+    'pool_connections': 10,       # requests: 缓存连接池的主机数
+    'pool_maxsize': 10,           # requests: 每个主机保持的连接数（并发引擎会按并发数调大）
+    'per_host_maxsize': {         # requests: 为主要主机单独设置连接池大小
+        'www.latestfreestuff.co.uk': 32,
+    },
+    'http2': True,                # httpx: 启用 HTTP/2，同一主机的请求共用一条连接
+    'http1': True,                # httpx: False 时对 http:// 直接使用 HTTP/2（本地测试服务器）
+    'max_connections': 100,       # httpx: 连接总数上限
+    'max_keepalive': 20,          # httpx: 保持的空闲连接数
+    'keepalive_expiry': 30.0,     # httpx: 空闲连接保持时间（秒）
+}
+
+# 链接提取进程池：并发解析大量详情页时，把CPU密集的规则求值交给多个工作进程
+EXTRACTION_POOL = {
+    'enabled': False,
+    'workers': None,         # 工作进程数，None 表示CPU核心数
+    'chunk_size': 4,         # 同时到达的页面最多合并成一个任务的数量
+    'batch_wait': 0.005,     # 凑批次的最长等待时间（秒）
+    'min_bytes': 32768,      # 小于该大小的页面直接在主进程中解析
+    'start_method': None,    # multiprocessing 启动方式（fork / spawn / forkserver），None 为系统默认
+}
+
+# 流式抓取配置：详情页/申请页边下载边匹配，找到高优先级链接后立即断开
+STREAMING_FETCH = {
+    'enabled': True,
+    'chunk_size': 16384,              # 每次读取的字节数
+    'max_bytes': 2 * 1024 * 1024,     # 单个页面最多下载的字节数，超出后按已读取部分解析
+    'overlap': 4096,                  # 新数据块前回看的字符数，用于发现跨块的匹配
+}
+
+# 时间预算配置：保证定时任务在可预期的时间内完成
+DEADLINES = {
+    'run_seconds': 900,       # 整次运行的截止时间（秒），None 表示不限时
+    'deal_seconds': 45,       # 单个优惠解析链路（详情页 → 申请页 → 商家链接）的预算（秒）
+    'reserve_seconds': 60,    # 为翻译和保存预留的时间（秒）
+}
+
+# 请求合并配置：单次运行内每个URL只请求一次，页面在运行期间缓存在内存中
+REQUEST_COALESCING = {
+    'max_bytes': 512 * 1024 * 1024,  # 内存中缓存的页面总大小上限
+}
+
+# 增量爬取配置：记录已处理过的优惠详情页，增量模式下只解析新优惠
+INCREMENTAL = {
+    'enabled': False,          # 增量模式（也可使用命令行 --incremental）
+    'track_seen': True,        # 非增量模式下也记录已处理的优惠，便于随时切换到增量模式
+    'path': 'data/cache/seen_deals.bin',
+    'max_entries': 100000,     # 指纹数量上限，超出后淘汰最早的记录
+    'stop_after_seen': 1,      # 连续遇到多少个已处理的优惠后停止（列表有置顶帖时可调大）
+    'keep_previous': 50,       # 与新优惠合并输出的上一次运行的优惠数量
+}
+
+# 并发引擎配置（CRAWL_ENGINE = 'async'）
+ASYNC_ENGINE = {
+    'max_deals': 200,            # 单次运行最多解析的优惠数量（并发引擎下代替 MAX_DEALS）
+    'concurrency': 32,           # 全局并发上限（工作线程数）
+}
+
+# 按主机限流配置（并发引擎）。同步引擎按 REQUEST_DELAY 逐个请求
+RATE_LIMIT = {
+    'rate': 20.0,                # 每个主机的平均请求速率（请求/秒，令牌桶）
+    'burst': 10,                 # 允许的突发请求数（令牌桶容量）
+    'adaptive': True,            # AIMD 自适应并发：健康时加性增长，429/5xx/超时时乘性减小
+    'initial_concurrency': 2,    # 每个主机的初始并发数
+    'min_concurrency': 1,
+    'max_concurrency': 16,       # 每个主机的并发上限
+    'latency_target': 2.0,       # 响应时间低于该值（秒）才增加并发
+    'decrease_factor': 0.5,      # 拥塞时并发数乘以该系数
+}
 
 # 真实链接提取配置
 REAL_LINK_EXTRACTION = {
@@ -31,6 +157,10 @@ REAL_LINK_EXTRACTION = {
     'max_retries': 3,  # 最大重试次数
     'timeout': 15,     # 单个链接提取超时
     
+    # GET FREEBIE 按钮与申请页面链接
+    'get_freebie_pattern': r'<a[^>]+href=["\']([^"\']+)["\'][^>]*>[^<]*GET\s+FREEBIE[^<]*</a>',
+    'claim_link_pattern': r'href=["\']([^"\']*\/claim\/[^"\']*)["\']',
+    
     # 主要链接模式（按优先级排序）
     'primary_patterns': [
         r'<a[^>]+class=["\'][^"\']*(?:deal-btn|offer-btn|get-deal|visit-store|claim-deal|btn-primary)[^"\']*["\'][^>]+href=["\']([^"\']+)["\']',
@@ -56,23 +186,150 @@ REAL_LINK_EXTRACTION = {
         r'location\.href\s*=\s*["\']([^"\']+)["\']',
         r'document\.location\s*=\s*["\']([^"\']+)["\']',
     ],
+    
+    # meta refresh 与 iframe 重定向
+    'meta_refresh_pattern': r'<meta[^>]+http-equiv=["\']refresh["\'][^>]+content=["\'][^"\']*url=([^"\']+)["\']',
+    'iframe_pattern': r'<iframe[^>]+src=["\']([^"\']+)["\']',
+    
+    # 申请页面中的商家链接模式
+    'claim_page_patterns': [
+        r'href=["\']((https?://(?!(?:www\.)?(?:latestfreestuff\.co\.uk|google\.com|facebook\.com|twitter\.com|instagram\.com|youtube\.com|analytics\.google\.com|fonts\.googleapis\.com))[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}[^"\']*?))["\']',
+        r'href=["\']((https?://[^"\']*(?:shop|store|buy|deal|offer|promo)[^"\']*?))["\']',
+    ],
+}
+
+# 真实链接缓存配置（详情页/申请页 URL → 商家真实 URL）
+LINK_CACHE = {
+    'enabled': True,
+    'path': 'data/cache/resolved_links.json',
+    'ttl': 7 * 24 * 3600,          # 成功解析结果的有效期（秒）
+    'negative_ttl': 24 * 3600,     # 未找到真实链接结果的有效期（秒）
+    'max_entries': 5000,           # 缓存条目上限，超出后按最近使用时间淘汰
+}
+
+# 重定向解析配置（联盟/短链接 → 最终落地的商家URL）
+REDIRECTS = {
+    'enabled': True,
+    'max_hops': 10,                # 最多跟随的跳转次数
+    'timeout': 10,                 # 每一跳的请求超时（秒）
+    'workers': 8,                  # 同时解析的主机数
+    'head_fallback_status': [400, 403, 404, 405, 501],  # HEAD 返回这些状态码时改用 Range GET
+    'cache_enabled': True,
+    'cache': {
+        'path': 'data/cache/final_urls.json',
+        'ttl': 7 * 24 * 3600,      # 最终URL的有效期（秒）
+        'negative_ttl': 6 * 3600,  # 解析失败结果的有效期（秒）
+        'max_entries': 20000,
+    },
+}
+
+# 优惠数据库（SQLite，按运行保存结果，代替逐个扫描时间戳快照文件）
+DEAL_STORE = {
+    'enabled': True,
+    'path': 'data/deals.db',
+    'json_export': True,   # 同时写出 enhanced_deals_<时间戳>.json，兼容仍读取快照文件的工具
+}
+
+# 爬虫输出格式
+DEAL_OUTPUT = {
+    'format': 'json',   # 'jsonl': 每批优惠翻译完成时立即追加到 enhanced_deals_<时间戳>.jsonl，崩溃时不丢失已完成的批次
+    'fsync': False,     # 每条记录写入后 fsync（更安全，但更慢）
+    'batch_size': 50,   # 每批解析、翻译并写出的优惠数量（内存中只保留一批）
+}
+
+# 跨运行去重（解析真实链接和翻译之前，按规范化详情页链接和标题 MinHash 指纹合并重复的优惠）
+DEDUPE = {
+    'enabled': True,
+    'path': 'data/cache/dedupe_index.json',
+    'similarity': 0.7,      # 标题词集合的 Jaccard 相似度阈值（标题中的数字还必须完全相同）
+    'min_tokens': 2,        # 标题去掉营销用词后至少要有几个词才按标题匹配
+    'max_entries': 20000,   # 索引记录上限，超出后淘汰最久未出现的
+    'ttl_days': 30,         # 超过这么多天没有再出现的优惠从索引中移除
+}
+
+# JSONL 归档的偏移索引（data/enhanced_deals.idx，按 detail_url 和优惠哈希直接定位历史记录）
+ARCHIVE_INDEX = {
+    'enabled': True,    # JSONL 输出时，每次运行结束后增量更新索引
+    'max_open': 64,     # 同时保持 mmap 打开的归档文件数
+}
+
+# 历史运行结果和网站备份的压缩归档（内容寻址去重，清单可还原任意一次运行）
+COMPACTION = {
+    'enabled': True,
+    'path': 'data/archive',             # 运行结果归档（相对 crawler 目录）
+    'backup_path': 'backups/archive',   # 网站备份归档（相对网站根目录）
+    'codec': 'zstd',                    # 'zstd'（需要 zstandard 包，未安装时自动使用 gzip）或 'gzip'
+    'level': None,                      # 压缩级别，None 为默认（zstd 10 / gzip 6）
+    'keep_runs': 30,                    # data 目录中保留原始文件的最近运行次数（更早的归档后删除）
+    'keep_backups': 10,                 # backups 目录中保留的最近备份数
+}
+
+# 商家链接可用性检查（网站更新前执行）
+LIVENESS = {
+    'enabled': True,
+    'timeout': 5,                  # 每个链接的请求超时（秒）
+    'workers': 16,                 # 同时检查的主机数
+    'max_seconds': 60,             # 整个检查阶段的时间上限，来不及检查的链接保持原样
+    'drop_dead': False,            # True 时移除 404/410 和已过期的优惠（默认排到最后）
+    'dead_status': [404, 410],
+    'head_fallback_status': [400, 405, 501],  # HEAD 返回这些状态码时改用 Range GET
+    # 重定向后的落地URL（路径和查询参数）符合这些正则时判定为活动已结束
+    'expired_patterns': [
+        r'expired',
+        r'(?:offer|promo|promotion|campaign|deal|competition)s?[-_/]?(?:ended|closed|over|finished)',
+        r'no[-_]?longer[-_]?available',
+        r'sold[-_]?out',
+    ],
+    # 推荐/短链接主机（含子域名）：被重定向到首页是正常行为，按 alive 处理
+    'referral_hosts': ['share.octopus.energy', 'bit.ly', 'amzn.to', 'tinyurl.com', 'prf.hn', 'awin1.com'],
+    'cache_enabled': True,
+    'cache_path': 'data/cache/liveness.json',
+    # 各状态结果的有效期（秒）
+    'ttl': {
+        'alive': 12 * 3600,
+        'dead': 24 * 3600,
+        'expired': 24 * 3600,
+        'unreachable': 2 * 3600,
+        'unknown': 30 * 60,
+    },
+    # 按域名设置 alive 结果的有效期（含子域名）
+    'domain_ttl': {
+        'amazon.co.uk': 24 * 3600,
+        'tesco.com': 24 * 3600,
+        'boots.com': 24 * 3600,
+    },
 }
 
-# URL验证配置
+# HTTP条件请求缓存配置（ETag / Last-Modified）
+HTTP_CACHE = {
+    'enabled': True,
+    'directory': 'data/cache/http',
+    'cache_only': False,   # 离线模式：只从缓存读取，用于重放上一次运行
+    'max_entries': 5000,   # 缓存页面数上限，超出后淘汰最久未使用的
+    'max_bytes': 256 * 1024 * 1024,  # 响应体总大小上限
+}
+
+# URL验证配置（由 url_classifier.URLClassifier 编译一次后使用）
+# 规则即原先写死在 is_valid_deal_url / _is_valid_merchant_link 中的列表，判断结果与原实现相同；
+# 此前这里的同名配置从未被读取，其中的 '/login'、'free' 等规则不再保留
 URL_VALIDATION = {
-    # 排除的URL模式
+    # 优惠链接中排除的URL模式（子串匹配）
     'invalid_patterns': [
-        'javascript:', 'mailto:', '#', 'latestfreestuff.co.uk',
-        '/terms', '/privacy', '/about', '/contact', '/login', '/register', '/search',
-        'facebook.com/sharer', 'twitter.com/intent', 'instagram.com',
-        'youtube.com', 'linkedin.com/sharing', 'pinterest.com/pin',
-        'google.com/search', 'bing.com/search', 'yahoo.com/search',
+        'javascript:', 'mailto:', 'tel:', '#', 'data:',
+        'void(0)', 'about:blank',
+        '.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.pdf',
+    ],
+    
+    # 社交媒体分享链接模式
+    'social_share_patterns': [
+        'share', 'sharer', 'intent/tweet', 'pin/create',
+        'linkedin.com/in/', 'facebook.com/profile',
     ],
     
     # 排除的文件扩展名
     'invalid_extensions': ['.pdf', '.doc', '.docx', '.zip', '.rar', '.exe', '.dmg'],
     
-    # 可信的购物网站域名
+    # 可信的购物网站域名（含子域名）
     'trusted_domains': [
         'amazon.co.uk', 'amazon.com', 'ebay.co.uk', 'ebay.com',
         'argos.co.uk', 'currys.co.uk', 'johnlewis.com', 'marksandspencer.com',
@@ -87,15 +344,25 @@ URL_VALIDATION = {
         'ryanair.com', 'easyjet.com', 'ba.com', 'trainline.com',
         'mcdonalds.co.uk', 'kfc.co.uk', 'pizzahut.co.uk', 'dominos.co.uk',
         'spotify.com', 'netflix.com', 'disneyplus.com', 'audible.co.uk',
+        'whitworths.co.uk', 'discoverysample.com',
     ],
     
     # 优惠相关关键词
     'deal_keywords': [
         'deal', 'offer', 'discount', 'coupon', 'promo', 'sale',
         'shop', 'store', 'buy', 'checkout', 'cart', 'order',
-        'voucher', 'code', 'cashback', 'reward', 'special',
-        'limited', 'exclusive', 'bonus', 'gift', 'free'
-    ]
+        'voucher', 'code', 'cashback', 'reward',
+    ],
+    
+    # 申请页面商家链接中排除的URL模式
+    'merchant_invalid_patterns': [
+        'javascript:', 'mailto:', 'tel:', '#', 'data:',
+        'google.com', 'facebook.com', 'twitter.com', 'instagram.com',
+        'youtube.com', 'linkedin.com', 'pinterest.com', 'tiktok.com',
+        'fonts.googleapis.com', 'analytics.google.com', 'google-analytics.com',
+        'googletagmanager.com', 'recaptcha', 'privacy-policy', 'terms-and-conditions',
+        '.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico',
+    ],
 }
 
 # 日志配置
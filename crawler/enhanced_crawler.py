@@ -1,11 +1,12 @@
 import requests
-import json
 import re
 import time
 from datetime import datetime
-from html.parser import HTMLParser
 import logging
 import os
+import sqlite3
+import threading
+from itertools import islice
 from urllib.parse import urljoin, urlparse
 
 # 导入配置
@@ -16,152 +17,110 @@ except ImportError:
     BASE_URL = "https://www.latestfreestuff.co.uk"
     MAX_DEALS = 10
     REQUEST_DELAY = 2
+    REQUEST_TIMEOUT = 30
     ENABLE_TRANSLATION = True
+    TRANSLATION = {}
+    INCREMENTAL = {}
+    LISTING_CRAWL = {}
+    RATE_LIMIT = {}
+    RETRY = {}
+    CIRCUIT_BREAKER = {}
+    REQUEST_COALESCING = {}
+    TRANSPORT = {}
+    REDIRECTS = {}
+    DEAL_STORE = {}
+    DEAL_OUTPUT = {}
+    ARCHIVE_INDEX = {}
+    COMPACTION = {}
+    DEDUPE = {}
+    EXTRACTION_POOL = {}
+    LISTING_PARSER = {}
+    STREAMING_FETCH = {}
+    DEADLINES = {}
+    CRAWL_ENGINE = 'sync'
+    ASYNC_ENGINE = {}
+    LINK_CACHE = {}
+    HTTP_CACHE = {}
+    REAL_LINK_EXTRACTION = {}
+    URL_VALIDATION = {}
 
-class SimpleTranslator:
-    """简单的翻译服务（可替换为其他翻译API）"""
-    
-    def __init__(self):
-        self.cache = {}  # 翻译缓存
-        
-    def translate_to_chinese(self, text):
-        """简单的英译中（这里使用基础词汇替换，实际应用中建议使用专业翻译API）"""
-        if not text or text in self.cache:
-            return self.cache.get(text, text)
-            
-        # 基础词汇替换（可扩展）
-        translations = {
-            'free': '免费',
-            'deal': '优惠',
-            'offer': '优惠',
-            'discount': '折扣',
-            'save': '省钱',
-            'sale': '促销',
-            'voucher': '优惠券',
-            'code': '代码',
-            'cashback': '返现',
-            'student': '学生',
-            'new': '新',
-            'exclusive': '独家',
-            'limited': '限时',
-            'today': '今天',
-            'now': '现在',
-            'get': '获得',
-            'buy': '购买',
-            'shop': '购物',
-            'online': '在线',
-            'delivery': '配送',
-            'shipping': '运费',
-            'click': '点击',
-            'here': '这里',
-            'link': '链接',
-            'visit': '访问',
-            'website': '网站',
-            'store': '商店',
-            'price': '价格',
-            'cheap': '便宜',
-            'bargain': '便宜货',
-            'member': '会员',
-            'signup': '注册',
-            'register': '注册',
-            'account': '账户'
-        }
-        
-        translated = text.lower()
-        for en, zh in translations.items():
-            translated = translated.replace(en, zh)
-            
-        # 保持原文的大小写结构
-        result = self._preserve_case_structure(text, translated)
-        self.cache[text] = result
-        return result
-        
-    def _preserve_case_structure(self, original, translated):
-        """保持原文的大小写结构"""
-        if not original:
-            return translated
-        if original.isupper():
-            return translated.upper()
-        if original.istitle():
-            return translated.title()
-        return translated
-
-class DealParser(HTMLParser):
-    """HTML解析器"""
-    
-    def __init__(self):
-        super().__init__()
-        self.deals = []
-        self.current_deal = {}
-        self.in_deal_container = False
-        self.in_title = False
-        self.in_description = False
-        self.current_tag = None
-        
-    def handle_starttag(self, tag, attrs):
-        self.current_tag = tag
-        attrs_dict = dict(attrs)
-        
-        # 检测可能的优惠容器
-        if tag in ['article', 'div'] and any('deal' in str(v).lower() or 'post' in str(v).lower() 
-                                           for v in attrs_dict.values()):
-            self.in_deal_container = True
-            self.current_deal = {}
-            
-        # 检测标题
-        if tag in ['h1', 'h2', 'h3', 'h4'] and self.in_deal_container:
-            self.in_title = True
-            
-        # 检测描述
-        if tag == 'p' and self.in_deal_container:
-            self.in_description = True
-            
-        # 检测链接 - 获取详情页链接
-        if tag == 'a' and self.in_deal_container and 'href' in attrs_dict:
-            if 'detail_url' not in self.current_deal:
-                self.current_deal['detail_url'] = attrs_dict['href']
-                
-        # 检测图片
-        if tag == 'img' and self.in_deal_container:
-            if 'src' in attrs_dict:
-                self.current_deal['image'] = attrs_dict['src']
-            elif 'data-src' in attrs_dict:
-                self.current_deal['image'] = attrs_dict['data-src']
-                
-    def handle_endtag(self, tag):
-        if tag in ['article', 'div'] and self.in_deal_container:
-            if self.current_deal and 'title' in self.current_deal:
-                self.deals.append(self.current_deal.copy())
-            self.in_deal_container = False
-            self.current_deal = {}
-            
-        if tag in ['h1', 'h2', 'h3', 'h4']:
-            self.in_title = False
-            
-        if tag == 'p':
-            self.in_description = False
-            
-    def handle_data(self, data):
-        data = data.strip()
-        if not data:
-            return
-            
-        if self.in_title and self.in_deal_container:
-            self.current_deal['title'] = data
-            
-        if self.in_description and self.in_deal_container:
-            if 'description' not in self.current_deal:
-                self.current_deal['description'] = data
-            else:
-                self.current_deal['description'] += ' ' + data
+from archive_index import ArchiveIndex
+from concurrent_engine import ConcurrentCrawlEngine
+from charset import decode_response
+from coalesce import RequestCoalescer
+from compaction import SnapshotArchive
+from extraction import ExtractionPool, LinkExtractor
+from deal_store import DealStore
+from dedupe import DealDeduplicator
+from deal_stream import DealRun, JSONLWriter, iter_deals, iter_jsonl, write_json_array
+from deadline import BudgetExceeded, Deadline, DeadlineStats, clamp_timeout, current_budget, deal_budget
+from frontier import ListingFrontier
+from http_cache import HTTPCache
+from link_cache import ResolvedLinkCache
+from link_index import LinkRuleSet
+from listing_parser import parse_listing
+from rate_limit import HostRateLimiter
+from redirects import RedirectResolver
+from retry import CircuitBreaker, CircuitOpenError, RetryPolicy
+from seen_deals import SeenDealStore
+from streaming import LinkWatcher, StreamedPage, StreamStats, read_stream
+from translation_service import TranslationService
+from translator import SimpleTranslator
+from transport import create_transport
+from url_classifier import URLClassifier, canonicalize_url
 
 class EnhancedFreeStuffCrawler:
     """增强版优惠爬虫 - 获取真实优惠链接"""
     
-    def __init__(self):
+    def __init__(self, engine=None, cache_only=None, incremental=None, max_deals=None):
         self.base_url = "https://www.latestfreestuff.co.uk"
-        self.translator = SimpleTranslator()
+        self.translator = SimpleTranslator.from_config(TRANSLATION)
+        self.translation_service = TranslationService.from_config(TRANSLATION, self.translator)
         self.session = requests.Session()
+        self.concurrent_engine = None
+        self.link_rules = LinkRuleSet.from_config(REAL_LINK_EXTRACTION)
+        self.listing_backend = LISTING_PARSER.get('backend', 'auto')  # 列表页解析后端
+        self.url_classifier = URLClassifier.from_config(URL_VALIDATION)
+        self.link_cache = ResolvedLinkCache.from_config(LINK_CACHE) if LINK_CACHE.get('enabled', True) else None
+        self.http_cache = None
+        if HTTP_CACHE.get('enabled', True) or cache_only:
+            self.http_cache = HTTPCache.from_config(HTTP_CACHE, cache_only=cache_only)
+        self.engine = engine or CRAWL_ENGINE
+        self.timeout = REQUEST_TIMEOUT
+        self.link_timeout = REAL_LINK_EXTRACTION.get('timeout', REQUEST_TIMEOUT)  # 详情页/申请页超时
+        self.retry_policy = RetryPolicy.from_config(RETRY, max_retries=REAL_LINK_EXTRACTION.get('max_retries', 3))
+        self.circuit_breaker = CircuitBreaker.from_config(CIRCUIT_BREAKER)
+        self.retries = 0
+        self.coalescer = RequestCoalescer.from_config(REQUEST_COALESCING)
+        # 时间预算：整次运行的截止时间（run_crawler 开始时重新计时）与单个优惠的解析预算
+        self.run_deadline = Deadline(DEADLINES.get('run_seconds'))
+        self.deadline_stats = DeadlineStats()
+        # 流式抓取：详情页找到 GET FREEBIE、申请页找到商家链接后立即断开
+        self.streaming = STREAMING_FETCH if STREAMING_FETCH.get('enabled', True) else None
+        self.stream_stats = StreamStats()
+        overlap = STREAMING_FETCH.get('overlap', 4096)
+        self.detail_watcher = LinkWatcher(self.link_rules.get_freebie.regex, overlap=overlap)
+        self.claim_watcher = None
+        if self.link_rules.claim_page:
+            # 只有第一条申请页规则的匹配是确定的（后面的规则优先级更低）
+            self.claim_watcher = LinkWatcher(self.link_rules.claim_page[0].regex, self._is_valid_merchant_link, overlap)
+        self._retries_lock = threading.Lock()
+        # 按主机限流：并发引擎使用令牌桶 + 自适应并发，同步引擎按 REQUEST_DELAY 逐个请求
+        self.rate_limiter = HostRateLimiter.from_config(
+            RATE_LIMIT, request_delay=None if self.engine == 'async' else REQUEST_DELAY
+        )
+        if max_deals is None:
+            max_deals = ASYNC_ENGINE.get('max_deals', MAX_DEALS) if self.engine == 'async' else MAX_DEALS
+        self.max_deals = max_deals
+        # 增量模式：跳过已处理过的优惠，遇到已知优惠即停止
+        self.incremental = INCREMENTAL.get('enabled', False) if incremental is None else incremental
+        self.seen_deals = SeenDealStore.from_config(INCREMENTAL) if INCREMENTAL.get('track_seen', True) or self.incremental else None
+        self.deduper = DealDeduplicator.from_config(DEDUPE, base_url=self.base_url, link_cache=self.link_cache) if DEDUPE.get('enabled', True) else None
+        self.reached_known = False  # 本次运行是否已遇到已处理过的优惠
+        # JSONL 输出：运行期间每解析完一个优惠就追加到本次运行的输出文件
+        self.output_format = DEAL_OUTPUT.get('format', 'json')
+        self.run_timestamp = None
+        self.deal_writer = None
         self.setup_logging()
         
         # 设置请求头
@@ -173,6 +132,19 @@ class EnhancedFreeStuffCrawler:
             'Connection': 'keep-alive',
         }
         self.session.headers.update(self.headers)
+        # 传输层：requests 连接池（可按主机设置大小）或可选的 httpx HTTP/2 客户端
+        self.transport = create_transport(TRANSPORT, self.session)
+        # 联盟/短链接的重定向解析（只读取响应头，最终URL按链接缓存）
+        self.redirects = None
+        if REDIRECTS.get('enabled', True):
+            self.redirects = RedirectResolver.from_config(REDIRECTS, self.transport, self.rate_limiter)
+        # 详情页/申请页的规则求值：默认在当前进程中执行，启用进程池时交给工作进程；
+        # 优惠链接已知重定向目标时按最终落地URL验证
+        final_url = self.redirects.final_url if self.redirects else None
+        self.extractor = LinkExtractor(self.link_rules, self.url_classifier, final_url)
+        if EXTRACTION_POOL.get('enabled', False):
+            self.extractor = ExtractionPool.from_config(EXTRACTION_POOL, REAL_LINK_EXTRACTION, URL_VALIDATION,
+                                                        final_url)
         
     def setup_logging(self):
         """设置日志"""
@@ -186,17 +158,145 @@ class EnhancedFreeStuffCrawler:
         )
         self.logger = logging.getLogger(__name__)
 
-    def get_page_content(self, url):
-        """获取页面内容"""
+    def get_page_content(self, url, timeout=None):
+        """获取页面内容（本次运行内同一URL只请求一次）"""
         try:
-            self.logger.info(f"正在获取页面: {url}")
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            return response.text
+            return self.coalescer.fetch(url, lambda: self._get_page_content(url, timeout))
+        except BudgetExceeded:
+            # 预算不足的请求不缓存，其他预算充足的优惠仍可以请求该页面
+            self.deadline_stats.add('requests_cut')
+            self.logger.warning(f"时间预算已用完，跳过: {url}")
+            return None
+
+    def stream_page_content(self, url, watcher, timeout=None):
+        """流式获取页面，watcher 找到匹配后立即断开；返回 StreamedPage
+
+        未启用流式抓取或没有 watcher 时等同于 get_page_content（返回完整页面）。
+        """
+        if not self.streaming or watcher is None:
+            return self.get_page_content(url, timeout)
+        try:
+            return self.coalescer.fetch(url, lambda: self._get_page_content(url, timeout, watcher), variant=watcher)
+        except BudgetExceeded:
+            self.deadline_stats.add('requests_cut')
+            self.logger.warning(f"时间预算已用完，跳过: {url}")
+            return None
+
+    def _get_page_content(self, url, timeout=None, watcher=None):
+        """获取页面内容（失败时按重试策略重试，主机熔断时立即返回None）"""
+        try:
+            # 离线模式：只从HTTP缓存重放
+            if self.http_cache and self.http_cache.cache_only:
+                content = self.http_cache.offline_lookup(url)
+                if content is None:
+                    self.logger.warning(f"离线模式下缓存未命中: {url}")
+                return content
+                
+            return self._fetch_with_retry(url, timeout or self.timeout, watcher)
+        except BudgetExceeded:
+            raise
+        except CircuitOpenError:
+            self.logger.warning(f"主机熔断中，跳过: {url}")
+            return None
         except Exception as e:
             self.logger.error(f"获取页面失败 {url}: {e}")
             return None
 
+    def _fetch_with_retry(self, url, timeout, watcher=None):
+        """按重试策略请求页面，同时更新熔断器状态"""
+        attempt = 0
+        while True:
+            request_timeout = clamp_timeout(timeout)
+            if not self.circuit_breaker.allow(url):
+                raise CircuitOpenError(url)
+            try:
+                content = self._fetch_once(url, request_timeout, watcher)
+            except Exception as e:
+                budget = current_budget()
+                if isinstance(e, requests.Timeout) and budget is not None and (
+                        request_timeout < timeout or budget.remaining() <= 0):
+                    # 超时是因为预算被缩短，不代表主机异常
+                    self.circuit_breaker.release(url)
+                    budget.exhausted = True
+                    raise BudgetExceeded() from e
+                if not self.retry_policy.is_retryable(e):
+                    # 404 等客户端错误说明主机仍然可用
+                    if isinstance(e, requests.HTTPError):
+                        self.circuit_breaker.record_success(url)
+                    else:
+                        self.circuit_breaker.release(url)
+                    raise
+                # 重试后仍然失败才计入熔断，并发请求同时遇到的偶发错误不会误触发；
+                # 半开状态下的探测请求失败则立即重新熔断
+                if attempt > 0 or self.retry_policy.max_retries == 0:
+                    self.circuit_breaker.record_failure(url)
+                else:
+                    self.circuit_breaker.release(url, failed=True)
+                delay = self.retry_policy.delay(attempt, e)
+                if attempt >= self.retry_policy.max_retries or delay is None:
+                    raise
+                if budget is not None and delay >= budget.remaining():
+                    budget.exhausted = True
+                    raise BudgetExceeded() from e
+                attempt += 1
+                with self._retries_lock:
+                    self.retries += 1
+                self.logger.warning(f"请求失败，{delay:.1f} 秒后第 {attempt} 次重试 {url}: {e}")
+                time.sleep(delay)
+                continue
+            self.circuit_breaker.record_success(url)
+            return content
+
+    def _fetch_once(self, url, timeout, watcher=None, conditional=True):
+        """发出一次请求（条件请求 + 按主机限流）；给定 watcher 时流式读取响应体"""
+        self.logger.info(f"正在获取页面: {url}")
+        headers = self.http_cache.conditional_headers(url) if self.http_cache and conditional else {}
+        stream = watcher is not None
+        with self.rate_limiter.slot(url) as ticket:
+            # 排队等待限流名额也会消耗预算，发出请求前重新计算超时
+            response = self.transport.get(url, timeout=clamp_timeout(timeout), headers=headers, stream=stream)
+            ticket.record(response.status_code)
+            if stream and response.status_code == 200:
+                on_complete = None
+                if self.http_cache:
+                    def on_complete(full, body):
+                        self.http_cache.store(url, response, body=body, encoding=full.encoding)
+                # 提前停止时保持连接，需要整页时从断开处继续读取（见 _find_real_url_in_detail）
+                page, body = read_stream(
+                    response, watcher,
+                    max_bytes=self.streaming.get('max_bytes', 2 * 1024 * 1024),
+                    chunk_size=self.streaming.get('chunk_size', 16384),
+                    resumable=True, on_complete=on_complete,
+                )
+                self.stream_stats.record(page)
+                # 只有完整读取的页面才能写入HTTP缓存
+                if body is not None and self.http_cache:
+                    self.http_cache.store(url, response, body=body, encoding=page.encoding)
+                return page
+        if stream and not 200 <= response.status_code < 300:
+            # 流式请求的错误和304响应不读取响应体：先关闭以归还连接，再抛出异常或使用缓存
+            response.close()
+            
+        # 304：页面未变化，直接使用磁盘缓存
+        if response.status_code == 304:
+            content = self.http_cache.revalidated_hit(url) if self.http_cache and headers else None
+            if content is not None:
+                self.logger.info(f"页面未变化，使用HTTP缓存: {url}")
+                return content
+            if not headers:
+                raise requests.HTTPError(f"304 Not Modified for unconditional request: {url}", response=response)
+            # 缓存的响应体在发出条件请求之后丢失（被淘汰或删除）：不带校验信息重新请求完整页面
+            self.logger.warning(f"HTTP缓存的页面已丢失，重新请求: {url}")
+            self.http_cache.discard(url)
+            return self._fetch_once(url, timeout, watcher, conditional=False)
+                
+        response.raise_for_status()
+        # 不使用 response.text：没有 charset 时它会按 ISO-8859-1 解码或对整页运行字符集检测
+        text, encoding = decode_response(response)
+        if self.http_cache:
+            self.http_cache.store(url, response, encoding=encoding)
+        return text
+
     def extract_real_deal_url(self, detail_url):
         """从详情页提取真实的优惠链接（非中转页）"""
         try:
@@ -209,318 +309,397 @@ class EnhancedFreeStuffCrawler:
                 full_url = self.base_url + detail_url
             else:
                 full_url = detail_url
-                
+
+            # 查询真实链接缓存，命中时无需再次请求详情页
+            cached = self.link_cache.get(full_url) if self.link_cache else None
+            if cached:
+                self.logger.info(f"真实链接缓存命中: {full_url} -> {cached['url']}")
+                return cached['url']
+
             self.logger.info(f"正在获取详情页以提取真实链接: {full_url}")
             
-            # 获取详情页内容
-            detail_content = self.get_page_content(full_url)
+            # 获取详情页内容（流式读取，找到 GET FREEBIE 按钮即断开）
+            detail_content = self.stream_page_content(full_url, self.detail_watcher, timeout=self.link_timeout)
             if not detail_content:
                 return detail_url
-                
-            # 首先查找 GET FREEBIE 按钮链接
-            get_freebie_pattern = r'<a[^>]+href=["\']([^"\']+)["\'][^>]*>[^<]*GET\s+FREEBIE[^<]*</a>'
-            freebie_matches = re.findall(get_freebie_pattern, detail_content, re.IGNORECASE)
-            
-            if freebie_matches:
-                claim_url = freebie_matches[0]
-                self.logger.info(f"找到 GET FREEBIE 按钮链接: {claim_url}")
-                
-                # 如果是申请页面，需要进一步提取真实链接
-                if 'latestfreestuff.co.uk/claim/' in claim_url:
-                    real_url = self._extract_from_claim_page(claim_url)
-                    if real_url and real_url != claim_url:
-                        return real_url
-                elif 'latestfreestuff.co.uk' not in claim_url:
-                    # 如果GET FREEBIE直接指向外部链接，直接返回
-                    return claim_url
-                
-            # 首先查找claim页面链接 - 这通常包含真实的优惠链接
-            claim_links = re.findall(r'href=["\']([^"\']*\/claim\/[^"\']*)["\']', detail_content, re.IGNORECASE)
-            if claim_links:
-                for claim_link in claim_links:
-                    if claim_link.startswith('/'):
-                        claim_url = self.base_url + claim_link
-                    else:
-                        claim_url = claim_link
-                    
-                    self.logger.info(f"找到申请页面，正在提取真实链接: {claim_url}")
-                    claim_content = self.get_page_content(claim_url)
-                    
-                    if claim_content:
-                        # 从申请页面提取外部链接
-                        real_link = self._extract_from_claim_page(claim_content)
-                        if real_link:
-                            return real_link
-                
-            # 首先查找最常见的优惠按钮链接 - 按优先级排序
-            primary_patterns = [
-                # 主要的优惠按钮 - 通常包含特定class
-                r'<a[^>]+class=["\'][^"\']*(?:deal-btn|offer-btn|get-deal|visit-store|claim-deal|btn-primary)[^"\']*["\'][^>]+href=["\']([^"\']+)["\']',
-                # 带有target="_blank"的外部链接 - 最可能是真实链接
-                r'<a[^>]+target=["\']_blank["\'][^>]+href=["\']([^"\']+)["\']',
-                r'<a[^>]+href=["\']([^"\']+)["\'][^>]+target=["\']_blank["\']',
-                # 包含"Get Deal"、"Visit Store"等文本的链接
-                r'<a[^>]+href=["\']([^"\']+)["\'][^>]*>[^<]*(?:Get Deal|Visit Store|Claim Deal|Shop Now|Get Offer|Grab Deal)[^<]*</a>',
-                # 包含rel="nofollow"的外部链接
-                r'<a[^>]+rel=["\']nofollow["\'][^>]+href=["\']([^"\']+)["\']',
-                r'<a[^>]+href=["\']([^"\']+)["\'][^>]+rel=["\']nofollow["\']',
-            ]
-            
-            # 次要模式 - 更广泛的搜索
-            secondary_patterns = [
-                # 任何带有常见按钮class的链接
-                r'<a[^>]+class=["\'][^"\']*(?:btn|button)[^"\']*["\'][^>]+href=["\']([^"\']+)["\']',
-                # 包含deal, offer, go, visit等关键词的链接
-                r'href=["\']([^"\']*(?:deal|offer|promo|discount)[^"\']*)["\']',
-                r'href=["\']([^"\']*(?:go|visit|redirect)[^"\']*)["\']',
-                # 任何外部域名链接（非本站链接）
-                r'href=["\'](https?://(?!(?:www\.)?latestfreestuff\.co\.uk)[a-zA-Z0-9][^"\']*?)["\']'
-            ]
-            
-            # 先尝试主要模式
-            for i, pattern in enumerate(primary_patterns):
-                matches = re.findall(pattern, detail_content, re.IGNORECASE)
-                if matches:
-                    for match in matches:
-                        url = match if isinstance(match, str) else match[0]
-                        if self.is_valid_deal_url(url):
-                            self.logger.info(f"找到主要优惠链接 (模式{i+1}): {url}")
-                            return url
-            
-            # 再尝试次要模式
-            for i, pattern in enumerate(secondary_patterns):
-                matches = re.findall(pattern, detail_content, re.IGNORECASE)
-                if matches:
-                    for match in matches:
-                        # 处理正则表达式可能返回的不同格式
-                        if isinstance(match, tuple):
-                            url = match[0] if match[0] else (match[1] if len(match) > 1 else None)
-                        else:
-                            url = match
-                            
-                        if url and self.is_valid_deal_url(url):
-                            self.logger.info(f"找到次要优惠链接 (模式{i+3}): {url}")
-                            return url
-                            
-            # 尝试查找JavaScript重定向
-            js_patterns = [
-                r'window\.location\.href\s*=\s*["\']([^"\']+)["\']',
-                r'window\.location\s*=\s*["\']([^"\']+)["\']',
-                r'location\.href\s*=\s*["\']([^"\']+)["\']',
-                r'document\.location\s*=\s*["\']([^"\']+)["\']',
-            ]
-            
-            for pattern in js_patterns:
-                js_matches = re.findall(pattern, detail_content, re.IGNORECASE)
-                if js_matches:
-                    url = js_matches[0]
-                    if self.is_valid_deal_url(url):
-                        self.logger.info(f"找到JS重定向链接: {url}")
-                        return url
-            
-            # 最后尝试查找meta refresh重定向
-            meta_pattern = r'<meta[^>]+http-equiv=["\']refresh["\'][^>]+content=["\'][^"\']*url=([^"\']+)["\']'
-            meta_matches = re.findall(meta_pattern, detail_content, re.IGNORECASE)
-            if meta_matches:
-                url = meta_matches[0]
-                if self.is_valid_deal_url(url):
-                    self.logger.info(f"找到meta重定向链接: {url}")
-                    return url
-            
-            # 尝试查找iframe src（有些网站用iframe嵌入外部链接）
-            iframe_pattern = r'<iframe[^>]+src=["\']([^"\']+)["\']'
-            iframe_matches = re.findall(iframe_pattern, detail_content, re.IGNORECASE)
-            if iframe_matches:
-                for url in iframe_matches:
-                    if self.is_valid_deal_url(url):
-                        self.logger.info(f"找到iframe链接: {url}")
-                        return url
-                        
+
+            errors = []
+            try:
+                real_url = self._find_real_url_in_detail(detail_content, full_url, errors)
+            finally:
+                if isinstance(detail_content, StreamedPage):
+                    detail_content.close()
+            # 只缓存所有请求都成功时的结果：申请页面超时、5xx 或熔断时得到的只是退而求其次的链接，
+            # 预算用完时得到的只是目前最佳的结果，都不写入缓存，下次运行重新解析
+            budget = current_budget()
+            cacheable = self.link_cache and not errors and not (budget and budget.exhausted)
+            if real_url:
+                if cacheable:
+                    self.link_cache.set(full_url, real_url)
+                return real_url
+
             self.logger.warning(f"未找到真实外部链接，使用详情页链接: {full_url}")
+            if cacheable:
+                # 负缓存：已知无法解析的页面在TTL内不再重复请求
+                self.link_cache.set(full_url, full_url, negative=True)
             return full_url
             
         except Exception as e:
             self.logger.error(f"提取真实链接失败: {e}")
             return detail_url
 
-    def _extract_from_claim_page(self, claim_url):
-        """从申请页面提取真实的优惠链接"""
+    def _find_real_url_in_detail(self, detail_content, detail_url=None, errors=None):
+        """按优先级在详情页HTML中查找真实优惠链接，未找到时返回None
+
+        detail_content 为提前断开的流式页面时，只有 GET FREEBIE 规则的结果是确定的；
+        该按钮无法解析时从断开处继续读取同一个响应（连接已关闭时才重新请求），再按其余规则查找。
+        errors 不为 None 时，请求失败的页面URL会追加到其中（调用方据此决定结果能否缓存）。
+        """
+        errors = [] if errors is None else errors
+        links = self.extractor.detail_links(detail_content)
+        
+        # 首先查找 GET FREEBIE 按钮链接
+        if links['freebie']:
+            claim_url = links['freebie']
+            self.logger.info(f"找到 GET FREEBIE 按钮链接: {claim_url}")
+            
+            # 如果是申请页面，需要进一步提取真实链接
+            if 'latestfreestuff.co.uk/claim/' in claim_url:
+                real_url = self._extract_from_claim_page(claim_url, errors)
+                if real_url and real_url != claim_url:
+                    return real_url
+            elif 'latestfreestuff.co.uk' not in claim_url:
+                # 如果GET FREEBIE直接指向外部链接，直接返回
+                return claim_url
+
+        if getattr(detail_content, 'stopped', False) and detail_url:
+            full_content = detail_content.resume()
+            if full_content is None:
+                full_content = self.get_page_content(detail_url, timeout=self.link_timeout)
+            detail_content = full_content
+            if not detail_content:
+                errors.append(detail_url)
+                return None
+            links = self.extractor.detail_links(detail_content)
+            
+        # 首先查找claim页面链接 - 这通常包含真实的优惠链接
+        for claim_link in links['claim_links']:
+            if claim_link.startswith('/'):
+                claim_url = self.base_url + claim_link
+            else:
+                claim_url = claim_link
+            
+            self.logger.info(f"找到申请页面，正在提取真实链接: {claim_url}")
+            # 从申请页面提取外部链接（未找到时返回申请页面本身）
+            real_link = self._extract_from_claim_page(claim_url, errors)
+            if real_link and real_link != claim_url:
+                return real_link
+            
+        # 其余规则（主要/次要模式、JS重定向、meta refresh、iframe）按优先级找到的第一个有效链接
+        if links['fallback']:
+            url, reason = links['fallback']
+            self.logger.info(f"{reason}: {url}")
+            return url
+        return None
+
+    def _extract_from_claim_page(self, claim_url, errors=None):
+        """从申请页面提取真实的优惠链接
+
+        请求失败时返回申请页面本身且不写入缓存，失败的URL追加到 errors 中；
+        只有成功获取页面但确实没有商家链接时才写入负缓存。
+        """
+        errors = [] if errors is None else errors
         try:
+            cached = self.link_cache.get(claim_url) if self.link_cache else None
+            if cached:
+                self.logger.info(f"申请页面缓存命中: {claim_url} -> {cached['url']}")
+                return cached['url']
+                
             self.logger.info(f"正在从申请页面提取真实链接: {claim_url}")
             
-            # 获取申请页面内容
-            claim_content = self.get_page_content(claim_url)
+            # 获取申请页面内容（流式读取，找到商家链接即断开）
+            claim_content = self.stream_page_content(claim_url, self.claim_watcher, timeout=self.link_timeout)
             if not claim_content:
+                errors.append(claim_url)
                 return claim_url
                 
-            # 查找申请页面中的外部链接
-            # 优先查找明显的商家网站链接
-            external_patterns = [
-                # 查找主要的外部域名链接（排除常见的非优惠链接）
-                r'href=["\']((https?://(?!(?:www\.)?(?:latestfreestuff\.co\.uk|google\.com|facebook\.com|twitter\.com|instagram\.com|youtube\.com|analytics\.google\.com|fonts\.googleapis\.com))[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}[^"\']*?))["\']',
-                # 查找包含商家名称的链接模式
-                r'href=["\']((https?://[^"\']*(?:shop|store|buy|deal|offer|promo)[^"\']*?))["\']',
-            ]
-            
-            for pattern in external_patterns:
-                matches = re.findall(pattern, claim_content, re.IGNORECASE)
-                for match in matches:
-                    url = match if isinstance(match, str) else match[0]
-                    # 进一步过滤无效链接
-                    if self._is_valid_merchant_link(url):
-                        self.logger.info(f"从申请页面找到真实优惠链接: {url}")
-                        return url
+            # 查找申请页面中的外部链接（提前断开的页面不再需要剩余部分）
+            try:
+                url = self.extractor.claim_link(claim_content)
+            finally:
+                if isinstance(claim_content, StreamedPage):
+                    claim_content.close()
+            if url:
+                self.logger.info(f"从申请页面找到真实优惠链接: {url}")
+                if self.link_cache:
+                    self.link_cache.set(claim_url, url)
+                return url
                         
             # 如果没找到外部链接，返回申请页面本身
+            if self.link_cache:
+                self.link_cache.set(claim_url, claim_url, negative=True)
             return claim_url
             
         except Exception as e:
             self.logger.error(f"从申请页面提取链接时出错: {e}")
+            errors.append(claim_url)
             return claim_url
     
     def _is_valid_merchant_link(self, url):
         """验证是否是有效的商家链接"""
-        if not url or len(url) < 10:
-            return False
-            
-        url_lower = url.lower()
-        
-        # 排除明显的无效链接
-        invalid_patterns = [
-            'javascript:', 'mailto:', 'tel:', '#', 'data:',
-            'google.com', 'facebook.com', 'twitter.com', 'instagram.com',
-            'youtube.com', 'linkedin.com', 'pinterest.com', 'tiktok.com',
-            'fonts.googleapis.com', 'analytics.google.com', 'google-analytics.com',
-            'googletagmanager.com', 'recaptcha', 'privacy-policy', 'terms-and-conditions',
-            '.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico'
-        ]
-        
-        for pattern in invalid_patterns:
-            if pattern in url_lower:
-                return False
-                
-        # 必须是外部链接
-        if 'latestfreestuff.co.uk' in url_lower:
-            return False
-            
-        # 必须是有效的HTTP(S) URL
-        if not url_lower.startswith(('http://', 'https://')):
-            return False
-            
-        return True
+        return self.url_classifier.is_valid_merchant_link(url)
 
-    def is_valid_deal_url(self, url):
-        """验证是否是有效的优惠链接URL"""
-        if not url or len(url) < 10:
-            return False
-        
-        url_lower = url.lower()
-        
-        # 排除无效链接
-        invalid_patterns = [
-            'javascript:', 'mailto:', 'tel:', '#', 'data:',
-            'void(0)', 'about:blank',
-            '.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.pdf'
-        ]
-        
-        for pattern in invalid_patterns:
-            if pattern in url_lower:
-                return False
-        
-        # 排除明显的社交媒体分享链接
-        social_share_patterns = [
-            'share', 'sharer', 'intent/tweet', 'pin/create',
-            'linkedin.com/in/', 'facebook.com/profile'
-        ]
-        
-        for pattern in social_share_patterns:
-            if pattern in url_lower:
-                return False
-                
-        # 排除文件下载链接（通常不是优惠链接）
-        file_extensions = ['.pdf', '.doc', '.docx', '.zip', '.rar', '.exe', '.dmg']
-        for ext in file_extensions:
-            if url_lower.endswith(ext):
-                return False
-        
-        # 检查是否是有效的商店/优惠网站域名
-        # 常见的英国购物网站和优惠网站域名
-        valid_domains = [
-            'amazon.co.uk', 'amazon.com', 'ebay.co.uk', 'ebay.com',
-            'argos.co.uk', 'currys.co.uk', 'johnlewis.com', 'marksandspencer.com',
-            'tesco.com', 'asda.com', 'sainsburys.co.uk', 'morrisons.com',
-            'boots.com', 'superdrug.com', 'next.co.uk', 'hm.com',
-            'zara.com', 'asos.com', 'boohoo.com', 'prettylittlething.com',
-            'topshop.com', 'newlook.com', 'primark.com', 'tkmaxx.com',
-            'virginmedia.com', 'octopus.energy', 'bulb.co.uk', 'edf.co.uk',
-            'groupon.co.uk', 'wowcher.co.uk', 'vouchercodes.co.uk',
-            'hotukdeals.com', 'myvouchercodes.co.uk', 'retailmenot.com',
-            'expedia.co.uk', 'booking.com', 'hotels.com', 'lastminute.com',
-            'ryanair.com', 'easyjet.com', 'ba.com', 'trainline.com',
-            'whitworths.co.uk', 'discoverysample.com'
-        ]
-        
-        # 解析域名
-        try:
-            from urllib.parse import urlparse
-            parsed = urlparse(url)
-            domain = parsed.netloc.lower()
-            
-            # 移除 www. 前缀
-            if domain.startswith('www.'):
-                domain = domain[4:]
-                
-            # 如果是已知的购物网站，认为是有效的
-            for valid_domain in valid_domains:
-                if domain == valid_domain or domain.endswith('.' + valid_domain):
-                    return True
-                    
-            # 如果包含常见的优惠相关关键词，也可能是有效的
-            deal_keywords = [
-                'deal', 'offer', 'discount', 'coupon', 'promo', 'sale',
-                'shop', 'store', 'buy', 'checkout', 'cart', 'order',
-                'voucher', 'code', 'cashback', 'reward'
-            ]
-            
-            url_for_keywords = url_lower
-            for keyword in deal_keywords:
-                if keyword in url_for_keywords:
-                    return True
-                    
-        except Exception:
-            pass
-            
-        # 如果URL长度合理且是外部链接，认为可能是有效的
-        return len(url) > 15 and 'latestfreestuff.co.uk' not in url_lower
+    def resolve_redirects(self, deals):
+        """跟随优惠链接的重定向，记录最终落地URL
+
+        url 保持原链接（联盟链接的跟踪参数只在原链接上），最终URL记录在 final_url 中。
+        """
+        if self.redirects is None:
+            return deals
+        urls = [deal['url'] for deal in deals
+                if deal.get('url', '').startswith('http') and 'latestfreestuff.co.uk' not in deal['url']]
+        results = self.redirects.resolve_many(urls, time_left=self.run_time_left)
+        for deal in deals:
+            result = results.get(deal.get('url'))
+            if result is not None:
+                deal['final_url'] = result.final_url
+        self.redirects.save()
+        self.logger.info(f"重定向解析: {len(results)} 个链接，统计: {self.redirects.stats()}")
+        return deals
 
     def parse_deals(self, html_content):
-        """解析优惠信息"""
+        """解析单个列表页中的优惠信息"""
         if not html_content:
             return []
             
-        parser = DealParser()
-        parser.feed(html_content)
-        
-        # 清理和验证数据，并获取真实链接
+        candidates, _ = self.select_deals(parse_listing(html_content, self.listing_backend))
+        return self.resolve_deals(candidates)
+
+    def crawl_listings(self, html_content):
+        """从首页出发按优先级遍历分页和分类列表，收集待解析的优惠"""
+        frontier = ListingFrontier.from_config(self.base_url, LISTING_CRAWL)
+        frontier.push(self.base_url)
+        candidates = []
+        seen = set()
+        first = True
+
+        while len(candidates) < self.max_deals:
+            entry = frontier.pop()
+            if entry is None:
+                break
+            if first:
+                first = False  # 首页已由 run_crawler 获取
+            else:
+                if self.run_time_left() <= 0:
+                    self.deadline_stats.add('listing_pages_skipped', 1 + len(frontier))
+                    self.logger.warning("已到运行截止时间，停止抓取列表页")
+                    break
+                with deal_budget(self.run_time_left()):
+                    html_content = self.get_page_content(entry.url)
+                if not html_content:
+                    continue
+
+            selected, reached_known = self.select_deals(
+                parse_listing(html_content, self.listing_backend),
+                limit=self.max_deals - len(candidates), seen=seen,
+            )
+            candidates.extend(selected)
+            self.logger.info(f"列表页 {entry.url}: 新增 {len(selected)} 个优惠（共 {len(candidates)} 个）")
+
+            if LISTING_CRAWL.get('enabled', True):
+                # 增量模式下遇到已处理的优惠后，该列表不再继续翻页
+                frontier.discover(entry, html_content, follow_pagination=not reached_known)
+
+        self.logger.info(f"列表页抓取完成: {frontier.popped} 页，待抓取 {len(frontier)} 页，"
+                         f"超出预算 {frontier.skipped} 页")
+        return candidates
+
+    def resolve_deals(self, candidates, offset=0, total=None):
+        """解析一批优惠的真实链接（offset/total 为这一批在整次运行中的位置，只用于日志）"""
+        total = len(candidates) if total is None else total
+        # 并发引擎：在线程池中同时解析，不再需要硬性限制为5个
+        if self.engine == 'async':
+            self.logger.info(f"使用并发引擎处理第 {offset+1}-{offset+len(candidates)}/{total} 个优惠...")
+            return self.get_concurrent_engine().resolve_deals(candidates)
+
+        # 清理数据，并获取真实链接
         valid_deals = []
-        for i, deal in enumerate(parser.deals[:5]):  # 限制最多5个，避免过多请求
-            if self.is_valid_deal(deal):
-                self.logger.info(f"处理第 {i+1}/{len(parser.deals[:5])} 个优惠...")
-                
-                # 获取真实优惠链接
-                if 'detail_url' in deal:
-                    real_url = self.extract_real_deal_url(deal['detail_url'])
-                    deal['url'] = real_url
-                    deal['source_url'] = deal['detail_url']  # 保存原始详情页链接
-                    
-                deal = self.clean_deal_data(deal)
-                valid_deals.append(deal)
-                
-                # 添加延迟避免频繁请求
-                time.sleep(2)
+        for i, deal in enumerate(candidates, offset):
+            self.logger.info(f"处理第 {i+1}/{total} 个优惠...")
+            valid_deals.append(self.resolve_deal(deal))
                 
         return valid_deals
 
+    def process_deals(self, candidates, previous_deals=()):
+        """按批处理候选优惠：解析真实链接 → 跟随重定向 → 翻译 → 写入输出文件，返回写入的数量
+
+        内存中只保留当前这一批；增量模式下最后接上上一次运行的优惠。
+        """
+        batch_size = max(1, DEAL_OUTPUT.get('batch_size', 50))
+        known = set()
+        count = 0
+        for start in range(0, len(candidates), batch_size):
+            batch = self.resolve_deals(candidates[start:start + batch_size], offset=start, total=len(candidates))
+            known.update(map(self.deal_key, batch))
+            count += self.output_deals(batch)
+        self.logger.info(f"找到 {count} 个优惠")
+
+        if previous_deals:
+            previous = self.merge_previous_deals(known, previous_deals)
+            if previous:
+                count += self.output_deals(previous)
+            self.logger.info(f"增量模式: 合并上一次运行的优惠后共 {count} 个")
+        return count
+
+    def run_time_left(self):
+        """距离运行截止时间的剩余秒数（扣除翻译和保存所需的预留时间）"""
+        return max(0.0, self.run_deadline.remaining() - DEADLINES.get('reserve_seconds', 0))
+
+    def deal_budget_seconds(self):
+        """单个优惠的解析预算，不超过运行剩余时间"""
+        return min(DEADLINES.get('deal_seconds', float('inf')), self.run_time_left())
+
+    def get_concurrent_engine(self):
+        """创建（或复用）并发引擎"""
+        if self.concurrent_engine is None:
+            self.concurrent_engine = ConcurrentCrawlEngine.from_config(self, ASYNC_ENGINE)
+        return self.concurrent_engine
+
+    def select_deals(self, deals, limit=None, seen=None):
+        """筛选需要解析的优惠：验证数据、去重、增量模式下跳过已处理的优惠
+
+        返回 (选中的优惠, 是否遇到已处理过的优惠)
+        """
+        limit = self.max_deals if limit is None else limit
+        seen = set() if seen is None else seen
+        stop_after_seen = max(1, INCREMENTAL.get('stop_after_seen', 1))
+        selected = []
+        consecutive_seen = 0
+        reached_known = False
+        for deal in deals:
+            if len(selected) >= limit:
+                break
+            if not self.is_valid_deal(deal):
+                continue
+            detail_url = urljoin(self.base_url, deal['detail_url'])
+            key = canonicalize_url(detail_url)
+            if key in seen:
+                continue
+            seen.add(key)
+            if self.incremental and self.seen_deals is not None:
+                if detail_url in self.seen_deals:
+                    consecutive_seen += 1
+                    if consecutive_seen >= stop_after_seen:
+                        # 列表按从新到旧排列，之后的优惠在之前的运行中都已处理
+                        reached_known = self.reached_known = True
+                        self.logger.info(f"增量模式: 遇到已处理的优惠，停止于 {deal['detail_url']}")
+                        break
+                    continue
+                consecutive_seen = 0
+            selected.append(deal)
+        return selected, reached_known
+
+    def resolve_deal(self, deal):
+        """获取单个优惠的真实链接并清理数据（同步/并发引擎共用）"""
+        if 'detail_url' in deal:
+            seconds = self.deal_budget_seconds()
+            # 整条解析链路共享同一个预算；预算为0时只使用缓存，不再发出请求
+            with deal_budget(seconds) as budget:
+                real_url = self.extract_real_deal_url(deal['detail_url'])
+            if budget.exhausted:
+                self.deadline_stats.add('deals_skipped' if seconds <= 0 else 'deals_timed_out')
+                self.logger.warning(f"优惠解析超出时间预算，使用目前最佳链接: {real_url}")
+            deal['url'] = real_url
+            deal['source_url'] = deal['detail_url']  # 保存原始详情页链接
+            # 只有在预算内解析出真实（站外）链接时才记为已处理；
+            # 退回详情页或申请页链接的优惠下次运行重新解析
+            resolved = not budget.exhausted and not urljoin(self.base_url, real_url).startswith(self.base_url)
+            if self.seen_deals is not None and resolved:
+                self.seen_deals.add(urljoin(self.base_url, deal['detail_url']))
+            
+        return self.clean_deal_data(deal)
+
+    def dedupe_deals(self, candidates):
+        """解析真实链接之前合并重复的优惠（按规范化链接和标题指纹，跨运行）"""
+        if self.deduper is None:
+            return candidates
+        deals = self.deduper.dedupe([self.clean_deal_data(deal) for deal in candidates])
+        self.logger.info(f"去重: {len(candidates)} 个候选优惠 → {len(deals)} 个，统计: {self.deduper.stats()}")
+        return deals
+
+    def record_deals(self, deals):
+        """把本次输出的优惠（含翻译）登记到去重索引，供之后的运行沿用"""
+        if self.deduper is not None:
+            self.deduper.record(deals)
+
+    def save_dedupe_index(self):
+        if self.deduper is None:
+            return
+        try:
+            self.deduper.save()
+        except OSError as e:
+            self.logger.warning(f"保存去重索引失败: {e}")
+
+    def load_previous_deals(self):
+        """读取上一次运行保存的优惠（增量模式下与新优惠合并输出）"""
+        # 合并时最多保留 keep_previous 个，其中至多 max_deals 个与新优惠重复，不需要读取更多
+        limit = INCREMENTAL.get('keep_previous', 50) + self.max_deals
+        if DEAL_STORE.get('enabled', True) and os.path.exists(DEAL_STORE.get('path', 'data/deals.db')):
+            try:
+                with DealStore.from_config(DEAL_STORE) as store:
+                    deals = store.latest_deals(limit=limit)
+                if deals:
+                    return deals
+            except Exception as e:
+                self.logger.warning(f"读取优惠数据库失败，改为读取快照文件: {e}")
+        if not os.path.isdir('data'):
+            return []
+        files = sorted(f for f in os.listdir('data')
+                       if f.startswith('enhanced_deals_') and f.endswith(('.json', '.jsonl')))
+        if not files:
+            return []
+        try:
+            return list(islice(iter_deals(os.path.join('data', files[-1])), limit))
+        except Exception as e:
+            self.logger.warning(f"读取上一次运行的优惠失败: {e}")
+            return []
+
+    def deal_key(self, deal):
+        """优惠的规范化详情页链接"""
+        return canonicalize_url(urljoin(self.base_url, deal.get('source_url') or deal.get('detail_url') or ''))
+
+    def merge_previous_deals(self, known, previous_deals):
+        """上一次运行中要接在新优惠之后输出的优惠：跳过 known（新优惠的 deal_key）中已有的，最多 keep_previous 个"""
+        keep = INCREMENTAL.get('keep_previous', 50)
+        known = set(known)
+        merged = []
+        for deal in previous_deals:
+            if len(merged) >= keep:
+                break
+            key = self.deal_key(deal)
+            if key in known:
+                continue
+            known.add(key)
+            merged.append(deal)
+        return merged
+
+    def save_seen_deals(self):
+        """持久化已处理优惠集合"""
+        if self.seen_deals is None:
+            return
+        self.seen_deals.save()
+        self.logger.info(f"已处理优惠集合: {len(self.seen_deals)} 条，本次新增 {self.seen_deals.added} 条")
+
+    def save_link_cache(self):
+        """持久化真实链接缓存并记录命中统计"""
+        if not self.link_cache:
+            return
+        try:
+            self.link_cache.save()
+            self.logger.info(f"真实链接缓存统计: {self.link_cache.stats()}")
+        except Exception as e:
+            self.logger.error(f"保存真实链接缓存失败: {e}")
+
     def is_valid_deal(self, deal):
         """验证优惠信息"""
         if not deal.get('title'):
@@ -555,52 +734,146 @@ class EnhancedFreeStuffCrawler:
         return deal
 
     def translate_deals(self, deals):
-        """翻译优惠信息"""
+        """翻译优惠信息（所有标题和描述去重后批量翻译）"""
+        texts = []
+        for deal in deals:
+            # 去重阶段沿用的优惠（以及合并进来的上一次运行的优惠）已经带有翻译
+            texts.extend(deal[key] for key in ('title', 'description') if key in deal and f'{key}_zh' not in deal)
+        self.logger.info(f"翻译 {len(deals)} 个优惠（{len(texts)} 个文本段）...")
+        translations = self.translation_service.translate_many(texts)
+
         translated_deals = []
-        
-        for i, deal in enumerate(deals):
-            self.logger.info(f"翻译第 {i+1}/{len(deals)} 个优惠...")
-            
+        for deal in deals:
             translated_deal = deal.copy()
-            
+
             # 翻译标题
-            if 'title' in deal:
-                translated_deal['title_zh'] = self.translator.translate_to_chinese(deal['title'])
-                
+            if 'title' in deal and 'title_zh' not in deal:
+                translated_deal['title_zh'] = translations.get(deal['title'], deal['title'])
+
             # 翻译描述
-            if 'description' in deal:
-                translated_deal['description_zh'] = self.translator.translate_to_chinese(deal['description'])
-                
+            if 'description' in deal and 'description_zh' not in deal:
+                translated_deal['description_zh'] = translations.get(deal['description'], deal['description'])
+
             translated_deals.append(translated_deal)
-            time.sleep(0.5)  # 避免过于频繁
-            
+
+        self.translation_service.save()
         return translated_deals
 
-    def save_deals(self, deals):
-        """保存优惠信息"""
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        
-        # 保存JSON
-        os.makedirs('data', exist_ok=True)
+    def output_deals(self, deals):
+        """跟随重定向、翻译一批已解析的优惠，逐条追加到本次运行的输出文件，返回写入的数量"""
+        deals = self.translate_deals(self.resolve_redirects(deals))
+        self.record_deals(deals)
+        for deal in deals:
+            self.deal_writer.write(deal)
+        return len(deals)
+
+    def save_deals(self):
+        """保存优惠信息：JSON 导出、HTML 和优惠数据库都从运行期间逐条写入的文件流式读取
+
+        返回 (json_file, html_file, reader)，reader() 重新逐条读取本次运行的优惠。
+        """
+        timestamp = self.run_timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+        path = os.path.abspath(self.deal_writer.path)
+        count = self.deal_writer.written
+        self.close_deal_writer()
+
+        def deals():
+            return iter_jsonl(path)
+
+        # 保存JSON（兼容导出）
         json_file = f"data/enhanced_deals_{timestamp}.json"
-        
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(deals, f, ensure_ascii=False, indent=2)
-            
-        self.logger.info(f"已保存 {len(deals)} 个优惠到 {json_file}")
+        store_enabled = DEAL_STORE.get('enabled', True)
+        if self.output_format == 'jsonl':
+            json_file = f"data/enhanced_deals_{timestamp}.jsonl"
+            self.logger.info(f"已保存 {count} 个优惠到 {json_file}")
+        elif not store_enabled or DEAL_STORE.get('json_export', True):
+            write_json_array(json_file, deals())
+            self.logger.info(f"已保存 {count} 个优惠到 {json_file}")
+        else:
+            json_file = None
         
         # 生成HTML
-        html_content = self.generate_html(deals)
         html_file = f"data/enhanced_deals_{timestamp}.html"
         
         with open(html_file, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+            f.writelines(self.generate_html(deals()))
+
+        # 写入优惠数据库
+        run_id = None
+        if store_enabled:
+            with DealStore.from_config(DEAL_STORE) as store:
+                run_id = store.save_run(deals(), json_file=json_file, html_file=html_file)
+                self.logger.info(f"已写入优惠数据库 {store.path}（运行 {run_id}），统计: {store.stats()}")
+
+        if self.output_format != 'jsonl':
+            os.remove(path)
+        reader = self.run_reader(json_file, run_id)
+
+        # 归档较早的运行结果，再更新 JSONL 归档索引（索引记录指向归档中的运行）
+        if COMPACTION.get('enabled', True):
+            self.compact_data()
+        if self.output_format == 'jsonl' and ARCHIVE_INDEX.get('enabled', True):
+            self.refresh_archive_index()
             
-        return json_file, html_file
+        return json_file, html_file, reader
+
+    def run_reader(self, json_file, run_id):
+        """逐条读取本次运行输出的函数（使用绝对路径，调用方之后切换工作目录也能读取）"""
+        if json_file:
+            path = os.path.abspath(json_file)
+            return lambda: iter_deals(path)
+        store_path = os.path.abspath(DEAL_STORE.get('path', 'data/deals.db'))
+
+        def read():
+            with DealStore(store_path) as store:
+                yield from store.iter_run_deals(run_id)
+        return read
+
+    def compact_data(self):
+        """把 data 目录中最近 keep_runs 次以外的运行结果压缩归档"""
+        try:
+            with SnapshotArchive.from_config(COMPACTION) as archive:
+                result = archive.compact('data', keep=COMPACTION.get('keep_runs', 30))
+                if result['files']:
+                    self.logger.info(f"已归档 {result['runs']} 次较早的运行: {result}，归档统计: {archive.stats()}")
+        except (OSError, sqlite3.Error) as e:
+            self.logger.warning(f"归档历史运行结果失败: {e}")
+
+    def refresh_archive_index(self):
+        """把新写入的 JSONL 归档登记到偏移索引（只扫描新增的归档；已压缩归档的运行仍保留在索引中）"""
+        archive_dir = COMPACTION.get('path', 'data/archive') if COMPACTION.get('enabled', True) else None
+        try:
+            with ArchiveIndex.from_config(ARCHIVE_INDEX, archive_dir=archive_dir) as index:
+                scanned = index.refresh()
+                self.logger.info(f"归档索引已更新（新扫描 {scanned} 个归档），统计: {index.stats()}")
+        except (OSError, sqlite3.Error) as e:
+            self.logger.warning(f"更新归档索引失败: {e}")
+
+    def open_deal_writer(self):
+        """打开本次运行的输出文件，之后每翻译完一批优惠就逐条追加
+
+        JSONL 输出时这就是最终结果文件（崩溃时最多丢失正在处理的一批）；
+        JSON 输出时先写入 .jsonl.part 临时文件，运行结束时再从中流式生成 JSON 导出。
+        """
+        os.makedirs('data', exist_ok=True)
+        path = f"data/enhanced_deals_{self.run_timestamp}.jsonl"
+        if self.output_format != 'jsonl':
+            path += '.part'
+        self.deal_writer = JSONLWriter(path, fsync=DEAL_OUTPUT.get('fsync', False))
+        self.logger.info(f"解析结果将逐条写入 {path}")
+
+    def close_deal_writer(self):
+        if self.deal_writer is None:
+            return
+        self.deal_writer.close()
+        # 没有写入任何优惠时不留下空文件
+        if not self.deal_writer.written and os.path.exists(self.deal_writer.path):
+            os.remove(self.deal_writer.path)
+        self.deal_writer = None
 
     def generate_html(self, deals):
-        """生成HTML内容"""
-        html = f"""
+        """逐段生成HTML内容（每个优惠一段，不在内存中拼接整页）"""
+        yield f"""
         <section class="daily-deals">
             <div class="container">
                 <div class="daily-deals-section">
@@ -615,11 +888,12 @@ class EnhancedFreeStuffCrawler:
             if len(desc_zh) > 100:
                 desc_zh = desc_zh[:100] + "..."
             
-            # 显示真实链接域名
+            # 显示真实链接域名（联盟/短链接显示最终落地的域名）
             url = deal.get('url', '#')
-            domain = urlparse(url).netloc if url.startswith('http') else '未知'
+            final_url = deal.get('final_url') or url
+            domain = urlparse(final_url).netloc if final_url.startswith('http') else '未知'
             
-            html += f"""
+            yield f"""
             <div class="deal-item">
                 <h3>{title_zh}</h3>
                 <p>{desc_zh}</p>
@@ -631,7 +905,7 @@ class EnhancedFreeStuffCrawler:
             </div>
             """
             
-        html += """
+        yield """
                     </div>
                     <div class="deal-note">
                         <p>💡 所有链接已解析为真实优惠地址，点击直接前往商家官网</p>
@@ -640,34 +914,60 @@ class EnhancedFreeStuffCrawler:
             </div>
         </section>
         """
-        
-        return html
 
     def run_crawler(self):
         """运行增强版爬虫"""
         self.logger.info("开始运行增强版爬虫，获取真实优惠链接...")
         
+        # 运行截止时间从这里开始计算
+        self.run_deadline = Deadline(DEADLINES.get('run_seconds'))
+        self.run_timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
         # 获取页面
-        html_content = self.get_page_content(self.base_url)
+        with deal_budget(self.run_time_left()):
+            html_content = self.get_page_content(self.base_url)
         if not html_content:
             self.logger.error("无法获取网站内容")
             return []
             
-        # 解析优惠
-        deals = self.parse_deals(html_content)
-        self.logger.info(f"找到 {len(deals)} 个优惠")
-        
-        if not deals:
+        # 增量模式需要上一次的结果；找不到时执行完整爬取
+        previous_deals = self.load_previous_deals() if self.incremental else []
+        if self.incremental and not previous_deals:
+            self.logger.info("增量模式: 未找到上一次运行的结果，执行完整爬取")
+            self.incremental = False
+
+        # 遍历列表页，按批解析、翻译并逐条写入输出文件
+        self.open_deal_writer()
+        candidates = self.dedupe_deals(self.crawl_listings(html_content))
+        count = self.process_deals(candidates, previous_deals)
+        self.save_link_cache()
+        self.save_seen_deals()
+        self.save_dedupe_index()
+
+        if not count:
+            self.close_deal_writer()
             return []
-            
-        # 翻译
-        translated_deals = self.translate_deals(deals)
-        
+
         # 保存
-        json_file, html_file = self.save_deals(translated_deals)
+        json_file, html_file, reader = self.save_deals()
         
+        self.logger.info(f"翻译统计: {self.translation_service.stats()}, 词典缓存: {self.translator.stats()}")
+        self.translation_service.close()
+        if isinstance(self.extractor, ExtractionPool):
+            self.logger.info(f"提取进程池统计: {self.extractor.stats()}")
+            self.extractor.close()
+        if self.http_cache:
+            self.logger.info(f"HTTP缓存统计: {self.http_cache.stats()}")
+        self.logger.info(f"限流统计: {self.rate_limiter.stats()}")
+        self.logger.info(f"连接统计 ({self.transport.name}): {self.transport.stats()}")
+        self.logger.info(f"重试 {self.retries} 次，熔断统计: {self.circuit_breaker.stats()}")
+        self.logger.info(f"请求合并统计: {self.coalescer.stats()}")
+        self.logger.info(f"流式抓取统计: {self.stream_stats.stats()}")
+        self.logger.info(f"时间预算统计: {self.deadline_stats.stats()}")
+        if self.deduper is not None:
+            self.logger.info(f"去重统计: {self.deduper.stats()}")
         self.logger.info(f"增强版爬虫完成！文件: {json_file}, {html_file}")
-        return translated_deals
+        return DealRun(count, reader)
 
 def main():
     """主函数"""
@@ -680,7 +980,7 @@ def main():
         print(f"\n✅ 成功爬取 {len(deals)} 个优惠信息（含真实链接）:")
         for i, deal in enumerate(deals, 1):
             title = deal.get('title_zh', deal.get('title', ''))
-            url = deal.get('url', '')
+            url = deal.get('final_url') or deal.get('url', '')
             domain = urlparse(url).netloc if url.startswith('http') else '本地链接'
             print(f"{i}. {title}")
             print(f"   🔗 {domain}")
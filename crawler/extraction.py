@@ -0,0 +1,284 @@
+"""
+链接提取 - 详情页/申请页的规则求值，可选在进程池中执行
+
+extract_real_deal_url 和 _extract_from_claim_page 中的索引构建和正则匹配是纯CPU计算，
+并发解析时所有线程都在争抢GIL，吞吐量被限制在一个核心上。
+这里把"页面HTML → 候选链接"抽成不依赖爬虫实例的纯函数：
+- 默认在当前进程中直接执行（LinkExtractor）
+- 启用 EXTRACTION_POOL 时由 ExtractionPool 交给 ProcessPoolExecutor，
+  请求和控制流程留在主进程，工作进程只负责解析和链接分类；
+  同时到达的页面按 chunk_size 合并成一个任务，减少进程间往返，
+  小于 min_bytes 的页面直接在主进程中解析（序列化开销比解析还大）
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from link_index import LinkRuleSet
+from url_classifier import URLClassifier
+
+
+class LinkExtractor:
+    """在页面HTML上按优先级求值提取规则"""
+
+    def __init__(self, link_rules, url_classifier, final_url=None):
+        self.link_rules = link_rules
+        self.url_classifier = url_classifier
+        # 返回链接已知最终落地URL的函数（RedirectResolver.final_url），未知时返回None
+        self.final_url = final_url
+
+    @classmethod
+    def from_config(cls, link_config, url_config, final_url=None):
+        """根据 REAL_LINK_EXTRACTION 和 URL_VALIDATION 配置创建"""
+        return cls(LinkRuleSet.from_config(link_config), URLClassifier.from_config(url_config), final_url)
+
+    def is_valid_deal_url(self, url):
+        """验证是否是有效的优惠链接URL（已知重定向目标时按最终落地URL判断）"""
+        final = self.final_url(url) if self.final_url is not None else None
+        return self.url_classifier.is_valid_deal_url(final or url)
+
+    def detail_links(self, html):
+        """详情页中的候选链接
+
+        返回 {'freebie': 第一个 GET FREEBIE 链接, 'claim_links': 申请页链接列表,
+              'fallback': (其余规则找到的第一个有效链接, 日志说明) 或 None}
+        """
+        result, index = self._detail_matches(html)
+        result['fallback'] = self.first_valid(self._fallback_candidates(index))
+        return result
+
+    def detail_candidates(self, html):
+        """与 detail_links 相同，但 'fallback_candidates' 列出全部未验证的候选链接
+
+        工作进程中没有重定向解析结果，由主进程调用 first_valid 选出有效链接。
+        """
+        result, index = self._detail_matches(html)
+        result['fallback_candidates'] = list(self._fallback_candidates(index))
+        return result
+
+    def _detail_matches(self, html):
+        rules = self.link_rules
+        # 对详情页只扫描一次，所有规则都在索引上求值
+        index = rules.index(html)
+        freebie_matches = rules.get_freebie.findall(index)
+        return {
+            'freebie': freebie_matches[0] if freebie_matches else None,
+            'claim_links': rules.claim_link.findall(index),
+        }, index
+
+    def first_valid(self, candidates):
+        """第一个有效的 (链接, 日志说明)，没有时返回None"""
+        for url, note in candidates:
+            if url and self.is_valid_deal_url(url):
+                return url, note
+        return None
+
+    def _fallback_candidates(self, index):
+        """按优先级依次产生 (候选链接, 日志说明)"""
+        rules = self.link_rules
+
+        # 先尝试主要模式（优惠按钮、target="_blank"、nofollow 等，按优先级排序）
+        for i, rule in enumerate(rules.primary):
+            for match in rule.findall(index):
+                url = match if isinstance(match, str) else match[0]
+                yield url, f"找到主要优惠链接 (模式{i+1})"
+
+        # 再尝试次要模式 - 更广泛的搜索
+        for i, rule in enumerate(rules.secondary):
+            for match in rule.findall(index):
+                # 处理正则表达式可能返回的不同格式
+                if isinstance(match, tuple):
+                    url = match[0] if match[0] else (match[1] if len(match) > 1 else None)
+                else:
+                    url = match
+                yield url, f"找到次要优惠链接 (模式{i+3})"
+
+        # 尝试查找JavaScript重定向（每条规则只看第一个匹配）
+        for rule in rules.js:
+            js_matches = rule.findall(index)
+            if js_matches:
+                yield js_matches[0], "找到JS重定向链接"
+
+        # 最后尝试查找meta refresh重定向
+        meta_matches = rules.meta_refresh.findall(index)
+        if meta_matches:
+            yield meta_matches[0], "找到meta重定向链接"
+
+        # 尝试查找iframe src（有些网站用iframe嵌入外部链接）
+        for url in rules.iframe.findall(index):
+            yield url, "找到iframe链接"
+
+    def claim_link(self, html):
+        """申请页中的商家链接，未找到时返回None"""
+        # 优先查找明显的商家网站链接，其次是包含商家关键词的链接
+        index = self.link_rules.index(html)
+        for rule in self.link_rules.claim_page:
+            for match in rule.findall(index):
+                url = match if isinstance(match, str) else match[0]
+                # 进一步过滤无效链接
+                if self.url_classifier.is_valid_merchant_link(url):
+                    return url
+        return None
+
+
+# 工作进程中的提取器（由 _init_worker 创建）
+_worker_extractor = None
+
+
+def _init_worker(link_config, url_config):
+    global _worker_extractor
+    _worker_extractor = LinkExtractor.from_config(link_config, url_config)
+
+
+def _extract_batch(tasks):
+    """在工作进程中处理一批 (类型, HTML) 任务"""
+    results = []
+    for kind, html in tasks:
+        if kind == 'detail':
+            results.append(_worker_extractor.detail_candidates(html))
+        else:
+            results.append(_worker_extractor.claim_link(html))
+    return results
+
+
+class ExtractionPool:
+    """把页面解析交给工作进程，接口与 LinkExtractor 相同（调用方阻塞等待结果）"""
+
+    def __init__(self, extractor, link_config, url_config, workers=None, chunk_size=4,
+                 batch_wait=0.005, min_bytes=32768, start_method=None):
+        self.extractor = extractor  # 小页面在主进程中直接解析
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+        self.batch_wait = batch_wait
+        self.min_bytes = min_bytes
+        context = multiprocessing.get_context(start_method) if start_method else None
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(link_config, url_config),
+        )
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._dispatcher = threading.Thread(target=self._dispatch, name='extraction-dispatcher', daemon=True)
+        self._dispatcher.start()
+
+        self.offloaded = 0
+        self.inline = 0
+        self.batches = 0
+
+    @classmethod
+    def from_config(cls, config, link_config, url_config, final_url=None):
+        """根据 EXTRACTION_POOL 配置创建"""
+        return cls(
+            LinkExtractor.from_config(link_config, url_config, final_url),
+            link_config,
+            url_config,
+            workers=config.get('workers'),
+            chunk_size=config.get('chunk_size', 4),
+            batch_wait=config.get('batch_wait', 0.005),
+            min_bytes=config.get('min_bytes', 32768),
+            start_method=config.get('start_method'),
+        )
+
+    def detail_links(self, html):
+        if len(html) < self.min_bytes:
+            return self._inline(self.extractor.detail_links, html)
+        result = self._submit('detail', html)
+        # 候选链接在主进程中验证（需要重定向解析的最终URL）
+        result['fallback'] = self.extractor.first_valid(result.pop('fallback_candidates'))
+        return result
+
+    def claim_link(self, html):
+        if len(html) < self.min_bytes:
+            return self._inline(self.extractor.claim_link, html)
+        return self._submit('claim', html)
+
+    def _inline(self, func, html):
+        with self._lock:
+            self.inline += 1
+        return func(html)
+
+    def _submit(self, kind, html):
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("提取进程池已关闭")
+            self.offloaded += 1
+            # 以 str 传给工作进程（StreamedPage 等子类的属性不需要序列化）
+            self._queue.put((kind, str(html), future))
+        return future.result()
+
+    def _dispatch(self):
+        """把同时到达的页面合并成批次提交给进程池"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.batch_wait
+            stop = False
+            while len(batch) < self.chunk_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._run(batch)
+            if stop:
+                return
+
+    def _run(self, batch):
+        with self._lock:
+            self.batches += 1
+        futures = [future for _, _, future in batch]
+        try:
+            pool_future = self._executor.submit(_extract_batch, [(kind, html) for kind, html, _ in batch])
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        def deliver(done):
+            try:
+                results = done.result()
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                return
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+        pool_future.add_done_callback(deliver)
+
+    def close(self):
+        """停止分发线程并关闭工作进程"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+
+    def stats(self):
+        """返回进程池统计"""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'offloaded': self.offloaded,
+                'inline': self.inline,
+                'batches': self.batches,
+                'avg_batch': round(self.offloaded / self.batches, 2) if self.batches else 0,
+            }
@@ -0,0 +1,133 @@
+"""
+列表页抓取队列 - 按优先级遍历首页、分页和分类列表
+
+原先只抓取首页，能获取的优惠数量受首页展示数量限制。
+这里用优先队列管理待抓取的列表页：所有列表的第1页先于任何列表的第2页（从新到旧），
+URL规范化后去重，并通过深度（分类跳转次数）、总页数和单个列表的页数预算控制请求量。
+"""
+
+import heapq
+import re
+from urllib.parse import urljoin, urlparse
+
+from url_classifier import canonicalize_url
+
+HREF_PATTERN = re.compile(r'<a\s[^>]*?href=["\']([^"\'#]+)["\']', re.IGNORECASE)
+
+DEFAULT_PAGINATION_PATTERNS = [
+    r'/page/(\d+)/?$',
+    r'[?&](?:page|paged)=(\d+)',
+]
+DEFAULT_CATEGORY_PATTERNS = [
+    r'/category/[^/?#]+(?:/[^/?#]+)*/?$',
+]
+
+
+class ListingPage:
+    """队列中的一个列表页"""
+
+    __slots__ = ('url', 'depth', 'page', 'listing')
+
+    def __init__(self, url, depth=0, page=1, listing=None):
+        self.url = url
+        self.depth = depth        # 从首页经过的分类跳转次数
+        self.page = page          # 在所属列表中的页码
+        self.listing = listing or url  # 所属列表（第1页的URL）
+
+    def __repr__(self):
+        return f"ListingPage({self.url!r}, depth={self.depth}, page={self.page})"
+
+
+class ListingFrontier:
+    """带去重和预算的列表页优先队列"""
+
+    def __init__(self, base_url, max_pages=20, max_depth=1, max_pages_per_listing=10,
+                 pagination_patterns=None, category_patterns=None):
+        self.base_url = base_url
+        self.host = urlparse(base_url).netloc.lower()
+        self.max_pages = max(1, max_pages)
+        self.max_depth = max(0, max_depth)
+        self.max_pages_per_listing = max(1, max_pages_per_listing)
+        self.pagination = [re.compile(p, re.IGNORECASE)
+                           for p in (pagination_patterns or DEFAULT_PAGINATION_PATTERNS)]
+        self.categories = [re.compile(p, re.IGNORECASE)
+                           for p in (category_patterns or DEFAULT_CATEGORY_PATTERNS)]
+
+        self._heap = []
+        self._seq = 0
+        self._seen = set()
+        self.popped = 0    # 已取出（将要抓取）的页数
+        self.skipped = 0   # 因预算被丢弃的页数
+
+    @classmethod
+    def from_config(cls, base_url, config):
+        """根据 LISTING_CRAWL 配置创建队列"""
+        return cls(
+            base_url,
+            max_pages=config.get('max_pages', 20),
+            max_depth=config.get('max_depth', 1),
+            max_pages_per_listing=config.get('max_pages_per_listing', 10),
+            pagination_patterns=config.get('pagination_patterns'),
+            category_patterns=config.get('category_patterns'),
+        )
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, url, depth=0, page=1, listing=None):
+        """加入列表页；重复、超出深度或单列表页数预算时返回False"""
+        key = canonicalize_url(url)
+        if key in self._seen:
+            return False
+        if depth > self.max_depth or page > self.max_pages_per_listing:
+            self.skipped += 1
+            return False
+        self._seen.add(key)
+        self._seq += 1
+        # 页码优先（所有列表的新内容先抓），其次是深度，最后按发现顺序
+        heapq.heappush(self._heap, (page, depth, self._seq, ListingPage(url, depth, page, listing)))
+        return True
+
+    def pop(self):
+        """取出下一个要抓取的列表页；队列为空或总页数预算用完时返回None"""
+        if not self._heap or self.popped >= self.max_pages:
+            return None
+        self.popped += 1
+        return heapq.heappop(self._heap)[-1]
+
+    def _page_number(self, url):
+        parsed = urlparse(url)
+        target = f"{parsed.path}?{parsed.query}" if parsed.query else parsed.path
+        for pattern in self.pagination:
+            match = pattern.search(target)
+            if match:
+                return int(match.group(1))
+        return None
+
+    def discover(self, entry, html, follow_pagination=True):
+        """从列表页中发现下一页和分类列表，加入队列，返回新加入的数量"""
+        added = 0
+        for href in HREF_PATTERN.findall(html):
+            url = urljoin(entry.url, href.strip())
+            parsed = urlparse(url)
+            if parsed.scheme not in ('http', 'https') or parsed.netloc.lower() != self.host:
+                continue
+
+            page = self._page_number(url)
+            if page is not None:
+                # 只跟随当前页之后的分页链接，所属列表不变
+                if follow_pagination and page > entry.page and self._same_listing(url, entry.listing):
+                    added += self.push(url, entry.depth, page, entry.listing)
+                continue
+
+            if any(pattern.search(parsed.path) for pattern in self.categories):
+                added += self.push(url, entry.depth + 1, 1)
+        return added
+
+    def _same_listing(self, url, listing):
+        """分页链接是否属于给定列表（去掉分页部分后路径相同）"""
+        def strip(u):
+            parsed = urlparse(u)
+            path = re.sub(r'/page/\d+/?$', '/', parsed.path).rstrip('/')
+            return (parsed.netloc.lower(), path)
+        return strip(url) == strip(listing)
@@ -0,0 +1,220 @@
+"""
+HTTP条件请求缓存 - 基于 ETag / Last-Modified 的磁盘缓存
+
+每个URL保存响应体和校验信息；再次请求时发送 If-None-Match / If-Modified-Since，
+源站返回 304 时直接从磁盘读取页面，只消耗一次无响应体的往返。
+cache_only 模式下完全不发请求，用于离线重放上一次运行。
+缓存按 max_entries / max_bytes 做LRU淘汰：响应体文件的修改时间记录最近一次使用，
+命中时更新，重启后按它恢复使用顺序。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class HTTPCache:
+    """按URL存储响应体与校验信息的磁盘缓存"""
+
+    def __init__(self, directory, cache_only=False, max_entries=None, max_bytes=None):
+        self.directory = directory
+        self.cache_only = cache_only
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._entries = None   # 键 → 响应体大小，按最近使用排列（第一次用到时扫描目录建立）
+        self._bytes = 0
+
+        self.revalidated = 0   # 304 命中
+        self.stored = 0        # 写入/更新的页面
+        self.offline_hits = 0  # cache_only 模式命中
+        self.misses = 0        # cache_only 模式未命中
+        self.evictions = 0     # LRU 淘汰的页面
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config, cache_only=None):
+        """根据 HTTP_CACHE 配置创建缓存"""
+        if cache_only is None:
+            cache_only = config.get('cache_only', False)
+        return cls(
+            config.get('directory', 'data/cache/http'),
+            cache_only=cache_only,
+            max_entries=config.get('max_entries', 5000),
+            max_bytes=config.get('max_bytes', 256 * 1024 * 1024),
+        )
+
+    @staticmethod
+    def _key(url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _paths(self, url, key=None):
+        key = key or self._key(url)
+        base = os.path.join(self.directory, key[:2], key)
+        return base + '.json', base + '.body'
+
+    def _index(self):
+        """LRU 索引（调用方持有锁）：按响应体文件的修改时间恢复使用顺序"""
+        if self._entries is None:
+            found = []
+            for sub in os.scandir(self.directory):
+                if not sub.is_dir():
+                    continue
+                for entry in os.scandir(sub.path):
+                    if entry.name.endswith('.body'):
+                        stat = entry.stat()
+                        found.append((stat.st_mtime, entry.name[:-5], stat.st_size))
+            found.sort()
+            self._entries = OrderedDict((key, size) for _, key, size in found)
+            self._bytes = sum(self._entries.values())
+        return self._entries
+
+    def _touch(self, key, body_path):
+        """标记为最近使用"""
+        with self._lock:
+            entries = self._index()
+            if key in entries:
+                entries.move_to_end(key)
+        try:
+            os.utime(body_path)
+        except OSError:
+            pass
+
+    def _remove(self, key):
+        """删除一个缓存页面（调用方持有锁）"""
+        size = self._index().pop(key, None)
+        if size is not None:
+            self._bytes -= size
+        for path in self._paths(None, key):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        """淘汰最久未使用的页面直到不超过上限（至少保留刚写入的一个，调用方持有锁）"""
+        entries = self._index()
+        while len(entries) > 1 and (
+            (self.max_entries and len(entries) > self.max_entries)
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            self._remove(next(iter(entries)))
+            self.evictions += 1
+
+    def discard(self, url):
+        """删除某个URL的缓存（例如源站返回304但缓存的响应体已丢失）"""
+        with self._lock:
+            self._remove(self._key(url))
+
+    def _read_meta(self, url):
+        meta_path, body_path = self._paths(url)
+        if not (os.path.exists(meta_path) and os.path.exists(body_path)):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except Exception:
+            return None
+        # 不同URL哈希冲突的极端情况
+        if meta.get('url') != url:
+            return None
+        return meta
+
+    def conditional_headers(self, url):
+        """返回用于重新验证的请求头（无缓存或无校验信息时为空）"""
+        meta = self._read_meta(url)
+        if not meta:
+            return {}
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def load(self, url):
+        """从磁盘读取已缓存的页面文本，不存在时返回None"""
+        meta = self._read_meta(url)
+        if not meta:
+            return None
+        key = self._key(url)
+        _, body_path = self._paths(url, key)
+        try:
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except OSError:
+            return None
+        self._touch(key, body_path)
+        return body.decode(meta.get('encoding') or 'utf-8', errors='replace')
+
+    def revalidated_hit(self, url):
+        """处理 304 响应：返回缓存页面"""
+        text = self.load(url)
+        if text is not None:
+            with self._lock:
+                self.revalidated += 1
+        return text
+
+    def offline_lookup(self, url):
+        """cache_only 模式下读取缓存"""
+        text = self.load(url)
+        with self._lock:
+            if text is None:
+                self.misses += 1
+            else:
+                self.offline_hits += 1
+        return text
+
+    def store(self, url, response, body=None, encoding=None):
+        """保存 200 响应的响应体和校验信息
+
+        body: 流式读取时已取出的完整响应体（此时 response.content 不可再读取）
+        encoding: 解码时实际使用的编码（见 charset.decode_html），读取缓存时按它解码
+        """
+        if body is None:
+            body = response.content
+        encoding = encoding or response.encoding or 'utf-8'
+        key = self._key(url)
+        meta_path, body_path = self._paths(url, key)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        meta = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'encoding': encoding,
+            'stored': time.time(),
+        }
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(body_path + suffix, 'wb') as f:
+                f.write(body)
+            os.replace(body_path + suffix, body_path)
+            with open(meta_path + suffix, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.replace(meta_path + suffix, meta_path)
+        except OSError as e:
+            self.logger.warning(f"写入HTTP缓存失败 {url}: {e}")
+            return
+        with self._lock:
+            self.stored += 1
+            entries = self._index()
+            self._bytes += len(body) - entries.pop(key, 0)
+            entries[key] = len(body)
+            self._evict()
+
+    def stats(self):
+        """返回缓存统计"""
+        with self._lock:
+            return {
+                'revalidated': self.revalidated,
+                'stored': self.stored,
+                'offline_hits': self.offline_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,156 @@
+"""
+真实链接缓存 - 持久化 详情页/申请页 URL → 商家真实 URL 的解析结果
+
+每天三次的定时运行中，大部分优惠在上一次运行时已经解析过。
+缓存命中时无需再次请求详情页和申请页；
+对"未找到真实链接"的结果做负缓存（较短TTL），避免反复请求无法解析的页面。
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResolvedLinkCache:
+    """带TTL、负缓存和容量上限（LRU淘汰）的磁盘链接缓存"""
+
+    def __init__(self, path, ttl=7 * 24 * 3600, negative_ttl=24 * 3600, max_entries=5000):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max(1, max_entries)
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # 按最近使用顺序排列，最旧的在前
+        self._dirty = False
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.load()
+
+    @classmethod
+    def from_config(cls, config):
+        """根据 LINK_CACHE 配置创建缓存"""
+        return cls(
+            config.get('path', 'data/cache/resolved_links.json'),
+            ttl=config.get('ttl', 7 * 24 * 3600),
+            negative_ttl=config.get('negative_ttl', 24 * 3600),
+            max_entries=config.get('max_entries', 5000),
+        )
+
+    @staticmethod
+    def _cacheable(key):
+        return bool(key) and key.startswith(('http://', 'https://'))
+
+    def load(self):
+        """从磁盘加载缓存，丢弃已过期的条目"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            self.logger.warning(f"读取链接缓存失败，将重新建立: {e}")
+            return
+
+        now = time.time()
+        for key, entry in data.get('entries', {}).items():
+            if entry.get('expires', 0) > now:
+                self._entries[key] = entry
+
+    def get(self, key):
+        """查询缓存，返回 {'url': ..., 'negative': bool} 或 None"""
+        if not self._cacheable(key):
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry['expires'] <= time.time():
+                del self._entries[key]
+                self._dirty = True
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            if entry.get('negative'):
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return {'url': entry['url'], 'negative': bool(entry.get('negative'))}
+
+    def peek(self, key):
+        """查询缓存但不计入命中统计、不调整LRU顺序，返回URL或None"""
+        if not self._cacheable(key):
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['expires'] <= time.time():
+                return None
+            return entry['url']
+
+    def set(self, key, url, negative=False, ttl=None):
+        """写入解析结果；negative=True 表示未能解析出真实链接"""
+        if not self._cacheable(key) or not url:
+            return
+        if ttl is None:
+            ttl = self.negative_ttl if negative else self.ttl
+        now = time.time()
+        with self._lock:
+            self._entries[key] = {
+                'url': url,
+                'negative': negative,
+                'stored': now,
+                'expires': now + ttl,
+            }
+            self._entries.move_to_end(key)
+            self._dirty = True
+            self._evict(now)
+
+    def _evict(self, now):
+        """超过容量时先清理过期条目，再按LRU淘汰"""
+        if len(self._entries) <= self.max_entries:
+            return
+        for key in [k for k, e in self._entries.items() if e['expires'] <= now]:
+            del self._entries[key]
+            self.evictions += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def save(self):
+        """原子写入磁盘（先写临时文件再替换）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {'version': 1, 'entries': dict(self._entries)}
+            self._dirty = False
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def stats(self):
+        """返回命中统计"""
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round((self.hits + self.negative_hits) / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,448 @@
+"""
+单次扫描的链接索引 - 替代在整页HTML上反复执行 re.findall
+
+extract_real_deal_url 原先对详情页执行约16次全文正则扫描。
+这里为每页只建立一份小写副本，并按需记录字面量（"<a"、"href="、"nofollow" 等）
+在文档中出现的位置，同一页上的所有规则共享这些位置：
+- 每条规则的匹配必然以固定的字面量前缀开头（如 "<a"、"href="、"window.location"），
+  只在前缀出现的位置上用 regex.match 做锚定匹配，跳过文档的其余部分
+- 规则中任何匹配都必须包含的字面量（如 "nofollow"、"freebie"）最后一次出现之后的前缀位置
+  不可能产生匹配，直接跳过；某个必需字面量在页面中不存在时整条规则不必求值
+- 规则开头不可能匹配 ">" 的部分（如 <a[^>]+rel=["']nofollow["']）中的字面量
+  必然出现在起始位置之后的第一个 ">" 之前，据此只保留包含这些字面量的标签位置
+
+匹配始终在整页文本上进行（不截取片段），按文档顺序、不重叠地收集结果，
+因此 LinkRule.findall 的返回值与 re.findall(pattern, html, re.IGNORECASE) 完全一致，
+原有的优先级逻辑无需改变。没有固定前缀的规则直接在整页上执行 re.findall。
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+
+# REAL_LINK_EXTRACTION 中的规则键（规则只在 enhanced_config 中定义）
+PATTERN_KEYS = (
+    'get_freebie_pattern', 'claim_link_pattern', 'primary_patterns', 'secondary_patterns',
+    'js_patterns', 'meta_refresh_pattern', 'iframe_pattern', 'claim_page_patterns',
+)
+
+# 在 re.IGNORECASE 下与ASCII字母等价、但 str.lower() 后不是该字母的字符（ı → i，ſ → s）；
+# 页面中出现这些字符时改用正则定位字面量，保证位置与正则的大小写规则一致
+_CASEFOLD_EXTRA = ('\u0131', '\u017f')
+
+
+class LinkIndex:
+    """一页HTML的小写副本和字面量位置（按需计算并缓存，规则之间共享）"""
+
+    def __init__(self, html):
+        self.html = html
+        self._positions = {}
+        # 统一转小写后用字面量定位（C层面的快速查找）；
+        # 极少数Unicode字符小写后长度会变化或大小写规则不同，此时退回不区分大小写的正则定位
+        lower = html.lower()
+        exact = len(lower) == len(html) and not any(ch in html for ch in _CASEFOLD_EXTRA)
+        self._lower = lower if exact else None
+
+    def positions(self, literal):
+        """字面量（小写）在文档中所有出现的起始位置（升序，包括相互重叠的出现）"""
+        found = self._positions.get(literal)
+        if found is None:
+            if self._lower is not None:
+                found = []
+                find = self._lower.find
+                pos = find(literal)
+                while pos != -1:
+                    found.append(pos)
+                    pos = find(literal, pos + 1)
+            else:
+                pattern = re.compile('(?=' + re.escape(literal) + ')', re.IGNORECASE)
+                found = [m.start() for m in pattern.finditer(self.html)]
+            self._positions[literal] = found
+        return found
+
+    def _last_position(self, literal):
+        if self._lower is not None and literal not in self._positions:
+            return self._lower.rfind(literal)
+        found = self.positions(literal)
+        return found[-1] if found else -1
+
+    def any_positions(self, group):
+        """一组字面量中任意一个出现的起始位置（升序）"""
+        if len(group) == 1:
+            return self.positions(group[0])
+        return sorted({pos for literal in group for pos in self.positions(literal)})
+
+    def last_start(self, literal_groups):
+        """能包含全部必需字面量的匹配的最大起始位置；某组字面量都不存在时返回-1"""
+        limit = len(self.html)
+        for group in literal_groups:
+            last = -1
+            for literal in group:
+                last = max(last, self._last_position(literal))
+            limit = min(limit, last)
+            if limit < 0:
+                return -1
+        return limit
+
+
+def literal_prefix(pattern):
+    """正则的每个匹配都必须以之开头的字面量（小写），无法确定时返回空字符串"""
+    if len(_split_alternatives(pattern)) > 1:
+        return ''
+    run = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        ch = pattern[i]
+        if ch == '\\' and i + 1 < n and not pattern[i + 1].isalnum():
+            char, i = pattern[i + 1], i + 2
+        elif ch in '\\.^$[]()|?*+{}':
+            break
+        else:
+            char, i = ch, i + 1
+        if i < n and pattern[i] in '?*{+':
+            if pattern[i] == '+':
+                run.append(char)   # 至少出现一次
+            break      # 之后的重复次数不定（或该字符是可选的），前缀到此为止
+        run.append(char)
+    return ''.join(run).lower()
+
+
+def tag_head(pattern):
+    """正则开头不可能匹配 ">" 的部分的长度
+
+    这部分匹配到的文本一定位于匹配起点之后的第一个 ">" 之前（含该位置）。
+    逐个分析顶层元素，遇到可能匹配 ">" 或无法确定的元素时停止。
+    """
+    i = 0
+    n = len(pattern)
+    while i < n:
+        ch = pattern[i]
+        if ch == '\\' and i + 1 < n:
+            nxt = pattern[i + 1]
+            end = _skip_escape(pattern, i) if nxt.isalnum() else i + 2
+            free = nxt in 'sdwbBAZ' if nxt.isalnum() else nxt != '>'
+        elif ch == '[':
+            end = _skip_class(pattern, i)
+            free = _class_excludes_gt(pattern[i + 1:end - 1])
+        elif ch == '(':
+            end = _group_end(pattern, i) + 1
+            body = pattern[i + 1:end - 1]
+            if body.startswith(('?=', '?!', '?<=', '?<!')):
+                free = True    # 环视不消耗字符
+            else:
+                if body.startswith('?P<'):
+                    body = body[body.find('>') + 1:]
+                elif body.startswith('?:'):
+                    body = body[2:]
+                elif body.startswith('?'):
+                    return i
+                free = all(tag_head(option) == len(option) for option in _split_alternatives(body))
+        elif ch in '^$':
+            end, free = i + 1, True
+        elif ch in '.|)?*+{':
+            if ch != '{' or _QUANTIFIER_RE.match(pattern, i):
+                return i
+            end, free = i + 1, True   # 不构成重复次数的 { 是普通字符
+        else:
+            end, free = i + 1, ch != '>'
+        if not free:
+            return i
+        i = _skip_quantifier(pattern, end)
+    return n
+
+
+_QUANTIFIER_RE = re.compile(r'\{\d*(?:,\d*)?\}')
+
+
+def _skip_quantifier(pattern, i):
+    """返回元素之后的重复次数（含非贪婪/占有修饰）结束的位置"""
+    if i < len(pattern) and pattern[i] in '?*+':
+        i += 1
+    else:
+        m = _QUANTIFIER_RE.match(pattern, i)
+        if not m:
+            return i
+        i = m.end()
+    if i < len(pattern) and pattern[i] in '?+':
+        i += 1
+    return i
+
+
+def _class_excludes_gt(body):
+    """字符类（不含方括号）是否一定不匹配 ">"；无法确定时返回False"""
+    negated = body.startswith('^')
+    if negated:
+        body = body[1:]
+    contains = False
+    i = 0
+    while i < len(body):
+        if body[i] == '\\' and i + 1 < len(body):
+            nxt = body[i + 1]
+            if nxt in 'SDW':
+                contains = True
+            elif nxt.isalnum() and nxt not in 'sdw':
+                return False   # \x3e 等转义
+            elif nxt == '>':
+                contains = True
+            low = nxt
+            i += 2
+        else:
+            low = body[i]
+            contains = contains or low == '>'
+            i += 1
+        if body.startswith('-', i) and i + 1 < len(body):
+            high = body[i + 1]
+            if high == '\\':
+                return False
+            contains = contains or low <= '>' <= high
+            i += 2
+    return contains if negated else not contains
+
+
+def required_literals(pattern):
+    """提取正则中任何匹配都必须包含的字面量（小写）
+
+    只分析顺序结构：连续的普通字符组成一个必需字面量，非可选的分组递归分析；
+    全部由字面量组成的 (?:a|b|c) 分组视为"任选其一"。
+    无法确定的结构（字符类、可选部分、环视、内联标志等）只会少提取字面量，不会多提取。
+    顶层含有 | 时无法确定，返回空列表。
+    """
+    groups = []
+    run = []
+
+    def flush():
+        if len(run) >= 2:
+            groups.append((''.join(run).lower(),))
+        run.clear()
+
+    i = 0
+    n = len(pattern)
+    while i < n:
+        ch = pattern[i]
+        if ch == '\\' and i + 1 < n:
+            nxt = pattern[i + 1]
+            if nxt.isalnum():
+                flush()        # \s \d \w 等字符类、\x41 等转义和反向引用
+                i = _skip_escape(pattern, i)
+                continue
+            run.append(nxt)
+            i += 2
+        elif ch == '[':
+            flush()
+            i = _skip_class(pattern, i)
+        elif ch == '(':
+            flush()
+            j = _group_end(pattern, i)
+            body = pattern[i + 1:j]
+            i = j + 1
+            optional = i < n and pattern[i] in '?*{'
+            if body.startswith('?P<'):
+                body = body[body.find('>') + 1:]
+            elif body.startswith('?:'):
+                body = body[2:]
+            elif body.startswith('?'):
+                continue       # 环视、反向引用、注释、内联标志
+            if optional:
+                continue
+            options = _split_alternatives(body)
+            if len(options) > 1:
+                if all(_LITERAL_OPTION_RE.fullmatch(opt) for opt in options):
+                    groups.append(tuple(opt.replace('\\', '').lower() for opt in options))
+            else:
+                groups.extend(required_literals(body))
+        elif ch == '|':
+            return []
+        elif ch in '?*{':
+            if run:
+                run.pop()      # 前一个字符是可选的
+            flush()
+            if ch == '{':
+                i = pattern.find('}', i) + 1 or n
+            else:
+                i += 1
+        elif ch == '+':
+            flush()
+            i += 1
+        elif ch in '.^$)':
+            flush()
+            i += 1
+        else:
+            run.append(ch)
+            i += 1
+    flush()
+    return groups
+
+
+def _skip_escape(pattern, i):
+    """返回 \\x41、\\u0041、\\N{...}、\\12 等转义序列之后的位置"""
+    kind = pattern[i + 1]
+    j = i + 2
+    if kind == 'x':
+        return j + 2
+    if kind == 'u':
+        return j + 4
+    if kind == 'U':
+        return j + 8
+    if kind == 'N' and pattern.startswith('{', j):
+        return pattern.find('}', j) + 1 or len(pattern)
+    if kind.isdigit():
+        while j < len(pattern) and pattern[j].isdigit():
+            j += 1
+    return j
+
+
+def _skip_class(pattern, i):
+    """返回从 i 开始的字符类 [...] 之后的位置（开头的 ^ 和 ] 属于字符类本身）"""
+    j = i + 1
+    if pattern.startswith('^', j):
+        j += 1
+    if pattern.startswith(']', j):
+        j += 1
+    while j < len(pattern) and pattern[j] != ']':
+        j += 2 if pattern[j] == '\\' else 1
+    return j + 1
+
+
+def _group_end(pattern, i):
+    """与 i 处的 ( 配对的 ) 的位置"""
+    depth = 0
+    j = i
+    while j < len(pattern):
+        ch = pattern[j]
+        if ch == '\\':
+            j += 2
+            continue
+        if ch == '[':
+            j = _skip_class(pattern, j)
+            continue
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+            if depth == 0:
+                return j
+        j += 1
+    return len(pattern)
+
+
+def _split_alternatives(body):
+    """按顶层的 | 拆分分组内容"""
+    options = []
+    depth = 0
+    start = 0
+    i = 0
+    while i < len(body):
+        ch = body[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if ch == '[':
+            i = _skip_class(body, i)
+            continue
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == '|' and depth == 0:
+            options.append(body[start:i])
+            start = i + 1
+        i += 1
+    options.append(body[start:])
+    return options
+
+
+_LITERAL_OPTION_RE = re.compile(r'(?:[\w \-/=:]|\\[^\w])+')
+
+
+class LinkRule:
+    """一条链接提取规则，在 LinkIndex 上求值"""
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.regex = re.compile(pattern, re.IGNORECASE)
+        self.prefix = literal_prefix(pattern)
+        # 前缀中已经包含的字面量没有筛选作用
+        self.literals = [
+            group for group in required_literals(pattern)
+            if not (len(group) == 1 and group[0] in self.prefix)
+        ]
+        # 必然出现在第一个 ">" 之前的字面量
+        self.head_literals = []
+        if self.prefix and '>' not in self.prefix:
+            self.head_literals = [
+                group for group in required_literals(pattern[:tag_head(pattern)])
+                if not (len(group) == 1 and group[0] in self.prefix)
+            ]
+
+    def findall(self, index):
+        """返回与 re.findall(pattern, html, re.IGNORECASE) 相同的结果"""
+        if not self.prefix:
+            return self.regex.findall(index.html)
+        limit = index.last_start(self.literals)
+        html = index.html
+        match = self.regex.match
+        groups = self.regex.groups
+        results = []
+        end = 0
+        for pos in self._starts(index):
+            if pos > limit:
+                break
+            if pos < end:
+                continue       # 与 findall 相同：结果之间不重叠
+            m = match(html, pos)
+            if m is None:
+                continue
+            end = m.end()
+            if groups == 0:
+                results.append(m.group(0))
+            elif groups == 1:
+                results.append(m.group(1) or '')
+            else:
+                results.append(m.groups(''))
+        return results
+
+
+    def _starts(self, index):
+        """可能产生匹配的起始位置（升序）"""
+        starts = index.positions(self.prefix)
+        selected = None
+        for group in self.head_literals:
+            hits = index.any_positions(group)
+            if len(hits) > len(starts) // 2:
+                continue       # 过于常见的字面量没有筛选作用
+            gts = index.positions('>')
+            chosen = set()
+            for hit in hits:
+                # 字面量之前最近的 ">" 之后、字面量之前的起始位置
+                k = bisect_left(gts, hit)
+                last_gt = gts[k - 1] if k else -1
+                chosen.update(range(bisect_right(starts, last_gt), bisect_right(starts, hit)))
+            selected = chosen if selected is None else selected & chosen
+            if not selected:
+                return []
+        if selected is None:
+            return starts
+        return [starts[k] for k in sorted(selected)]
+
+
+class LinkRuleSet:
+    """详情页/申请页的全部提取规则"""
+
+    def __init__(self, patterns):
+        self.get_freebie = LinkRule(patterns['get_freebie_pattern'])
+        self.claim_link = LinkRule(patterns['claim_link_pattern'])
+        self.primary = [LinkRule(p) for p in patterns['primary_patterns']]
+        self.secondary = [LinkRule(p) for p in patterns['secondary_patterns']]
+        self.js = [LinkRule(p) for p in patterns['js_patterns']]
+        self.meta_refresh = LinkRule(patterns['meta_refresh_pattern'])
+        self.iframe = LinkRule(patterns['iframe_pattern'])
+        self.claim_page = [LinkRule(p) for p in patterns['claim_page_patterns']]
+
+    @classmethod
+    def from_config(cls, config):
+        """根据 REAL_LINK_EXTRACTION 配置创建"""
+        return cls({key: config[key] for key in PATTERN_KEYS})
+
+    def index(self, html):
+        """为一页HTML建立索引"""
+        return LinkIndex(html)
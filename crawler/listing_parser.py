@@ -0,0 +1,227 @@
+"""
+列表页解析 - 按嵌套深度识别优惠卡片，支持 html.parser 和 lxml 两种后端
+
+原先的 DealParser 在遇到第一个 </div> 时就结束当前优惠，
+卡片内部嵌套的 div（缩略图、元信息等）会把标题和链接截断在卡片之外；
+而且每个起始标签都要 dict(attrs) 并把所有属性值转成小写字符串。
+这里把识别逻辑放在与后端无关的 DealCollector 中：
+- 只对 div/article 计数深度，每个优惠容器记录自己打开时的深度，对应的结束标签才会结束它
+- 容器可以嵌套：内层容器有标题时是独立的优惠，没有标题时其链接/图片并入外层容器
+- 只有 div/article/a/img 需要读取属性，其他标签不触碰属性
+
+两种后端都支持多次 feed()，每次返回本段内容中新完成的优惠，可以边下载边解析。
+"""
+
+import re
+from html.parser import HTMLParser
+
+CONTAINER_TAGS = frozenset(('div', 'article'))
+HEADING_TAGS = frozenset(('h1', 'h2', 'h3', 'h4'))
+ATTR_TAGS = frozenset(('div', 'article', 'a', 'img'))
+_CONTAINER_VALUE = re.compile(r'deal|post', re.IGNORECASE)
+
+
+class DealCollector:
+    """与解析后端无关的优惠卡片识别状态机"""
+
+    def __init__(self):
+        self.deals = []
+        self._completed = []
+        self._stack = []      # [(打开时的深度, 优惠字典)]，栈顶为当前优惠
+        self._depth = 0       # 当前打开的 div/article 数量
+        self._text = []
+        self.in_title = False
+        self.in_description = False
+
+    def start(self, tag, attrs):
+        """处理起始标签；attrs 为 (名称, 值) 序列，只有 ATTR_TAGS 中的标签会被读取"""
+        if self._text:
+            self._flush()
+        if tag in CONTAINER_TAGS:
+            self._depth += 1
+            # 检测可能的优惠容器（任一属性值包含 deal 或 post）
+            for _, value in attrs:
+                if value and _CONTAINER_VALUE.search(value):
+                    self._stack.append((self._depth, {}))
+                    break
+            return
+        if not self._stack:
+            return
+        deal = self._stack[-1][1]
+        if tag in HEADING_TAGS:
+            self.in_title = True
+        elif tag == 'p':
+            self.in_description = True
+        elif tag == 'a':
+            # 第一个链接为详情页链接
+            if 'detail_url' not in deal:
+                for name, value in attrs:
+                    if name == 'href':
+                        deal['detail_url'] = value
+                        break
+        elif tag == 'img':
+            src = data_src = None
+            for name, value in attrs:
+                if name == 'src':
+                    src = value
+                elif name == 'data-src':
+                    data_src = value
+            if src is not None:
+                deal['image'] = src
+            elif data_src is not None:
+                deal['image'] = data_src
+
+    def end(self, tag):
+        if self._text:
+            self._flush()
+        if tag in CONTAINER_TAGS:
+            if self._stack and self._stack[-1][0] == self._depth:
+                self._finish(self._stack.pop()[1])
+            self._depth = max(0, self._depth - 1)
+        elif tag in HEADING_TAGS:
+            self.in_title = False
+        elif tag == 'p':
+            self.in_description = False
+
+    def data(self, text):
+        self._text.append(text)
+
+    def close(self):
+        if self._text:
+            self._flush()
+
+    def take_completed(self):
+        """返回并清空自上次调用以来完成的优惠"""
+        completed, self._completed = self._completed, []
+        return completed
+
+    def _finish(self, deal):
+        if 'title' in deal:
+            self.deals.append(deal)
+            self._completed.append(deal)
+        elif deal and self._stack:
+            # 没有标题的内层容器（缩略图、元信息等）属于外层优惠
+            parent = self._stack[-1][1]
+            for key, value in deal.items():
+                parent.setdefault(key, value)
+
+    def _flush(self):
+        data = ''.join(self._text).strip()
+        self._text = []
+        if not data or not self._stack:
+            return
+        deal = self._stack[-1][1]
+        if self.in_title:
+            deal['title'] = data
+        if self.in_description:
+            if 'description' not in deal:
+                deal['description'] = data
+            else:
+                deal['description'] += ' ' + data
+
+
+class DealParser(HTMLParser):
+    """标准库 html.parser 后端"""
+
+    backend = 'html.parser'
+
+    def __init__(self):
+        super().__init__()
+        self.collector = DealCollector()
+        self.deals = self.collector.deals
+
+    def feed(self, data):
+        """解析一段HTML，返回本段中新完成的优惠"""
+        super().feed(data)
+        return self.collector.take_completed()
+
+    def close(self):
+        super().close()
+        self.collector.close()
+        return self.collector.take_completed()
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag, attrs if tag in ATTR_TAGS else ())
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+
+class _LxmlTarget:
+    """lxml 解析器的回调目标"""
+
+    __slots__ = ('collector',)
+
+    def __init__(self, collector):
+        self.collector = collector
+
+    def start(self, tag, attrib):
+        self.collector.start(tag, attrib.items() if tag in ATTR_TAGS else ())
+
+    def end(self, tag):
+        self.collector.end(tag)
+
+    def data(self, data):
+        self.collector.data(data)
+
+    def close(self):
+        self.collector.close()
+
+
+class LxmlDealParser:
+    """lxml 后端（libxml2 的C解析器，大页面上更快）"""
+
+    backend = 'lxml'
+
+    def __init__(self):
+        from lxml import etree
+
+        self.collector = DealCollector()
+        self.deals = self.collector.deals
+        self._parser = etree.HTMLParser(target=_LxmlTarget(self.collector))
+
+    def feed(self, data):
+        """解析一段HTML，返回本段中新完成的优惠"""
+        self._parser.feed(data)
+        return self.collector.take_completed()
+
+    def close(self):
+        try:
+            self._parser.close()
+        except Exception:
+            pass  # 空文档等情况下 lxml 会抛出异常，已解析的结果仍然有效
+        return self.collector.take_completed()
+
+
+BACKENDS = {
+    'html.parser': DealParser,
+    'lxml': LxmlDealParser,
+}
+
+
+def lxml_available():
+    try:
+        import lxml.etree  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_deal_parser(backend='auto'):
+    """创建列表页解析器；auto 时优先使用 lxml，未安装则使用 html.parser"""
+    if backend == 'auto':
+        backend = 'lxml' if lxml_available() else 'html.parser'
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的列表页解析后端: {backend}")
+    return BACKENDS[backend]()
+
+
+def parse_listing(html, backend='auto'):
+    """解析整页HTML，返回优惠列表"""
+    parser = create_deal_parser(backend)
+    parser.feed(html)
+    parser.close()
+    return parser.deals
@@ -0,0 +1,336 @@
+"""
+链接可用性检查 - 渲染前并发探测商家链接，按状态降级或移除失效优惠
+
+解析出的 deal['url'] 在渲染时直接带上"✅ 真实链接"标记，但从没有人确认过它还能打开：
+活动结束后商家页面返回404，或者把旧链接重定向回首页。
+这里在 generate_deals_html 之前加一个检查阶段：
+- 对最终落地URL（final_url，没有时为 url）发 HEAD 请求并跟随重定向，
+  不支持 HEAD 时改用 Range: bytes=0-0 的 GET，不读取响应体
+- 按主机分组，不同主机并发检查，整个阶段受 max_seconds 限制，来不及检查的链接保持原样
+- 结果按URL缓存，有效期按状态区分，可按域名单独设置；连接失败的主机在域名级别缓存，
+  同一主机的其他链接不再重复等待超时
+状态：alive 正常；dead 404/410；expired 被重定向到符合"活动已结束"模式的页面；
+unreachable 无法连接；unknown 403/429/5xx、超时或未检查（反爬或临时故障，不据此判断）。
+被重定向回首页本身不算过期：推荐链接和短链接（share.octopus.energy 等）正常情况下就会跳到首页，
+referral_hosts 中的主机按 alive 处理，其他主机按 unknown 处理。
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from urllib.parse import urlparse
+
+import requests
+
+from deadline import BudgetExceeded, Deadline, clamp_timeout, deal_budget
+
+ALIVE = 'alive'
+DEAD = 'dead'
+EXPIRED = 'expired'
+UNREACHABLE = 'unreachable'
+UNKNOWN = 'unknown'
+
+DEFAULT_TTL = {
+    ALIVE: 12 * 3600,
+    DEAD: 24 * 3600,
+    EXPIRED: 24 * 3600,
+    UNREACHABLE: 2 * 3600,
+    UNKNOWN: 30 * 60,
+}
+
+# 重定向后的落地URL符合这些模式时判定为活动已结束
+DEFAULT_EXPIRED_PATTERNS = (
+    r'expired',
+    r'(?:offer|promo|promotion|campaign|deal|competition)s?[-_/]?(?:ended|closed|over|finished)',
+    r'no[-_]?longer[-_]?available',
+    r'sold[-_]?out',
+)
+
+# 推荐/短链接主机（含子域名）：跳转到首页是正常行为
+DEFAULT_REFERRAL_HOSTS = ('share.octopus.energy', 'bit.ly', 'amzn.to', 'tinyurl.com', 'prf.hn', 'awin1.com')
+
+# 独立运行时（未传入爬虫的传输层）使用的请求头；默认的 python-requests UA 常被商家直接拒绝
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+
+
+class LinkStatusCache:
+    """URL → 检查结果 的磁盘缓存，有效期按状态区分，可按域名覆盖"""
+
+    def __init__(self, path, ttl=None, domain_ttl=None):
+        self.path = path
+        self.ttl = dict(DEFAULT_TTL, **(ttl or {}))
+        self.domain_ttl = {d.lower(): v for d, v in (domain_ttl or {}).items()}
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._urls = {}
+        self._domains = {}   # 主机 → 无法连接的记录
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def load(self):
+        """从磁盘加载缓存，丢弃已过期的条目"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            self.logger.warning(f"读取链接状态缓存失败，将重新建立: {e}")
+            return
+        now = time.time()
+        self._urls = {k: e for k, e in data.get('urls', {}).items() if e.get('expires', 0) > now}
+        self._domains = {k: e for k, e in data.get('domains', {}).items() if e.get('expires', 0) > now}
+
+    def _ttl_for(self, host, state):
+        """alive 状态的有效期可以按域名设置（大商家的页面很少失效）"""
+        if state == ALIVE:
+            if host.startswith('www.'):
+                host = host[4:]
+            pos = 0
+            while pos != -1:
+                ttl = self.domain_ttl.get(host[pos:].lstrip('.'))
+                if ttl is not None:
+                    return ttl
+                pos = host.find('.', pos + 1)
+        return self.ttl.get(state, self.ttl[UNKNOWN])
+
+    def get(self, url):
+        """返回 (状态, 状态码) 或 None"""
+        host = urlparse(url).netloc.lower()
+        now = time.time()
+        with self._lock:
+            entry = self._urls.get(url) or self._domains.get(host)
+            if entry is None or entry['expires'] <= now:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry['state'], entry.get('code')
+
+    def set(self, url, state, code=None):
+        host = urlparse(url).netloc.lower()
+        now = time.time()
+        entry = {'state': state, 'code': code, 'checked': now, 'expires': now + self._ttl_for(host, state)}
+        with self._lock:
+            self._urls[url] = entry
+            if state == UNREACHABLE:
+                self._domains[host] = entry
+            self._dirty = True
+
+    def save(self):
+        """原子写入磁盘（先写临时文件再替换），同时清理过期条目"""
+        now = time.time()
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                'version': 1,
+                'urls': {k: e for k, e in self._urls.items() if e['expires'] > now},
+                'domains': {k: e for k, e in self._domains.items() if e['expires'] > now},
+            }
+            self._dirty = False
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+class LivenessChecker:
+    """并发探测商家链接是否仍然可用"""
+
+    def __init__(self, transport, rate_limiter=None, cache=None, timeout=5, workers=16, max_seconds=60,
+                 dead_status=(404, 410), head_fallback_status=(400, 405, 501),
+                 expired_patterns=DEFAULT_EXPIRED_PATTERNS, referral_hosts=DEFAULT_REFERRAL_HOSTS):
+        self.transport = transport
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.timeout = timeout
+        self.workers = max(1, workers)
+        self.max_seconds = max_seconds
+        self.dead_status = frozenset(dead_status)
+        self.head_fallback_status = frozenset(head_fallback_status)
+        self.expired_pattern = re.compile('|'.join(f'(?:{p})' for p in expired_patterns), re.I) if expired_patterns else None
+        self.referral_hosts = frozenset(h.lower() for h in referral_hosts)
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.cache_hits = 0
+        self.states = {}
+
+    @classmethod
+    def from_config(cls, config, transport=None, rate_limiter=None, base_dir=None):
+        """根据 LIVENESS 配置创建；未传入传输层时使用独立的 requests 传输"""
+        if transport is None:
+            from transport import create_transport
+
+            session = requests.Session()
+            session.headers.update(DEFAULT_HEADERS)
+            transport = create_transport(config.get('transport', {}), session)
+        cache = None
+        if config.get('cache_enabled', True):
+            path = config.get('cache_path', 'data/cache/liveness.json')
+            if base_dir is not None:
+                path = os.path.join(base_dir, path)
+            cache = LinkStatusCache(path, ttl=config.get('ttl'), domain_ttl=config.get('domain_ttl'))
+        return cls(
+            transport,
+            rate_limiter=rate_limiter,
+            cache=cache,
+            timeout=config.get('timeout', 5),
+            workers=config.get('workers', 16),
+            max_seconds=config.get('max_seconds', 60),
+            dead_status=config.get('dead_status', (404, 410)),
+            head_fallback_status=config.get('head_fallback_status', (400, 405, 501)),
+            expired_patterns=config.get('expired_patterns', DEFAULT_EXPIRED_PATTERNS),
+            referral_hosts=config.get('referral_hosts', DEFAULT_REFERRAL_HOSTS),
+        )
+
+    def check(self, url):
+        """检查单个链接，返回 (状态, 状态码)"""
+        if self.cache is not None:
+            cached = self.cache.get(url)
+            if cached is not None:
+                self._record(cached[0], cache_hit=True)
+                return cached
+
+        try:
+            state, code = self._probe(url)
+        except BudgetExceeded:
+            # 来不及检查：不缓存，保持原样
+            self._record(UNKNOWN)
+            return UNKNOWN, None
+        except requests.Timeout:
+            state, code = UNKNOWN, None
+        except requests.ConnectionError:
+            state, code = UNREACHABLE, None
+        except requests.RequestException:
+            state, code = UNKNOWN, None
+
+        if self.cache is not None:
+            self.cache.set(url, state, code)
+        self._record(state)
+        return state, code
+
+    def check_many(self, urls):
+        """并发检查一批链接，返回 {链接: (状态, 状态码)}；整批不超过 max_seconds"""
+        deadline = Deadline(self.max_seconds)
+        groups = OrderedDict()
+        for url in urls:
+            if url and url.startswith(('http://', 'https://')):
+                groups.setdefault(urlparse(url).netloc.lower(), OrderedDict())[url] = None
+        if not groups:
+            return {}
+
+        def run_group(group):
+            # 同一主机顺序检查：主机无法连接时，其余链接直接命中域名级别的缓存
+            with deal_budget(deadline.remaining()):
+                return [(url, self.check(url)) for url in group]
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(groups)), thread_name_prefix='liveness') as executor:
+            for pairs in executor.map(run_group, groups.values()):
+                results.update(pairs)
+        if self.cache is not None:
+            self.cache.save()
+        return results
+
+    def _probe(self, url):
+        response = self._request('HEAD', url)
+        if response.status_code in self.head_fallback_status:
+            response = self._request('GET', url, headers={'Range': 'bytes=0-0'})
+        code = response.status_code
+        if code in self.dead_status:
+            return DEAD, code
+        if code < 400:
+            return self._classify_redirect(url, response.url or url), code
+        return UNKNOWN, code
+
+    def _classify_redirect(self, url, landed_url):
+        """按重定向的落地URL判断成功响应的状态"""
+        if landed_url == url:
+            return ALIVE
+        landed = urlparse(landed_url)
+        if self.expired_pattern is not None and self.expired_pattern.search(f'{landed.path}?{landed.query}'):
+            return EXPIRED
+        # 带路径的链接被重定向到首页：推荐/短链接正常如此，其他主机可能是活动已结束，但不据此判断
+        if urlparse(url).path.rstrip('/') and not landed.path.rstrip('/'):
+            return ALIVE if self._is_referral(urlparse(url).netloc) else UNKNOWN
+        return ALIVE
+
+    def _is_referral(self, host):
+        host = host.lower().split(':')[0]
+        if host.startswith('www.'):
+            host = host[4:]
+        return any(host == h or host.endswith('.' + h) for h in self.referral_hosts)
+
+    def _request(self, method, url, headers=None):
+        slot = self.rate_limiter.slot(url) if self.rate_limiter is not None else nullcontext()
+        with slot as ticket:
+            response = self.transport.request(
+                method, url, timeout=clamp_timeout(self.timeout), headers=headers,
+                stream=True, allow_redirects=True,
+            )
+            response.close()
+            if ticket is not None:
+                ticket.record(response.status_code)
+        return response
+
+    def _record(self, state, cache_hit=False):
+        with self._lock:
+            self.checked += 1
+            self.cache_hits += cache_hit
+            self.states[state] = self.states.get(state, 0) + 1
+
+    def close(self):
+        self.transport.close()
+
+    def stats(self):
+        """返回检查统计"""
+        with self._lock:
+            return {'checked': self.checked, 'cache_hits': self.cache_hits, 'states': dict(self.states)}
+
+
+def deal_link(deal):
+    """需要检查的商家链接（最终落地URL优先）；指向本站的链接不检查"""
+    url = deal.get('final_url') or deal.get('url') or ''
+    if not url.startswith(('http://', 'https://')) or 'latestfreestuff.co.uk' in url:
+        return None
+    return url
+
+
+def apply_liveness(deals, results, drop_dead=False):
+    """按检查结果标记 link_status 并重新排序
+
+    dead/expired 在 drop_dead 时移除，否则（默认）排到最后；unreachable 排在正常优惠之后；
+    alive/unknown 保持原有顺序。
+    """
+    kept, demoted, dead = [], [], []
+    for deal in deals:
+        url = deal_link(deal)
+        result = results.get(url) if url else None
+        if result is None:
+            kept.append(deal)
+            continue
+        state = result[0]
+        deal['link_status'] = state
+        if state in (DEAD, EXPIRED):
+            if not drop_dead:
+                dead.append(deal)
+        elif state == UNREACHABLE:
+            demoted.append(deal)
+        else:
+            kept.append(deal)
+    return kept + demoted + dead
@@ -0,0 +1,276 @@
+"""
+限流 - 按主机的令牌桶与自适应（AIMD）并发控制
+
+原先的礼貌策略是写死的：同步引擎每个优惠 sleep 2 秒，异步引擎每个主机固定并发数和间隔，
+配置中的 REQUEST_DELAY 没有被读取。这里统一为每个主机一个：
+- 令牌桶：限制平均请求速率，允许 burst 个请求的突发
+- AIMD 并发控制：响应正常且延迟健康时并发数加性增长（每轮约 +1），
+  遇到 429/5xx/超时/连接错误时乘性减小（同一时间窗口内只减一次）
+吞吐量会自动逼近源站能承受的水平，无需手工调参。
+
+排队等待名额和令牌都受当前优惠的时间预算（deadline.current_budget）约束：
+预算不足以等到时抛出 BudgetExceeded，不会在预算用完之后才发出请求。
+因预算缩短超时而失败的请求不是源站拥塞的信号，不参与并发调整。
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+
+from deadline import BudgetExceeded, current_budget
+
+
+def _budget_remaining():
+    """当前优惠的剩余预算秒数，没有预算时返回None"""
+    budget = current_budget()
+    return None if budget is None else budget.remaining()
+
+
+def _budget_exceeded():
+    """标记当前优惠的预算已用完并返回 BudgetExceeded"""
+    budget = current_budget()
+    if budget is not None:
+        budget.exhausted = True
+    return BudgetExceeded()
+
+
+class TokenBucket:
+    """线程安全的令牌桶，rate <= 0 表示不限速"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """预约一个令牌，返回需要等待的秒数"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def refund(self):
+        """归还预约的令牌（请求最终没有发出）"""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + 1)
+
+    def acquire(self):
+        """取得一个令牌（必要时等待），返回等待的秒数
+
+        需要等待的时间超过当前优惠的剩余预算时归还令牌并抛出 BudgetExceeded。
+        """
+        wait = self.reserve()
+        if wait > 0:
+            remaining = _budget_remaining()
+            if remaining is not None and wait >= remaining:
+                self.refund()
+                raise _budget_exceeded()
+            time.sleep(wait)
+        return wait
+
+
+class AIMDController:
+    """加性增、乘性减的并发上限控制"""
+
+    def __init__(self, initial=2, minimum=1, maximum=16, increase=1.0, decrease=0.5, latency_target=2.0,
+                 adaptive=True):
+        self.adaptive = adaptive
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(self.maximum, max(self.minimum, initial)))
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+
+        self._cond = threading.Condition()
+        self._last_decrease = 0.0
+        self._rtt = None  # 成功请求的平滑响应时间
+        self.in_flight = 0
+        self.decreases = 0
+
+    def acquire(self):
+        """占用一个并发名额；等待超过当前优惠的剩余预算时抛出 BudgetExceeded"""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                remaining = _budget_remaining()
+                if remaining is not None and remaining <= 0:
+                    raise _budget_exceeded()
+                self._cond.wait(remaining)
+            self.in_flight += 1
+
+    def cancel(self):
+        """归还名额但不调整并发上限（请求没有发出，或因预算不足而超时）"""
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def release(self, latency, overloaded):
+        """请求结束后根据结果调整并发上限"""
+        with self._cond:
+            saturated = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            if self.adaptive:
+                self._adjust(latency, overloaded, saturated)
+            self._cond.notify_all()
+
+    def _adjust(self, latency, overloaded, saturated):
+        now = time.monotonic()
+        if overloaded:
+            # 同一个往返时间内的多个失败只算一次拥塞信号
+            if now - self._last_decrease >= (self._rtt or latency):
+                self.limit = max(self.minimum, self.limit * self.decrease)
+                self._last_decrease = now
+                self.decreases += 1
+            return
+        self._rtt = latency if self._rtt is None else 0.8 * self._rtt + 0.2 * latency
+        if saturated and latency <= self.latency_target:
+            # 只有并发名额用满时才增长，每个"满并发轮次"约 +increase
+            self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+
+
+class RequestTicket:
+    """一次请求的结果记录，由调用方在拿到响应后填写状态码"""
+
+    __slots__ = ('status',)
+
+    def __init__(self):
+        self.status = None
+
+    def record(self, status):
+        self.status = status
+
+    @property
+    def overloaded(self):
+        return self.status is not None and (self.status == 429 or self.status >= 500)
+
+
+class _HostState:
+    __slots__ = ('bucket', 'controller', 'requests', 'overloads', 'waited')
+
+    def __init__(self, bucket, controller):
+        self.bucket = bucket
+        self.controller = controller
+        self.requests = 0
+        self.overloads = 0
+        self.waited = 0.0
+
+
+class HostRateLimiter:
+    """按主机的令牌桶 + AIMD 并发控制"""
+
+    def __init__(self, rate=1.0, burst=1, adaptive=True, initial_concurrency=2, min_concurrency=1,
+                 max_concurrency=16, latency_target=2.0, decrease_factor=0.5):
+        self.rate = rate
+        self.burst = burst
+        self.adaptive = adaptive
+        self.initial_concurrency = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    @classmethod
+    def from_config(cls, config, request_delay=None):
+        """根据 RATE_LIMIT 配置创建限流器
+
+        request_delay 不为空时（同步引擎），速率取 1/REQUEST_DELAY、并发固定为1。
+        """
+        if request_delay is not None:
+            return cls(rate=1.0 / request_delay if request_delay > 0 else 0, burst=1, adaptive=False,
+                       initial_concurrency=1, min_concurrency=1, max_concurrency=1)
+        return cls(
+            rate=config.get('rate', 20.0),
+            burst=config.get('burst', 10),
+            adaptive=config.get('adaptive', True),
+            initial_concurrency=config.get('initial_concurrency', 2),
+            min_concurrency=config.get('min_concurrency', 1),
+            max_concurrency=config.get('max_concurrency', 16),
+            latency_target=config.get('latency_target', 2.0),
+            decrease_factor=config.get('decrease_factor', 0.5),
+        )
+
+    def _host(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                initial = self.initial_concurrency if self.adaptive else self.max_concurrency
+                controller = AIMDController(
+                    initial=initial,
+                    minimum=self.min_concurrency,
+                    maximum=self.max_concurrency,
+                    decrease=self.decrease_factor,
+                    latency_target=self.latency_target,
+                    adaptive=self.adaptive,
+                )
+                state = self._hosts[host] = _HostState(TokenBucket(self.rate, self.burst), controller)
+            return state
+
+    @contextmanager
+    def slot(self, url):
+        """在请求期间占用该主机的一个并发名额和一个令牌
+
+        用法:
+            with limiter.slot(url) as ticket:
+                response = session.get(url)
+                ticket.record(response.status_code)
+        """
+        state = self._host(url)
+        state.controller.acquire()
+        try:
+            waited = state.bucket.acquire()
+        except BudgetExceeded:
+            state.controller.cancel()
+            raise
+        ticket = RequestTicket()
+        overloaded = False
+        budget_cut = False
+        start = time.monotonic()
+        try:
+            yield ticket
+            overloaded = ticket.overloaded
+        except requests.Timeout:
+            # 超时时预算已用完：超时是被预算缩短的，不代表源站过载
+            remaining = _budget_remaining()
+            budget_cut = remaining is not None and remaining <= 0
+            overloaded = not budget_cut
+            raise
+        except requests.ConnectionError:
+            overloaded = True
+            raise
+        finally:
+            if budget_cut:
+                state.controller.cancel()
+            else:
+                state.controller.release(time.monotonic() - start, overloaded)
+            with self._lock:
+                state.requests += 1
+                state.overloads += overloaded
+                state.waited += waited
+
+    def stats(self):
+        """返回每个主机的限流统计"""
+        with self._lock:
+            return {
+                host: {
+                    'requests': state.requests,
+                    'overloads': state.overloads,
+                    'concurrency': round(state.controller.limit, 2),
+                    'decreases': state.controller.decreases,
+                    'waited': round(state.waited, 2),
+                }
+                for host, state in self._hosts.items()
+            }
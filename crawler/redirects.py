@@ -0,0 +1,192 @@
+"""
+重定向解析 - 跟随联盟/短链接的跳转链，记录最终落地的商家URL
+
+解析出的优惠链接经常是联盟或短链接（例如 share.octopus.energy/...），
+页面上显示的域名和 is_valid_deal_url 的判断都只看到了包装链接本身。
+这里逐跳跟随重定向，只读取响应头：
+- 使用 HEAD 请求；服务器不支持 HEAD（405/501 等）时改用 Range: bytes=0-0 的流式 GET，
+  拿到状态码和 Location 后立即关闭连接，不读取响应体
+- 最终URL按链接缓存（与真实链接缓存相同的磁盘格式，解析失败时做负缓存）
+- 按主机分组，不同主机并发解析；同一主机内顺序请求，并经过按主机限流
+只跟随 HTTP 3xx 跳转，需要执行 JavaScript 或解析 meta refresh 的跳转页保持原样。
+"""
+
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+from deadline import BudgetExceeded, clamp_timeout, current_budget, deal_budget
+from link_cache import ResolvedLinkCache
+
+REDIRECT_STATUS = frozenset((301, 302, 303, 307, 308))
+
+# final_url: 最终落地URL；hops: 跳转次数；status: 最后一跳的状态码（缓存命中或失败时为None）
+RedirectResult = namedtuple('RedirectResult', ('url', 'final_url', 'hops', 'status'))
+
+
+class RedirectResolver:
+    """用 HEAD（必要时退回 Range GET）跟随重定向链"""
+
+    def __init__(self, transport, rate_limiter=None, cache=None, max_hops=10, timeout=10, workers=8,
+                 head_fallback_status=(400, 403, 404, 405, 501)):
+        self.transport = transport
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.max_hops = max_hops
+        self.timeout = timeout
+        self.workers = max(1, workers)
+        self.head_fallback_status = frozenset(head_fallback_status)
+
+        self._lock = threading.Lock()
+        self._resolved = {}  # 本次运行中解析过的 链接 → 最终URL
+
+        self.resolved = 0
+        self.redirected = 0
+        self.cache_hits = 0
+        self.get_fallbacks = 0
+        self.too_many_hops = 0
+        self.failures = 0
+        self.requests = 0
+
+    @classmethod
+    def from_config(cls, config, transport, rate_limiter=None):
+        """根据 REDIRECTS 配置创建"""
+        cache = None
+        if config.get('cache_enabled', True):
+            cache = ResolvedLinkCache.from_config({'path': 'data/cache/final_urls.json', **config.get('cache', {})})
+        return cls(
+            transport,
+            rate_limiter=rate_limiter,
+            cache=cache,
+            max_hops=config.get('max_hops', 10),
+            timeout=config.get('timeout', 10),
+            workers=config.get('workers', 8),
+            head_fallback_status=config.get('head_fallback_status', (400, 403, 404, 405, 501)),
+        )
+
+    def final_url(self, url):
+        """已知的最终URL（只查本次结果和缓存，不发出请求），未知时返回None"""
+        with self._lock:
+            final = self._resolved.get(url)
+        if final is None and self.cache is not None:
+            final = self.cache.peek(url)
+        return final
+
+    def resolve(self, url):
+        """解析单个链接，返回 RedirectResult；请求失败时最终URL为原链接"""
+        if self.cache is not None:
+            cached = self.cache.get(url)
+            if cached is not None:
+                with self._lock:
+                    self.cache_hits += 1
+                    self._resolved[url] = cached['url']
+                return RedirectResult(url, cached['url'], None, None)
+
+        try:
+            final, hops, status = self._follow(url)
+        except (requests.RequestException, BudgetExceeded):
+            budget = current_budget()
+            with self._lock:
+                self.failures += 1
+            # 因时间预算放弃的链接不做负缓存，下次运行再试
+            if self.cache is not None and not (budget is not None and budget.exhausted):
+                self.cache.set(url, url, negative=True)
+            return RedirectResult(url, url, 0, None)
+
+        with self._lock:
+            self.resolved += 1
+            self.redirected += hops > 0
+            self._resolved[url] = final
+        if self.cache is not None:
+            self.cache.set(url, final)
+        return RedirectResult(url, final, hops, status)
+
+    def resolve_many(self, urls, time_left=None):
+        """并发解析一批链接，返回 {链接: RedirectResult}
+
+        time_left 为返回剩余秒数的函数，每组开始时以它作为该组的时间预算。
+        """
+        groups = OrderedDict()
+        for url in urls:
+            if url and url.startswith(('http://', 'https://')):
+                groups.setdefault(urlparse(url).netloc.lower(), OrderedDict())[url] = None
+        if not groups:
+            return {}
+
+        def run_group(group):
+            budget = deal_budget(time_left()) if time_left is not None else nullcontext()
+            with budget:
+                return [(url, self.resolve(url)) for url in group]
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(groups)), thread_name_prefix='redirects') as executor:
+            for pairs in executor.map(run_group, groups.values()):
+                results.update(pairs)
+        return results
+
+    def _follow(self, url):
+        """逐跳请求，返回 (最终URL, 跳转次数, 最后一跳的状态码)"""
+        current = url
+        seen = {url}
+        status = None
+        for hop in range(self.max_hops + 1):
+            response = self._probe(current)
+            status = response.status_code
+            location = response.headers.get('Location')
+            if status not in REDIRECT_STATUS or not location:
+                return current, hop, status
+            next_url = urljoin(current, location.strip())
+            # 跳回已访问过的地址（设置 Cookie 后跳回等）或非HTTP地址时停在当前URL
+            if next_url in seen or not next_url.startswith(('http://', 'https://')):
+                return current, hop, status
+            if hop == self.max_hops:
+                break  # 跳转次数用完：停在最后一个实际请求过的URL
+            seen.add(next_url)
+            current = next_url
+        with self._lock:
+            self.too_many_hops += 1
+        return current, self.max_hops, status
+
+    def _probe(self, url):
+        response = self._request('HEAD', url)
+        if response.status_code in self.head_fallback_status:
+            # 部分服务器不支持 HEAD：只请求第一个字节，读到响应头即关闭连接
+            with self._lock:
+                self.get_fallbacks += 1
+            response = self._request('GET', url, headers={'Range': 'bytes=0-0'})
+        return response
+
+    def _request(self, method, url, headers=None):
+        slot = self.rate_limiter.slot(url) if self.rate_limiter is not None else nullcontext()
+        with slot as ticket:
+            response = self.transport.request(
+                method, url, timeout=clamp_timeout(self.timeout), headers=headers,
+                stream=True, allow_redirects=False,
+            )
+            response.close()
+            if ticket is not None:
+                ticket.record(response.status_code)
+        with self._lock:
+            self.requests += 1
+        return response
+
+    def save(self):
+        if self.cache is not None:
+            self.cache.save()
+
+    def stats(self):
+        """返回解析统计"""
+        with self._lock:
+            return {
+                'resolved': self.resolved,
+                'redirected': self.redirected,
+                'cache_hits': self.cache_hits,
+                'requests': self.requests,
+                'get_fallbacks': self.get_fallbacks,
+                'too_many_hops': self.too_many_hops,
+                'failures': self.failures,
+            }
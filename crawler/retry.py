@@ -0,0 +1,171 @@
+"""
+重试与熔断 - 指数退避（带抖动、遵守 Retry-After）和按主机的熔断器
+
+原先 get_page_content 只请求一次，任何异常都直接返回 None：
+一次偶发失败就丢掉一个优惠，源站宕机时每个优惠都要等满超时。
+- RetryPolicy: 对超时、连接错误、429 和 5xx 重试，等待时间指数增长并加入随机抖动，
+  响应带 Retry-After 时以它为准（超过上限则直接放弃）
+- CircuitBreaker: 同一主机连续失败达到阈值后熔断，之后的请求立即失败；
+  冷却时间过后进入半开状态，只放行一个探测请求，成功则恢复
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(Exception):
+    """主机处于熔断状态，请求未发出"""
+
+
+def parse_retry_after(value):
+    """解析 Retry-After 头（秒数或 HTTP 日期），返回秒数或 None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """指数退避 + 全抖动的重试策略"""
+
+    def __init__(self, max_retries=3, backoff_base=0.5, backoff_max=30.0, max_retry_after=60.0,
+                 retry_statuses=RETRY_STATUSES):
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retry_after = max_retry_after
+        self.retry_statuses = tuple(retry_statuses)
+
+    @classmethod
+    def from_config(cls, config, max_retries=3):
+        """根据 RETRY 配置创建重试策略（重试次数来自 REAL_LINK_EXTRACTION['max_retries']）"""
+        return cls(
+            max_retries=max_retries,
+            backoff_base=config.get('backoff_base', 0.5),
+            backoff_max=config.get('backoff_max', 30.0),
+            max_retry_after=config.get('max_retry_after', 60.0),
+            retry_statuses=config.get('retry_statuses', RETRY_STATUSES),
+        )
+
+    def is_retryable(self, error):
+        """超时、连接错误和可重试的状态码"""
+        if isinstance(error, (requests.Timeout, requests.ConnectionError)):
+            return True
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            return error.response.status_code in self.retry_statuses
+        return False
+
+    def delay(self, attempt, error=None):
+        """第 attempt 次重试前的等待秒数；Retry-After 超过上限时返回 None 表示放弃"""
+        response = getattr(error, 'response', None)
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                return retry_after if retry_after <= self.max_retry_after else None
+        # 全抖动：在 [0, base * 2^attempt] 中随机取值，避免并发请求同时重试
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """按主机的熔断器：closed → open → half-open → closed"""
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._hosts = {}  # host → {'state', 'failures', 'opened', 'probing'}
+        self.rejected = 0
+        self.trips = 0
+
+    @classmethod
+    def from_config(cls, config):
+        """根据 CIRCUIT_BREAKER 配置创建熔断器"""
+        return cls(
+            failure_threshold=config.get('failure_threshold', 5),
+            reset_timeout=config.get('reset_timeout', 30.0),
+        )
+
+    @staticmethod
+    def _key(url):
+        return urlparse(url).netloc.lower()
+
+    def _state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = {'state': self.CLOSED, 'failures': 0, 'opened': 0.0, 'probing': False}
+        return state
+
+    def allow(self, url):
+        """是否允许向该主机发出请求"""
+        with self._lock:
+            state = self._state(self._key(url))
+            if state['state'] == self.OPEN:
+                if time.monotonic() - state['opened'] < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                state['state'] = self.HALF_OPEN
+                state['probing'] = False
+            if state['state'] == self.HALF_OPEN:
+                # 半开状态只放行一个探测请求
+                if state['probing']:
+                    self.rejected += 1
+                    return False
+                state['probing'] = True
+            return True
+
+    def record_success(self, url):
+        with self._lock:
+            state = self._state(self._key(url))
+            state.update(state=self.CLOSED, failures=0, probing=False)
+
+    def record_failure(self, url):
+        with self._lock:
+            state = self._state(self._key(url))
+            state['failures'] += 1
+            state['probing'] = False
+            if state['state'] == self.HALF_OPEN or state['failures'] >= self.failure_threshold:
+                self._open(state)
+
+    def release(self, url, failed=False):
+        """结束一次没有记录成功或失败的请求
+
+        只影响半开状态下的探测请求：failed 为 True（可重试的错误，调用方稍后会重试）时重新熔断；
+        结果未知（预算耗尽、非HTTP的其他错误）时释放探测名额，下一个请求重新探测。
+        否则探测名额一直被占用，该主机之后的请求全部被拒绝。
+        """
+        with self._lock:
+            state = self._state(self._key(url))
+            if state['state'] != self.HALF_OPEN:
+                return
+            state['probing'] = False
+            if failed:
+                self._open(state)
+
+    def _open(self, state):
+        if state['state'] != self.OPEN:
+            self.trips += 1
+        state['state'] = self.OPEN
+        state['opened'] = time.monotonic()
+
+    def stats(self):
+        """返回熔断统计"""
+        with self._lock:
+            return {
+                'trips': self.trips,
+                'rejected': self.rejected,
+                'open_hosts': [host for host, s in self._hosts.items() if s['state'] != self.CLOSED],
+            }
@@ -0,0 +1,101 @@
+"""
+已处理优惠集合 - 增量爬取使用的持久化 detail_url 指纹集合
+
+每个规范化后的详情页URL只保存 8 字节的 BLAKE2b 指纹（按写入顺序的二进制文件），
+十万条记录约 800KB，查询是内存中的哈希集合查找。
+增量模式下列表页按从新到旧遍历，遇到已处理过的优惠即停止，
+稳定状态下一次运行只需要少量请求。
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from url_classifier import canonicalize_url
+
+DIGEST_SIZE = 8
+
+
+class SeenDealStore:
+    """规范化 detail_url 的紧凑指纹集合，超出容量时淘汰最早写入的记录"""
+
+    def __init__(self, path, max_entries=100000):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._digests = OrderedDict()  # 指纹 → None，按写入顺序排列
+        self._dirty = False
+        self.added = 0
+        self.load()
+
+    @classmethod
+    def from_config(cls, config):
+        """根据 INCREMENTAL 配置创建集合"""
+        return cls(
+            config.get('path', 'data/cache/seen_deals.bin'),
+            max_entries=config.get('max_entries', 100000),
+        )
+
+    @staticmethod
+    def fingerprint(url):
+        canonical = canonicalize_url(url)
+        return hashlib.blake2b(canonical.encode('utf-8'), digest_size=DIGEST_SIZE).digest()
+
+    def load(self):
+        """从磁盘加载指纹"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            self.logger.warning(f"读取已处理优惠集合失败，将重新建立: {e}")
+            return
+        usable = len(data) - len(data) % DIGEST_SIZE
+        for offset in range(0, usable, DIGEST_SIZE):
+            self._digests[data[offset:offset + DIGEST_SIZE]] = None
+
+    def __len__(self):
+        return len(self._digests)
+
+    def __contains__(self, url):
+        if not url:
+            return False
+        digest = self.fingerprint(url)
+        with self._lock:
+            return digest in self._digests
+
+    def add(self, url):
+        if not url:
+            return
+        digest = self.fingerprint(url)
+        with self._lock:
+            if digest in self._digests:
+                return
+            self._digests[digest] = None
+            self.added += 1
+            while len(self._digests) > self.max_entries:
+                self._digests.popitem(last=False)
+            self._dirty = True
+
+    def save(self):
+        """原子写入磁盘（仅在有变化时）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = b''.join(self._digests)
+            self._dirty = False
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.logger.warning(f"保存已处理优惠集合失败: {e}")
@@ -0,0 +1,196 @@
+"""
+流式抓取 - 边下载边查找链接，找到后立即断开连接
+
+GET FREEBIE 按钮和申请页中的商家链接通常位于正文靠前的位置，
+而 response.text 要等整页下载完才能开始匹配。这里按块读取响应体并增量解码，
+每读到一块就在新内容上查找停止规则；一旦找到高优先级链接就关闭连接，
+同时用 max_bytes 限制单个页面的下载量。
+
+返回的 StreamedPage 是 str 的子类，可以直接交给现有的解析逻辑，
+并通过 stopped / truncated 标记说明页面是否完整。
+resumable=True 时提前停止的页面保留已缓冲的内容和仍然打开的连接：
+需要整页时 resume() 从断开处继续读取同一个响应，不再重新请求；不需要时必须 close()。
+"""
+
+import codecs
+import threading
+
+from charset import sniff_encoding
+
+
+class StreamedPage(str):
+    """流式读取得到的页面文本（可能只是页面开头的一部分）"""
+
+    stopped = False      # 找到停止规则的匹配后提前断开
+    truncated = False    # 达到 max_bytes 上限后断开
+    bytes_read = 0
+    encoding = None      # 解码使用的编码
+    _reader = None       # 可继续读取时的 _StreamReader
+
+    @classmethod
+    def build(cls, text, stopped=False, truncated=False, bytes_read=0):
+        page = cls(text)
+        page.stopped = stopped
+        page.truncated = truncated
+        page.bytes_read = bytes_read
+        return page
+
+    @property
+    def complete(self):
+        return not (self.stopped or self.truncated)
+
+    def resume(self):
+        """继续读取同一个响应的剩余部分，返回读到结尾（或 max_bytes）的页面
+
+        没有可继续的读取（不是提前停止的页面、连接已关闭或读取出错）时返回None。
+        """
+        return self._reader.finish() if self._reader is not None else None
+
+    def close(self):
+        """不再需要剩余部分时关闭连接"""
+        if self._reader is not None:
+            self._reader.close()
+
+
+class LinkWatcher:
+    """在增量到达的文本上查找第一条被接受的规则匹配
+
+    regex 的第一个分组为链接；accept 为空时任何匹配都会停止读取。
+    每次只从新内容前 overlap 个字符处开始查找，跨块的匹配也能被发现。
+    """
+
+    def __init__(self, regex, accept=None, overlap=4096):
+        self.regex = regex
+        self.accept = accept
+        self.overlap = overlap
+
+    def __call__(self, text, start):
+        for match in self.regex.finditer(text, max(0, start - self.overlap)):
+            url = match.group(1) if self.regex.groups else match.group(0)
+            if self.accept is None or self.accept(url):
+                return True
+        return False
+
+
+class StreamStats:
+    """流式抓取统计（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.stopped = 0
+        self.truncated = 0
+        self.bytes_read = 0
+
+    def record(self, page):
+        with self._lock:
+            self.pages += 1
+            self.stopped += page.stopped
+            self.truncated += page.truncated
+            self.bytes_read += page.bytes_read
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pages': self.pages,
+                'stopped_early': self.stopped,
+                'truncated': self.truncated,
+                'bytes_read': self.bytes_read,
+            }
+
+
+class _StreamReader:
+    """按块读取响应并增量解码；提前停止后可以从断开处继续读取（线程安全，剩余部分只读取一次）"""
+
+    def __init__(self, response, max_bytes, chunk_size):
+        self.response = response
+        self.max_bytes = max_bytes
+        self._chunks = response.iter_content(chunk_size)
+        self._decoder = None
+        self.encoding = None
+        self.parts = []
+        self.text = ''
+        self.size = 0
+        self.truncated = False
+        self.on_complete = None   # 继续读取到结尾后调用 on_complete(page, body)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._result = None
+
+    def read(self, watcher=None):
+        """读取到 watcher 返回True、达到 max_bytes 或响应结束；返回是否因 watcher 停止"""
+        for chunk in self._chunks:
+            if not chunk:
+                continue
+            if self.max_bytes and self.size + len(chunk) > self.max_bytes:
+                chunk = chunk[:self.max_bytes - self.size]
+                self.truncated = True
+            self.size += len(chunk)
+            self.parts.append(chunk)
+            if self._decoder is None:
+                # 编码由响应头、BOM或第一块中的 <meta charset> 确定，未声明时按UTF-8
+                self.encoding = sniff_encoding(chunk, self.response.headers.get('Content-Type')) or 'utf-8'
+                self._decoder = codecs.getincrementaldecoder(self.encoding)(errors='replace')
+                if self.encoding.startswith('utf-8'):
+                    chunk = chunk[len(codecs.BOM_UTF8):] if chunk.startswith(codecs.BOM_UTF8) else chunk
+            start = len(self.text)
+            self.text += self._decoder.decode(chunk)
+            if watcher is not None and watcher(self.text, start):
+                return True
+            if self.truncated:
+                return False
+        if self._decoder is not None:
+            self.text += self._decoder.decode(b'', final=True)
+        return False
+
+    def page(self, stopped=False):
+        """当前已读取内容的页面，以及完整读取时的原始字节"""
+        page = StreamedPage.build(self.text, stopped=stopped, truncated=self.truncated, bytes_read=self.size)
+        page.encoding = self.encoding
+        return page, (b''.join(self.parts) if page.complete else None)
+
+    def finish(self):
+        with self._lock:
+            if self._result is None:
+                if self._closed:
+                    return None
+                try:
+                    self.read()
+                except Exception:
+                    return None
+                finally:
+                    self.close()
+                self._result, body = self.page()
+                self.parts = []
+                if body is not None and self.on_complete is not None:
+                    self.on_complete(self._result, body)
+            return self._result
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self.response.close()
+
+
+def read_stream(response, watcher=None, max_bytes=2 * 1024 * 1024, chunk_size=16384, resumable=False,
+                on_complete=None):
+    """按块读取 stream=True 的响应，返回 (StreamedPage, 完整响应体或None)
+
+    watcher(text, start) 返回True时停止读取。resumable 为False时读取结束后连接总是被关闭；
+    为True时提前停止的页面保持连接打开，由调用方 resume() 或 close()，
+    resume() 读取到结尾后调用 on_complete(完整页面, 原始字节)。
+    只有完整读取时才返回原始字节，供HTTP缓存保存。
+    """
+    reader = _StreamReader(response, max_bytes, chunk_size)
+    reader.on_complete = on_complete
+    stopped = False
+    try:
+        stopped = reader.read(watcher)
+    finally:
+        if not (resumable and stopped):
+            reader.close()
+
+    page, body = reader.page(stopped)
+    if resumable and stopped:
+        page._reader = reader
+    return page, body
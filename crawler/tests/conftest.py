@@ -0,0 +1,25 @@
+import os
+import sys
+import time
+
+import pytest
+
+# 爬虫模块之间按顶层模块名互相导入（与直接运行 enhanced_crawler.py 时相同）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Clock:
+    """可手动推进的 time.time()，用于测试TTL"""
+
+    def __init__(self):
+        self.now = time.time()
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, 'time', lambda: clock.now)
+    return clock
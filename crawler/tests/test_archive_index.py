@@ -0,0 +1,127 @@
+import os
+
+import pytest
+
+from archive_index import INDEX_NAME, ArchiveIndex, deal_hash
+from compaction import SnapshotArchive
+from deal_stream import write_deals
+
+DETAIL = 'https://www.latestfreestuff.co.uk/free-stuff/{}/'
+
+
+def deal(slug, run):
+    return {'title': f'Free {slug}', 'source_url': DETAIL.format(slug), 'run': run}
+
+
+def write_run(data_dir, run, slugs):
+    """写入第 run 次运行的 JSONL 归档，返回其中的优惠"""
+    deals = [deal(slug, run) for slug in slugs]
+    write_deals(os.path.join(data_dir, f'enhanced_deals_20250101_{run:06d}.jsonl'), deals)
+    return deals
+
+
+def run_name(run):
+    return f'enhanced_deals_20250101_{run:06d}.jsonl'
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    path = tmp_path / 'data'
+    path.mkdir()
+    return str(path)
+
+
+def test_find_and_first_seen_in_run_order(data_dir):
+    write_run(data_dir, 2, ['tea', 'coffee'])
+    write_run(data_dir, 1, ['coffee'])
+    write_run(data_dir, 3, ['socks'])
+    with ArchiveIndex(data_dir) as index:
+        assert index.refresh() == 3
+        # 查询按规范化URL匹配，结果按运行时间先后排列
+        found = index.find('https://latestfreestuff.co.uk/free-stuff/coffee?utm_source=x')
+        assert [(name, d['run']) for name, d in found] == [(run_name(1), 1), (run_name(2), 2)]
+        assert index.first_seen(DETAIL.format('tea')) == (run_name(2), deal('tea', 2))
+        assert index.first_seen(DETAIL.format('gloves')) is None
+        assert index.stats() == {'archives': 3, 'records': 8}
+
+
+def test_get_by_deal_hash_returns_earliest_copy(data_dir):
+    write_run(data_dir, 1, ['coffee'])
+    with open(os.path.join(data_dir, run_name(2)), 'w', encoding='utf-8') as f:
+        # 字段顺序和空白不同、内容相同的优惠
+        f.write('{"run": 1,  "source_url": "%s", "title": "Free coffee"}\n' % DETAIL.format('coffee'))
+    with ArchiveIndex(data_dir) as index:
+        index.refresh()
+        assert index.get(deal_hash(deal('coffee', 1))) == deal('coffee', 1)
+        assert len(index.locate(bytes.fromhex(deal_hash(deal('coffee', 1))))) == 2
+        assert index.get(deal_hash(deal('coffee', 99))) is None
+
+
+def test_refresh_only_rescans_new_or_changed_archives(data_dir):
+    write_run(data_dir, 1, ['coffee'])
+    write_run(data_dir, 2, ['tea'])
+    with ArchiveIndex(data_dir) as index:
+        assert index.refresh() == 2
+        assert index.refresh() == 0
+
+        write_run(data_dir, 3, ['socks'])
+        assert index.refresh() == 1
+        write_run(data_dir, 2, ['tea', 'coffee'])      # 大小变化的归档重新扫描
+        assert index.refresh() == 1
+        assert [name for name, _ in index.find(DETAIL.format('coffee'))] == [run_name(1), run_name(2)]
+
+        os.remove(os.path.join(data_dir, run_name(1)))   # 已删除（且未归档）的运行从索引中移除
+        assert index.refresh() == 0
+        assert index.first_seen(DETAIL.format('coffee'))[0] == run_name(2)
+        assert index.stats()['archives'] == 2
+
+
+def test_index_is_reused_across_instances_and_rebuilt_when_corrupt(data_dir):
+    write_run(data_dir, 1, ['coffee'])
+    with ArchiveIndex(data_dir) as index:
+        index.refresh()
+    with ArchiveIndex(data_dir) as index:
+        assert index.first_seen(DETAIL.format('coffee'))[0] == run_name(1)   # 不需要 refresh
+        assert index.refresh() == 0
+
+    with open(os.path.join(data_dir, INDEX_NAME), 'wb') as f:
+        f.write(b'garbage')
+    with ArchiveIndex(data_dir) as index:
+        assert index.refresh() == 1
+        assert index.first_seen(DETAIL.format('coffee'))[0] == run_name(1)
+
+
+def test_skips_invalid_lines_and_other_snapshots(data_dir):
+    with open(os.path.join(data_dir, run_name(1)), 'w', encoding='utf-8') as f:
+        f.write('not json\n[1, 2]\n\n{"title": "Free coffee", "detail_url": "%s"}\n' % DETAIL.format('coffee'))
+    with open(os.path.join(data_dir, 'enhanced_deals_20250101_000002.json'), 'w', encoding='utf-8') as f:
+        f.write('[]')
+    with ArchiveIndex(data_dir) as index:
+        index.refresh()
+        assert index.stats() == {'archives': 1, 'records': 2}
+        assert index.first_seen(DETAIL.format('coffee'))[1]['title'] == 'Free coffee'
+
+
+def test_compacted_runs_stay_queryable(data_dir):
+    for run in range(1, 5):
+        write_run(data_dir, run, ['coffee', f'item-{run}'])
+    archive_dir = os.path.join(data_dir, 'archive')
+    with ArchiveIndex(data_dir, archive_dir=archive_dir) as index:
+        index.refresh()
+        before = index.find(DETAIL.format('coffee'))
+
+    with SnapshotArchive(archive_dir, codec='gzip') as archive:
+        archive.compact(data_dir, keep=1)
+    assert not os.path.exists(os.path.join(data_dir, run_name(1)))
+
+    with ArchiveIndex(data_dir, archive_dir=archive_dir) as index:
+        assert index.refresh() == 0                 # 被压缩的运行沿用原有记录
+        assert index.find(DETAIL.format('coffee')) == before
+        assert index.first_seen(DETAIL.format('item-1')) == (run_name(1), deal('item-1', 1))
+        assert index.get(deal_hash(deal('item-2', 2))) == deal('item-2', 2)
+        assert index.stats() == {'archives': 4, 'records': 16}
+
+    # 没有归档目录时，压缩掉的运行被跳过
+    with ArchiveIndex(data_dir) as index:
+        assert [name for name, _ in index.find(DETAIL.format('coffee'))] == [run_name(4)]
+        assert index.get(deal_hash(deal('item-2', 2))) is None
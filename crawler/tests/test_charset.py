@@ -0,0 +1,75 @@
+import codecs
+
+import pytest
+
+from charset import bom_encoding, decode_html, decode_response, header_encoding, meta_encoding, sniff_encoding
+
+TEXT = 'Café – £5 off'
+META_LATIN1 = b'<html><head><meta charset="iso-8859-1"></head><body>'
+META_HTTP_EQUIV = b'<meta http-equiv="Content-Type" content="text/html; charset=windows-1252">'
+
+
+@pytest.mark.parametrize('body, content_type, expected', [
+    # 响应头优先于 BOM 和 meta
+    (codecs.BOM_UTF8 + META_LATIN1, 'text/html; charset=cp1252', 'cp1252'),
+    (META_LATIN1, 'text/html; charset="UTF-8"', 'utf-8'),
+    # 响应头没有 charset：BOM 优先于 meta
+    (codecs.BOM_UTF8 + META_LATIN1, 'text/html', 'utf-8'),
+    (codecs.BOM_UTF16_LE + 'x'.encode('utf-16-le'), None, 'utf-16-le'),
+    # 没有 BOM：使用 meta
+    (META_LATIN1, 'text/html', 'iso8859-1'),
+    (META_HTTP_EQUIV, None, 'cp1252'),
+    # 响应头中无法识别的 charset 被忽略
+    (META_LATIN1, 'text/html; charset=bogus', 'iso8859-1'),
+    # 都没有声明
+    (b'<html><body>plain</body></html>', 'text/html', None),
+])
+def test_sniff_encoding_precedence(body, content_type, expected):
+    assert sniff_encoding(body, content_type) == expected
+
+
+def test_text_html_without_charset_is_not_latin1():
+    assert header_encoding('text/html') is None
+    body = f'<p>{TEXT}</p>'.encode('utf-8')
+    assert decode_html(body, 'text/html') == (f'<p>{TEXT}</p>', 'utf-8')
+
+
+def test_header_charset_decodes_against_meta():
+    body = b'<meta charset="utf-8"><p>' + TEXT.encode('cp1252') + b'</p>'
+    text, encoding = decode_html(body, 'text/html; charset=windows-1252')
+    assert encoding == 'cp1252' and TEXT in text
+
+
+def test_bom_is_stripped_when_it_decides_the_encoding():
+    body = codecs.BOM_UTF8 + META_LATIN1 + TEXT.encode('utf-8')
+    text, encoding = decode_html(body)
+    assert encoding == 'utf-8'
+    assert text.startswith('<html>') and text.endswith(TEXT)
+
+
+def test_meta_declaring_utf16_is_treated_as_utf8():
+    assert meta_encoding(b'<meta charset="utf-16">') == 'utf-8'
+    assert bom_encoding(b'<meta charset="utf-16">') == (None, 0)
+
+
+def test_meta_outside_scan_window_is_ignored():
+    body = b' ' * 5000 + META_LATIN1
+    assert meta_encoding(body) is None
+    assert meta_encoding(body, scan_bytes=len(body)) == 'iso8859-1'
+
+
+def test_undeclared_non_utf8_falls_back_to_detection():
+    body = ('<p>' + TEXT * 20 + '</p>').encode('cp1252')
+    text, encoding = decode_html(body)
+    # 严格的 UTF-8 解码失败后才运行检测；检测结果是近似的，只要求能完整解码
+    assert encoding != 'utf-8'
+    assert '\ufffd' not in text and text.startswith('<p>Caf')
+
+
+def test_decode_response_reads_content_type_header():
+    class Response:
+        content = META_LATIN1 + 'Café'.encode('iso8859-1')
+        headers = {'Content-Type': 'text/html'}
+
+    text, encoding = decode_response(Response())
+    assert encoding == 'iso8859-1' and text.endswith('Café')
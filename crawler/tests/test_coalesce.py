@@ -0,0 +1,86 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from coalesce import RequestCoalescer
+
+URL = 'https://www.latestfreestuff.co.uk/claim/coffee/'
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, '等待超时'
+        time.sleep(0.001)
+
+
+def test_concurrent_callers_share_one_fetch():
+    coalescer = RequestCoalescer()
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(threading.current_thread().name)
+        release.wait(5)
+        return '<html>claim</html>'
+
+    callers = 16
+    with ThreadPoolExecutor(max_workers=callers) as executor:
+        # 同一页面的不同写法（主机名大小写、跟踪参数、末尾斜杠）合并为同一个请求
+        urls = [URL, URL.replace('www.latestfreestuff', 'WWW.LatestFreeStuff'), URL + '?utm_source=x', URL.rstrip('/')]
+        futures = [executor.submit(coalescer.fetch, urls[i % len(urls)], loader) for i in range(callers)]
+        # 所有调用者都已到达：一个在请求，其余在等待同一个结果
+        wait_until(lambda: coalescer.requests == callers)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert results == ['<html>claim</html>'] * callers
+    assert len(calls) == 1
+    stats = coalescer.stats()
+    assert stats['fetches'] == 1 and stats['coalesced'] == callers - 1
+
+    # 之后的调用者直接使用本次运行内缓存的页面
+    assert coalescer.fetch(URL, loader) == '<html>claim</html>'
+    assert len(calls) == 1 and coalescer.stats()['memo_hits'] == 1
+
+
+def test_failure_is_shared_by_waiters_but_not_cached():
+    coalescer = RequestCoalescer()
+    release = threading.Event()
+    attempts = []
+
+    def failing_loader():
+        attempts.append(1)
+        release.wait(5)
+        raise ConnectionError('boom')
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(coalescer.fetch, URL, failing_loader) for _ in range(4)]
+        wait_until(lambda: coalescer.requests == 4)
+        release.set()
+        for future in futures:
+            with pytest.raises(ConnectionError):
+                future.result()
+    assert len(attempts) == 1
+
+    assert coalescer.fetch(URL, lambda: 'retried') == 'retried'
+    assert coalescer.stats()['fetches'] == 2
+
+
+def test_variants_are_fetched_separately():
+    coalescer = RequestCoalescer()
+    assert coalescer.fetch(URL, lambda: 'head', variant='stream') == 'head'
+    assert coalescer.fetch(URL, lambda: 'full') == 'full'
+    assert coalescer.fetch(URL, lambda: 'again', variant='stream') == 'head'
+    assert coalescer.stats()['fetches'] == 2
+
+
+def test_evicted_page_is_fetched_again():
+    coalescer = RequestCoalescer(max_bytes=10)
+    coalescer.fetch('https://shop.example/a', lambda: 'a' * 8)
+    coalescer.fetch('https://shop.example/b', lambda: 'b' * 8)   # 超出上限，淘汰 a
+    assert coalescer.fetch('https://shop.example/a', lambda: 'A' * 8) == 'A' * 8
+    stats = coalescer.stats()
+    assert stats['evictions'] == 2 and stats['refetches'] == 1 and stats['unique_urls'] == 2
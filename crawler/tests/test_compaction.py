@@ -0,0 +1,142 @@
+import json
+import os
+
+import pytest
+
+from archive_index import ArchiveIndex
+from compaction import BACKUP_NAME, SnapshotArchive
+from deal_stream import write_deals
+
+
+def make_runs(data_dir, count, deals_per_run=5):
+    """按时间顺序生成 count 次运行（相邻运行有重复的优惠），返回 {文件名: 内容}"""
+    originals = {}
+    for run in range(count):
+        stamp = f'20250101_{run:06d}'
+        deals = [{'title': f'Free sample {k}', 'source_url': f'https://www.latestfreestuff.co.uk/free-stuff/deal-{k}/'}
+                 for k in range(run, run + deals_per_run)]
+        if run % 2:
+            write_deals(os.path.join(data_dir, f'enhanced_deals_{stamp}.jsonl'), deals)
+        else:
+            with open(os.path.join(data_dir, f'enhanced_deals_{stamp}.json'), 'w', encoding='utf-8') as f:
+                json.dump(deals, f, ensure_ascii=False, indent=2)
+        with open(os.path.join(data_dir, f'enhanced_deals_{stamp}.html'), 'w', encoding='utf-8') as f:
+            f.write(f'<html>{run % 2}</html>')
+    for name in os.listdir(data_dir):
+        with open(os.path.join(data_dir, name), 'rb') as f:
+            originals[name] = f.read()
+    return originals
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    path = tmp_path / 'data'
+    path.mkdir()
+    return str(path)
+
+
+def test_compact_keeps_recent_runs_and_restores_every_file(data_dir, tmp_path):
+    originals = make_runs(data_dir, 6)
+    with SnapshotArchive(os.path.join(data_dir, 'archive'), codec='gzip') as archive:
+        result = archive.compact(data_dir, keep=2)
+        assert result['runs'] == 4 and result['files'] == 8
+        # 归档的 4 次运行共 20 条记录、8 个不同的优惠；2 种 HTML 内容各只存一份
+        assert result['records'] == 20
+        assert result['new_records'] == 8 and result['new_objects'] == 2
+
+        remaining = sorted(n for n in os.listdir(data_dir) if n.startswith('enhanced_deals_'))
+        assert remaining == sorted(n for n in originals if n[15:30] >= '20250101_000004')
+
+        restore_dir = tmp_path / 'restored'
+        for name in originals:
+            if name not in remaining:
+                archive.restore(name, str(restore_dir))
+                assert (restore_dir / name).read_bytes() == originals[name]
+
+
+def test_restore_by_stamp_and_unknown_name(data_dir, tmp_path):
+    make_runs(data_dir, 3)
+    with SnapshotArchive(os.path.join(data_dir, 'archive'), codec='gzip') as archive:
+        archive.compact(data_dir, keep=1)
+        restored = archive.restore('20250101_000001', str(tmp_path))
+        assert sorted(os.path.basename(p) for p in restored) == [
+            'enhanced_deals_20250101_000001.html', 'enhanced_deals_20250101_000001.jsonl']
+        assert archive.restore('20990101_000000', str(tmp_path)) == []
+        assert archive.read('missing.jsonl') is None
+
+
+def test_restored_run_is_not_deleted_again(data_dir):
+    originals = make_runs(data_dir, 4)
+    name = 'enhanced_deals_20250101_000000.json'
+    with SnapshotArchive(os.path.join(data_dir, 'archive'), codec='gzip') as archive:
+        archive.compact(data_dir, keep=1)
+        archive.restore(name, data_dir)
+        result = archive.compact(data_dir, keep=1)
+        assert result['skipped'] == 1 and result['files'] == 0
+    with open(os.path.join(data_dir, name), 'rb') as f:
+        assert f.read() == originals[name]
+
+
+def test_backups_are_stored_once(tmp_path):
+    backups = tmp_path / 'backups'
+    backups.mkdir()
+    for i in range(5):
+        (backups / f'index_backup_20250101_00000{i}.html').write_text('<html>same</html>')
+    with SnapshotArchive(str(backups / 'archive'), codec='gzip') as archive:
+        result = archive.compact(str(backups), keep=1, pattern=BACKUP_NAME)
+        assert result['files'] == 4 and result['new_objects'] == 1
+        assert archive.stats()['objects'] == 1
+
+
+def test_archive_index_covers_compacted_runs(data_dir):
+    make_runs(data_dir, 6)
+    archive_dir = os.path.join(data_dir, 'archive')
+    url = 'https://www.latestfreestuff.co.uk/free-stuff/deal-3/?utm_source=x'
+
+    with ArchiveIndex(data_dir, archive_dir=archive_dir) as index:
+        index.refresh()
+        assert index.first_seen(url)[0] == 'enhanced_deals_20250101_000001.jsonl'
+
+    with SnapshotArchive(archive_dir, codec='gzip') as archive:
+        archive.compact(data_dir, keep=1)
+    assert not os.path.exists(os.path.join(data_dir, 'enhanced_deals_20250101_000001.jsonl'))
+
+    with ArchiveIndex(data_dir, archive_dir=archive_dir) as index:
+        assert index.refresh() == 0
+        archive_name, deal = index.first_seen(url)
+        assert archive_name == 'enhanced_deals_20250101_000001.jsonl'
+        assert deal['title'] == 'Free sample 3'
+        assert [name for name, _ in index.find(url)] == [
+            'enhanced_deals_20250101_000001.jsonl', 'enhanced_deals_20250101_000003.jsonl']
+
+
+def test_archive_index_scans_runs_archived_before_indexing(data_dir):
+    make_runs(data_dir, 4)
+    archive_dir = os.path.join(data_dir, 'archive')
+    with SnapshotArchive(archive_dir, codec='gzip') as archive:
+        archive.compact(data_dir, keep=1)
+
+    with ArchiveIndex(data_dir, archive_dir=archive_dir) as index:
+        assert index.refresh() == 2
+        assert index.first_seen('https://www.latestfreestuff.co.uk/free-stuff/deal-2/')[0] == \
+            'enhanced_deals_20250101_000001.jsonl'
+    # 不传 archive_dir 时只索引 data 目录中的文件
+    with ArchiveIndex(data_dir) as index:
+        index.refresh()
+        assert index.first_seen('https://www.latestfreestuff.co.uk/free-stuff/deal-1/') is None
+
+
+def test_index_without_archive_skips_archived_records(data_dir):
+    make_runs(data_dir, 6)
+    archive_dir = os.path.join(data_dir, 'archive')
+    url = 'https://www.latestfreestuff.co.uk/free-stuff/deal-5/'
+    with SnapshotArchive(archive_dir, codec='gzip') as archive:
+        archive.compact(data_dir, keep=1)
+    with ArchiveIndex(data_dir, archive_dir=archive_dir) as index:
+        index.refresh()
+        assert len(index.find(url)) == 3
+
+    # 索引里有指向归档的记录，但这里读不到归档：跳过而不是报错
+    with ArchiveIndex(data_dir) as index:
+        assert index.first_seen(url)[0] == 'enhanced_deals_20250101_000005.jsonl'
+        assert [name for name, _ in index.find(url)] == ['enhanced_deals_20250101_000005.jsonl']
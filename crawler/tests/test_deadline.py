@@ -0,0 +1,131 @@
+import logging
+import time
+
+import pytest
+
+import enhanced_crawler
+from coalesce import RequestCoalescer
+from deadline import BudgetExceeded, Deadline, DeadlineStats, clamp_timeout, current_budget, deal_budget
+from extraction import LinkExtractor
+from link_cache import ResolvedLinkCache
+from link_index import LinkRuleSet
+from url_classifier import URLClassifier
+
+DETAIL = 'https://www.latestfreestuff.co.uk/free-stuff/deal-1/'
+CLAIM = 'https://www.latestfreestuff.co.uk/claim/deal-1/'
+MERCHANT = 'https://merchant1.co.uk/free-sample'
+
+PAGES = {
+    DETAIL: f'<html><a class="btn" href="{CLAIM}">GET FREEBIE</a></html>',
+    CLAIM: f'<html><a href="{MERCHANT}">go</a></html>',
+}
+
+
+@pytest.fixture
+def crawler(tmp_path, monkeypatch):
+    """带真实预算、请求合并和链接解析流程的爬虫实例；页面请求在 delays 指定的秒数后返回"""
+    monkeypatch.setitem(enhanced_crawler.DEADLINES, 'deal_seconds', 0.2)
+    monkeypatch.setitem(enhanced_crawler.DEADLINES, 'reserve_seconds', 0)
+    crawler = object.__new__(enhanced_crawler.EnhancedFreeStuffCrawler)
+    crawler.base_url = 'https://www.latestfreestuff.co.uk'
+    crawler.logger = logging.getLogger('test')
+    crawler.run_deadline = Deadline(None)
+    crawler.deadline_stats = DeadlineStats()
+    crawler.coalescer = RequestCoalescer()
+    crawler.streaming = None
+    crawler.detail_watcher = crawler.claim_watcher = None
+    crawler.link_timeout = 5
+    crawler.timeout = 5
+    crawler.url_classifier = URLClassifier.from_config(enhanced_crawler.URL_VALIDATION)
+    crawler.extractor = LinkExtractor(LinkRuleSet.from_config(enhanced_crawler.REAL_LINK_EXTRACTION),
+                                      crawler.url_classifier)
+    crawler.link_cache = ResolvedLinkCache(str(tmp_path / 'links.json'))
+    crawler.seen_deals = None
+    crawler.delays = {}
+    crawler.requested = []
+
+    def fetch(url, timeout=None, watcher=None):
+        # 与 _fetch_with_retry 相同：超时按剩余预算缩短，超时时预算已用完则抛出 BudgetExceeded
+        request_timeout = clamp_timeout(timeout)
+        crawler.requested.append(url)
+        delay = crawler.delays.get(url, 0)
+        if delay >= request_timeout:
+            time.sleep(request_timeout)
+            current_budget().exhausted = True
+            raise BudgetExceeded()
+        time.sleep(delay)
+        return PAGES.get(url)
+
+    crawler._get_page_content = fetch
+    return crawler
+
+
+def resolve(crawler):
+    return crawler.resolve_deal({'title': 'Free sample', 'description': '', 'detail_url': DETAIL})
+
+
+def test_deal_within_budget_resolves_merchant_link(crawler):
+    deal = resolve(crawler)
+    assert deal['url'] == MERCHANT and deal['source_url'] == DETAIL
+    assert crawler.deadline_stats.stats()['deals_timed_out'] == 0
+
+
+def test_budget_expiring_on_detail_page_falls_back_to_source_url(crawler):
+    crawler.delays[DETAIL] = 10
+    start = time.monotonic()
+    deal = resolve(crawler)
+    assert time.monotonic() - start < 1          # 不等满 5 秒的请求超时
+    assert deal['url'] == deal['source_url'] == DETAIL
+    stats = crawler.deadline_stats.stats()
+    assert stats['deals_timed_out'] == 1 and stats['requests_cut'] == 1
+    assert crawler.link_cache.peek(DETAIL) is None
+
+
+def test_budget_used_up_before_claim_page_is_not_cached(crawler):
+    crawler.delays[DETAIL] = 0.19   # 详情页用掉几乎全部预算，申请页请求等不到响应
+    crawler.delays[CLAIM] = 1
+    deal = resolve(crawler)
+    assert deal['url'] == CLAIM                  # 目前找到的最佳链接
+    assert crawler.deadline_stats.stats()['deals_timed_out'] == 1
+    assert crawler.link_cache.peek(DETAIL) is None
+
+    # 下一次运行（预算充足）重新解析并得到商家链接
+    crawler.coalescer = RequestCoalescer()
+    crawler.delays.clear()
+    assert resolve(crawler)['url'] == MERCHANT
+
+
+def test_run_deadline_reached_skips_requests(crawler):
+    crawler.run_deadline = Deadline(0)
+    deal = resolve(crawler)
+    assert deal['url'] == deal['source_url'] == DETAIL
+    assert crawler.requested == []
+    stats = crawler.deadline_stats.stats()
+    assert stats['deals_skipped'] == 1 and stats['requests_cut'] == 1
+
+
+def test_run_deadline_still_serves_cached_links(crawler):
+    crawler.link_cache.set(DETAIL, MERCHANT)
+    crawler.run_deadline = Deadline(0)
+    assert resolve(crawler)['url'] == MERCHANT
+    assert crawler.requested == []
+
+
+def test_deal_budget_never_exceeds_run_time_left(crawler, monkeypatch):
+    monkeypatch.setitem(enhanced_crawler.DEADLINES, 'deal_seconds', 45)
+    monkeypatch.setitem(enhanced_crawler.DEADLINES, 'reserve_seconds', 60)
+    crawler.run_deadline = Deadline(100)
+    assert 39 < crawler.deal_budget_seconds() <= 40
+    crawler.run_deadline = Deadline(30)
+    assert crawler.deal_budget_seconds() == 0
+
+
+def test_clamp_timeout_uses_remaining_budget():
+    assert clamp_timeout(5) == 5                 # 没有预算时不变
+    with deal_budget(1) as budget:
+        assert 0.9 < clamp_timeout(5) <= 1
+        assert clamp_timeout(0.5) == 0.5
+    assert not budget.exhausted
+    with deal_budget(0) as budget, pytest.raises(BudgetExceeded):
+        clamp_timeout(5)
+    assert budget.exhausted
@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+from deal_store import DealStore
+from deal_stream import write_deals
+
+DETAIL = 'https://www.latestfreestuff.co.uk/free-stuff/{}/'
+
+
+def deal(slug, **extra):
+    return dict({'title': f'Free {slug}', 'detail_url': DETAIL.format(slug), 'url': f'https://{slug}.example/'},
+                **extra)
+
+
+@pytest.fixture
+def store(tmp_path):
+    with DealStore(str(tmp_path / 'data' / 'deals.db')) as store:
+        yield store
+
+
+def test_empty_store_has_no_latest_run(store):
+    assert store.latest_run() is None
+    assert store.latest_deals() == [] and store.top_deals(5) == []
+
+
+def test_latest_run_orders_by_created_then_run_id(store):
+    first = store.save_run([deal('a')], created='2025-01-02T10:00:00')
+    second = store.save_run([deal('b'), deal('c')], created='2025-01-02T10:00:00')
+    # 后导入的旧快照不会成为最新一次运行
+    store.save_run([deal('old')], created='2024-12-31T08:00:00', source='import')
+
+    latest = store.latest_run()
+    assert latest['run_id'] == second > first
+    assert latest['deal_count'] == 2 and latest['source'] == 'crawler'
+    assert [d['title'] for d in store.latest_deals()] == ['Free b', 'Free c']
+    assert [d['title'] for d in store.latest_deals(limit=1)] == ['Free b']
+
+
+def test_save_run_accepts_generators_and_records_file_names(store, tmp_path):
+    run_id = store.save_run((deal(s) for s in 'xyz'), json_file=str(tmp_path / 'data' / 'enhanced_deals_x.jsonl'))
+    run = store.latest_run()
+    assert run['run_id'] == run_id and run['deal_count'] == 3
+    assert run['json_file'] == 'enhanced_deals_x.jsonl'
+
+
+def test_top_deals_skips_inactive_links(store):
+    store.save_run([deal('a', link_status='dead'), deal('b', link_status='alive'), deal('c', link_status='expired'),
+                    deal('d'), deal('e')])
+    assert [d['title'] for d in store.top_deals(2)] == ['Free b', 'Free d']
+    assert [d['title'] for d in store.top_deals(2, active_only=False)] == ['Free a', 'Free b']
+
+
+def test_history_and_find_by_url(store):
+    store.save_run([deal('a', final_url='https://landing.example/a')], created='2025-01-01T00:00:00')
+    store.save_run([deal('a', url='https://a.example/new')], created='2025-01-02T00:00:00')
+    history = store.history(DETAIL.format('a'))
+    assert [(created, d['url']) for _, created, d in history] == [
+        ('2025-01-01T00:00:00', 'https://a.example/'), ('2025-01-02T00:00:00', 'https://a.example/new'),
+    ]
+    assert store.find_by_url('https://landing.example/a')['url'] == 'https://a.example/'
+    assert store.find_by_url('https://missing.example/') is None
+
+
+def test_import_snapshots_is_ordered_and_idempotent(store, tmp_path):
+    data_dir = tmp_path / 'snapshots'
+    data_dir.mkdir()
+    write_deals(str(data_dir / 'enhanced_deals_20250103_090000.jsonl'), [deal('new')])
+    (data_dir / 'enhanced_deals_20250101_080000.json').write_text(
+        json.dumps([deal('oldest'), deal('older')]), encoding='utf-8')
+    (data_dir / 'enhanced_deals_20250102_080000.json').write_text('[{"broken', encoding='utf-8')
+    (data_dir / 'notes.json').write_text('[]', encoding='utf-8')
+
+    assert store.import_snapshots(str(data_dir)) == 2
+    assert store.import_snapshots(str(data_dir)) == 0     # 已导入的快照被跳过
+    assert store.stats() == {'runs': 2, 'deals': 3}
+
+    latest = store.latest_run()
+    assert latest['created'] == '2025-01-03T09:00:00' and latest['source'] == 'import'
+    assert store.latest_deals() == [deal('new')]
+    first = store.history(DETAIL.format('oldest'))[0]
+    assert first[1] == '2025-01-01T08:00:00'
+
+    # 爬虫之后的运行成为最新一次
+    store.save_run([deal('fresh')], created='2025-02-01T00:00:00')
+    assert store.latest_deals() == [deal('fresh')]
+
+
+def test_import_records_matching_html_snapshot(store, tmp_path):
+    (tmp_path / 'enhanced_deals_20250101_080000.json').write_text(json.dumps([deal('a')]), encoding='utf-8')
+    (tmp_path / 'enhanced_deals_20250101_080000.html').write_text('<html></html>', encoding='utf-8')
+    store.import_snapshots(str(tmp_path))
+    run = store.latest_run()
+    assert run['json_file'] == 'enhanced_deals_20250101_080000.json'
+    assert run['html_file'] == 'enhanced_deals_20250101_080000.html'
+
+
+def test_export_json_matches_snapshot_format(store, tmp_path):
+    store.save_run([deal('a'), deal('b')])
+    path = tmp_path / 'export.json'
+    assert store.export_json(str(path)) == 2
+    assert json.loads(path.read_text(encoding='utf-8')) == [deal('a'), deal('b')]
@@ -0,0 +1,73 @@
+import json
+import logging
+import os
+
+import enhanced_crawler
+from deal_store import DealStore
+from deal_stream import DealRun, JSONLWriter, iter_jsonl, write_json_array
+
+
+def make_deals(n, prefix='deal'):
+    return [{'title': f'Free sample {i}', 'detail_url': f'/free-stuff/{prefix}-{i}/'} for i in range(n)]
+
+
+def test_json_array_matches_json_dump(tmp_path):
+    deals = [{'title': 'Free\nsample', 'tags': [1, {'a': None}], 'extra': {}}, {'title_zh': '免费样品'}]
+    for items in ([], deals):
+        path = str(tmp_path / 'deals.json')
+        assert write_json_array(path, iter(items)) == len(items)
+        with open(path, encoding='utf-8') as f:
+            assert f.read() == json.dumps(items, ensure_ascii=False, indent=2)
+
+
+def test_writer_creates_file_on_first_write(tmp_path):
+    path = str(tmp_path / 'run.jsonl')
+    writer = JSONLWriter(path)
+    assert not os.path.exists(path)
+    writer.write({'title': 'a'})
+    writer.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"title": "trunc')       # 崩溃时写了一半的最后一行
+    assert list(iter_jsonl(path)) == [{'title': 'a'}]
+
+
+def test_save_run_from_generator(tmp_path):
+    with DealStore(str(tmp_path / 'deals.db')) as store:
+        run_id = store.save_run(iter(make_deals(3)), json_file='data/enhanced_deals_x.jsonl')
+        assert store.latest_run()['deal_count'] == 3
+        assert [d['title'] for d in store.iter_run_deals(run_id)] == ['Free sample 0', 'Free sample 1', 'Free sample 2']
+
+
+def test_deal_run_reads_again_on_each_iteration():
+    reads = []
+    run = DealRun(2, lambda: reads.append(1) or iter(make_deals(2)))
+    assert len(run) == 2 and run
+    assert list(run) == list(run) == make_deals(2)
+    assert len(reads) == 2
+
+
+def test_process_deals_writes_batch_by_batch(monkeypatch, tmp_path):
+    monkeypatch.setitem(enhanced_crawler.DEAL_OUTPUT, 'batch_size', 2)
+    monkeypatch.setitem(enhanced_crawler.INCREMENTAL, 'keep_previous', 2)
+    crawler = object.__new__(enhanced_crawler.EnhancedFreeStuffCrawler)
+    crawler.base_url = 'https://www.latestfreestuff.co.uk'
+    crawler.engine = 'sync'
+    crawler.logger = logging.getLogger('test')
+    crawler.resolve_deal = lambda deal: deal
+    crawler.deal_writer = JSONLWriter(str(tmp_path / 'run.jsonl'))
+    batches = []
+
+    def output_deals(deals):
+        batches.append([d['detail_url'] for d in deals])
+        for deal in deals:
+            crawler.deal_writer.write(deal)
+        return len(deals)
+
+    crawler.output_deals = output_deals
+    previous = make_deals(2) + make_deals(3, prefix='old')
+    assert crawler.process_deals(make_deals(5), previous) == 7
+    crawler.deal_writer.close()
+    # 每批写出后才处理下一批；上一次运行的优惠跳过重复的，最多保留 keep_previous 个
+    assert [len(batch) for batch in batches] == [2, 2, 1, 2]
+    assert batches[-1] == ['/free-stuff/old-0/', '/free-stuff/old-1/']
+    assert len(list(iter_jsonl(crawler.deal_writer.path))) == 7
@@ -0,0 +1,100 @@
+import json
+
+from dedupe import DealDeduplicator, DedupeIndex, merchant_host
+from link_cache import ResolvedLinkCache
+
+BASE = 'https://www.latestfreestuff.co.uk'
+
+
+def deal(slug, title, url=None, **extra):
+    deal = {'title': title, 'description': f'{title} description', 'detail_url': f'/free-stuff/{slug}/', **extra}
+    if url:
+        deal['url'] = url
+    return deal
+
+
+def translated(deal):
+    return dict(deal, title_zh='ZH:' + deal['title'], description_zh='ZH:' + deal['description'])
+
+
+def make_deduper(tmp_path, link_cache=None):
+    return DealDeduplicator(DedupeIndex(str(tmp_path / 'dedupe.json')), base_url=BASE, link_cache=link_cache)
+
+
+def test_merchant_host():
+    assert merchant_host('https://WWW.Shop.example/offer') == 'shop.example'
+    assert merchant_host(BASE + '/free-stuff/x/') is None
+    assert merchant_host('/relative') is None and merchant_host(None) is None
+
+
+def test_url_duplicate_reuses_translations_but_not_links(tmp_path):
+    deduper = make_deduper(tmp_path)
+    deduper.record([translated(deal('coffee', 'Free Coffee Pods', url='https://shop.example/coffee',
+                                    first_seen='2026-10-01'))])
+
+    again = deal('coffee', 'Free Coffee Pods', source_url='/free-stuff/coffee/?utm_source=x')
+    [merged] = deduper.dedupe([again])
+    assert merged['title_zh'] == 'ZH:Free Coffee Pods'
+    assert merged['first_seen'] == '2026-10-01'
+    # 真实链接不从索引沿用，由带有效期的真实链接缓存重新解析
+    assert 'url' not in merged and 'final_url' not in merged
+    assert deduper.stats()['url_duplicates'] == 1
+
+
+def test_changed_text_is_translated_again(tmp_path):
+    deduper = make_deduper(tmp_path)
+    deduper.record([translated(deal('coffee', 'Free Coffee Pods', url='https://shop.example/coffee'))])
+    [merged] = deduper.dedupe([deal('coffee', 'Free Coffee Pods Bundle')])
+    assert 'title_zh' not in merged and 'description_zh' not in merged
+
+
+def test_title_merge_requires_same_merchant(tmp_path):
+    links = ResolvedLinkCache(str(tmp_path / 'links.json'))
+    deduper = make_deduper(tmp_path, link_cache=links)
+    deduper.record([translated(deal('tea-1', 'Free Yorkshire Tea Bags Sample', url='https://shop.example/tea',
+                                    first_seen='2026-10-01'))])
+
+    links.set(BASE + '/free-stuff/tea-2/', 'https://www.shop.example/tea?ref=2')
+    links.set(BASE + '/free-stuff/tea-3/', 'https://other.example/tea')
+    reworded = 'Claim Free Yorkshire Tea Bags Sample Now'
+    same, other, unknown = deduper.dedupe([
+        deal('tea-2', reworded), deal('tea-3', reworded + '!'), deal('tea-4', reworded + '?'),
+    ])
+    assert same['first_seen'] == '2026-10-01'
+    assert 'first_seen' not in other and 'first_seen' not in unknown
+    assert deduper.stats()['title_duplicates'] == 1
+
+
+def test_in_run_title_duplicates_need_same_merchant(tmp_path):
+    deduper = make_deduper(tmp_path)
+    deals = [
+        deal('a', 'Free Dog Food Sample Pack', url='https://pets.example/a'),
+        deal('b', 'Free Dog Food Sample Pack Today', url='https://pets.example/b'),
+        deal('c', 'Free Dog Food Sample Pack', url='https://other.example/c'),
+        deal('d', 'Free Dog Food Sample Pack'),          # 商家未知：不按标题合并
+        deal('a', 'Completely different title', url='https://pets.example/a2'),  # 同一链接
+    ]
+    kept = deduper.dedupe(deals)
+    assert [d['detail_url'] for d in kept] == ['/free-stuff/a/', '/free-stuff/c/', '/free-stuff/d/']
+    assert deduper.stats()['in_run_duplicates'] == 2
+
+
+def test_numbers_must_match(tmp_path):
+    deduper = make_deduper(tmp_path)
+    kept = deduper.dedupe([
+        deal('a', 'Free £5 Amazon Voucher Offer', url='https://amazon.example/a'),
+        deal('b', 'Free £10 Amazon Voucher Offer', url='https://amazon.example/b'),
+    ])
+    assert len(kept) == 2
+
+
+def test_index_is_persisted_without_links(tmp_path):
+    deduper = make_deduper(tmp_path)
+    deduper.record([translated(deal('x', 'Free Seeds Packet', url='https://garden.example/seeds'))])
+    deduper.save()
+    with open(tmp_path / 'dedupe.json', encoding='utf-8') as f:
+        [entry] = json.load(f)['entries'].values()
+    assert entry['host'] == 'garden.example'
+    assert 'url' not in entry and 'final_url' not in entry
+    reloaded = DedupeIndex(str(tmp_path / 'dedupe.json'))
+    assert len(reloaded) == 1
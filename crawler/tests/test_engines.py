@@ -0,0 +1,82 @@
+import copy
+
+import requests
+
+import enhanced_crawler
+
+BASE = 'https://www.latestfreestuff.co.uk'
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=''):
+        self.status_code = status_code
+        self.content = body.encode('utf-8')
+        self.headers = {'Content-Type': 'text/html; charset=utf-8'}
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.content), 64):
+            yield self.content[i:i + 64]
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code} for url', response=self)
+
+    def close(self):
+        pass
+
+
+class FakeTransport:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def resize(self, maxsize):
+        pass
+
+    def get(self, url, timeout=None, headers=None, stream=False):
+        if url in self.pages:
+            return FakeResponse(200, self.pages[url])
+        return FakeResponse(404)
+
+    def close(self):
+        pass
+
+
+PAGES = {
+    # GET FREEBIE → 申请页 → 商家链接
+    f'{BASE}/free-stuff/coffee/': f'<a href="{BASE}/claim/coffee/">GET FREEBIE</a>' + '<p>text</p>' * 50,
+    f'{BASE}/claim/coffee/': '<a href="https://shop.example/coffee" target="_blank">Visit</a>',
+    # 详情页上直接的外部链接
+    f'{BASE}/free-stuff/tea/': '<p>Tea</p><a class="btn deal-btn" href="https://tea.example/sample">Get Deal</a>',
+    # 申请页不存在：使用详情页链接
+    f'{BASE}/free-stuff/seeds/': f'<a href="{BASE}/claim/seeds/">GET FREEBIE</a>',
+    # 没有任何链接：使用详情页链接
+    f'{BASE}/free-stuff/empty/': '<p>nothing here</p>',
+}
+
+
+def make_crawler(monkeypatch, tmp_path, engine):
+    tmp_path.mkdir()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(enhanced_crawler, 'REQUEST_DELAY', 0)
+    monkeypatch.setitem(enhanced_crawler.LINK_CACHE, 'enabled', False)
+    monkeypatch.setitem(enhanced_crawler.HTTP_CACHE, 'enabled', False)
+    monkeypatch.setitem(enhanced_crawler.REDIRECTS, 'enabled', False)
+    crawler = enhanced_crawler.EnhancedFreeStuffCrawler(engine=engine)
+    crawler.transport = FakeTransport(PAGES)
+    return crawler
+
+
+def test_sync_and_concurrent_engines_produce_identical_deals(monkeypatch, tmp_path):
+    slugs = ['coffee', 'tea', 'seeds', 'empty', 'missing'] * 3
+    deals = [{'title': f'  Free   {slug} sample {i}', 'description': f'{slug}\n description',
+              'detail_url': f'{BASE}/free-stuff/{slug}/', 'image': f'/img/{slug}.jpg'}
+             for i, slug in enumerate(slugs)]
+
+    sync = make_crawler(monkeypatch, tmp_path / 'sync', 'sync').resolve_deals(copy.deepcopy(deals))
+    concurrent = make_crawler(monkeypatch, tmp_path / 'async', 'async').resolve_deals(copy.deepcopy(deals))
+
+    assert concurrent == sync
+    assert [d['url'] for d in sync[:5]] == [
+        'https://shop.example/coffee', 'https://tea.example/sample', f'{BASE}/free-stuff/seeds/',
+        f'{BASE}/free-stuff/empty/', f'{BASE}/free-stuff/missing/',
+    ]
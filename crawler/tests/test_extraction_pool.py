@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from enhanced_config import REAL_LINK_EXTRACTION, URL_VALIDATION
+from extraction import ExtractionPool, LinkExtractor
+
+PADDING = '<p>' + 'lorem ipsum dolor sit amet ' * 20 + '</p>'
+
+DETAIL_PAGES = [
+    '<a class="btn" href="https://www.latestfreestuff.co.uk/claim/coffee/">GET FREEBIE</a>',
+    '<a href="/claim/tea/">Claim</a><a href="https://shop.example/tea" target="_blank">Visit</a>',
+    '<a class="btn deal-btn" href="https://www.amazon.co.uk/dp/B01">Get Deal</a>'
+    '<a href="https://twitter.com/intent/tweet?url=x" target="_blank">Tweet</a>',
+    '<a href="https://www.facebook.com/sharer/sharer.php?u=x" target="_blank">Share</a>'
+    '<a href="https://brand.example/free-sample" rel="nofollow">Sample</a>',
+    '<script>window.location.href = "https://brand.example/landing";</script>',
+    '<meta http-equiv="refresh" content="0; url=https://brand.example/refresh">',
+    '<iframe src="https://brand.example/embed"></iframe>',
+    '<p>nothing to see here</p>',
+]
+
+CLAIM_PAGES = [
+    '<a href="https://merchant1.co.uk/free-sample">Claim now</a>',
+    '<a href="https://www.google.com/maps">map</a><a href="https://shop.example/offer" target="_blank">go</a>',
+    '<a href="https://www.latestfreestuff.co.uk/">home</a>',
+    '<p>empty</p>',
+]
+
+
+def page(body):
+    return f'<html><body>{PADDING}{body}{PADDING}</body></html>'
+
+
+@pytest.fixture(scope='module')
+def extractor():
+    return LinkExtractor.from_config(REAL_LINK_EXTRACTION, URL_VALIDATION)
+
+
+@pytest.fixture(scope='module')
+def pool(extractor):
+    pool = ExtractionPool(extractor, REAL_LINK_EXTRACTION, URL_VALIDATION, workers=2, chunk_size=3, min_bytes=0)
+    yield pool
+    pool.close()
+
+
+def test_pool_matches_inline_extraction(extractor, pool):
+    for body in DETAIL_PAGES:
+        assert pool.detail_links(page(body)) == extractor.detail_links(page(body)), body
+    for body in CLAIM_PAGES:
+        assert pool.claim_link(page(body)) == extractor.claim_link(page(body)), body
+    assert pool.stats()['offloaded'] >= len(DETAIL_PAGES) + len(CLAIM_PAGES)
+
+
+def test_pool_matches_inline_extraction_under_concurrent_callers(extractor, pool):
+    tasks = [('detail', page(body)) for body in DETAIL_PAGES] + [('claim', page(body)) for body in CLAIM_PAGES]
+    tasks *= 4
+
+    def run(target, task):
+        kind, html = task
+        return target.detail_links(html) if kind == 'detail' else target.claim_link(html)
+
+    batches = pool.stats()['batches']
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        pooled = list(executor.map(lambda task: run(pool, task), tasks))
+    assert pooled == [run(extractor, task) for task in tasks]
+    assert pool.stats()['batches'] - batches < len(tasks)   # 同时到达的页面合并成批次
+
+
+def test_pool_validates_fallback_with_final_url_in_main_process(pool):
+    final_urls = {'https://brand.example/free-sample': 'https://www.facebook.com/sharer/sharer.php?u=x'}
+    extractor = LinkExtractor.from_config(REAL_LINK_EXTRACTION, URL_VALIDATION, final_url=final_urls.get)
+    html = page('<a href="https://brand.example/free-sample" rel="nofollow">Sample</a>'
+                '<a href="https://brand.example/other" target="_blank">Other</a>')
+    inline = extractor.detail_links(html)
+
+    original, pool.extractor = pool.extractor, extractor
+    try:
+        assert pool.detail_links(html) == inline
+    finally:
+        pool.extractor = original
+    assert inline['fallback'][0] == 'https://brand.example/other'
+
+
+def test_small_pages_are_parsed_inline(extractor):
+    pool = ExtractionPool(extractor, REAL_LINK_EXTRACTION, URL_VALIDATION, workers=1, min_bytes=1 << 20)
+    try:
+        html = page(DETAIL_PAGES[0])
+        assert pool.detail_links(html) == extractor.detail_links(html)
+        assert pool.stats()['inline'] == 1 and pool.stats()['offloaded'] == 0
+    finally:
+        pool.close()
+    with pytest.raises(RuntimeError):
+        pool._submit('detail', html)
@@ -0,0 +1,42 @@
+from frontier import ListingFrontier
+
+BASE = 'https://www.latestfreestuff.co.uk/'
+
+
+def links(*hrefs):
+    return ''.join(f'<a href="{href}">x</a>' for href in hrefs)
+
+
+def test_first_pages_come_before_later_pages():
+    frontier = ListingFrontier(BASE, max_pages=10)
+    frontier.push(BASE)
+    home = frontier.pop()
+    assert frontier.discover(home, links('/page/2/', '/category/food/', 'https://other.example/page/3/')) == 2
+
+    category = frontier.pop()
+    assert (category.url, category.depth, category.page) == (BASE + 'category/food/', 1, 1)
+    frontier.discover(category, links('/category/food/page/2/', '/category/drink/'))
+    # 深度超出 max_depth 的分类不入队
+    assert frontier.skipped == 1
+    assert [frontier.pop().url for _ in range(2)] == [BASE + 'page/2/', BASE + 'category/food/page/2/']
+    assert frontier.pop() is None
+
+
+def test_duplicates_and_budgets():
+    frontier = ListingFrontier(BASE, max_pages=2, max_pages_per_listing=3)
+    assert frontier.push(BASE)
+    assert not frontier.push(BASE + '?utm_source=x')
+    home = frontier.pop()
+    frontier.discover(home, links('/page/2/', '/page/3/', '/page/4/', '/page/2/#top'))
+    assert len(frontier) == 2 and frontier.skipped == 1
+    assert frontier.pop().page == 2
+    assert frontier.pop() is None and frontier.popped == 2
+
+
+def test_pagination_only_moves_forward_within_listing():
+    frontier = ListingFrontier(BASE)
+    frontier.push(BASE + 'page/3/', page=3, listing=BASE)
+    entry = frontier.pop()
+    added = frontier.discover(entry, links('/page/2/', '/page/4/', '/category/food/page/5/', '/?paged=6'))
+    assert added == 2
+    assert [frontier.pop().page for _ in range(2)] == [4, 6]
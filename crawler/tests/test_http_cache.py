@@ -0,0 +1,107 @@
+import logging
+import os
+from contextlib import contextmanager
+
+import enhanced_crawler
+from http_cache import HTTPCache
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=b'', etag=None):
+        self.status_code = status_code
+        self.content = body
+        self.encoding = 'utf-8'
+        self.headers = {'Content-Type': 'text/html; charset=utf-8'}
+        if etag:
+            self.headers['ETag'] = etag
+
+    def raise_for_status(self):
+        pass
+
+
+def url(i):
+    return f'https://shop.example/page-{i}'
+
+
+def test_lru_evicts_least_recently_used(tmp_path):
+    cache = HTTPCache(str(tmp_path), max_entries=2)
+    cache.store(url(0), FakeResponse(body=b'zero', etag='"0"'))
+    cache.store(url(1), FakeResponse(body=b'one', etag='"1"'))
+    assert cache.load(url(0)) == 'zero'          # page-0 变为最近使用
+    cache.store(url(2), FakeResponse(body=b'two', etag='"2"'))
+    assert cache.load(url(1)) is None
+    assert cache.load(url(0)) == 'zero' and cache.load(url(2)) == 'two'
+    assert cache.stats()['evictions'] == 1
+
+
+def test_byte_limit_and_order_survive_restart(tmp_path):
+    cache = HTTPCache(str(tmp_path))
+    for i in range(3):
+        cache.store(url(i), FakeResponse(body=b'x' * 100))
+    # 用修改时间记录使用顺序：page-0 最久未使用
+    _, body0 = cache._paths(url(0))
+    os.utime(body0, (1, 1))
+
+    reopened = HTTPCache(str(tmp_path), max_bytes=250)
+    reopened.store(url(1), FakeResponse(body=b'y' * 100))
+    assert reopened.load(url(0)) is None
+    assert reopened.load(url(1)) == 'y' * 100 and reopened.load(url(2)) == 'x' * 100
+
+
+def test_oversized_page_is_kept_alone(tmp_path):
+    cache = HTTPCache(str(tmp_path), max_bytes=10)
+    cache.store(url(0), FakeResponse(body=b'small'))
+    cache.store(url(1), FakeResponse(body=b'much too large'))
+    assert cache.load(url(1)) == 'much too large'
+    assert cache.load(url(0)) is None
+
+
+class FakeLimiter:
+    class Ticket:
+        def record(self, status):
+            pass
+
+    @contextmanager
+    def slot(self, url):
+        yield self.Ticket()
+
+
+def make_crawler(tmp_path, responses):
+    crawler = object.__new__(enhanced_crawler.EnhancedFreeStuffCrawler)
+    crawler.logger = logging.getLogger('test')
+    crawler.http_cache = HTTPCache(str(tmp_path))
+    crawler.rate_limiter = FakeLimiter()
+    crawler.requests = []
+
+    class Transport:
+        def get(self, url, timeout=None, headers=None, stream=False):
+            crawler.requests.append(dict(headers or {}))
+            return responses.pop(0)
+
+    crawler.transport = Transport()
+    return crawler
+
+
+def test_304_with_missing_body_refetches_unconditionally(tmp_path):
+    crawler = make_crawler(tmp_path, [FakeResponse(304), FakeResponse(200, b'<html>fresh</html>', etag='"2"')])
+    crawler.http_cache.store(url(0), FakeResponse(body=b'<html>old</html>', etag='"1"'))
+    _, body_path = crawler.http_cache._paths(url(0))
+    # 发出条件请求之后响应体丢失（例如被另一个进程淘汰）
+    original_revalidated = crawler.http_cache.revalidated_hit
+
+    def lose_body(u):
+        os.remove(body_path)
+        return original_revalidated(u)
+
+    crawler.http_cache.revalidated_hit = lose_body
+
+    assert crawler._fetch_once(url(0), timeout=5) == '<html>fresh</html>'
+    assert crawler.requests == [{'If-None-Match': '"1"'}, {}]
+    assert crawler.http_cache.conditional_headers(url(0)) == {'If-None-Match': '"2"'}
+
+
+def test_304_with_cached_body_uses_cache(tmp_path):
+    crawler = make_crawler(tmp_path, [FakeResponse(304)])
+    crawler.http_cache.store(url(0), FakeResponse(body=b'<html>cached</html>', etag='"1"'))
+    assert crawler._fetch_once(url(0), timeout=5) == '<html>cached</html>'
+    assert crawler.http_cache.stats()['revalidated'] == 1
@@ -0,0 +1,39 @@
+from dedupe import DealDeduplicator, DedupeIndex
+from liveness import ALIVE, DEAD, UNREACHABLE, LinkStatusCache
+
+
+def test_status_ttl_depends_on_state_and_domain(tmp_path, clock):
+    cache = LinkStatusCache(str(tmp_path / 'liveness.json'),
+                            ttl={ALIVE: 100, DEAD: 1000}, domain_ttl={'bigshop.example': 5000})
+    cache.set('https://shop.example/a', ALIVE, 200)
+    cache.set('https://www.bigshop.example/a', ALIVE, 200)
+    cache.set('https://shop.example/gone', DEAD, 404)
+
+    clock.advance(500)
+    assert cache.get('https://shop.example/a') is None
+    assert cache.get('https://www.bigshop.example/a') == (ALIVE, 200)
+    assert cache.get('https://shop.example/gone') == (DEAD, 404)
+
+
+def test_unreachable_host_covers_other_urls(tmp_path, clock):
+    path = str(tmp_path / 'liveness.json')
+    cache = LinkStatusCache(path, ttl={UNREACHABLE: 100})
+    cache.set('https://down.example/a', UNREACHABLE)
+    assert cache.get('https://down.example/b') == (UNREACHABLE, None)
+    cache.save()
+
+    assert LinkStatusCache(path).get('https://down.example/c') == (UNREACHABLE, None)
+    clock.advance(101)
+    assert LinkStatusCache(path).get('https://down.example/c') is None
+
+
+def test_dedupe_index_forgets_deals_not_seen_within_ttl(tmp_path, clock):
+    path = str(tmp_path / 'dedupe.json')
+    deduper = DealDeduplicator(DedupeIndex(path, ttl_days=2), base_url='https://www.latestfreestuff.co.uk')
+    deduper.record([{'title': 'Free Seeds Packet', 'detail_url': '/free-stuff/seeds/'}])
+    clock.advance(86400)
+    deduper.record([{'title': 'Free Tea Bags Sample', 'detail_url': '/free-stuff/tea/'}])
+    deduper.save()
+
+    clock.advance(86400 + 60)
+    assert len(DedupeIndex(path, ttl_days=2)) == 1
@@ -0,0 +1,69 @@
+import os
+import random
+import re
+
+import pytest
+
+import enhanced_crawler
+from link_index import LinkRule, LinkRuleSet, literal_prefix, required_literals
+
+RULES = LinkRuleSet.from_config(enhanced_crawler.REAL_LINK_EXTRACTION)
+ALL_RULES = ([RULES.get_freebie, RULES.claim_link, RULES.meta_refresh, RULES.iframe]
+             + RULES.primary + RULES.secondary + RULES.js + RULES.claim_page)
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sample_data')
+
+
+def assert_same_as_findall(html, rules=ALL_RULES):
+    index = RULES.index(html)
+    for rule in rules:
+        assert rule.findall(index) == re.findall(rule.pattern, html, re.IGNORECASE), rule.pattern
+
+
+@pytest.mark.parametrize('html', [
+    '<a title="a<b" href="https://f.com/shop" target="_blank">Shop</a>',
+    '<a title="a>b" rel="nofollow" href="https://f.com/go">x</a>',
+    '<a href="https://f.com/x" target="_blank"',                      # 未闭合的标签
+    '<a class="btn <a href="https://f.com/deal">GET FREEBIE</a>',      # 嵌套在属性中的标签
+    '<A HREF="https://F.com/Offer" TARGET="_BLANK">Get Deal</A><a href="/claim/1/">GET  FREEBIE</a>',
+    "<a href=\"x' target='_blank' href='https://f.com/'>",
+    '<script>window.location = "https://r.example/"; location.href=\'/go\'</script>',
+    '<meta http-equiv="refresh" content="0;url=https://m.example/"><iframe src="https://v.example/e">',
+    '<a href="https://ſhop.example/" rel="nofoLLow">ı</a><a href="https://KEY.example/deal">',
+])
+def test_rules_match_whole_page_findall(html):
+    assert_same_as_findall(html)
+
+
+def test_sample_pages():
+    for name in os.listdir(SAMPLE_DIR):
+        if name.endswith('.html'):
+            with open(os.path.join(SAMPLE_DIR, name), encoding='utf-8') as f:
+                assert_same_as_findall(f.read())
+
+
+def test_random_documents():
+    pieces = ['<a ', '<A ', '<a', '<abbr ', 'href=', 'href="', "href='", '"', "'", '>', '<', '</a>',
+              'target="_blank"', 'rel="nofollow"', 'class="btn deal-btn"', 'title="a<b"', 'title="a>b"',
+              'https://shop.example/offer', '/claim/x/', 'GET FREEBIE', 'Get Deal', ' ', '\n', 'go',
+              'window.location = "https://r.example/"', '<meta http-equiv="refresh" content="0;url=/m">',
+              '<iframe src="https://v.example/e">', 'ı', 'ſ', 'İ', 'K']
+    rng = random.Random(4)
+    for _ in range(500):
+        assert_same_as_findall(''.join(rng.choice(pieces) for _ in range(rng.randrange(1, 40))))
+
+
+def test_custom_patterns_fall_back_safely():
+    rules = [LinkRule(p) for p in (r'<a[^>]*>(.*?)</a>', r'(?:<a|<iframe)[^>]+src', r'aa+b', r'<a[^\]>]+class')]
+    html = '<iframe src=x><a class="y">aaab</a><a src=z>'
+    index = RULES.index(html)
+    for rule in rules:
+        assert rule.findall(index) == re.findall(rule.pattern, html, re.IGNORECASE)
+
+
+def test_pattern_analysis():
+    assert literal_prefix(r'<a[^>]+href') == '<a'
+    assert literal_prefix(r'window\.location\s*=') == 'window.location'
+    assert literal_prefix(r'ab+c') == 'ab'
+    assert literal_prefix(r'<a|<iframe') == ''
+    assert required_literals(r'\x41bc(?P<n>xyz)[]ab]cd(?=qq)') == [('bc',), ('xyz',), ('cd',)]
+    assert required_literals(r'href=["\']([^"\']*(?:deal|offer)[^"\']*)') == [('href=',), ('deal', 'offer')]
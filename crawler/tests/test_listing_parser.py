@@ -0,0 +1,89 @@
+import pytest
+
+from listing_parser import DealParser, create_deal_parser, lxml_available, parse_listing
+
+BACKENDS = [
+    'html.parser',
+    pytest.param('lxml', marks=pytest.mark.skipif(not lxml_available(), reason='未安装 lxml')),
+]
+
+# 卡片内部嵌套的缩略图和元信息 div 出现在标题和链接之前
+NESTED_CARDS = '''
+<html><body>
+<div class="deals-list">
+  <div class="deal-card">
+    <div class="thumb"><div class="inner"><img data-src="/img/coffee.jpg"></div></div>
+    <div class="meta"><span>2 hours ago</span></div>
+    <h3>Free Coffee Sample</h3>
+    <p>Claim a <b>free</b> bag of coffee.</p>
+    <a href="https://www.latestfreestuff.co.uk/free-stuff/coffee/">Read more</a>
+  </div>
+  <article id="post-42">
+    <div class="deal-thumb"><a href="/free-stuff/tea/"><img src="/img/tea.jpg"></a></div>
+    <h2>Free Tea Bags</h2>
+    <div class="excerpt"><p>Three tea bags.</p><p>UK only.</p></div>
+  </article>
+  <div class="deal-card"><div class="thumb"></div><p>no title here</p></div>
+</div>
+</body></html>
+'''
+
+EXPECTED = [
+    {
+        'image': '/img/coffee.jpg',
+        'title': 'Free Coffee Sample',
+        'description': 'Claim a free bag of coffee.',
+        'detail_url': 'https://www.latestfreestuff.co.uk/free-stuff/coffee/',
+    },
+    {
+        'detail_url': '/free-stuff/tea/',
+        'image': '/img/tea.jpg',
+        'title': 'Free Tea Bags',
+        'description': 'Three tea bags. UK only.',
+    },
+]
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_nested_cards_keep_their_fields(backend):
+    deals = parse_listing(NESTED_CARDS, backend=backend)
+    assert deals == EXPECTED
+    assert create_deal_parser(backend).backend == backend
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_inner_container_with_title_is_a_separate_deal(backend):
+    html = '''
+    <div class="deals-wrapper">
+      <div class="deal"><h3>Free Seeds</h3><a href="/free-stuff/seeds/">x</a></div>
+      <div class="deal"><h3>Free Socks</h3><a href="/free-stuff/socks/">x</a></div>
+    </div>
+    '''
+    deals = parse_listing(html, backend=backend)
+    # 外层容器没有标题，不单独成为优惠
+    assert [(d['title'], d['detail_url']) for d in deals] == [
+        ('Free Seeds', '/free-stuff/seeds/'),
+        ('Free Socks', '/free-stuff/socks/'),
+    ]
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_feeding_in_chunks_matches_whole_page(backend):
+    parser = create_deal_parser(backend)
+    completed = []
+    for i in range(0, len(NESTED_CARDS), 7):
+        completed += parser.feed(NESTED_CARDS[i:i + 7])
+    completed += parser.close()
+    assert completed == parser.deals == EXPECTED
+
+
+def test_backends_agree():
+    if not lxml_available():
+        pytest.skip('未安装 lxml')
+    assert parse_listing(NESTED_CARDS, 'lxml') == parse_listing(NESTED_CARDS, 'html.parser')
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_deal_parser('bs4')
+    assert isinstance(create_deal_parser('html.parser'), DealParser)
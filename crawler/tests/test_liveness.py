@@ -0,0 +1,88 @@
+import pytest
+import requests
+
+from liveness import (ALIVE, DEAD, EXPIRED, UNKNOWN, UNREACHABLE, LivenessChecker, LinkStatusCache,
+                      apply_liveness)
+
+
+class FakeResponse:
+    def __init__(self, status_code, url):
+        self.status_code = status_code
+        self.url = url
+
+    def close(self):
+        pass
+
+
+class FakeTransport:
+    """routes: 请求URL → (状态码, 落地URL) 或异常"""
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.requests = []
+
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url))
+        route = self.routes[url]
+        if isinstance(route, Exception):
+            raise route
+        code, landed = route
+        return FakeResponse(code, landed or url)
+
+    def close(self):
+        pass
+
+
+def check(routes, url, **kwargs):
+    return LivenessChecker(FakeTransport(routes), **kwargs).check(url)
+
+
+@pytest.mark.parametrize('url, route, expected', [
+    ('https://shop.example/offer', (200, None), ALIVE),
+    ('https://shop.example/offer', (404, None), DEAD),
+    ('https://shop.example/offer', (503, None), UNKNOWN),
+    ('https://shop.example/offer', (200, 'https://shop.example/offer-ended'), EXPIRED),
+    ('https://shop.example/offer', (200, 'https://shop.example/?promotion_closed=1'), EXPIRED),
+    ('https://shop.example/offer', (200, 'https://shop.example/samples/new-offer'), ALIVE),
+    # 重定向到首页本身不算过期
+    ('https://shop.example/offer', (200, 'https://shop.example/'), UNKNOWN),
+    ('https://share.octopus.energy/calm-bird-123', (200, 'https://octopus.energy/'), ALIVE),
+    ('https://www.bit.ly/abc', (200, 'https://merchant.example'), ALIVE),
+    ('https://shop.example/offer', requests.ConnectionError(), UNREACHABLE),
+    ('https://shop.example/offer', requests.Timeout(), UNKNOWN),
+])
+def test_probe_classification(url, route, expected):
+    assert check({url: route}, url)[0] == expected
+
+
+def test_expired_patterns_and_referral_hosts_are_configurable():
+    url = 'https://refer.example/friend-42'
+    routes = {url: (200, 'https://refer.example/')}
+    assert check(routes, url)[0] == UNKNOWN
+    assert check(routes, url, referral_hosts=['refer.example'])[0] == ALIVE
+    routes = {url: (200, 'https://refer.example/closed')}
+    assert check(routes, url)[0] == ALIVE
+    assert check(routes, url, expired_patterns=[r'closed'])[0] == EXPIRED
+
+
+def test_results_are_cached(tmp_path):
+    url = 'https://shop.example/offer'
+    transport = FakeTransport({url: (200, None)})
+    checker = LivenessChecker(transport, cache=LinkStatusCache(str(tmp_path / 'liveness.json')))
+    assert checker.check_many([url, url]) == {url: (ALIVE, 200)}
+    assert checker.check(url) == (ALIVE, 200)
+    assert len(transport.requests) == 1
+
+
+def test_apply_liveness_keeps_dead_deals_by_default():
+    deals = [{'url': f'https://shop.example/{i}'} for i in range(4)]
+    results = {
+        'https://shop.example/0': (EXPIRED, 200),
+        'https://shop.example/1': (UNREACHABLE, None),
+        'https://shop.example/2': (ALIVE, 200),
+    }
+    ordered = apply_liveness([dict(d) for d in deals], results)
+    assert [d['url'][-1] for d in ordered] == ['2', '3', '1', '0']
+    assert ordered[-1]['link_status'] == EXPIRED
+    dropped = apply_liveness([dict(d) for d in deals], results, drop_dead=True)
+    assert [d['url'][-1] for d in dropped] == ['2', '3', '1']
@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from deadline import BudgetExceeded, deal_budget
+from rate_limit import AIMDController, HostRateLimiter, TokenBucket
+
+URL = 'https://merchant.example/page'
+
+
+def test_token_bucket_raises_when_wait_exceeds_budget():
+    bucket = TokenBucket(rate=1, burst=1)
+    bucket.acquire()
+    with deal_budget(0.2) as budget:
+        start = time.monotonic()
+        with pytest.raises(BudgetExceeded):
+            bucket.acquire()
+        assert time.monotonic() - start < 0.1   # 不等待注定超出预算的令牌
+    assert budget.exhausted
+    # 放弃的预约归还了令牌：下一个请求只需等待约1秒，而不是2秒
+    assert bucket.reserve() <= 1.0
+
+
+def test_token_bucket_waits_within_budget():
+    bucket = TokenBucket(rate=20, burst=1)
+    bucket.acquire()
+    with deal_budget(1) as budget:
+        assert 0 < bucket.acquire() <= 0.05
+    assert not budget.exhausted
+
+
+def test_controller_wait_is_limited_by_budget():
+    controller = AIMDController(initial=1, maximum=1, adaptive=False)
+    controller.acquire()
+    with deal_budget(0.1) as budget:
+        start = time.monotonic()
+        with pytest.raises(BudgetExceeded):
+            controller.acquire()
+        assert time.monotonic() - start < 1
+    assert budget.exhausted
+    assert controller.in_flight == 1
+
+
+def test_controller_wakes_up_when_slot_is_released():
+    controller = AIMDController(initial=1, maximum=1, adaptive=False)
+    controller.acquire()
+    threading.Timer(0.05, controller.release, args=(0.05, False)).start()
+    with deal_budget(5) as budget:
+        controller.acquire()
+    assert not budget.exhausted
+    assert controller.in_flight == 1
+
+
+def test_slot_gives_back_concurrency_when_bucket_budget_runs_out():
+    limiter = HostRateLimiter(rate=1, burst=1, adaptive=False, max_concurrency=2)
+    with limiter.slot(URL):
+        pass
+    with deal_budget(0.2), pytest.raises(BudgetExceeded):
+        with limiter.slot(URL):
+            pytest.fail('请求不应发出')
+    state = limiter._host(URL)
+    assert state.controller.in_flight == 0
+    assert limiter.stats()['merchant.example']['requests'] == 1
+
+
+def test_budget_cut_timeout_does_not_decrease_concurrency():
+    limiter = HostRateLimiter(rate=0, initial_concurrency=4, max_concurrency=8)
+    with deal_budget(0.01), pytest.raises(requests.Timeout):
+        with limiter.slot(URL):
+            time.sleep(0.02)   # 超时被缩短到剩余预算，超时时预算已用完
+            raise requests.Timeout()
+    stats = limiter.stats()['merchant.example']
+    assert stats['decreases'] == 0
+    assert stats['overloads'] == 0
+    assert stats['concurrency'] == 4
+    assert limiter._host(URL).controller.in_flight == 0
+
+
+def test_real_timeout_decreases_concurrency():
+    limiter = HostRateLimiter(rate=0, initial_concurrency=4, max_concurrency=8)
+    with deal_budget(10), pytest.raises(requests.Timeout):
+        with limiter.slot(URL):
+            raise requests.Timeout()
+    stats = limiter.stats()['merchant.example']
+    assert stats['decreases'] == 1
+    assert stats['concurrency'] == 2
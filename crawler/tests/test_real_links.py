@@ -0,0 +1,145 @@
+import logging
+
+import pytest
+
+import enhanced_crawler
+from extraction import LinkExtractor
+from link_cache import ResolvedLinkCache
+from link_index import LinkRuleSet
+from url_classifier import URLClassifier
+
+DETAIL = 'https://www.latestfreestuff.co.uk/free-stuff/deal-1/'
+CLAIM = 'https://www.latestfreestuff.co.uk/claim/deal-1/'
+MERCHANT = 'https://merchant1.co.uk/free-sample'
+FALLBACK = 'https://shop1.example.com/offer'
+
+
+def detail_page(claim=True, fallback=False):
+    body = '<p>lorem ipsum</p>'
+    if claim:
+        body += f'<a class="btn" href="{CLAIM}">GET FREEBIE</a>'
+    if fallback:
+        body += f'<a href="{FALLBACK}" target="_blank">Visit</a>'
+    return f'<html><body>{body}</body></html>'
+
+
+CLAIM_PAGE = f'<html><body><a href="{MERCHANT}">go</a></body></html>'
+EMPTY_CLAIM_PAGE = '<html><body><p>nothing here</p></body></html>'
+
+
+@pytest.fixture
+def crawler(tmp_path):
+    """只带真实链接解析相关属性的爬虫实例；pages 中值为 None 的页面模拟请求失败"""
+    crawler = object.__new__(enhanced_crawler.EnhancedFreeStuffCrawler)
+    crawler.base_url = 'https://www.latestfreestuff.co.uk'
+    crawler.logger = logging.getLogger('test')
+    rules = LinkRuleSet.from_config(enhanced_crawler.REAL_LINK_EXTRACTION)
+    crawler.url_classifier = URLClassifier.from_config(enhanced_crawler.URL_VALIDATION)
+    crawler.extractor = LinkExtractor(rules, crawler.url_classifier)
+    crawler.link_cache = ResolvedLinkCache(str(tmp_path / 'links.json'))
+    crawler.streaming = None
+    crawler.detail_watcher = crawler.claim_watcher = None
+    crawler.link_timeout = 5
+    crawler.pages = {}
+    crawler.requested = []
+
+    def get_page_content(url, timeout=None):
+        crawler.requested.append(url)
+        return crawler.pages.get(url)
+
+    crawler.get_page_content = get_page_content
+    return crawler
+
+
+def test_resolved_link_is_cached(crawler):
+    crawler.pages = {DETAIL: detail_page(), CLAIM: CLAIM_PAGE}
+    assert crawler.extract_real_deal_url(DETAIL) == MERCHANT
+    assert crawler.link_cache.peek(DETAIL) == MERCHANT
+
+    crawler.requested.clear()
+    assert crawler.extract_real_deal_url(DETAIL) == MERCHANT
+    assert crawler.requested == []
+
+
+def test_claim_page_failure_is_not_cached(crawler):
+    # 申请页面请求失败（超时、5xx、熔断）：退回申请页面链接，但不写入缓存
+    crawler.pages = {DETAIL: detail_page(), CLAIM: None}
+    assert crawler.extract_real_deal_url(DETAIL) == CLAIM
+    assert crawler.link_cache.peek(DETAIL) is None
+    assert crawler.link_cache.peek(CLAIM) is None
+
+    crawler.pages[CLAIM] = CLAIM_PAGE
+    assert crawler.extract_real_deal_url(DETAIL) == MERCHANT
+
+
+def test_fallback_after_claim_failure_is_not_cached(crawler):
+    # 申请页面失败时退回的次要链接不能当作确定结果缓存 7 天
+    crawler.pages = {DETAIL: detail_page(fallback=True), CLAIM: None}
+    assert crawler.extract_real_deal_url(DETAIL) == FALLBACK
+    assert crawler.link_cache.peek(DETAIL) is None
+
+
+def test_page_without_link_is_negatively_cached(crawler):
+    crawler.pages = {DETAIL: detail_page(claim=False)}
+    assert crawler.extract_real_deal_url(DETAIL) == DETAIL
+    assert crawler.link_cache.get(DETAIL) == {'url': DETAIL, 'negative': True}
+
+
+def test_claim_page_without_link_is_negatively_cached(crawler):
+    crawler.pages = {DETAIL: detail_page(), CLAIM: EMPTY_CLAIM_PAGE}
+    assert crawler.extract_real_deal_url(DETAIL) == CLAIM
+    assert crawler.link_cache.get(CLAIM) == {'url': CLAIM, 'negative': True}
+    assert crawler.link_cache.peek(DETAIL) == CLAIM
+
+
+def test_detail_page_failure_is_not_cached(crawler):
+    assert crawler.extract_real_deal_url(DETAIL) == DETAIL
+    assert crawler.link_cache.peek(DETAIL) is None
+
+
+@pytest.fixture
+def resolving_crawler(crawler, tmp_path):
+    """在 crawler 的基础上加入 resolve_deal 需要的预算和已处理集合"""
+    crawler.run_deadline = enhanced_crawler.Deadline(None)
+    crawler.deadline_stats = enhanced_crawler.DeadlineStats()
+    crawler.seen_deals = enhanced_crawler.SeenDealStore(str(tmp_path / 'seen.bin'))
+    crawler.translation_service = None
+    crawler.link_cache = None
+    return crawler
+
+
+def resolve(crawler):
+    return crawler.resolve_deal({'title': 'Free sample', 'description': '', 'detail_url': DETAIL})
+
+
+def test_resolved_deal_is_marked_seen(resolving_crawler):
+    resolving_crawler.pages = {DETAIL: detail_page(), CLAIM: CLAIM_PAGE}
+    assert resolve(resolving_crawler)['url'] == MERCHANT
+    assert DETAIL in resolving_crawler.seen_deals
+
+
+@pytest.mark.parametrize('pages', [
+    {},                                          # 详情页请求失败
+    {DETAIL: detail_page(claim=False)},          # 没有链接，退回详情页
+    {DETAIL: detail_page(), CLAIM: None},        # 申请页失败，退回申请页
+])
+def test_fallback_deal_is_not_marked_seen(resolving_crawler, pages):
+    resolving_crawler.pages = pages
+    assert resolve(resolving_crawler)['url'] in (DETAIL, CLAIM)
+    assert DETAIL not in resolving_crawler.seen_deals
+
+
+def test_deal_over_budget_is_not_marked_seen(resolving_crawler):
+    resolving_crawler.pages = {DETAIL: detail_page(fallback=True), CLAIM: CLAIM_PAGE}
+    get_page_content = resolving_crawler.get_page_content
+
+    def slow_claim_page(url, timeout=None):
+        if url == CLAIM:
+            # 申请页请求时预算已用完：只能使用详情页上的次要链接
+            enhanced_crawler.current_budget().exhausted = True
+            return None
+        return get_page_content(url, timeout)
+
+    resolving_crawler.get_page_content = slow_claim_page
+    assert resolve(resolving_crawler)['url'] == FALLBACK
+    assert DETAIL not in resolving_crawler.seen_deals
@@ -0,0 +1,113 @@
+import requests
+
+import enhanced_crawler
+from deadline import deal_budget
+from extraction import LinkExtractor
+from link_cache import ResolvedLinkCache
+from link_index import LinkRuleSet
+from redirects import RedirectResolver
+from url_classifier import URLClassifier
+
+
+class FakeResponse:
+    def __init__(self, status_code, location=None):
+        self.status_code = status_code
+        self.headers = {'Location': location} if location else {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeTransport:
+    """routes: (方法, URL) 或 URL → (状态码, Location) 或异常"""
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.requests = []
+
+    def request(self, method, url, timeout=None, headers=None, stream=False, allow_redirects=True):
+        assert stream and not allow_redirects
+        self.requests.append((method, url, headers))
+        route = self.routes.get((method, url), self.routes.get(url))
+        if isinstance(route, Exception):
+            raise route
+        return FakeResponse(*route)
+
+
+def test_follows_chain_with_head():
+    transport = FakeTransport({
+        'https://bit.ly/abc': (301, 'https://share.shop.example/r/1'),
+        'https://share.shop.example/r/1': (302, '/offer?id=1'),
+        'https://share.shop.example/offer?id=1': (200, None),
+    })
+    result = RedirectResolver(transport).resolve('https://bit.ly/abc')
+    assert result.final_url == 'https://share.shop.example/offer?id=1'
+    assert (result.hops, result.status) == (2, 200)
+    assert {method for method, _, _ in transport.requests} == {'HEAD'}
+
+
+def test_head_rejected_falls_back_to_range_get():
+    url = 'https://go.example/x'
+    transport = FakeTransport({
+        ('HEAD', url): (405, None),
+        ('GET', url): (302, 'https://shop.example/x'),
+        'https://shop.example/x': (200, None),
+    })
+    resolver = RedirectResolver(transport)
+    assert resolver.resolve(url).final_url == 'https://shop.example/x'
+    assert transport.requests[1] == ('GET', url, {'Range': 'bytes=0-0'})
+    assert resolver.stats()['get_fallbacks'] == 1
+
+
+def test_hop_limit_and_loops():
+    chain = {f'https://hop.example/{i}': (302, f'https://hop.example/{i + 1}') for i in range(10)}
+    resolver = RedirectResolver(FakeTransport(chain), max_hops=3)
+    result = resolver.resolve('https://hop.example/0')
+    assert (result.final_url, result.hops) == ('https://hop.example/3', 3)
+    assert resolver.stats()['too_many_hops'] == 1
+
+    # 设置 Cookie 后跳回原地址：停在跳回之前的URL
+    loop = FakeTransport({
+        'https://a.example/': (302, 'https://a.example/cookie'),
+        'https://a.example/cookie': (302, 'https://a.example/'),
+    })
+    result = RedirectResolver(loop).resolve('https://a.example/')
+    assert (result.final_url, result.hops) == ('https://a.example/cookie', 1)
+    assert len(loop.requests) == 2
+
+
+def test_failures_are_negatively_cached(tmp_path):
+    url = 'https://down.example/x'
+    cache = ResolvedLinkCache(str(tmp_path / 'final_urls.json'))
+    transport = FakeTransport({url: requests.ConnectionError()})
+    resolver = RedirectResolver(transport, cache=cache)
+    assert resolver.resolve(url).final_url == url
+    assert cache.get(url) == {'url': url, 'negative': True}
+
+    again = RedirectResolver(transport, cache=cache)
+    assert again.resolve(url).final_url == url
+    assert len(transport.requests) == 1 and again.stats()['cache_hits'] == 1
+
+
+def test_budget_cut_is_not_cached(tmp_path):
+    url = 'https://slow.example/x'
+    cache = ResolvedLinkCache(str(tmp_path / 'final_urls.json'))
+    transport = FakeTransport({url: (200, None)})
+    with deal_budget(0):
+        assert RedirectResolver(transport, cache=cache).resolve(url).final_url == url
+    assert transport.requests == [] and cache.peek(url) is None
+
+
+def test_extractor_validates_fallback_by_final_url(tmp_path):
+    wrapper = 'https://share.octopus.energy/calm-bird-123'
+    cache = ResolvedLinkCache(str(tmp_path / 'final_urls.json'))
+    cache.set(wrapper, 'https://octopus.energy/')
+    resolver = RedirectResolver(FakeTransport({}), cache=cache)
+    rules = LinkRuleSet.from_config(enhanced_crawler.REAL_LINK_EXTRACTION)
+    classifier = URLClassifier.from_config(enhanced_crawler.URL_VALIDATION)
+    html = f'<a href="{wrapper}" target="_blank">Get it</a>'
+
+    assert LinkExtractor(rules, classifier).detail_links(html)['fallback'] is None
+    fallback = LinkExtractor(rules, classifier, resolver.final_url).detail_links(html)['fallback']
+    assert fallback[0] == wrapper
@@ -0,0 +1,52 @@
+from link_cache import ResolvedLinkCache
+
+DETAIL = 'https://www.latestfreestuff.co.uk/free-stuff/{}/'
+
+
+def test_negative_entries_expire_before_positive(tmp_path, clock):
+    cache = ResolvedLinkCache(str(tmp_path / 'links.json'), ttl=100, negative_ttl=10)
+    cache.set(DETAIL.format('a'), 'https://shop.example/a')
+    cache.set(DETAIL.format('b'), DETAIL.format('b'), negative=True)
+    assert cache.get(DETAIL.format('b')) == {'url': DETAIL.format('b'), 'negative': True}
+
+    clock.advance(11)
+    assert cache.get(DETAIL.format('b')) is None
+    assert cache.get(DETAIL.format('a')) == {'url': 'https://shop.example/a', 'negative': False}
+    clock.advance(90)
+    assert cache.get(DETAIL.format('a')) is None and cache.peek(DETAIL.format('a')) is None
+    assert cache.stats()['misses'] == 2
+
+
+def test_expired_entries_are_dropped_on_reload(tmp_path, clock):
+    path = str(tmp_path / 'links.json')
+    cache = ResolvedLinkCache(path, ttl=100)
+    cache.set(DETAIL.format('a'), 'https://shop.example/a')
+    cache.set(DETAIL.format('b'), 'https://shop.example/b', ttl=10)
+    cache.save()
+
+    clock.advance(50)
+    reloaded = ResolvedLinkCache(path, ttl=100)
+    assert reloaded.stats()['size'] == 1
+    assert reloaded.peek(DETAIL.format('a')) == 'https://shop.example/a'
+
+
+def test_eviction_prefers_expired_then_least_recently_used(tmp_path, clock):
+    cache = ResolvedLinkCache(str(tmp_path / 'links.json'), ttl=100, max_entries=3)
+    cache.set(DETAIL.format('old'), 'https://shop.example/old', ttl=5)
+    cache.set(DETAIL.format('a'), 'https://shop.example/a')
+    cache.set(DETAIL.format('b'), 'https://shop.example/b')
+    clock.advance(10)
+    cache.set(DETAIL.format('c'), 'https://shop.example/c')   # 先清理过期的 old
+    assert cache.peek(DETAIL.format('a')) == 'https://shop.example/a'
+
+    cache.get(DETAIL.format('a'))                                # a 变为最近使用
+    cache.set(DETAIL.format('d'), 'https://shop.example/d')
+    assert cache.peek(DETAIL.format('b')) is None
+    assert [cache.peek(DETAIL.format(k)) is not None for k in 'acd'] == [True, True, True]
+    assert cache.stats()['evictions'] == 2
+
+
+def test_non_http_keys_are_not_cached(tmp_path):
+    cache = ResolvedLinkCache(str(tmp_path / 'links.json'))
+    cache.set('/free-stuff/a/', 'https://shop.example/a')
+    assert cache.get('/free-stuff/a/') is None and cache.stats()['size'] == 0
@@ -0,0 +1,125 @@
+import logging
+import threading
+
+import pytest
+import requests
+
+import enhanced_crawler
+from deadline import BudgetExceeded
+from retry import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+URL = 'https://merchant.example/page'
+
+
+def make_crawler(fetch, max_retries=2):
+    """只带重试和熔断相关属性的爬虫实例（不创建传输层、翻译服务等）"""
+    crawler = object.__new__(enhanced_crawler.EnhancedFreeStuffCrawler)
+    crawler.circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    crawler.retry_policy = RetryPolicy(max_retries=max_retries, backoff_base=0)
+    crawler.retries = 0
+    crawler._retries_lock = threading.Lock()
+    crawler.logger = logging.getLogger('test')
+    crawler._fetch_once = fetch
+    return crawler
+
+
+def half_open(breaker):
+    breaker.record_failure(URL)
+    assert breaker._hosts['merchant.example']['state'] == CircuitBreaker.OPEN
+
+
+def test_breaker_opens_and_recovers_after_successful_probe():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    breaker.record_failure(URL)
+    assert breaker.allow(URL)
+    breaker.record_failure(URL)
+    assert breaker.stats()['open_hosts'] == ['merchant.example']
+
+    assert breaker.allow(URL)          # 冷却结束，放行一个探测请求
+    assert not breaker.allow(URL)      # 探测期间拒绝其他请求
+    breaker.record_success(URL)
+    assert breaker.allow(URL) and breaker.allow(URL)
+    assert breaker.stats()['open_hosts'] == []
+
+
+def test_release_frees_probe_slot_or_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure(URL)
+    breaker.reset_timeout = 0
+    assert breaker.allow(URL)
+    breaker.release(URL)
+    assert breaker._hosts['merchant.example'] == {**breaker._hosts['merchant.example'],
+                                                 'state': CircuitBreaker.HALF_OPEN, 'probing': False}
+    assert breaker.allow(URL)
+
+    breaker.reset_timeout = 60
+    breaker.release(URL, failed=True)
+    assert not breaker.allow(URL)
+
+
+def test_release_does_not_touch_closed_host():
+    breaker = CircuitBreaker(failure_threshold=3)
+    breaker.release(URL, failed=True)
+    assert breaker.allow(URL)
+    assert breaker.stats() == {'trips': 0, 'rejected': 0, 'open_hosts': []}
+
+
+def test_failed_probe_on_first_attempt_does_not_wedge_host():
+    calls = []
+
+    def fetch(url, timeout, watcher=None):
+        calls.append(url)
+        if len(calls) == 1:
+            raise requests.ConnectionError('reset')
+        return 'ok'
+
+    crawler = make_crawler(fetch)
+    half_open(crawler.circuit_breaker)
+
+    # 探测失败后立即重新熔断（reset_timeout=0：下一次请求重新探测并成功）
+    assert crawler._fetch_with_retry(URL, timeout=5) == 'ok'
+    assert len(calls) == 2
+    assert crawler.circuit_breaker.stats()['open_hosts'] == []
+
+
+def test_failed_probe_reopens_circuit_until_cooldown():
+    def fetch(url, timeout, watcher=None):
+        raise requests.ConnectionError('reset')
+
+    crawler = make_crawler(fetch)
+    half_open(crawler.circuit_breaker)
+    crawler.circuit_breaker.reset_timeout = 60
+    crawler.circuit_breaker._hosts['merchant.example']['opened'] -= 60
+
+    with pytest.raises(CircuitOpenError):
+        crawler._fetch_with_retry(URL, timeout=5)
+    state = crawler.circuit_breaker._hosts['merchant.example']
+    assert state['state'] == CircuitBreaker.OPEN and not state['probing']
+
+
+@pytest.mark.parametrize('error', [BudgetExceeded(), ValueError('bad content')])
+def test_probe_ending_without_result_releases_slot(error):
+    def fetch(url, timeout, watcher=None):
+        raise error
+
+    crawler = make_crawler(fetch)
+    half_open(crawler.circuit_breaker)
+    with pytest.raises(type(error)):
+        crawler._fetch_with_retry(URL, timeout=5)
+    state = crawler.circuit_breaker._hosts['merchant.example']
+    assert state['state'] == CircuitBreaker.HALF_OPEN and not state['probing']
+    assert crawler.circuit_breaker.allow(URL)
+
+
+def test_client_error_counts_as_healthy_host():
+    response = requests.Response()
+    response.status_code = 404
+
+    def fetch(url, timeout, watcher=None):
+        raise requests.HTTPError(response=response)
+
+    crawler = make_crawler(fetch)
+    half_open(crawler.circuit_breaker)
+    with pytest.raises(requests.HTTPError):
+        crawler._fetch_with_retry(URL, timeout=5)
+    assert crawler.circuit_breaker.stats()['open_hosts'] == []
@@ -0,0 +1,115 @@
+import logging
+import re
+
+import pytest
+import requests
+
+import enhanced_crawler
+from extraction import LinkExtractor
+from link_index import LinkRuleSet
+from rate_limit import HostRateLimiter
+from streaming import LinkWatcher, StreamedPage, read_stream
+from url_classifier import URLClassifier
+
+FREEBIE = re.compile(r'href="([^"]+)"[^>]*>GET FREEBIE')
+
+
+class FakeResponse:
+    def __init__(self, body, chunk=8):
+        self.body = body.encode('utf-8')
+        self.chunk = chunk
+        self.headers = {'Content-Type': 'text/html; charset=utf-8'}
+        self.delivered = 0
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), self.chunk):
+            if self.closed:
+                raise ValueError('read from closed response')
+            self.delivered = i + self.chunk
+            yield self.body[i:i + self.chunk]
+
+    def close(self):
+        self.closed = True
+
+
+HEAD = '<html><a href="https://www.latestfreestuff.co.uk/claim/x/">GET FREEBIE</a>'
+TAIL = '<p>' + 'lorem ipsum ' * 20 + '</p><a href="https://shop.example/offer" target="_blank">Visit</a></html>'
+
+
+def test_stopped_page_resumes_same_response():
+    response = FakeResponse(HEAD + TAIL)
+    completed = []
+    page, body = read_stream(response, LinkWatcher(FREEBIE), resumable=True,
+                             on_complete=lambda full, raw: completed.append(raw))
+    assert page.stopped and body is None and not response.closed
+    assert len(page) < len(HEAD + TAIL)
+
+    full = page.resume()
+    assert full == HEAD + TAIL and full.complete
+    assert response.closed and completed == [(HEAD + TAIL).encode('utf-8')]
+    assert page.resume() is full          # 剩余部分只读取一次
+
+
+def test_closed_page_cannot_resume():
+    response = FakeResponse(HEAD + TAIL)
+    page, _ = read_stream(response, LinkWatcher(FREEBIE), resumable=True)
+    page.close()
+    assert response.closed and page.resume() is None
+
+
+def test_not_resumable_by_default():
+    response = FakeResponse(HEAD + TAIL)
+    page, _ = read_stream(response, LinkWatcher(FREEBIE))
+    assert page.stopped and response.closed and page.resume() is None
+
+
+def test_complete_page_returns_body():
+    response = FakeResponse(TAIL)
+    page, body = read_stream(response, LinkWatcher(FREEBIE), resumable=True)
+    assert page.complete and page == TAIL and body == TAIL.encode('utf-8') and response.closed
+
+
+def test_detail_fallback_continues_streamed_page():
+    crawler = object.__new__(enhanced_crawler.EnhancedFreeStuffCrawler)
+    crawler.base_url = 'https://www.latestfreestuff.co.uk'
+    crawler.logger = logging.getLogger('test')
+    crawler.url_classifier = URLClassifier.from_config(enhanced_crawler.URL_VALIDATION)
+    crawler.extractor = LinkExtractor(LinkRuleSet.from_config(enhanced_crawler.REAL_LINK_EXTRACTION),
+                                      crawler.url_classifier)
+    crawler.link_cache = None
+    crawler.requested = []
+
+    def get_page_content(url, timeout=None):
+        crawler.requested.append(url)
+        return None
+
+    crawler.get_page_content = get_page_content
+    crawler.link_timeout = 5
+    crawler._extract_from_claim_page = lambda url, errors=None: url   # 申请页面没有商家链接
+
+    response = FakeResponse(HEAD + TAIL)
+    page, _ = read_stream(response, LinkWatcher(FREEBIE), resumable=True)
+    assert isinstance(page, StreamedPage) and page.stopped
+    url = crawler._find_real_url_in_detail(page, 'https://www.latestfreestuff.co.uk/free-stuff/x/')
+    assert url == 'https://shop.example/offer'
+    assert crawler.requested == []        # 没有再次请求详情页
+
+
+def test_streamed_error_response_is_closed_before_raising():
+    response = FakeResponse('<html>not found</html>')
+    response.status_code = 404
+
+    def raise_for_status():
+        raise requests.HTTPError('404', response=response)
+
+    response.raise_for_status = raise_for_status
+    crawler = object.__new__(enhanced_crawler.EnhancedFreeStuffCrawler)
+    crawler.logger = logging.getLogger('test')
+    crawler.http_cache = None
+    crawler.rate_limiter = HostRateLimiter(rate=0)
+    crawler.transport = type('Transport', (), {'get': lambda self, url, **kwargs: response})()
+
+    with pytest.raises(requests.HTTPError):
+        crawler._fetch_once('https://www.latestfreestuff.co.uk/free-stuff/x/', 5, LinkWatcher(FREEBIE))
+    assert response.closed
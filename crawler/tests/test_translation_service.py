@@ -0,0 +1,96 @@
+import time
+
+import pytest
+
+from translation_service import (DictionaryBackend, LocalTranslationServer, RemoteAPIBackend, TranslationMemory,
+                                 TranslationService)
+from translator import SimpleTranslator
+
+
+class RecordingBackend(DictionaryBackend):
+    """记录每次交给后端的批次"""
+
+    def __init__(self, translator, batch_size=500):
+        super().__init__(translator, batch_size)
+        self.calls = []
+
+    def translate_batch(self, texts):
+        self.calls.append(list(texts))
+        return super().translate_batch(texts)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(time, 'sleep', sleeps.append)
+    return sleeps
+
+
+def test_duplicate_texts_are_translated_once():
+    backend = RecordingBackend(SimpleTranslator())
+    service = TranslationService(backend)
+    results = service.translate_many(['free deal', 'free gift', 'free deal', '', 'free deal'])
+    assert results == {'free deal': '免费 优惠', 'free gift': '免费 gift'}
+    assert backend.calls == [['free deal', 'free gift']]
+    assert service.stats()['segments'] == 5 and service.stats()['unique'] == 2
+
+
+def test_memory_persists_across_runs(tmp_path):
+    path = str(tmp_path / 'cache' / 'memory.json')
+    first = TranslationService(RecordingBackend(SimpleTranslator()), TranslationMemory(path))
+    first.translate_many(['free deal', 'free gift'])
+    first.close()
+
+    backend = RecordingBackend(SimpleTranslator())
+    second = TranslationService(backend, TranslationMemory(path))
+    results = second.translate_many(['free deal', 'new offer'])
+    assert results == {'free deal': '免费 优惠', 'new offer': '新 优惠'}
+    assert backend.calls == [['new offer']]         # 只有新文本交给后端
+    assert second.stats()['memory_hits'] == 1
+
+
+def test_memory_is_scoped_to_dictionary_contents(tmp_path):
+    path = str(tmp_path / 'memory.json')
+    first = TranslationService(DictionaryBackend(SimpleTranslator()), TranslationMemory(path))
+    first.translate_many(['free gift'])
+    first.save()
+
+    dictionary = tmp_path / 'extra.tsv'
+    dictionary.write_text('gift\t礼物\n', encoding='utf-8')
+    backend = RecordingBackend(SimpleTranslator(str(dictionary)))
+    results = TranslationService(backend, TranslationMemory(path)).translate_many(['free gift'])
+    assert results == {'free gift': '免费 礼物'}     # 词典变化后旧记忆不再使用
+    assert backend.calls == [['free gift']]
+
+
+def test_dictionary_backend_is_not_throttled(sleeps):
+    service = TranslationService(DictionaryBackend(SimpleTranslator(), batch_size=1))
+    service.translate_many(['free', 'deal', 'offer'])
+    assert service.stats()['batches'] == 3
+    assert sleeps == []
+
+
+def test_remote_backend_is_throttled_between_batches(sleeps):
+    server = LocalTranslationServer(SimpleTranslator())
+    try:
+        backend = RemoteAPIBackend(server.url, batch_size=2, min_interval=30)
+        service = TranslationService(backend)
+        results = service.translate_many(['free', 'deal', 'offer', 'free'])
+        assert results == {'free': '免费', 'deal': '优惠', 'offer': '优惠'}
+        assert server.requests == 2
+        # 第一个批次不等待，第二个批次等待约 min_interval
+        assert len(sleeps) == 1 and 29 < sleeps[0] <= 30
+    finally:
+        server.stop()
+
+
+def test_failed_batch_keeps_original_text_and_is_not_remembered(tmp_path):
+    class FailingBackend(DictionaryBackend):
+        def translate_batch(self, texts):
+            raise ValueError('boom')
+
+    memory = TranslationMemory(str(tmp_path / 'memory.json'))
+    service = TranslationService(FailingBackend(SimpleTranslator()), memory)
+    assert service.translate_many(['free deal']) == {'free deal': 'free deal'}
+    assert service.stats()['failures'] == 1
+    assert len(memory) == 0
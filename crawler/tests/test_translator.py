@@ -0,0 +1,59 @@
+from translator import LRUCache, PhraseMatcher, SimpleTranslator
+
+
+def test_phrase_matcher_prefers_longest_phrase():
+    matcher = PhraseMatcher({'free': '免费', 'free sample': '免费样品', 'free samples': '免费样品们', 'sample': '样品'})
+    assert matcher.replace('free samples') == '免费样品们'
+    assert matcher.replace('free sample') == '免费样品'
+    assert matcher.replace('free samp') == '免费 samp'      # 较长短语不完整时退回较短的短语
+    assert matcher.replace('a sample for free') == 'a 样品 for 免费'
+
+
+def test_phrase_matcher_takes_leftmost_match_without_overlap():
+    matcher = PhraseMatcher({'gift card': '礼品卡', 'card game': '卡牌游戏'})
+    # 最左的 gift card 先匹配，剩下的 " game" 不再构成 card game
+    assert matcher.replace('gift card game') == '礼品卡 game'
+    assert matcher.replace('card game gift') == '卡牌游戏 gift'
+
+
+def test_phrase_matcher_matches_str_replace_for_prefix_free_dictionary():
+    translations = {'free': '免费', 'deal': '优惠', 'voucher': '优惠券', 'shop': '购物'}
+    text = 'free voucher deal at the shop, free delivery'
+    expected = text
+    for en, zh in translations.items():
+        expected = expected.replace(en, zh)
+    assert PhraseMatcher(translations).replace(text) == expected
+
+
+def test_phrase_matcher_lowercases_dictionary_and_handles_empty():
+    assert PhraseMatcher({'FREE': '免费', '': 'x'}).replace('free') == '免费'
+    assert PhraseMatcher({}).replace('free') == 'free'
+
+
+def test_lru_cache_counts_hits_misses_and_evictions():
+    cache = LRUCache(max_entries=2)
+    cache.set('a', 'A')
+    cache.set('b', 'B')
+    assert cache.get('a') == 'A'        # a 变为最近使用
+    cache.set('c', 'C')                 # 淘汰最久未使用的 b
+    assert cache.get('b') is None
+    assert cache.get('c') == 'C'
+    assert len(cache) == 2
+    assert cache.stats() == {'entries': 2, 'hits': 2, 'misses': 1, 'evictions': 1, 'hit_rate': 0.667}
+
+
+def test_lru_cache_update_refreshes_recency():
+    cache = LRUCache(max_entries=2)
+    cache.set('a', 'A')
+    cache.set('b', 'B')
+    cache.set('a', 'A2')                # 更新也算最近使用
+    cache.set('c', 'C')
+    assert cache.get('a') == 'A2'
+    assert cache.get('b') is None
+
+
+def test_translator_serves_repeated_text_from_cache():
+    translator = SimpleTranslator(cache_size=10)
+    assert translator.translate_to_chinese('Free Delivery') == translator.translate_to_chinese('Free Delivery')
+    stats = translator.stats()
+    assert stats['hits'] == 1 and stats['misses'] == 1 and stats['entries'] == 1
@@ -0,0 +1,44 @@
+import gc
+
+import pytest
+
+pytest.importorskip('httpx')
+
+from transport import HTTPXTransport
+
+URL = 'https://merchant.example/page'
+
+
+class NetworkStream:
+    pass
+
+
+class FakeHTTPXResponse:
+    http_version = 'HTTP/1.1'
+
+    def __init__(self, stream):
+        self.extensions = {'network_stream': stream}
+
+
+def test_connection_stats_do_not_keep_streams_alive():
+    transport = HTTPXTransport(http2=False)
+    try:
+        first = NetworkStream()
+        transport._record(URL, FakeHTTPXResponse(first))
+        transport._record(URL, FakeHTTPXResponse(first))   # 复用同一条连接
+        second = NetworkStream()
+        transport._record(URL, FakeHTTPXResponse(second))
+
+        del first, second
+        gc.collect()
+        assert len(transport._connections['merchant.example']) == 0
+
+        stats = transport.stats()['merchant.example']
+        assert stats['requests'] == 3
+        assert stats['connections'] == 2
+        assert stats['reused'] == 1
+
+        transport._record(URL, FakeHTTPXResponse(NetworkStream()))   # 旧连接关闭后的新连接
+        assert transport.stats()['merchant.example']['connections'] == 3
+    finally:
+        transport.close()
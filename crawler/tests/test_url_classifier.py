@@ -0,0 +1,144 @@
+from urllib.parse import urlparse
+
+import pytest
+
+from enhanced_config import URL_VALIDATION
+from url_classifier import URLClassifier, canonicalize_url
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('HTTPS://WWW.Shop.example:443/offer/?utm_source=x&b=2&a=1#top', 'https://shop.example/offer?a=1&b=2'),
+    ('http://shop.example:8080/offer', 'http://shop.example:8080/offer'),
+    ('https://shop.example', 'https://shop.example/'),
+    # 端口无法解析时去掉端口，不抛出异常
+    ('https://shop.example:abc/offer', 'https://shop.example/offer'),
+    ('https://shop.example:99999/offer/', 'https://shop.example/offer'),
+    # 整个URL无法解析时原样返回
+    ('https://[::1/offer', 'https://[::1/offer'),
+    ('', ''),
+])
+def test_canonicalize_url(url, expected):
+    assert canonicalize_url(url) == expected
+
+
+def legacy_is_valid_deal_url(url):
+    """原 EnhancedFreeStuffCrawler.is_valid_deal_url（逐个遍历写死的列表）"""
+    if not url or len(url) < 10:
+        return False
+    url_lower = url.lower()
+    invalid_patterns = [
+        'javascript:', 'mailto:', 'tel:', '#', 'data:',
+        'void(0)', 'about:blank',
+        '.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.pdf'
+    ]
+    for pattern in invalid_patterns:
+        if pattern in url_lower:
+            return False
+    social_share_patterns = [
+        'share', 'sharer', 'intent/tweet', 'pin/create',
+        'linkedin.com/in/', 'facebook.com/profile'
+    ]
+    for pattern in social_share_patterns:
+        if pattern in url_lower:
+            return False
+    file_extensions = ['.pdf', '.doc', '.docx', '.zip', '.rar', '.exe', '.dmg']
+    for ext in file_extensions:
+        if url_lower.endswith(ext):
+            return False
+    valid_domains = [
+        'amazon.co.uk', 'amazon.com', 'ebay.co.uk', 'ebay.com',
+        'argos.co.uk', 'currys.co.uk', 'johnlewis.com', 'marksandspencer.com',
+        'tesco.com', 'asda.com', 'sainsburys.co.uk', 'morrisons.com',
+        'boots.com', 'superdrug.com', 'next.co.uk', 'hm.com',
+        'zara.com', 'asos.com', 'boohoo.com', 'prettylittlething.com',
+        'topshop.com', 'newlook.com', 'primark.com', 'tkmaxx.com',
+        'virginmedia.com', 'octopus.energy', 'bulb.co.uk', 'edf.co.uk',
+        'groupon.co.uk', 'wowcher.co.uk', 'vouchercodes.co.uk',
+        'hotukdeals.com', 'myvouchercodes.co.uk', 'retailmenot.com',
+        'expedia.co.uk', 'booking.com', 'hotels.com', 'lastminute.com',
+        'ryanair.com', 'easyjet.com', 'ba.com', 'trainline.com',
+        'whitworths.co.uk', 'discoverysample.com'
+    ]
+    try:
+        domain = urlparse(url).netloc.lower()
+        if domain.startswith('www.'):
+            domain = domain[4:]
+        for valid_domain in valid_domains:
+            if domain == valid_domain or domain.endswith('.' + valid_domain):
+                return True
+        deal_keywords = [
+            'deal', 'offer', 'discount', 'coupon', 'promo', 'sale',
+            'shop', 'store', 'buy', 'checkout', 'cart', 'order',
+            'voucher', 'code', 'cashback', 'reward'
+        ]
+        for keyword in deal_keywords:
+            if keyword in url_lower:
+                return True
+    except Exception:
+        pass
+    return len(url) > 15 and 'latestfreestuff.co.uk' not in url_lower
+
+
+def legacy_is_valid_merchant_link(url):
+    """原 EnhancedFreeStuffCrawler._is_valid_merchant_link"""
+    if not url or len(url) < 10:
+        return False
+    url_lower = url.lower()
+    invalid_patterns = [
+        'javascript:', 'mailto:', 'tel:', '#', 'data:',
+        'google.com', 'facebook.com', 'twitter.com', 'instagram.com',
+        'youtube.com', 'linkedin.com', 'pinterest.com', 'tiktok.com',
+        'fonts.googleapis.com', 'analytics.google.com', 'google-analytics.com',
+        'googletagmanager.com', 'recaptcha', 'privacy-policy', 'terms-and-conditions',
+        '.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico'
+    ]
+    for pattern in invalid_patterns:
+        if pattern in url_lower:
+            return False
+    if 'latestfreestuff.co.uk' in url_lower:
+        return False
+    if not url_lower.startswith(('http://', 'https://')):
+        return False
+    return True
+
+
+CANDIDATE_URLS = [
+    None, '', 'short.url', 'https://a.io/x',
+    'https://www.amazon.co.uk/dp/B000', 'https://smile.AMAZON.com/gp/x', 'https://notamazon.com/item/123',
+    'https://www.latestfreestuff.co.uk/free-stuff/coffee/', 'https://www.latestfreestuff.co.uk/claim/coffee/',
+    'https://www.facebook.com/sharer/sharer.php?u=x', 'https://twitter.com/intent/tweet?url=x',
+    'https://pinterest.com/pin/create/button/', 'https://www.linkedin.com/in/someone',
+    'https://brand.example/Free-Sample', 'https://brand.example/signup?ref=1',
+    'https://brand.example/offer/coffee', 'https://brand.example/CHECKOUT', 'HTTPS://BRAND.EXAMPLE/PROMO',
+    'https://brand.example/page#section', 'javascript:void(0)', 'mailto:hello@brand.example',
+    'tel:+441234567890', 'data:text/html;base64,AAAA', 'about:blank',
+    'https://cdn.brand.example/app.js?v=1', 'https://cdn.brand.example/style.css',
+    'https://cdn.brand.example/logo.PNG', 'https://brand.example/guide.pdf', 'https://brand.example/setup.EXE',
+    'https://brand.example/archive.zip', 'https://files.brand.example/report.docx',
+    'https://www.google.com/search?q=free', 'https://fonts.googleapis.com/css?family=x',
+    'https://www.youtube.com/watch?v=abc', 'https://brand.example/privacy-policy',
+    'https://www.google.com/recaptcha/api.js', 'https://www.instagram.com/brand/',
+    'https://whitworths.co.uk/free', 'https://samples.discoverysample.com/x', 'https://www.mcdonalds.co.uk/deals',
+    'ftp://brand.example/free-sample', '/relative/free-sample/path', 'https://brand.example/',
+]
+
+
+@pytest.fixture(scope='module')
+def classifier():
+    return URLClassifier.from_config(URL_VALIDATION)
+
+
+@pytest.mark.parametrize('url', CANDIDATE_URLS)
+def test_classifier_matches_legacy_deal_url_check(classifier, url):
+    assert classifier.is_valid_deal_url(url) == legacy_is_valid_deal_url(url)
+
+
+@pytest.mark.parametrize('url', CANDIDATE_URLS)
+def test_classifier_matches_legacy_merchant_link_check(classifier, url):
+    assert classifier.is_valid_merchant_link(url) == legacy_is_valid_merchant_link(url)
+
+
+def test_missing_rules_are_empty():
+    classifier = URLClassifier.from_config({})
+    assert classifier.is_valid_deal_url('https://www.facebook.com/sharer/sharer.php?u=x')
+    assert not classifier.is_valid_deal_url('https://www.latestfreestuff.co.uk/x/')
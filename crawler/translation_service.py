@@ -0,0 +1,328 @@
+"""
+批量翻译服务 - 可插拔的翻译后端与持久化翻译记忆
+
+translate_deals 原先逐个优惠翻译标题和描述，并且每个优惠固定 sleep 0.5 秒，
+而本地词典翻译根本不需要限流。这里统一为：
+- 收集本次运行的所有文本段，去重后整批交给后端
+- 翻译记忆（data/cache/translation_memory.json）跨运行保存，重复的标题不再翻译
+- 只有声明了 min_interval 的后端（远程API）才在批次之间限流
+
+后端:
+- dictionary: 本地词典（translator.SimpleTranslator），不限流
+- remote: 远程翻译API客户端（Google Translate v2 风格的 JSON 接口）
+- local-http: 在本机启动一个同协议的翻译服务替身，用于测试 remote 路径
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+
+class TranslationBackend:
+    """翻译后端接口：一次翻译一批文本，返回同样长度、同样顺序的结果"""
+
+    name = 'base'
+    batch_size = 50
+    min_interval = 0.0  # 两个批次之间的最小间隔（秒），0 表示不限流
+
+    def translate_batch(self, texts):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class DictionaryBackend(TranslationBackend):
+    """本地词典后端"""
+
+    def __init__(self, translator, batch_size=500):
+        self.translator = translator
+        self.batch_size = batch_size
+        # 词典内容变化后，旧的翻译记忆自动失效
+        entries = json.dumps(sorted(translator.matcher.translations.items()), ensure_ascii=False)
+        self.name = 'dictionary:' + hashlib.sha1(entries.encode('utf-8')).hexdigest()[:8]
+
+    def translate_batch(self, texts):
+        return [self.translator.translate_to_chinese(text) for text in texts]
+
+
+class RemoteAPIBackend(TranslationBackend):
+    """远程翻译API客户端
+
+    请求: POST endpoint  {"q": [...], "source": "en", "target": "zh-CN", "format": "text"}
+    响应: {"data": {"translations": [{"translatedText": "..."}, ...]}}
+    """
+
+    def __init__(self, endpoint, api_key=None, source='en', target='zh-CN',
+                 batch_size=50, min_interval=0.5, timeout=15, session=None):
+        if not endpoint:
+            raise ValueError("远程翻译后端需要配置 endpoint")
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.source = source
+        self.target = target
+        self.batch_size = batch_size
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.name = f"remote:{endpoint}:{target}"
+
+    def translate_batch(self, texts):
+        params = {'key': self.api_key} if self.api_key else None
+        payload = {'q': list(texts), 'source': self.source, 'target': self.target, 'format': 'text'}
+        response = self.session.post(self.endpoint, params=params, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        translations = response.json()['data']['translations']
+        if len(translations) != len(texts):
+            raise ValueError(f"翻译结果数量不匹配: 请求 {len(texts)} 条, 返回 {len(translations)} 条")
+        return [item['translatedText'] for item in translations]
+
+
+class LocalTranslationServer:
+    """本机翻译服务替身：与 RemoteAPIBackend 协议相同，使用本地词典翻译"""
+
+    def __init__(self, translator, host='127.0.0.1', port=0):
+        self.translator = translator
+        self.requests = 0
+        self.segments = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    payload = json.loads(self.rfile.read(length) or b'{}')
+                    texts = payload['q'] if isinstance(payload['q'], list) else [payload['q']]
+                except (ValueError, KeyError) as e:
+                    self.send_error(400, str(e))
+                    return
+                server.requests += 1
+                server.segments += len(texts)
+                body = json.dumps({'data': {'translations': [
+                    {'translatedText': server.translator.translate_to_chinese(text)} for text in texts
+                ]}}, ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/translate"
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class LocalHTTPBackend(RemoteAPIBackend):
+    """通过本机翻译服务替身走完整的远程API路径"""
+
+    def __init__(self, translator, batch_size=50, min_interval=0.0, timeout=15):
+        self.server = LocalTranslationServer(translator)
+        super().__init__(self.server.url, batch_size=batch_size, min_interval=min_interval, timeout=timeout)
+        self.name = 'local-http'
+
+    def close(self):
+        self.server.stop()
+
+
+class TranslationMemory:
+    """持久化翻译记忆：(后端, 原文) → 译文"""
+
+    def __init__(self, path, max_entries=50000):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # 按写入顺序排列，最旧的在前
+        self._dirty = False
+        self.load()
+
+    @staticmethod
+    def _key(backend, text):
+        return f"{backend}\x1f{text}"
+
+    def load(self):
+        """从磁盘加载翻译记忆"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            self.logger.warning(f"读取翻译记忆失败，将重新建立: {e}")
+            return
+        for backend, entries in data.get('backends', {}).items():
+            for text, translated in entries.items():
+                self._entries[self._key(backend, text)] = translated
+
+    def get(self, backend, text):
+        with self._lock:
+            return self._entries.get(self._key(backend, text))
+
+    def set(self, backend, text, translated):
+        key = self._key(backend, text)
+        with self._lock:
+            if self._entries.get(key) == translated:
+                return
+            self._entries[key] = translated
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def __len__(self):
+        return len(self._entries)
+
+    def save(self):
+        """原子写入磁盘（仅在有变化时）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            backends = {}
+            for key, translated in self._entries.items():
+                backend, _, text = key.partition('\x1f')
+                backends.setdefault(backend, {})[text] = translated
+            self._dirty = False
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': 1, 'backends': backends}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.logger.warning(f"保存翻译记忆失败: {e}")
+
+
+class TranslationService:
+    """去重 → 查翻译记忆 → 按批次调用后端（需要时限流）→ 写回翻译记忆"""
+
+    def __init__(self, backend, memory=None):
+        self.backend = backend
+        self.memory = memory
+        self.logger = logging.getLogger(__name__)
+        self._last_call = 0.0
+
+        self.segments = 0      # 请求翻译的文本段（含重复）
+        self.unique = 0        # 去重后的文本段
+        self.memory_hits = 0   # 翻译记忆命中
+        self.translated = 0    # 交给后端翻译的文本段
+        self.batches = 0       # 后端调用次数
+        self.failures = 0      # 翻译失败、保留原文的文本段
+
+    @classmethod
+    def from_config(cls, config, translator):
+        """根据 TRANSLATION 配置创建翻译服务"""
+        backend_name = config.get('backend', 'dictionary')
+        remote = config.get('remote', {})
+        logger = logging.getLogger(__name__)
+        backend = None
+        if backend_name == 'remote':
+            if remote.get('endpoint'):
+                backend = RemoteAPIBackend(
+                    remote.get('endpoint'),
+                    api_key=remote.get('api_key') or os.environ.get('TRANSLATION_API_KEY'),
+                    target=remote.get('target', 'zh-CN'),
+                    batch_size=remote.get('batch_size', 50),
+                    min_interval=remote.get('min_interval', 0.5),
+                    timeout=remote.get('timeout', 15),
+                )
+            else:
+                logger.warning("远程翻译后端未配置 endpoint，改用本地词典")
+        elif backend_name == 'local-http':
+            backend = LocalHTTPBackend(translator, batch_size=remote.get('batch_size', 50))
+        if backend is None:
+            backend = DictionaryBackend(translator)
+
+        memory = None
+        if config.get('memory_enabled', True):
+            memory = TranslationMemory(
+                config.get('memory_path', 'data/cache/translation_memory.json'),
+                max_entries=config.get('memory_max_entries', 50000),
+            )
+        return cls(backend, memory)
+
+    def _throttle(self):
+        if self.backend.min_interval <= 0:
+            return
+        wait = self._last_call + self.backend.min_interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self._last_call = time.monotonic()
+
+    def translate_many(self, texts):
+        """翻译一组文本，返回 {原文: 译文}；失败的文本段保留原文"""
+        unique = list(OrderedDict.fromkeys(t for t in texts if t))
+        self.segments += len(texts)
+        self.unique += len(unique)
+
+        results = {}
+        pending = []
+        for text in unique:
+            cached = self.memory.get(self.backend.name, text) if self.memory is not None else None
+            if cached is not None:
+                results[text] = cached
+                self.memory_hits += 1
+            else:
+                pending.append(text)
+
+        size = max(1, self.backend.batch_size)
+        for start in range(0, len(pending), size):
+            batch = pending[start:start + size]
+            self._throttle()
+            self.batches += 1
+            try:
+                translated = self.backend.translate_batch(batch)
+            except Exception as e:
+                self.logger.warning(f"翻译后端 {self.backend.name} 失败，保留原文: {e}")
+                self.failures += len(batch)
+                results.update((text, text) for text in batch)
+                continue
+            self.translated += len(batch)
+            for text, result in zip(batch, translated):
+                results[text] = result
+                if self.memory is not None:
+                    self.memory.set(self.backend.name, text, result)
+        return results
+
+    def save(self):
+        """保存翻译记忆"""
+        if self.memory is not None:
+            self.memory.save()
+
+    def close(self):
+        """保存翻译记忆并释放后端资源"""
+        self.save()
+        self.backend.close()
+
+    def stats(self):
+        """返回翻译统计"""
+        return {
+            'backend': self.backend.name,
+            'segments': self.segments,
+            'unique': self.unique,
+            'memory_hits': self.memory_hits,
+            'translated': self.translated,
+            'batches': self.batches,
+            'failures': self.failures,
+        }
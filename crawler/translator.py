@@ -0,0 +1,199 @@
+"""
+词典翻译 - 单次扫描的短语替换与有界LRU翻译缓存
+
+原实现对每个字符串按词典逐条调用 str.replace，开销随"词典大小 × 文本长度"增长，
+翻译缓存也没有容量上限。这里把词典编译成前缀树正则（共享前缀、最长匹配优先），
+一次扫描完成全部替换，词典扩展到数万条短语时吞吐量基本不变；
+缓存改为带命中率统计的LRU。
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from url_classifier import trie_pattern
+
+# 内置基础词汇（词典文件中的同名条目会覆盖这里的翻译）
+BASE_TRANSLATIONS = {
+    'free': '免费',
+    'deal': '优惠',
+    'offer': '优惠',
+    'discount': '折扣',
+    'save': '省钱',
+    'sale': '促销',
+    'voucher': '优惠券',
+    'code': '代码',
+    'cashback': '返现',
+    'student': '学生',
+    'new': '新',
+    'exclusive': '独家',
+    'limited': '限时',
+    'today': '今天',
+    'now': '现在',
+    'get': '获得',
+    'buy': '购买',
+    'shop': '购物',
+    'online': '在线',
+    'delivery': '配送',
+    'shipping': '运费',
+    'click': '点击',
+    'here': '这里',
+    'link': '链接',
+    'visit': '访问',
+    'website': '网站',
+    'store': '商店',
+    'price': '价格',
+    'cheap': '便宜',
+    'bargain': '便宜货',
+    'member': '会员',
+    'signup': '注册',
+    'register': '注册',
+    'account': '账户',
+}
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_dictionary(path):
+    """读取短语词典文件
+
+    支持两种格式：
+    - .json: {"english phrase": "中文", ...}
+    - 其他（TSV）: 每行 "english phrase<TAB>中文"，# 开头为注释
+    """
+    if path.endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return {str(en).lower(): str(zh) for en, zh in data.items() if en}
+
+    entries = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            en, sep, zh = line.partition('\t')
+            if sep and en.strip():
+                entries[en.strip().lower()] = zh.strip()
+    return entries
+
+
+class PhraseMatcher:
+    """把词典编译成一个前缀树正则，一次扫描替换所有短语（最左、最长匹配优先）"""
+
+    def __init__(self, translations):
+        self.translations = {en.lower(): zh for en, zh in translations.items() if en}
+        words = sorted(self.translations)
+        self._regex = re.compile(trie_pattern(words)) if words else None
+
+    def __len__(self):
+        return len(self.translations)
+
+    def replace(self, text):
+        if not self._regex:
+            return text
+        lookup = self.translations
+        return self._regex.sub(lambda m: lookup[m.group(0)], text)
+
+
+class LRUCache:
+    """容量有限的LRU缓存，记录命中率"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # 按最近使用顺序排列，最旧的在前
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """查询缓存，未命中时返回None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        """返回缓存统计"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+class SimpleTranslator:
+    """简单的翻译服务（可替换为其他翻译API）"""
+
+    def __init__(self, dictionary_file=None, cache_size=10000):
+        self.logger = logging.getLogger(__name__)
+        translations = dict(BASE_TRANSLATIONS)
+        if dictionary_file:
+            path = dictionary_file if os.path.isabs(dictionary_file) else os.path.join(MODULE_DIR, dictionary_file)
+            try:
+                translations.update(load_dictionary(path))
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"读取翻译词典失败，仅使用内置词汇: {e}")
+        self.matcher = PhraseMatcher(translations)
+        self.cache = LRUCache(cache_size)  # 翻译缓存
+
+    @classmethod
+    def from_config(cls, config):
+        """根据 TRANSLATION 配置创建翻译器"""
+        return cls(
+            dictionary_file=config.get('dictionary_file'),
+            cache_size=config.get('cache_size', 10000),
+        )
+
+    def translate_to_chinese(self, text):
+        """简单的英译中（这里使用词典短语替换，实际应用中建议使用专业翻译API）"""
+        if not text:
+            return text
+        cached = self.cache.get(text)
+        if cached is not None:
+            return cached
+
+        translated = self.matcher.replace(text.lower())
+
+        # 保持原文的大小写结构
+        result = self._preserve_case_structure(text, translated)
+        self.cache.set(text, result)
+        return result
+
+    def _preserve_case_structure(self, original, translated):
+        """保持原文的大小写结构"""
+        if not original:
+            return translated
+        if original.isupper():
+            return translated.upper()
+        if original.istitle():
+            return translated.title()
+        return translated
+
+    def stats(self):
+        """返回词典规模与缓存统计"""
+        return dict(self.cache.stats(), dictionary_size=len(self.matcher))
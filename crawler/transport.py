@@ -0,0 +1,236 @@
+"""
+传输层 - 可替换的HTTP客户端、按主机的连接池大小和连接复用统计
+
+原先只有一个使用默认连接池（每个主机10个连接）的 requests.Session，
+异步引擎的并发数一旦超过10，多出来的请求每次都要新建连接再丢弃。
+而详情页和申请页几乎都在 latestfreestuff.co.uk 这一个主机上。
+- RequestsTransport: requests + urllib3 连接池，可为指定主机单独设置连接池大小，
+  统计每个主机新建的连接数和复用次数
+- HTTPXTransport: 可选的 httpx 客户端，启用 HTTP/2 时同一主机的所有请求
+  在一条连接上多路复用；响应和异常被转换为 requests 的形式，
+  重试、限流、缓存等上层逻辑无需区分传输方式
+"""
+
+import logging
+import threading
+import weakref
+from collections import Counter
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.utils import get_encoding_from_headers
+
+
+class RequestsTransport:
+    """基于 requests.Session 的传输（HTTP/1.1 keep-alive）"""
+
+    name = 'requests'
+
+    def __init__(self, session, pool_connections=10, pool_maxsize=10, per_host_maxsize=None):
+        self.session = session
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.per_host_maxsize = dict(per_host_maxsize or {})
+        self._mounted = {}  # 前缀 → 本传输挂载的适配器
+        self._mount()
+
+    def _mount(self):
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+        self._mount_adapter('http://', adapter)
+        self._mount_adapter('https://', adapter)
+        # 主要主机单独使用一个连接池，大小与并发数匹配
+        for host, maxsize in self.per_host_maxsize.items():
+            host_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(maxsize, self.pool_maxsize))
+            self._mount_adapter(f'http://{host}', host_adapter)
+            self._mount_adapter(f'https://{host}', host_adapter)
+
+    def _mount_adapter(self, prefix, adapter):
+        # 不替换调用方自己挂载在主机前缀上的适配器（Session 默认的两个适配器除外）
+        current = self.session.adapters.get(prefix)
+        if current is not None and current is not self._mounted.get(prefix) and prefix not in ('http://', 'https://'):
+            return
+        self.session.mount(prefix, adapter)
+        self._mounted[prefix] = adapter
+
+    def resize(self, maxsize):
+        """确保每个主机的连接池至少能容纳 maxsize 个并发连接（在发出请求前调用）"""
+        if maxsize <= self.pool_maxsize and all(v >= maxsize for v in self.per_host_maxsize.values()):
+            return
+        self.pool_maxsize = max(self.pool_maxsize, maxsize)
+        self.per_host_maxsize = {host: max(v, maxsize) for host, v in self.per_host_maxsize.items()}
+        self._mount()
+
+    def get(self, url, timeout=None, headers=None, stream=False):
+        return self.request('GET', url, timeout=timeout, headers=headers, stream=stream)
+
+    def request(self, method, url, timeout=None, headers=None, stream=False, allow_redirects=True):
+        return self.session.request(method, url, timeout=timeout, headers=headers, stream=stream,
+                                    allow_redirects=allow_redirects)
+
+    def stats(self):
+        """每个主机的请求数、新建连接数和连接复用次数"""
+        hosts = {}
+        for adapter in {id(a): a for a in self.session.adapters.values()}.values():
+            manager = getattr(adapter, 'poolmanager', None)
+            if manager is None:
+                continue
+            for key in list(manager.pools.keys()):
+                pool = manager.pools.get(key)
+                if pool is None:
+                    continue
+                entry = hosts.setdefault(pool.host, {'requests': 0, 'connections': 0})
+                entry['requests'] += pool.num_requests
+                entry['connections'] += pool.num_connections
+        for entry in hosts.values():
+            entry['reused'] = max(0, entry['requests'] - entry['connections'])
+        return hosts
+
+    def close(self):
+        self.session.close()
+
+
+class HTTPXResponse:
+    """把 httpx.Response 包装成爬虫使用的 requests.Response 接口"""
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+        self.request = None
+        self.encoding = get_encoding_from_headers(response.headers)
+        self.http_version = response.http_version
+
+    @property
+    def content(self):
+        return self._response.read()
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def iter_content(self, chunk_size=None):
+        try:
+            yield from self._response.iter_bytes(chunk_size)
+        except Exception as e:
+            raise _translate_error(e) from e
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+    def close(self):
+        self._response.close()
+
+
+def _translate_error(error):
+    """把 httpx 异常转换为 requests 异常，重试策略和限流器据此判断"""
+    import httpx
+
+    if isinstance(error, httpx.TimeoutException):
+        return requests.Timeout(str(error))
+    if isinstance(error, (httpx.NetworkError, httpx.RemoteProtocolError, httpx.ProxyError)):
+        return requests.ConnectionError(str(error))
+    return requests.RequestException(str(error))
+
+
+class HTTPXTransport:
+    """基于 httpx 的传输，可启用 HTTP/2 多路复用"""
+
+    name = 'httpx'
+
+    def __init__(self, session_headers=None, http2=True, http1=True, max_connections=100, max_keepalive=20,
+                 keepalive_expiry=30.0):
+        import httpx
+
+        self.http2 = http2
+        self._headers = session_headers if session_headers is not None else {}
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        # http1=False 时对 http:// 也直接使用 HTTP/2（h2c 先验知识），用于本地 HTTP/2 测试服务器
+        self.client = httpx.Client(http1=http1, http2=http2, limits=limits, follow_redirects=True)
+        self._lock = threading.Lock()
+        self._requests = Counter()
+        self._connections = {}   # 主机 → 仍存活的连接（底层网络流的弱引用，用于识别复用）
+        self._connection_counts = Counter()  # 主机 → 使用过的连接数
+        self._versions = {}      # 主机 → 各协议版本的请求数
+
+    def resize(self, maxsize):
+        """HTTP/2 下同一主机的请求共用一条连接，连接数上限由 Limits 控制"""
+
+    def get(self, url, timeout=None, headers=None, stream=False):
+        return self.request('GET', url, timeout=timeout, headers=headers, stream=stream)
+
+    def request(self, method, url, timeout=None, headers=None, stream=False, allow_redirects=True):
+        import httpx
+
+        merged = dict(self._headers)
+        merged.update(headers or {})
+        try:
+            request = self.client.build_request(method, url, headers=merged, timeout=timeout)
+            response = self.client.send(request, stream=True, follow_redirects=allow_redirects)
+            if not stream:
+                response.read()
+                response.close()
+        except httpx.HTTPError as e:
+            raise _translate_error(e) from e
+        self._record(url, response)
+        return HTTPXResponse(response)
+
+    def _record(self, url, response):
+        host = urlparse(url).netloc.lower()
+        stream = response.extensions.get('network_stream')
+        with self._lock:
+            self._requests[host] += 1
+            self._versions.setdefault(host, Counter())[response.http_version] += 1
+            if stream is not None:
+                # 弱引用集合而不是 id()：已回收连接的 id 可能被新连接复用，而弱引用会随回收自动移除；
+                # 也不持有连接对象本身，长时间运行时不会积累已关闭的连接
+                seen = self._connections.setdefault(host, weakref.WeakSet())
+                if stream not in seen:
+                    seen.add(stream)
+                    self._connection_counts[host] += 1
+
+    def stats(self):
+        """每个主机的请求数、使用过的连接数、复用次数和各协议版本的请求数"""
+        with self._lock:
+            hosts = {}
+            for host, count in self._requests.items():
+                connections = self._connection_counts[host]
+                hosts[host] = {
+                    'requests': count,
+                    'connections': connections,
+                    'reused': max(0, count - connections),
+                    'versions': dict(self._versions.get(host, {})),
+                }
+            return hosts
+
+    def close(self):
+        self.client.close()
+
+
+def create_transport(config, session):
+    """根据 TRANSPORT 配置创建传输；httpx 未安装时退回 requests"""
+    logger = logging.getLogger(__name__)
+    if config.get('client', 'requests') == 'httpx':
+        try:
+            return HTTPXTransport(
+                session_headers=session.headers,
+                http2=config.get('http2', True),
+                http1=config.get('http1', True),
+                max_connections=config.get('max_connections', 100),
+                max_keepalive=config.get('max_keepalive', 20),
+                keepalive_expiry=config.get('keepalive_expiry', 30.0),
+            )
+        except ImportError:
+            logger.warning("未安装 httpx（pip install 'httpx[http2]'），使用 requests 传输")
+    return RequestsTransport(
+        session,
+        pool_connections=config.get('pool_connections', 10),
+        pool_maxsize=config.get('pool_maxsize', 10),
+        per_host_maxsize=config.get('per_host_maxsize'),
+    )
@@ -0,0 +1,173 @@
+"""
+URL分类器 - 由 enhanced_config.URL_VALIDATION 编译而成，只构建一次
+
+is_valid_deal_url / _is_valid_merchant_link 原先对每个候选链接逐个遍历多个列表
+（无效模式、分享链接、文件扩展名、约45个可信域名的 endswith 循环、优惠关键词）。
+这里把子串列表编译成前缀树形式的正则（共享前缀的多模式匹配），
+可信域名按"域名后缀"放入哈希集合，每个URL只需按标签数查找几次，
+可信域名增长到数千个商家时，单个URL的判断开销基本不变。
+"""
+
+import re
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+INTERNAL_DOMAIN = 'latestfreestuff.co.uk'
+
+# 规范化URL时去掉的跟踪参数
+TRACKING_PARAMS = {'fbclid', 'gclid', 'msclkid', 'mc_cid', 'mc_eid', '_ga', 'ref'}
+
+# URL_VALIDATION 中的规则列表（规则只在 enhanced_config 中维护）
+RULE_KEYS = ('invalid_patterns', 'social_share_patterns', 'invalid_extensions',
+             'trusted_domains', 'deal_keywords', 'merchant_invalid_patterns')
+
+
+def trie_pattern(words):
+    """把一组字面量合并成前缀树结构的正则，例如 share/sharer → shar(?:e(?:r)?)"""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    escaped = {}
+
+    def emit(node):
+        end = '' in node
+        branches = []
+        for ch, child in sorted(node.items()):
+            if ch:
+                if ch not in escaped:
+                    escaped[ch] = re.escape(ch)
+                branches.append(escaped[ch] + emit(child))
+        if not branches:
+            return ''
+        if len(branches) == 1 and not end:
+            return branches[0]
+        body = '|'.join(branches)
+        return f"(?:{body})?" if end else f"(?:{body})"
+
+    return emit(trie)
+
+
+class SubstringMatcher:
+    """多模式子串匹配：一次扫描判断是否包含任意一个模式"""
+
+    def __init__(self, patterns):
+        words = sorted({p.lower() for p in patterns if p})
+        self._regex = re.compile(trie_pattern(words)) if words else None
+
+    def search(self, text):
+        return bool(self._regex and self._regex.search(text))
+
+
+class DomainSet:
+    """可信域名集合：按域名后缀逐级查找，等价于 host == d 或 host.endswith('.' + d)"""
+
+    def __init__(self, domains):
+        self._domains = {d.lower().strip('.') for d in domains if d}
+
+    def __len__(self):
+        return len(self._domains)
+
+    def contains(self, host):
+        if host in self._domains:
+            return True
+        pos = host.find('.')
+        while pos != -1:
+            if host[pos + 1:] in self._domains:
+                return True
+            pos = host.find('.', pos + 1)
+        return False
+
+
+class URLClassifier:
+    """编译后的候选链接分类器"""
+
+    def __init__(self, invalid_patterns, social_share_patterns, invalid_extensions,
+                 trusted_domains, deal_keywords, merchant_invalid_patterns):
+        self.invalid = SubstringMatcher(invalid_patterns)
+        self.social_share = SubstringMatcher(social_share_patterns)
+        self.invalid_extensions = tuple(ext.lower() for ext in invalid_extensions)
+        self.trusted_domains = DomainSet(trusted_domains)
+        self.deal_keywords = SubstringMatcher(deal_keywords)
+        self.merchant_invalid = SubstringMatcher(merchant_invalid_patterns)
+
+    @classmethod
+    def from_config(cls, config):
+        """使用 URL_VALIDATION 配置构建分类器（未配置的规则为空列表）"""
+        return cls(**{key: config.get(key, ()) for key in RULE_KEYS})
+
+    def is_valid_deal_url(self, url):
+        """验证是否是有效的优惠链接URL"""
+        if not url or len(url) < 10:
+            return False
+
+        url_lower = url.lower()
+
+        # 排除无效链接、社交媒体分享链接和文件下载链接
+        if self.invalid.search(url_lower) or self.social_share.search(url_lower):
+            return False
+        if url_lower.endswith(self.invalid_extensions):
+            return False
+
+        try:
+            domain = urlparse(url).netloc.lower()
+            if domain.startswith('www.'):
+                domain = domain[4:]
+
+            # 已知的购物网站，或包含优惠相关关键词
+            if self.trusted_domains.contains(domain):
+                return True
+            if self.deal_keywords.search(url_lower):
+                return True
+        except Exception:
+            pass
+
+        # 如果URL长度合理且是外部链接，认为可能是有效的
+        return len(url) > 15 and INTERNAL_DOMAIN not in url_lower
+
+    def is_valid_merchant_link(self, url):
+        """验证是否是有效的商家链接"""
+        if not url or len(url) < 10:
+            return False
+
+        url_lower = url.lower()
+        if self.merchant_invalid.search(url_lower):
+            return False
+
+        # 必须是外部的 HTTP(S) 链接
+        if INTERNAL_DOMAIN in url_lower:
+            return False
+        return url_lower.startswith(('http://', 'https://'))
+
+
+def canonicalize_url(url):
+    """规范化URL，用于判断两个链接是否指向同一个页面
+
+    小写协议和主机名、去掉 www. 前缀、默认端口、片段和跟踪参数，
+    查询参数排序，路径末尾的 / 统一去掉。
+    端口无法解析（非数字或超出范围）时去掉端口；整个URL无法解析（如不完整的IPv6地址）时原样返回。
+    """
+    if not url:
+        return url
+    try:
+        parsed = urlparse(url.strip())
+    except ValueError:
+        return url
+    scheme = parsed.scheme.lower()
+    host = parsed.hostname or ''
+    if host.startswith('www.'):
+        host = host[4:]
+    try:
+        port = parsed.port
+    except ValueError:
+        port = None
+    if port and not ((scheme == 'http' and port == 80) or (scheme == 'https' and port == 443)):
+        host = f"{host}:{port}"
+    path = parsed.path.rstrip('/') or '/'
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not (key.lower().startswith('utm_') or key.lower() in TRACKING_PARAMS)
+    ))
+    return urlunparse((scheme, host, path, '', query, ''))
@@ -13,15 +13,31 @@ from typing import Sequence
 from automation import AutomationManager
 
 
-def run_full_workflow(manager: AutomationManager) -> int:
+def run_full_workflow(
+    manager: AutomationManager,
+    engine: str | None = None,
+    cache_only: bool = False,
+    incremental: bool = False,
+    max_deals: int | None = None,
+) -> int:
     """Run the complete automation pipeline."""
-    success = manager.run_full_automation()
+    success = manager.run_full_automation(
+        engine=engine, cache_only=cache_only, incremental=incremental, max_deals=max_deals
+    )
     return 0 if success else 1
 
 
-def run_crawler_only(manager: AutomationManager) -> int:
+def run_crawler_only(
+    manager: AutomationManager,
+    engine: str | None = None,
+    cache_only: bool = False,
+    incremental: bool = False,
+    max_deals: int | None = None,
+) -> int:
     """Execute the crawler and print a short summary."""
-    deals = manager.run_crawler()
+    deals = manager.run_crawler(
+        engine=engine, cache_only=cache_only, incremental=incremental, max_deals=max_deals
+    )
     if deals:
         print(f"✅ 成功获取 {len(deals)} 个优惠")
         return 0
@@ -48,6 +64,43 @@ def generate_report(manager: AutomationManager, deals: int) -> int:
     return 0
 
 
+def import_snapshots(manager: AutomationManager) -> int:
+    """Import existing timestamped JSON snapshots into the deal store."""
+    imported = manager.import_snapshots()
+    print(f"✅ 已导入 {imported} 个快照文件到优惠数据库")
+    return 0
+
+
+def first_seen(manager: AutomationManager, url: str) -> int:
+    """Look up the earliest archived run that contains a detail URL."""
+    found = manager.first_seen(url)
+    if found is None:
+        print(f"❌ 归档中没有找到 {url}")
+        return 1
+    archive, deal = found
+    print(f"✅ 最早出现于 {archive}: {deal.get('title', '')}")
+    return 0
+
+
+def compact(manager: AutomationManager, keep_runs: int | None, keep_backups: int | None) -> int:
+    """Archive older runs and website backups according to the retention policy."""
+    results = manager.compact_archives(keep_runs, keep_backups)
+    for kind, result in results.items():
+        print(f"✅ {kind}: 归档 {result['files']} 个文件 ({result['bytes']} 字节 → 新增 {result['stored']} 字节)")
+    return 0
+
+
+def restore(manager: AutomationManager, name: str) -> int:
+    """Restore an archived file (or every file of a run timestamp)."""
+    restored = manager.restore_snapshot(name)
+    if not restored:
+        print(f"❌ 归档中没有找到 {name}")
+        return 1
+    for path in restored:
+        print(f"✅ 已还原 {path}")
+    return 0
+
+
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="英国优惠爬虫自动化管理工具",
@@ -62,6 +115,30 @@ def build_parser() -> argparse.ArgumentParser:
     crawl_parser = subparsers.add_parser("crawl", help="仅运行增强版爬虫")
     crawl_parser.set_defaults(command="crawl")
 
+    for sub in (run_parser, crawl_parser):
+        sub.add_argument(
+            "--engine",
+            choices=("sync", "async"),
+            default=None,
+            help="爬取引擎: sync 逐个解析, async 并发解析 (默认读取配置)",
+        )
+        sub.add_argument(
+            "--cache-only",
+            action="store_true",
+            help="离线模式: 只从HTTP缓存读取页面, 重放上一次运行",
+        )
+        sub.add_argument(
+            "--incremental",
+            action="store_true",
+            help="增量模式: 只解析新优惠, 遇到已处理过的优惠即停止",
+        )
+        sub.add_argument(
+            "--max-deals",
+            type=int,
+            default=None,
+            help="最多解析的优惠数量 (默认读取配置 MAX_DEALS)",
+        )
+
     update_parser = subparsers.add_parser("update", help="根据最新数据更新网站")
     update_parser.set_defaults(command="update")
 
@@ -74,6 +151,34 @@ def build_parser() -> argparse.ArgumentParser:
     )
     report_parser.set_defaults(command="report")
 
+    import_parser = subparsers.add_parser(
+        "import-snapshots", help="将 crawler/data 中已有的快照文件导入优惠数据库 (可重复执行)"
+    )
+    import_parser.set_defaults(command="import-snapshots")
+
+    first_seen_parser = subparsers.add_parser(
+        "first-seen", help="查询某个详情页最早出现在哪次运行的 JSONL 归档中"
+    )
+    first_seen_parser.add_argument("url", help="优惠详情页URL")
+    first_seen_parser.set_defaults(command="first-seen")
+
+    compact_parser = subparsers.add_parser(
+        "compact", help="压缩归档较早的运行结果和网站备份 (相同内容只存一份)"
+    )
+    compact_parser.add_argument(
+        "--keep-runs", type=int, default=None, help="crawler/data 中保留的最近运行次数 (默认读取配置)"
+    )
+    compact_parser.add_argument(
+        "--keep-backups", type=int, default=None, help="backups 中保留的最近备份数 (默认读取配置)"
+    )
+    compact_parser.set_defaults(command="compact")
+
+    restore_parser = subparsers.add_parser("restore", help="从归档还原某次运行或某个备份")
+    restore_parser.add_argument(
+        "name", help="归档文件名 (如 enhanced_deals_20250101_090000.jsonl) 或运行时间戳 (20250101_090000)"
+    )
+    restore_parser.set_defaults(command="restore")
+
     return parser
 
 
@@ -84,15 +189,28 @@ def main(argv: Sequence[str] | None = None) -> int:
 
     manager = AutomationManager()
 
+    engine = getattr(args, "engine", None)
+    cache_only = getattr(args, "cache_only", False)
+    incremental = getattr(args, "incremental", False)
+    max_deals = getattr(args, "max_deals", None)
+
     if command == "run":
-        return run_full_workflow(manager)
+        return run_full_workflow(manager, engine, cache_only, incremental, max_deals)
     if command == "crawl":
-        return run_crawler_only(manager)
+        return run_crawler_only(manager, engine, cache_only, incremental, max_deals)
     if command == "update":
         return update_site(manager)
     if command == "report":
         deals = getattr(args, "deals", 0)
         return generate_report(manager, deals)
+    if command == "import-snapshots":
+        return import_snapshots(manager)
+    if command == "first-seen":
+        return first_seen(manager, args.url)
+    if command == "compact":
+        return compact(manager, args.keep_runs, args.keep_backups)
+    if command == "restore":
+        return restore(manager, args.name)
 
     parser.print_help()
     return 1
@@ -4,10 +4,23 @@
 """
 
 import os
+import sys
 import json
 import re
 from datetime import datetime
 import shutil
+from itertools import chain
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crawler'))
+
+try:
+    from enhanced_config import COMPACTION, DEAL_STORE
+except ImportError:
+    COMPACTION = {}
+    DEAL_STORE = {}
+from compaction import BACKUP_NAME, SnapshotArchive
+from deal_store import DealStore
+from deal_stream import iter_deals
 
 class WebsiteUpdater:
     def __init__(self):
@@ -16,6 +29,22 @@ class WebsiteUpdater:
         self.backup_dir = "backups"
         self.sample_data_dir = "crawler/sample_data"
         self.sample_json = os.path.join(self.sample_data_dir, "enhanced_deals_sample.json")
+        self.store_path = os.path.join("crawler", DEAL_STORE.get('path', 'data/deals.db'))
+        self.rendered_count = 0  # 上一次 generate_deals_html 渲染的优惠数量
+
+    def load_latest_from_store(self):
+        """逐条返回优惠数据库中最新一次运行的优惠；数据库未启用、不存在或为空时不返回任何优惠"""
+        if not DEAL_STORE.get('enabled', True) or not os.path.exists(self.store_path):
+            return
+        try:
+            with DealStore(self.store_path) as store:
+                run = store.latest_run()
+                if not run:
+                    return
+                print(f"📄 优惠数据库: 运行 {run['run_id']}（{run['created']}），{run['deal_count']} 个优惠")
+                yield from store.iter_run_deals(run['run_id'])
+        except Exception as e:
+            print(f"⚠️ 读取优惠数据库失败: {e}")
 
     def get_latest_data_files(self):
         """获取最新的数据文件"""
@@ -23,8 +52,8 @@ class WebsiteUpdater:
             print("⚠️ 数据目录不存在，尝试使用示例数据")
             return self.get_sample_data_files()
 
-        # 获取所有JSON和HTML文件
-        json_files = [f for f in os.listdir(self.data_dir) if f.endswith('.json')]
+        # 获取所有JSON/JSONL和HTML文件
+        json_files = [f for f in os.listdir(self.data_dir) if f.endswith(('.json', '.jsonl'))]
         html_files = [f for f in os.listdir(self.data_dir) if f.endswith('.html')]
 
         if not json_files or not html_files:
@@ -53,15 +82,11 @@ class WebsiteUpdater:
         return None, None
 
     def load_deals_data(self, json_path):
-        """加载优惠数据"""
+        """逐条读取优惠数据（生成器；JSONL 文件不会被整体读入内存）"""
         try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                deals = json.load(f)
-            print(f"✅ 成功加载 {len(deals)} 个优惠信息")
-            return deals
+            yield from iter_deals(json_path)
         except Exception as e:
             print(f"❌ 加载数据失败: {e}")
-            return []
 
     def backup_website(self):
         """备份当前网站"""
@@ -77,8 +102,22 @@ class WebsiteUpdater:
         
         shutil.copy2(self.main_html_path, backup_path)
         print(f"💾 网站已备份到: {backup_path}")
+        self.compact_backups()
         return True
 
+    def compact_backups(self):
+        """只保留最近 keep_backups 个备份文件，更早的备份压缩归档（内容相同的只存一份）"""
+        if not COMPACTION.get('enabled', True):
+            return
+        try:
+            with SnapshotArchive.from_config(COMPACTION, path=COMPACTION.get('backup_path', 'backups/archive')) as archive:
+                result = archive.compact(self.backup_dir, keep=COMPACTION.get('keep_backups', 10), pattern=BACKUP_NAME)
+                if result['files']:
+                    print(f"🗜️ 已归档 {result['files']} 个较早的备份（新增 {result['new_objects']} 个对象），"
+                          f"可用 manage_crawler.py restore 还原")
+        except Exception as e:
+            print(f"⚠️ 归档备份失败: {e}")
+
     def generate_deals_html(self, deals, used_sample=False):
         """生成优惠信息的HTML"""
         if not deals:
@@ -104,7 +143,9 @@ class WebsiteUpdater:
                 <div class="deals-container">
 """
         
+        self.rendered_count = 0
         for deal in deals:
+            self.rendered_count += 1
             title_zh = deal.get('title_zh', deal.get('title', ''))
             desc_zh = deal.get('description_zh', deal.get('description', ''))
             
@@ -170,17 +211,23 @@ class WebsiteUpdater:
         """从最新数据更新网站"""
         print("🔄 开始更新网站内容...")
         
-        # 获取最新数据文件
-        json_path, html_path = self.get_latest_data_files()
-        if not json_path:
-            return False
+        # 优先读取优惠数据库，没有时再查找最新的数据文件（均为逐条读取）
+        deals = self.load_latest_from_store()
+        first = next(deals, None)
+        used_sample = False
+        if first is None:
+            json_path, html_path = self.get_latest_data_files()
+            if not json_path:
+                return False
 
-        used_sample = json_path == self.sample_json
+            used_sample = json_path == self.sample_json
 
-        # 加载数据
-        deals = self.load_deals_data(json_path)
-        if not deals:
+            # 加载数据
+            deals = self.load_deals_data(json_path)
+            first = next(deals, None)
+        if first is None:
             return False
+        deals = chain([first], deals)
             
         # 备份网站
         if not self.backup_website():
@@ -192,7 +239,7 @@ class WebsiteUpdater:
         # 更新网站
         if self.update_website(deals_html):
             print("✅ 网站更新成功！")
-            print(f"📊 已添加 {len(deals)} 个最新优惠")
+            print(f"📊 已添加 {self.rendered_count} 个最新优惠")
             print("🌐 您可以查看更新后的网站效果")
             return True
         else: